@@ -216,8 +216,9 @@ def handle_payment_succeeded(yookassa_payment_id, payment_data):
             logger.info(f'Re-enabled OpenRouter key for {user.email}')
     else:
         # First payment — assign server via Celery task (provides retry + monitoring)
+        from apps.servers.queues import PRIORITY_FIRST_PAYMENT
         from apps.servers.tasks import assign_server_to_user
-        assign_server_to_user.delay(user.id)
+        assign_server_to_user.apply_async((user.id,), priority=PRIORITY_FIRST_PAYMENT)
         logger.info(f'Queued assign_server_to_user task for user {user.id}')
 
     # Notify Telegram bot user about payment received
@@ -1,13 +1,17 @@
 from django.contrib import admin
-from .models import Server, OAuthPendingFlow
+from .models import DeployRun, DeployStep, GoldenImage, ImageBuild, Server, OAuthPendingFlow
 
 
 @admin.register(Server)
 class ServerAdmin(admin.ModelAdmin):
-    list_display = ['ip_address', 'status', 'openclaw_running', 'clawdmatrix_installed', 'profile', 'last_health_check']
-    list_filter = ['status', 'openclaw_running', 'clawdmatrix_installed']
+    list_display = ['ip_address', 'status', 'provision_state', 'openclaw_running', 'clawdmatrix_installed', 'profile', 'last_health_check']
+    list_filter = ['status', 'provision_state', 'openclaw_running', 'clawdmatrix_installed']
     search_fields = ['ip_address', 'profile__user__email']
-    readonly_fields = ['created_at', 'updated_at', 'last_health_check']
+    actions = ['resume_deploy']
+    readonly_fields = [
+        'created_at', 'updated_at', 'last_health_check', 'deploy_state',
+        'provision_state', 'provision_state_at', 'provision_failures', 'provision_data',
+    ]
     fieldsets = (
         ('SSH подключение', {
             'fields': ('ip_address', 'ssh_user', 'ssh_password', 'ssh_port'),
@@ -15,6 +19,10 @@ class ServerAdmin(admin.ModelAdmin):
         ('Статус', {
             'fields': ('status', 'openclaw_running', 'openclaw_path', 'last_error', 'last_health_check'),
         }),
+        ('Развёртывание', {
+            'fields': ('provision_state', 'provision_state_at', 'provision_failures', 'provision_data', 'deploy_state'),
+            'classes': ('collapse',),
+        }),
         ('Привязка', {
             'fields': ('profile',),
         }),
@@ -23,9 +31,65 @@ class ServerAdmin(admin.ModelAdmin):
         }),
     )
 
+    @admin.action(description='Продолжить прерванный деплой')
+    def resume_deploy(self, request, queryset):
+        from .journal import resumable
+        from .tasks import redeploy_openclaw
+
+        queued = 0
+        for server in queryset.select_related('profile'):
+            if server.profile is None or resumable(server) is None:
+                continue
+            redeploy_openclaw.delay(server.profile.user_id, resume=True)
+            queued += 1
+        self.message_user(request, f'Продолжение деплоя запущено: {queued} из {queryset.count()}')
+
 
 @admin.register(OAuthPendingFlow)
 class OAuthPendingFlowAdmin(admin.ModelAdmin):
     list_display = ['provider', 'skill_key', 'server', 'created_at']
     list_filter = ['provider']
     readonly_fields = ['state', 'created_at']
+
+
+class DeployStepInline(admin.TabularInline):
+    model = DeployStep
+    extra = 0
+    can_delete = False
+    fields = ['position', 'name', 'status', 'duration', 'commands', 'bytes_sent', 'bytes_received',
+              'exit_code', 'retries', 'error']
+    readonly_fields = fields
+
+
+@admin.register(DeployRun)
+class DeployRunAdmin(admin.ModelAdmin):
+    list_display = ['server', 'kind', 'status', 'started_at', 'duration', 'resumed_from']
+    list_filter = ['kind', 'status']
+    search_fields = ['server__ip_address']
+    readonly_fields = ['server', 'kind', 'status', 'started_at', 'finished_at', 'duration', 'error', 'critical_path',
+                       'idempotency_key', 'resumed_from', 'checkpoint']
+    inlines = [DeployStepInline]
+
+
+@admin.register(DeployStep)
+class DeployStepAdmin(admin.ModelAdmin):
+    list_display = ['name', 'run', 'status', 'duration', 'commands', 'bytes_sent', 'retries']
+    list_filter = ['name', 'status', 'run__kind']
+    search_fields = ['run__server__ip_address']
+    readonly_fields = [f.name for f in DeployStep._meta.fields]
+
+
+@admin.register(ImageBuild)
+class ImageBuildAdmin(admin.ModelAdmin):
+    list_display = ['tag', 'status', 'source', 'size_bytes', 'build_duration', 'created_at']
+    list_filter = ['status']
+    readonly_fields = ['build_key', 'tag', 'dockerfile_sha', 'base_digests', 'image_id', 'registry_ref',
+                       'size_bytes', 'build_duration', 'created_at', 'updated_at']
+
+
+@admin.register(GoldenImage)
+class GoldenImageAdmin(admin.ModelAdmin):
+    list_display = ['timeweb_image_id', 'status', 'source', 'servers_created', 'created_at']
+    list_filter = ['status']
+    readonly_fields = ['fingerprint', 'timeweb_image_id', 'source', 'deploy_state', 'servers_created', 'error',
+                       'created_at', 'updated_at']
@@ -9,3 +9,5 @@ class ServersConfig(AppConfig):
     def ready(self):
         # Import signals to register them
         import apps.servers.signals  # noqa
+        # Queue wait metrics (celery publish/prerun signals)
+        import apps.servers.queues  # noqa
@@ -0,0 +1,185 @@
+"""Deploy artifacts — human-browser node_modules + Playwright Chromium as cached tarballs.
+
+install_human_browser used to run `npm install` and `npx playwright install
+chromium` in throwaway containers on every server (timeouts 120 s + 300 s),
+downloading the same ~150 MB each time. The result depends only on the skill's
+package.json and the openclaw-chrome image (node version), so it is keyed by
+a sha256 of both and kept on the backend as a tarball:
+
+    DEPLOY_ARTIFACTS_DIR/human-browser-deps-<key>.tar.gz
+      node_modules/       → {openclaw_path}/skills/human-browser/node_modules
+      playwright-cache/   → /root/playwright-cache
+
+A server whose marker file already holds the key skips the step. A server
+without it gets the tarball streamed into `tar -x` (one channel, no
+downloads on the VPS). Only when the backend has no tarball yet does the
+server install the deps itself. The tarball for the rest of the fleet is
+then built by capture() in a throwaway container without mounts — never
+from the host directories, which are mounted read-write into the user's
+container — and only on a pool server nobody was assigned to.
+"""
+import glob
+import hashlib
+import logging
+import os
+import shlex
+import tempfile
+
+from django.conf import settings
+
+from .bundles import BACKEND_DIR, HUMAN_BROWSER_DIR, NODE_UID
+
+logger = logging.getLogger(__name__)
+
+DEPLOY_ARTIFACTS_DIR = getattr(settings, 'DEPLOY_ARTIFACTS_DIR', os.path.join(BACKEND_DIR, 'var', 'artifacts'))
+# Tarballs of older keys kept per artifact name
+DEPLOY_ARTIFACTS_KEEP = getattr(settings, 'DEPLOY_ARTIFACTS_KEEP', 3)
+# Seconds for streaming one artifact to or from a server
+ARTIFACT_TRANSFER_TIMEOUT = getattr(settings, 'ARTIFACT_TRANSFER_TIMEOUT', 600)
+# Seconds for npm + Playwright installs in the capture container
+ARTIFACT_BUILD_TIMEOUT = getattr(settings, 'ARTIFACT_BUILD_TIMEOUT', 600)
+
+HUMAN_BROWSER_DEPS = 'human-browser-deps'
+PLAYWRIGHT_CACHE = '/root/playwright-cache'
+MARKER_NAME = '.deps-sha256'
+
+
+def human_browser_key(image):
+    """Key of the deps built from the skill's package.json inside `image`."""
+    h = hashlib.sha256(f'{HUMAN_BROWSER_DEPS}:{image}:chromium\0'.encode())
+    with open(os.path.join(HUMAN_BROWSER_DIR, 'package.json'), 'rb') as f:
+        h.update(f.read())
+    return h.hexdigest()
+
+
+def artifact_path(name, key):
+    return os.path.join(DEPLOY_ARTIFACTS_DIR, f'{name}-{key}.tar.gz')
+
+
+class HumanBrowserDeps:
+    """Install/capture of the human-browser deps on one server."""
+
+    def __init__(self, manager, image):
+        self.manager = manager
+        self.image = image
+        self.key = human_browser_key(image)
+        self.path = artifact_path(HUMAN_BROWSER_DEPS, self.key)
+        self.skill_dir = f'{manager.server.openclaw_path}/skills/human-browser'
+        self.marker = f'{self.skill_dir}/{MARKER_NAME}'
+
+    def installed(self):
+        """The server already has these deps (marker matches and both trees exist)."""
+        out, _, code = self.manager.exec_command(
+            f'test -d {self.skill_dir}/node_modules && ls -d {PLAYWRIGHT_CACHE}/chromium-* >/dev/null 2>&1 '
+            f'&& cat {self.marker}'
+        )
+        return code == 0 and out.strip() == self.key
+
+    def deliver(self):
+        """Stream the cached tarball into place. False if there is none or extraction failed."""
+        if not os.path.exists(self.path):
+            return False
+        stage = f'{self.skill_dir}/.deps-stage'
+        cmd = (
+            f'set -e; rm -rf {stage}; mkdir -p {stage} {PLAYWRIGHT_CACHE}; '
+            f'tar -xzf - -C {stage}; '
+            f'rm -rf {self.skill_dir}/node_modules; mv {stage}/node_modules {self.skill_dir}/node_modules; '
+            f'cp -a {stage}/{os.path.basename(PLAYWRIGHT_CACHE)}/. {PLAYWRIGHT_CACHE}/; rm -rf {stage}; '
+            f'chown -R {NODE_UID}:{NODE_UID} {self.skill_dir} {PLAYWRIGHT_CACHE}; '
+            f'echo {self.key} > {self.marker}'
+        )
+        with open(self.path, 'rb') as f:
+            out, err, code = self.manager.exec_stdin(
+                cmd, f, timeout=ARTIFACT_TRANSFER_TIMEOUT, chunk_size=1 << 20,
+            )
+        if code != 0:
+            logger.warning(
+                f'{HUMAN_BROWSER_DEPS} artifact not extracted on {self.manager.server.ip_address}: '
+                f'{(err or out)[:300]}'
+            )
+            return False
+        logger.info(
+            f'{HUMAN_BROWSER_DEPS} {self.key[:12]} delivered to {self.manager.server.ip_address} '
+            f'({os.path.getsize(self.path)} bytes)'
+        )
+        return True
+
+    def mark_installed(self):
+        self.manager.exec_command(f'echo {self.key} > {self.marker}')
+
+    def capture_command(self):
+        """Install the deps from package.json (stdin) in a container of the image, tar them to stdout."""
+        cache_dir = os.path.basename(PLAYWRIGHT_CACHE)
+        script = (
+            f'set -e; mkdir -p /out/skill; cd /out/skill; cat > package.json; '
+            f'{{ npm install --no-fund --no-audit && '
+            f'PLAYWRIGHT_BROWSERS_PATH=/out/{cache_dir} npx playwright install chromium; }} '
+            f'>/tmp/install.log 2>&1 || {{ tail -c 300 /tmp/install.log >&2; exit 1; }}; '
+            f'tar -czf - node_modules -C /out {cache_dir}'
+        )
+        return (
+            f'timeout {ARTIFACT_BUILD_TIMEOUT} docker run --rm -i -u 0 --entrypoint sh {self.image} '
+            f'-c {shlex.quote(script)}'
+        )
+
+    def capture(self):
+        """Build the deps in a throwaway container on the server into the backend cache.
+
+        Only for a server no user has been assigned to (see the module docstring).
+        """
+        if os.path.exists(self.path):
+            return True
+        server = self.manager.server
+        if server.profile_id is not None:
+            logger.warning(f'{HUMAN_BROWSER_DEPS} not captured from user server {server.ip_address}')
+            return False
+        os.makedirs(DEPLOY_ARTIFACTS_DIR, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=DEPLOY_ARTIFACTS_DIR, suffix='.part')
+        try:
+            stdin, stdout, stderr = self.manager._open_channel(
+                self.capture_command(), ARTIFACT_BUILD_TIMEOUT + ARTIFACT_TRANSFER_TIMEOUT,
+            )
+            with open(os.path.join(HUMAN_BROWSER_DIR, 'package.json'), 'rb') as f:
+                stdin.write(f.read())
+            stdin.channel.shutdown_write()
+            received = 0
+            with os.fdopen(fd, 'wb') as f:
+                while True:
+                    chunk = stdout.read(1 << 20)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    received += len(chunk)
+            code = stdout.channel.recv_exit_status()
+            self.manager._track(commands=1, received=received, exit_code=code)
+            if code != 0:
+                logger.warning(
+                    f'{HUMAN_BROWSER_DEPS} capture failed on {self.manager.server.ip_address}: '
+                    f'{stderr.read().decode(errors="replace")[:300]}'
+                )
+                return False
+            os.replace(tmp, self.path)
+        except Exception as e:
+            logger.warning(f'{HUMAN_BROWSER_DEPS} capture failed on {self.manager.server.ip_address}: {e}')
+            return False
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+        logger.info(
+            f'{HUMAN_BROWSER_DEPS} {self.key[:12]} cached from {self.manager.server.ip_address} '
+            f'({received} bytes)'
+        )
+        prune(HUMAN_BROWSER_DEPS)
+        return True
+
+
+def prune(name, keep=DEPLOY_ARTIFACTS_KEEP):
+    """Drop all but the `keep` newest tarballs of `name`."""
+    paths = sorted(
+        glob.glob(os.path.join(DEPLOY_ARTIFACTS_DIR, f'{name}-*.tar.gz')), key=os.path.getmtime, reverse=True,
+    )
+    for old in paths[keep:]:
+        try:
+            os.unlink(old)
+        except OSError:
+            pass
@@ -0,0 +1,201 @@
+"""AsyncServerManager — asyncio surface over ServerManager for fleet operations.
+
+A synchronous ServerManager ties up its caller for the whole SSH conversation,
+so one management-command process could only drive one VPS at a time. This
+module exposes the same methods (`exec_command`, `upload_file`, the deploy
+and verify methods, …) as coroutines, so both variants share one set of step
+definitions.
+
+It is a thread-backed wrapper, not asyncio-native SSH: every call runs the
+unchanged (blocking, paramiko) ServerManager step on a worker thread, and the
+event loop only schedules them. A server being worked on occupies one thread,
+so the number of servers in flight is the smaller of the semaphore and the
+worker pool. The pool is sized from the concurrency asked for (at least
+ASYNC_FLEET_MAX_WORKERS threads), so for_each_server(concurrency=50) really
+runs 50 servers at once — at the cost of 50 threads and 50 SSH connections:
+
+    async def sweep(servers):
+        results = await for_each_server(servers, lambda m: m.verify_searxng(), concurrency=50)
+
+Calls on one AsyncServerManager are serialized (a ServerManager holds one
+borrowed connection and is not thread-safe); calls on different servers run
+in parallel. A worker thread can't be interrupted, so cancelling a call
+(e.g. a for_each_server timeout) aborts its SSH work with
+ServerManager.cancel() and keeps the server's lock and semaphore slot until
+the thread has returned.
+"""
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .services import ServerManager
+
+logger = logging.getLogger(__name__)
+
+# Worker threads shared by all AsyncServerManager calls in the process (minimum;
+# the pool grows to the largest for_each_server concurrency)
+ASYNC_FLEET_MAX_WORKERS = getattr(settings, 'ASYNC_FLEET_MAX_WORKERS', 64)
+# Default number of servers handled at once by for_each_server()
+ASYNC_FLEET_CONCURRENCY = getattr(settings, 'ASYNC_FLEET_CONCURRENCY', 20)
+
+_executor = None
+_executor_pid = None
+_executor_size = 0
+_executor_lock = threading.Lock()
+
+
+def get_executor(workers=0):
+    """Process-wide worker pool with at least `workers` threads, recreated after fork (same as ssh_pool.get_pool).
+
+    A larger pool replaces a smaller one; calls already running finish on the old pool.
+    """
+    global _executor, _executor_pid, _executor_size
+    pid = os.getpid()
+    size = max(workers, ASYNC_FLEET_MAX_WORKERS)
+    with _executor_lock:
+        if _executor is None or _executor_pid != pid or _executor_size < size:
+            if _executor is not None and _executor_pid == pid:
+                _executor.shutdown(wait=False)
+            _executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='ssh-fleet')
+            _executor_pid = pid
+            _executor_size = size
+        return _executor
+
+
+def _call_in_worker(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        # Worker threads outlive the call — don't leak DB connections
+        close_old_connections()
+
+
+class AsyncServerManager:
+    """Coroutine-based mirror of ServerManager for one server."""
+
+    def __init__(self, server, semaphore=None):
+        self.server = server
+        self.sync = ServerManager(server)
+        self._semaphore = semaphore
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    async def run(self, fn, *args, **kwargs):
+        """Run `fn(*args, **kwargs)` in the worker pool, one call per server at a time."""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(_call_in_worker, fn, *args, **kwargs)
+        async with self._lock:
+            if self._semaphore is None:
+                return await self._in_worker(loop, call)
+            async with self._semaphore:
+                return await self._in_worker(loop, call)
+
+    async def _in_worker(self, loop, call):
+        future = loop.run_in_executor(get_executor(), call)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # Stop the remote work, then wait for the thread to let go of
+            # the manager before anyone else may use it
+            self.sync.cancel()
+            await asyncio.wait([future])
+            if not future.cancelled() and future.exception() is not None:
+                logger.debug(f'Cancelled call on {self.server.ip_address} ended with: {future.exception()}')
+            raise
+
+    async def connect(self):
+        return await self.run(self.sync.connect)
+
+    async def disconnect(self, discard=False):
+        return await self.run(self.sync.disconnect, discard=discard)
+
+    async def exec_command(self, cmd, timeout=60):
+        return await self.run(self.sync.exec_command, cmd, timeout=timeout)
+
+    async def exec_parallel(self, cmds, timeout=60):
+        return await self.run(self.sync.exec_parallel, cmds, timeout=timeout)
+
+    async def upload_file(self, content, remote_path, mode=None):
+        return await self.run(self.sync.upload_file, content, remote_path, mode=mode)
+
+    async def upload_many(self, files, mode=0o644):
+        return await self.run(self.sync.upload_many, files, mode=mode)
+
+    def __getattr__(self, name):
+        # Everything else (deploy_openclaw, verify_searxng, install_agents, …)
+        # is the ServerManager method wrapped as a coroutine
+        attr = getattr(self.sync, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def method(*args, **kwargs):
+            return await self.run(attr, *args, **kwargs)
+        return method
+
+
+@dataclass
+class ServerOutcome:
+    """Result of one server in for_each_server()."""
+    server: Any
+    ok: bool
+    result: Any = None
+    error: str = ''
+    duration: float = 0.0
+    exception: BaseException | None = None
+
+
+async def for_each_server(servers, op, concurrency=ASYNC_FLEET_CONCURRENCY, timeout=None, on_done=None):
+    """Run `await op(manager)` for every server, at most `concurrency` at once.
+
+    `timeout` (seconds) bounds each server; a timed-out or failing server is
+    reported in its ServerOutcome and doesn't stop the others. `on_done`
+    is called with each ServerOutcome as soon as that server finishes.
+    A timed-out server's SSH work is cancelled (ServerManager.cancel()) and
+    its connection discarded; its slot is freed once the worker call returns.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    # One thread per server in flight: the pool must not be the narrower limit
+    get_executor(concurrency)
+
+    async def one(server):
+        async with semaphore:
+            manager = AsyncServerManager(server)
+            started = time.monotonic()
+            timed_out = False
+            try:
+                result = await asyncio.wait_for(op(manager), timeout)
+                outcome = ServerOutcome(server, ok=True, result=result)
+            except asyncio.TimeoutError:
+                timed_out = True
+                outcome = ServerOutcome(server, ok=False, error=f'timed out after {timeout}s')
+            except Exception as e:
+                logger.warning(f'Fleet op failed on {server.ip_address}: {e}')
+                outcome = ServerOutcome(server, ok=False, error=str(e) or type(e).__name__, exception=e)
+            finally:
+                # A cancelled connection is closed, not returned to the pool
+                try:
+                    await manager.disconnect(discard=timed_out)
+                except Exception:
+                    pass
+            outcome.duration = time.monotonic() - started
+            if on_done:
+                on_done(outcome)
+            return outcome
+
+    return await asyncio.gather(*(one(server) for server in servers))
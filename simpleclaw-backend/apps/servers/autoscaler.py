@@ -0,0 +1,242 @@
+"""Pool autoscaler — size the warm standby pool from forecast demand.
+
+ensure_server_pool used to keep a fixed MIN_AVAILABLE_SERVERS = 5. Evening
+payment spikes drained the pool, so users fell back to provision_user_service
+(a new VPS, minutes). On quiet nights five idle VPSes were paid for.
+
+plan() sizes the pool for the servers that will be needed before a server
+ordered now is ready:
+
+    arrivals   first payments (Payment, is_recurring=False) of the last
+               AUTOSCALE_HISTORY_WEEKS weeks, per hour of the week. Recent
+               weeks weigh more (AUTOSCALE_WEEK_DECAY). Each hour is shrunk
+               toward the overall hourly mean, so a sparse history doesn't
+               forecast zero (AUTOSCALE_SHRINK).
+    pending    first payments still pending, times the share of first
+               payments that succeed
+    lead time  p90 of created_at → 'warm' (provisioning.py) of recent servers
+    target     the AUTOSCALE_SERVICE_LEVEL quantile of a Poisson count with
+               mean = arrivals over lead time + one scaling interval,
+               + pending
+
+It scales up to the target now. It scales down only to the largest target
+of the next AUTOSCALE_SCALE_DOWN_HORIZON hours, so the pool fills ahead of
+the evening. At most AUTOSCALE_SCALE_DOWN_STEP idle servers older than
+AUTOSCALE_MIN_AGE minutes are deleted per run. MAX_TOTAL_SERVERS (tasks.py)
+still caps everything.
+"""
+import logging
+import math
+from dataclasses import asdict, dataclass, field
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# False = the fixed MIN_AVAILABLE_SERVERS pool (tasks.ensure_server_pool)
+AUTOSCALE_ENABLED = getattr(settings, 'AUTOSCALE_ENABLED', True)
+AUTOSCALE_MIN_POOL = getattr(settings, 'AUTOSCALE_MIN_POOL', 2)
+AUTOSCALE_MAX_POOL = getattr(settings, 'AUTOSCALE_MAX_POOL', 10)
+# Probability that the pool covers the arrivals until new servers are ready
+AUTOSCALE_SERVICE_LEVEL = getattr(settings, 'AUTOSCALE_SERVICE_LEVEL', 0.95)
+AUTOSCALE_HISTORY_WEEKS = getattr(settings, 'AUTOSCALE_HISTORY_WEEKS', 8)
+AUTOSCALE_WEEK_DECAY = getattr(settings, 'AUTOSCALE_WEEK_DECAY', 0.7)
+AUTOSCALE_SHRINK = getattr(settings, 'AUTOSCALE_SHRINK', 0.8)
+# Seconds between two runs of ensure_server_pool
+AUTOSCALE_INTERVAL = getattr(settings, 'AUTOSCALE_INTERVAL', 300)
+# Until enough servers went through the provisioning state machine
+AUTOSCALE_DEFAULT_LEAD_TIME = getattr(settings, 'AUTOSCALE_DEFAULT_LEAD_TIME', 1200)
+# Pending first payments younger than this count as imminent arrivals
+AUTOSCALE_PENDING_WINDOW = getattr(settings, 'AUTOSCALE_PENDING_WINDOW', 1800)
+AUTOSCALE_SCALE_DOWN_HORIZON = getattr(settings, 'AUTOSCALE_SCALE_DOWN_HORIZON', 3)
+AUTOSCALE_SCALE_DOWN_STEP = getattr(settings, 'AUTOSCALE_SCALE_DOWN_STEP', 1)
+AUTOSCALE_MIN_AGE = getattr(settings, 'AUTOSCALE_MIN_AGE', 60)
+
+WEEK = 7 * 24 * 3600
+HOURS_PER_WEEK = 168
+LEAD_TIME_SAMPLES = 20
+PLAN_CACHE_KEY = 'autoscale:plan'
+
+
+def hour_of_week(dt):
+    """0 (Monday 00:00) … 167, in TIME_ZONE — payments follow the users' clock."""
+    local = timezone.localtime(dt)
+    return local.weekday() * 24 + local.hour
+
+
+def hourly_rates(times, now, weeks=AUTOSCALE_HISTORY_WEEKS, decay=AUTOSCALE_WEEK_DECAY, shrink=AUTOSCALE_SHRINK):
+    """Expected arrivals per hour for each hour of the week, from past arrival `times`."""
+    times = [t for t in times if timedelta(0) <= now - t < timedelta(weeks=weeks)]
+    if not times:
+        return [0.0] * HOURS_PER_WEEK
+    # Only the weeks there is history for (a young service isn't averaged with empty weeks)
+    weeks = min(weeks, math.ceil((now - min(times)).total_seconds() / WEEK) or 1)
+    counts = [[0] * HOURS_PER_WEEK for _ in range(weeks)]
+    for t in times:
+        week = min(int((now - t).total_seconds() // WEEK), weeks - 1)
+        counts[week][hour_of_week(t)] += 1
+    weights = [decay ** k for k in range(weeks)]
+    rates = [
+        sum(w * c[h] for w, c in zip(weights, counts)) / sum(weights)
+        for h in range(HOURS_PER_WEEK)
+    ]
+    mean = sum(rates) / HOURS_PER_WEEK
+    return [shrink * r + (1 - shrink) * mean for r in rates]
+
+
+def expected_arrivals(rates, start, seconds):
+    """Arrivals expected from `start` for `seconds`, hour buckets prorated."""
+    total = 0.0
+    t = start
+    while seconds > 0:
+        local = timezone.localtime(t)
+        chunk = min(3600 - (local.minute * 60 + local.second), seconds)
+        total += rates[hour_of_week(t)] * chunk / 3600
+        t += timedelta(seconds=chunk)
+        seconds -= chunk
+    return total
+
+
+def poisson_quantile(mean, level):
+    """Smallest k with P(N ≤ k) ≥ level for N ~ Poisson(mean)."""
+    if mean <= 0:
+        return 0
+    k = 0
+    pmf = math.exp(-mean)
+    cdf = pmf
+    while cdf < level and k < 1000:
+        k += 1
+        pmf *= mean / k
+        cdf += pmf
+    return k
+
+
+def lead_time(now):
+    """p90 seconds from ordering a server to 'warm' over recent servers."""
+    from .models import Server
+    from .provisioning import WARM
+
+    samples = sorted(
+        (warm_at - created_at).total_seconds()
+        for created_at, warm_at in Server.objects.filter(
+            provision_state=WARM, provision_state_at__isnull=False, created_at__gte=now - timedelta(days=30),
+        ).order_by('-created_at').values_list('created_at', 'provision_state_at')[:LEAD_TIME_SAMPLES]
+    )
+    if len(samples) < 3:
+        return AUTOSCALE_DEFAULT_LEAD_TIME
+    return samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+
+
+def pending_demand(now):
+    """Pending first payments, weighted by the share of first payments that succeed."""
+    from apps.payments.models import Payment
+
+    first = Payment.objects.filter(is_recurring=False)
+    pending = first.filter(
+        status='pending', created_at__gte=now - timedelta(seconds=AUTOSCALE_PENDING_WINDOW),
+    ).count()
+    if not pending:
+        return 0.0
+    history = first.filter(created_at__gte=now - timedelta(weeks=AUTOSCALE_HISTORY_WEEKS))
+    succeeded = history.filter(status='succeeded').count()
+    canceled = history.filter(status='canceled').count()
+    conversion = succeeded / (succeeded + canceled) if succeeded + canceled else 0.5
+    return pending * conversion
+
+
+@dataclass
+class Plan:
+    available: int
+    in_progress: int
+    target: int
+    keep: int
+    create: int = 0
+    delete: int = 0
+    arrivals: float = 0.0
+    pending: float = 0.0
+    lead_time: float = 0.0
+    forecast: list = field(default_factory=list)
+
+    def summary(self):
+        return (
+            f'pool {self.available}+{self.in_progress} → target {self.target} (keep {self.keep}): '
+            f'+{self.create} -{self.delete}; {self.arrivals:.2f} arrivals + {self.pending:.2f} pending '
+            f'in {self.lead_time / 60:.0f}+{AUTOSCALE_INTERVAL / 60:.0f} min'
+        )
+
+
+def _target(mean):
+    return max(AUTOSCALE_MIN_POOL, min(AUTOSCALE_MAX_POOL, poisson_quantile(mean, AUTOSCALE_SERVICE_LEVEL)))
+
+
+def plan(available, in_progress, headroom, now=None):
+    """How many pool servers to create/delete. `headroom`: servers allowed under MAX_TOTAL_SERVERS."""
+    from apps.payments.models import Payment
+
+    now = now or timezone.now()
+    times = Payment.objects.filter(
+        is_recurring=False, status='succeeded', created_at__gte=now - timedelta(weeks=AUTOSCALE_HISTORY_WEEKS),
+    ).values_list('created_at', flat=True)
+    rates = hourly_rates(list(times), now)
+    lead = lead_time(now)
+    window = lead + AUTOSCALE_INTERVAL
+    arrivals = expected_arrivals(rates, now, window)
+    pending = pending_demand(now)
+    target = _target(arrivals + pending)
+
+    # Scale down only to what the next hours need (pool filled ahead of a peak)
+    forecast = [
+        _target(expected_arrivals(rates, now + timedelta(minutes=30 * i), window))
+        for i in range(1, AUTOSCALE_SCALE_DOWN_HORIZON * 2 + 1)
+    ]
+    keep = max([target] + forecast)
+
+    p = Plan(available=available, in_progress=in_progress, target=target, keep=keep,
+             arrivals=arrivals, pending=pending, lead_time=lead, forecast=forecast)
+    pool = available + in_progress
+    if pool < target:
+        p.create = max(0, min(target - pool, headroom))
+    elif pool > keep and in_progress == 0:
+        p.delete = min(AUTOSCALE_SCALE_DOWN_STEP, pool - keep, available)
+    try:
+        cache.set(PLAN_CACHE_KEY, {**asdict(p), 'at': now.isoformat()}, 24 * 3600)
+    except Exception:
+        pass
+    return p
+
+
+def last_plan():
+    """The last plan() as a dict (admin/diagnostics), or None."""
+    return cache.get(PLAN_CACHE_KEY)
+
+
+def scale_down(count, now=None):
+    """Delete up to `count` idle pool servers (unwarmed first, then the oldest). Returns their IPs."""
+    from django.db import transaction
+
+    from .models import Server
+    from .timeweb import delete_server
+
+    now = now or timezone.now()
+    deleted = []
+    for _ in range(count):
+        # Out of the pool first, in a short transaction: no row lock during the TimeWeb call
+        with transaction.atomic():
+            # skip_locked: a server assign_server_to_user is taking stays
+            server = Server.objects.select_for_update(skip_locked=True).filter(
+                status='active', profile__isnull=True,
+                created_at__lt=now - timedelta(minutes=AUTOSCALE_MIN_AGE),
+            ).order_by('openclaw_running', 'created_at').first()
+            if server is None:
+                break
+            Server.objects.filter(pk=server.pk).update(status='deleting', updated_at=timezone.now())
+        if server.timeweb_server_id and not delete_server(server.timeweb_server_id):
+            logger.warning(f'Autoscaler: TimeWeb delete of {server.ip_address} failed, keeping it')
+            Server.objects.filter(pk=server.pk, status='deleting').update(status='active', updated_at=timezone.now())
+            break
+        deleted.append(server.ip_address or str(server.pk))
+        server.delete()
+    return deleted
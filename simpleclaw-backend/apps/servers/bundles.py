@@ -0,0 +1,143 @@
+"""Bundles — in-memory tar archives of the static files shipped to servers.
+
+Agent workspaces, ClawdMatrix skills and the human-browser skill used to be
+delivered file by file (upload to /tmp, `docker cp`, `rm` — three round trips
+per file). A bundle packs a whole tree into one tar that is streamed over a
+single channel into `docker cp - openclaw:/` or `tar -x` on the host.
+
+Bundles are built once per process and cached by the sha256 of their
+contents, so editing a file in the repo produces a new bundle without a
+restart while repeated deploys reuse the same bytes.
+"""
+import hashlib
+import io
+import logging
+import os
+import tarfile
+import threading
+import time
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# simpleclaw-backend/ — static trees live next to manage.py
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+AGENTS_DIR = os.path.join(BACKEND_DIR, 'openclaw-config', 'agents')
+AGENTS_CONFIG_FILE = os.path.join(BACKEND_DIR, 'openclaw-config', 'openclaw-agents.json')
+CLAWDMATRIX_SKILLS_DIR = os.path.join(BACKEND_DIR, 'clawdmatrix', 'skills')
+HUMAN_BROWSER_DIR = os.path.join(BACKEND_DIR, 'skills', 'human-browser')
+
+HUMAN_BROWSER_FILES = ['SKILL.md', 'package.json', 'scripts/browser-human.js']
+
+# node user inside openclaw-chrome — owner of the host-mounted skill dir
+NODE_UID = 1000
+
+
+def build_tar(files, mode=0o644, uid=0, gid=0, dirs=()):
+    """Build an uncompressed tar of {archive_path: content}.
+
+    `dirs` are emitted as explicit directory entries (0755) before the files,
+    so the target creates them with the right owner. Only list leaf dirs the
+    bundle owns — an entry for an existing dir like /root would re-chmod it.
+    """
+    buf = io.BytesIO()
+    now = int(time.time())
+    with tarfile.open(fileobj=buf, mode='w') as tar:
+        for name in dirs:
+            info = tarfile.TarInfo(name)
+            info.type = tarfile.DIRTYPE
+            info.mode = 0o755
+            info.mtime = now
+            info.uid, info.gid = uid, gid
+            tar.addfile(info)
+        for name, content in files.items():
+            data = content.encode('utf-8') if isinstance(content, str) else bytes(content)
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mode = mode
+            info.mtime = now
+            info.uid, info.gid = uid, gid
+            tar.addfile(info, io.BytesIO(data))
+    return buf.getvalue()
+
+
+@dataclass(frozen=True)
+class Bundle:
+    """A built tar archive ready to be streamed to a server."""
+    name: str
+    sha256: str
+    data: bytes
+    files: tuple
+
+    def __len__(self):
+        return len(self.data)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _bundle(name, sources, uid=0, gid=0, dirs=()):
+    """Read [(local_path, archive_path)] and return a cached Bundle.
+
+    Missing local files are skipped with a warning, same as the old per-file
+    upload loops did.
+    """
+    contents = {}
+    digest = hashlib.sha256(f'{name}:{uid}:{gid}:{",".join(dirs)}'.encode())
+    for local_path, arcname in sources:
+        try:
+            with open(local_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            logger.warning(f'{name} bundle: file not found: {local_path}')
+            continue
+        contents[arcname] = data
+        digest.update(arcname.encode() + b'\0' + hashlib.sha256(data).digest())
+    sha = digest.hexdigest()
+
+    with _cache_lock:
+        cached = _cache.get(name)
+        if cached is not None and cached.sha256 == sha:
+            return cached
+        bundle = Bundle(
+            name=name,
+            sha256=sha,
+            data=build_tar(contents, uid=uid, gid=gid, dirs=dirs),
+            files=tuple(contents),
+        )
+        _cache[name] = bundle
+    logger.info(f'Bundle {name} built: {len(bundle.files)} files, {len(bundle)} bytes, sha256={sha[:12]}')
+    return bundle
+
+
+def agents_bundle(agent_ids, filenames):
+    """Agent workspaces as /root/.openclaw/agents/{id}/{file} (extract at / in the container)."""
+    sources = [
+        (os.path.join(AGENTS_DIR, agent_id, filename), f'root/.openclaw/agents/{agent_id}/{filename}')
+        for agent_id in agent_ids
+        for filename in filenames
+    ]
+    dirs = [f'root/.openclaw/agents/{agent_id}' for agent_id in agent_ids]
+    return _bundle('agents', sources, dirs=dirs)
+
+
+def clawdmatrix_bundle(skill_names):
+    """ClawdMatrix skills as /app/skills/{name}/SKILL.md (extract at / in the container)."""
+    sources = [
+        (os.path.join(CLAWDMATRIX_SKILLS_DIR, name, 'SKILL.md'), f'app/skills/{name}/SKILL.md')
+        for name in skill_names
+    ]
+    dirs = [f'app/skills/{name}' for name in skill_names]
+    return _bundle('clawdmatrix', sources, dirs=dirs)
+
+
+def human_browser_bundle():
+    """human-browser skill as skills/human-browser/... (extract at openclaw_path on the host)."""
+    sources = [
+        (os.path.join(HUMAN_BROWSER_DIR, rel_path), f'skills/human-browser/{rel_path}')
+        for rel_path in HUMAN_BROWSER_FILES
+    ]
+    dirs = ['skills/human-browser', 'skills/human-browser/scripts']
+    return _bundle('human-browser', sources, uid=NODE_UID, gid=NODE_UID, dirs=dirs)
@@ -0,0 +1,448 @@
+"""Control agent — resident helper on each VPS for interactive operations.
+
+Pairing approval, model switches, skill installs, config patches, health and
+log tails each used to be one or more `exec_command` calls, several of them
+cold-starting the Node CLI in the container. The control agent is a small
+stdlib-only python3 HTTP service (the host has python3 but no node) installed
+by warm_deploy_standby as the `openclaw-agent` systemd unit. It listens on
+127.0.0.1 only; the backend reaches it through a direct-tcpip channel on the
+pooled SSH transport, so requests stay encrypted, no port is opened on the VPS
+and an action costs one channel open plus one HTTP exchange.
+
+Every request carries a dedicated per-server key (derived from
+CONTROL_AGENT_SECRET, not the user-visible gateway_token). When the agent is
+not installed or not answering, ControlAgentUnavailable is raised and the
+ServerManager falls back to its SSH path; the server is then skipped for
+CONTROL_AGENT_RETRY_AFTER seconds.
+
+Usage:
+    agent = manager.agent
+    config, sha = agent.read_config()
+    agent.approve_pairing('ABCD2345')
+"""
+import hashlib
+import hmac
+import http.client
+import json
+import logging
+import threading
+import time
+from urllib.parse import urlencode
+
+import paramiko
+from django.conf import settings
+
+from .openclaw_config import OPENCLAW_CONFIG_PATH, config_sha
+
+logger = logging.getLogger(__name__)
+
+# Use the agent for interactive operations (False = always SSH exec)
+CONTROL_AGENT_ENABLED = getattr(settings, 'CONTROL_AGENT_ENABLED', True)
+# Loopback port the agent listens on inside the VPS
+CONTROL_AGENT_PORT = getattr(settings, 'CONTROL_AGENT_PORT', 18790)
+# Per-request timeout (seconds)
+CONTROL_AGENT_TIMEOUT = getattr(settings, 'CONTROL_AGENT_TIMEOUT', 30)
+# After the agent failed to answer, use SSH for this long before trying again
+CONTROL_AGENT_RETRY_AFTER = getattr(settings, 'CONTROL_AGENT_RETRY_AFTER', 300)
+
+AGENT_DIR = '/opt/openclaw-agent'
+AGENT_SCRIPT_PATH = f'{AGENT_DIR}/agent.py'
+AGENT_KEY_PATH = f'{AGENT_DIR}/key'
+AGENT_UNIT_PATH = '/etc/systemd/system/openclaw-agent.service'
+AGENT_UNIT = 'openclaw-agent'
+
+# Bumped when AGENT_SCRIPT changes so health() can tell stale installs apart
+AGENT_VERSION = 1
+
+
+class ControlAgentUnavailable(Exception):
+    """Agent not reachable — the caller should fall back to SSH exec."""
+
+
+class ControlAgentError(Exception):
+    """Agent answered with an error (bad input, command failed)."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def agent_key(server):
+    """Dedicated per-server key, derived so nothing extra is stored in the DB."""
+    secret = getattr(settings, 'CONTROL_AGENT_SECRET', '') or settings.SECRET_KEY
+    return hmac.new(
+        secret.encode('utf-8'), f'openclaw-agent:{server.pk}'.encode('utf-8'), hashlib.sha256,
+    ).hexdigest()
+
+
+_unavailable = {}
+_unavailable_lock = threading.Lock()
+
+
+def _mark_unavailable(server, reason):
+    with _unavailable_lock:
+        _unavailable[server.pk] = time.monotonic() + CONTROL_AGENT_RETRY_AFTER
+    logger.info(f'Control agent unavailable on {server.ip_address} ({reason}), using SSH')
+
+
+def _recently_unavailable(server):
+    with _unavailable_lock:
+        until = _unavailable.get(server.pk)
+        if until is None:
+            return False
+        if until < time.monotonic():
+            del _unavailable[server.pk]
+            return False
+        return True
+
+
+def forget_unavailable(server):
+    """Try the agent again on the next call (e.g. right after installing it)."""
+    with _unavailable_lock:
+        _unavailable.pop(server.pk, None)
+
+
+class _ChannelHTTPConnection(http.client.HTTPConnection):
+    """HTTPConnection over an already-open paramiko channel."""
+
+    def __init__(self, channel, timeout):
+        super().__init__('127.0.0.1', CONTROL_AGENT_PORT, timeout=timeout)
+        self._channel = channel
+
+    def connect(self):
+        self._channel.settimeout(self.timeout)
+        self.sock = self._channel
+
+
+class ControlAgentClient:
+    """Calls the control agent of one server over its ServerManager's transport."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.server = manager.server
+
+    @property
+    def enabled(self):
+        return CONTROL_AGENT_ENABLED and not _recently_unavailable(self.server)
+
+    def _channel(self):
+        manager = self.manager
+        if not manager.client:
+            manager.connect()
+        try:
+            return manager.client.get_transport().open_channel(
+                'direct-tcpip', ('127.0.0.1', CONTROL_AGENT_PORT), ('127.0.0.1', 0), timeout=10,
+            )
+        except paramiko.ChannelException as e:
+            # Connection refused on the VPS side — agent not installed/running
+            _mark_unavailable(self.server, e)
+            raise ControlAgentUnavailable(str(e)) from e
+
+    def request(self, method, path, payload=None, query=None, timeout=CONTROL_AGENT_TIMEOUT, headers=None):
+        """One HTTP exchange with the agent. Returns (status, parsed JSON body)."""
+        if not self.enabled:
+            raise ControlAgentUnavailable('disabled or recently unavailable')
+        if query:
+            path = f'{path}?{urlencode(query)}'
+        body = b''
+        if payload is not None:
+            body = payload if isinstance(payload, bytes) else json.dumps(payload).encode('utf-8')
+
+        started = time.monotonic()
+        conn = _ChannelHTTPConnection(self._channel(), timeout)
+        try:
+            conn.request(method, path, body=body, headers={
+                'X-Agent-Key': agent_key(self.server),
+                'Content-Type': 'application/json',
+                **(headers or {}),
+            })
+            resp = conn.getresponse()
+            raw = resp.read()
+        except (OSError, EOFError, http.client.HTTPException, paramiko.SSHException) as e:
+            _mark_unavailable(self.server, e)
+            raise ControlAgentUnavailable(str(e)) from e
+        finally:
+            conn.close()
+
+        try:
+            data = json.loads(raw) if raw else {}
+        except json.JSONDecodeError:
+            data = {'error': raw[:300].decode('utf-8', errors='replace')}
+        if resp.status in (401, 404):
+            # Wrong key or an older agent without this endpoint — SSH still works
+            _mark_unavailable(self.server, f'HTTP {resp.status}')
+            raise ControlAgentUnavailable(f'HTTP {resp.status}')
+        logger.debug(f'agent {method} {path} on {self.server.ip_address}: {resp.status} '
+                     f'in {time.monotonic() - started:.2f}s')
+        return resp.status, data
+
+    def _ok(self, method, path, payload=None, **kwargs):
+        status, data = self.request(method, path, payload, **kwargs)
+        if status >= 400:
+            raise ControlAgentError(data.get('error') or f'HTTP {status}', status=status)
+        return data
+
+    # ─── operations ─────────────────────────────────────────────────
+
+    def health(self):
+        return self._ok('GET', '/health')
+
+    def logs(self, container='openclaw', tail=200):
+        return self._ok('GET', '/logs', query={'container': container, 'tail': tail})['logs']
+
+    def read_config(self):
+        """(config, sha) — same contract as ServerManager.read_openclaw_config."""
+        data = self._ok('GET', '/config')
+        text = data.get('text') or ''
+        if not text.strip():
+            return {}, ''
+        try:
+            return json.loads(text), config_sha(text)
+        except json.JSONDecodeError:
+            logger.warning(f'openclaw.json on {self.server.ip_address} is not valid JSON')
+            return None, config_sha(text)
+
+    def write_config(self, config, expected_sha=None):
+        """Atomic replace; False if the file changed since `expected_sha` was read."""
+        data = json.dumps(config, indent=2, ensure_ascii=False).encode('utf-8')
+        status, body = self.request(
+            'PUT', '/config', data, headers={'X-Expected-Sha': expected_sha or ''},
+        )
+        if status == 409:
+            return False
+        if status >= 400:
+            raise ControlAgentError(body.get('error') or f'HTTP {status}', status=status)
+        return True
+
+    def approve_pairing(self, code, channel='telegram'):
+        """Returns (out, err, exit_code) of `openclaw pairing approve`."""
+        data = self._ok('POST', '/pairing/approve', {'channel': channel, 'code': code}, timeout=60)
+        return data.get('out', ''), data.get('err', ''), data.get('exit_code')
+
+    def install_skill(self, name, files):
+        """Write {relative_path: content} into /app/skills/<name>/ in the container."""
+        return self._ok('POST', '/skills/install', {'name': name, 'files': files}, timeout=60)
+
+    def uninstall_skill(self, name):
+        return self._ok('POST', '/skills/uninstall', {'name': name})
+
+
+# ─── agent deployed to the VPS ───────────────────────────────────────
+
+AGENT_SCRIPT = r'''#!/usr/bin/env python3
+"""openclaw-agent — local control API for the OpenClaw stack (installed by the backend)."""
+import hashlib
+import hmac
+import io
+import json
+import os
+import re
+import subprocess
+import tarfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+VERSION = __VERSION__
+PORT = __PORT__
+CONFIG_PATH = '__CONFIG_PATH__'
+KEY_PATH = '__KEY_PATH__'
+CONTAINERS = ('openclaw', 'searxng', 'searxng-adapter', 'lightpanda', 'lightpanda-adapter')
+NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9._-]{0,63}$')
+PATH_RE = re.compile(r'^[A-Za-z0-9._-]+(/[A-Za-z0-9._-]+)*$')
+CODE_RE = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+STARTED = time.time()
+config_lock = threading.Lock()
+
+with open(KEY_PATH) as f:
+    KEY = f.read().strip()
+
+
+def run(args, timeout=60, data=None):
+    p = subprocess.run(args, input=data, capture_output=True, timeout=timeout)
+    return p.stdout.decode('utf-8', 'replace'), p.stderr.decode('utf-8', 'replace'), p.returncode
+
+
+def sha(data):
+    return hashlib.sha256(data).hexdigest() if data else ''
+
+
+def read_config():
+    try:
+        with open(CONFIG_PATH, 'rb') as f:
+            return f.read()
+    except FileNotFoundError:
+        return b''
+
+
+def write_config(data, expected):
+    json.loads(data)
+    with config_lock:
+        current = read_config()
+        if expected and sha(current) != expected:
+            return False
+        tmp = f'{CONFIG_PATH}.tmp.{os.getpid()}'
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        if current:
+            st = os.stat(CONFIG_PATH)
+            os.chown(tmp, st.st_uid, st.st_gid)
+            os.chmod(tmp, st.st_mode & 0o7777)
+        os.replace(tmp, CONFIG_PATH)
+    return True
+
+
+def container_state(name):
+    out, _, code = run(['docker', 'inspect', '-f', '{{.State.Status}}', name], timeout=10)
+    return out.strip() if code == 0 else 'missing'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def authorized(self):
+        return hmac.compare_digest(self.headers.get('X-Agent-Key', ''), KEY)
+
+    def dispatch(self, method):
+        if not self.authorized():
+            return self.reply(401, {'error': 'unauthorized'})
+        url = urlparse(self.path)
+        handler = ROUTES.get((method, url.path))
+        if handler is None:
+            return self.reply(404, {'error': 'not found'})
+        try:
+            status, payload = handler(self, parse_qs(url.query))
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {'error': str(e)[:300]}
+        except subprocess.TimeoutExpired:
+            status, payload = 504, {'error': 'timeout'}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)[:300]}
+        self.reply(status, payload)
+
+    def do_GET(self):
+        self.dispatch('GET')
+
+    def do_POST(self):
+        self.dispatch('POST')
+
+    def do_PUT(self):
+        self.dispatch('PUT')
+
+    # ─── endpoints ───
+
+    def health(self, query):
+        return 200, {
+            'version': VERSION,
+            'uptime': int(time.time() - STARTED),
+            'containers': {name: container_state(name) for name in CONTAINERS},
+        }
+
+    def logs(self, query):
+        container = query.get('container', ['openclaw'])[0]
+        tail = int(query.get('tail', ['200'])[0])
+        if container not in CONTAINERS:
+            raise ValueError(f'unknown container {container!r}')
+        out, err, _ = run(['docker', 'logs', '--tail', str(min(max(tail, 1), 5000)), container], timeout=20)
+        return 200, {'logs': out + err}
+
+    def get_config(self, query):
+        return 200, {'text': read_config().decode('utf-8', 'replace')}
+
+    def put_config(self, query):
+        if not write_config(self.body(), self.headers.get('X-Expected-Sha', '')):
+            return 409, {'error': 'config changed since it was read'}
+        return 200, {}
+
+    def approve_pairing(self, query):
+        data = json.loads(self.body())
+        channel, code = data.get('channel', 'telegram'), data['code']
+        if not NAME_RE.match(channel) or not CODE_RE.match(code):
+            raise ValueError('invalid pairing code')
+        out, err, exit_code = run(
+            ['docker', 'exec', 'openclaw', 'node', '/app/openclaw.mjs', 'pairing', 'approve', channel, code],
+        )
+        return 200, {'out': out, 'err': err, 'exit_code': exit_code}
+
+    def install_skill(self, query):
+        data = json.loads(self.body())
+        name, files = data['name'], data['files']
+        if not NAME_RE.match(name) or not files:
+            raise ValueError('invalid skill')
+        buf = io.BytesIO()
+        with tarfile.open(fileobj=buf, mode='w') as tar:
+            for rel, content in files.items():
+                if not PATH_RE.match(rel) or '..' in rel.split('/'):
+                    raise ValueError(f'invalid path {rel!r}')
+                raw = content.encode('utf-8')
+                info = tarfile.TarInfo(f'{name}/{rel}')
+                info.size, info.mode, info.mtime = len(raw), 0o644, int(time.time())
+                tar.addfile(info, io.BytesIO(raw))
+        out, err, code = run(['docker', 'cp', '-', 'openclaw:/app/skills/'], data=buf.getvalue())
+        if code != 0:
+            return 500, {'error': (err or out)[:300]}
+        return 200, {'installed': name}
+
+    def uninstall_skill(self, query):
+        name = json.loads(self.body())['name']
+        if not NAME_RE.match(name):
+            raise ValueError('invalid skill')
+        out, err, code = run(['docker', 'exec', 'openclaw', 'rm', '-rf', f'/app/skills/{name}'])
+        if code != 0:
+            return 500, {'error': (err or out)[:300]}
+        return 200, {'removed': name}
+
+
+ROUTES = {
+    ('GET', '/health'): Handler.health,
+    ('GET', '/logs'): Handler.logs,
+    ('GET', '/config'): Handler.get_config,
+    ('PUT', '/config'): Handler.put_config,
+    ('POST', '/pairing/approve'): Handler.approve_pairing,
+    ('POST', '/skills/install'): Handler.install_skill,
+    ('POST', '/skills/uninstall'): Handler.uninstall_skill,
+}
+
+if __name__ == '__main__':
+    ThreadingHTTPServer(('127.0.0.1', PORT), Handler).serve_forever()
+'''
+
+AGENT_UNIT_CONTENT = f"""[Unit]
+Description=OpenClaw control agent
+After=docker.service
+Wants=docker.service
+
+[Service]
+ExecStart=/usr/bin/python3 {AGENT_SCRIPT_PATH}
+Restart=always
+RestartSec=2
+
+[Install]
+WantedBy=multi-user.target
+"""
+
+
+def agent_script():
+    return (
+        AGENT_SCRIPT
+        .replace('__VERSION__', str(AGENT_VERSION))
+        .replace('__PORT__', str(CONTROL_AGENT_PORT))
+        .replace('__CONFIG_PATH__', OPENCLAW_CONFIG_PATH)
+        .replace('__KEY_PATH__', AGENT_KEY_PATH)
+    )
@@ -0,0 +1,179 @@
+"""Streaming exec — read a remote command's stdout and stderr as they arrive.
+
+ServerManager.exec_command used to call stdout.read() and then stderr.read().
+That buffered the whole output in memory. It could also hang: a command that
+filled the stderr window while stdout was still being drained stopped
+writing, so neither side made progress. And nothing was visible until e.g.
+a 300 s `npx playwright install` finished.
+
+pump() waits on the channel with select() and drains both streams as data
+arrives (stdin is fed from the same loop), so neither pipe can fill up. It
+keeps only the last `tail_bytes` of each stream in an OutputTail ring buffer,
+and closes the channel once `max_output` bytes have been received. Complete
+lines are passed to an `on_line(stream, line)` callback. During a deploy the
+callback is DeployJournal.progress, which publishes the current step and its
+latest output line (see deploy_progress()).
+
+Usage:
+    result = manager.exec_stream('npx playwright install chromium', timeout=300)
+    if not result.ok:
+        logger.warning(result.err or result.out)
+"""
+import select
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+# Bytes of stdout/stderr kept per stream by exec_stream (the tail of the output)
+EXEC_TAIL_BYTES = getattr(settings, 'EXEC_TAIL_BYTES', 64 * 1024)
+# Total bytes of output after which a command is cut off (channel closed)
+EXEC_MAX_OUTPUT = getattr(settings, 'EXEC_MAX_OUTPUT', 64 * 1024 * 1024)
+
+# Longest line passed to on_line; the rest is dropped
+MAX_LINE = 1000
+READ_SIZE = 32768
+
+
+class OutputTail:
+    """The last `limit` bytes written (everything when limit is None)."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.buf = bytearray()
+        self.total = 0
+
+    def write(self, data):
+        self.total += len(data)
+        self.buf += data
+        if self.limit is not None and len(self.buf) > self.limit:
+            del self.buf[:len(self.buf) - self.limit]
+
+    @property
+    def truncated(self):
+        return self.total > len(self.buf)
+
+    def text(self):
+        return self.buf.decode('utf-8', errors='replace')
+
+
+class _LineSplitter:
+    def __init__(self, stream, on_line):
+        self.stream = stream
+        self.on_line = on_line
+        self.partial = b''
+
+    def feed(self, data):
+        *lines, self.partial = (self.partial + data).split(b'\n')
+        if len(self.partial) > MAX_LINE:
+            lines.append(self.partial)
+            self.partial = b''
+        for line in lines:
+            # \r: progress bars redraw a line in place — the last frame is the current state
+            line = line.rsplit(b'\r', 1)[-1].strip()
+            if line:
+                self.on_line(self.stream, line[:MAX_LINE].decode('utf-8', errors='replace'))
+
+    def flush(self):
+        if self.partial:
+            self.feed(b'\n')
+
+
+@dataclass
+class StreamResult:
+    """Outcome of pump(): output tails, exit status and byte counts."""
+    out: str
+    err: str
+    exit_code: int | None
+    bytes_out: int
+    bytes_err: int
+    bytes_sent: int
+    duration: float
+    truncated: bool = False
+    capped: bool = False
+    timed_out: bool = False
+
+    @property
+    def ok(self):
+        return self.exit_code == 0
+
+    def as_tuple(self):
+        """(out, err, exit_code) — the shape exec_command returns."""
+        return self.out, self.err, self.exit_code
+
+
+def pump(chan, timeout, stdin=None, on_line=None, tail_bytes=EXEC_TAIL_BYTES, max_output=EXEC_MAX_OUTPUT,
+         chunk_size=READ_SIZE):
+    """Drive a channel whose command was already started until it exits.
+
+    `timeout` is seconds without any output, like the channel timeout of
+    the blocking reads this replaces. `stdin` is an optional binary
+    file-like object streamed to the command. On timeout or when
+    `max_output` is exceeded the channel is closed and exit_code is None.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    out, err = OutputTail(tail_bytes), OutputTail(tail_bytes)
+    lines = [_LineSplitter(name, on_line) for name in ('stdout', 'stderr')] if on_line else None
+    pending, sent = b'', 0
+    feeding = stdin is not None
+    if not feeding:
+        chan.shutdown_write()
+    capped = timed_out = False
+    streams = (
+        (chan.recv_ready, chan.recv, out, lines[0] if lines else None),
+        (chan.recv_stderr_ready, chan.recv_stderr, err, lines[1] if lines else None),
+    )
+
+    while True:
+        # Data precedes exit-status on the wire: check the status first,
+        # then drain, so nothing printed can be missed
+        exited = chan.exit_status_ready()
+        if exited:
+            feeding = False  # exited without reading all of stdin
+        if feeding and not pending:
+            pending = stdin.read(chunk_size)
+            if not pending:
+                feeding = False
+                chan.shutdown_write()
+        if feeding and chan.send_ready():
+            n = chan.send(pending)
+            pending = pending[n:]
+            sent += n
+            if n:
+                deadline = time.monotonic() + timeout
+
+        progressed = False
+        for ready, recv, tail, splitter in streams:
+            while ready() and not capped:
+                data = recv(READ_SIZE)
+                tail.write(data)
+                if splitter:
+                    splitter.feed(data)
+                progressed = True
+                capped = max_output is not None and out.total + err.total > max_output
+        if capped:
+            break
+        if exited:
+            break
+        if progressed:
+            deadline = time.monotonic() + timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        if not progressed and not (feeding and chan.send_ready()):
+            # Woken by new stdout/stderr data or the channel closing
+            select.select([chan], [], [], min(remaining, 0.05 if feeding else 0.2))
+
+    exit_code = None if (capped or timed_out) else chan.recv_exit_status()
+    chan.close()
+    if lines:
+        for splitter in lines:
+            splitter.flush()
+    return StreamResult(
+        out=out.text(), err=err.text(), exit_code=exit_code,
+        bytes_out=out.total, bytes_err=err.total, bytes_sent=sent,
+        duration=time.monotonic() - started,
+        truncated=out.truncated or err.truncated, capped=capped, timed_out=timed_out,
+    )
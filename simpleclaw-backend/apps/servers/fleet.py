@@ -0,0 +1,276 @@
+"""Fleet runner — apply one operation to many servers in parallel.
+
+The servers management commands used to loop over Server.objects serially, so
+a fleet-wide change took minutes per server times N. FleetRunner drives the
+servers through async_manager.for_each_server with a concurrency limit and a
+per-host timeout, prints progress as each server finishes, checkpoints
+per-server results to a JSON file after every host (so an interrupted run can
+be resumed with --resume, skipping servers that already succeeded) and ends
+with a summary of per-server results and durations.
+
+FleetCommand is the BaseCommand the fleet commands are built on: subclasses
+define get_queryset() and process(); the base class adds --server-ip,
+--dry-run, --concurrency, --timeout, --checkpoint, --resume and --summary.
+"""
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from .async_manager import for_each_server
+
+logger = logging.getLogger(__name__)
+
+# Servers processed at once by default
+FLEET_CONCURRENCY = getattr(settings, 'FLEET_CONCURRENCY', 10)
+# Per-server time limit (seconds) by default
+FLEET_HOST_TIMEOUT = getattr(settings, 'FLEET_HOST_TIMEOUT', 600)
+
+
+class SkipServer(Exception):
+    """Raised by an operation to skip a server (counted separately from failures)."""
+
+
+class FleetError(Exception):
+    """Raised by an operation to mark a server as failed with a short message."""
+
+
+@dataclass
+class HostResult:
+    server_id: int
+    ip_address: str
+    status: str          # ok | failed | skipped
+    message: str = ''
+    duration: float = 0.0
+
+
+@dataclass
+class FleetSummary:
+    name: str
+    results: list
+    resumed: int = 0     # servers skipped because the checkpoint had them as ok
+
+    def count(self, status):
+        return sum(1 for r in self.results if r.status == status)
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'finished_at': datetime.now(timezone.utc).isoformat(),
+            'ok': self.count('ok'),
+            'failed': self.count('failed'),
+            'skipped': self.count('skipped'),
+            'resumed': self.resumed,
+            'results': [asdict(r) for r in self.results],
+        }
+
+
+class Checkpoint:
+    """Per-server results of a run, persisted as JSON after every host."""
+
+    def __init__(self, path, name):
+        self.path = path
+        self.name = name
+        self.done = {}
+
+    @staticmethod
+    def default_path(name):
+        return os.path.join(tempfile.gettempdir(), f'fleet-{name}.json')
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        if data.get('name') == self.name:
+            self.done = {int(k): v for k, v in data.get('done', {}).items()}
+
+    def succeeded(self, server_id):
+        return self.done.get(server_id, {}).get('status') == 'ok'
+
+    def record(self, result):
+        self.done[result.server_id] = asdict(result)
+        tmp = f'{self.path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'name': self.name, 'done': self.done}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+class FleetRunner:
+    """Run `op(manager, server)` on many servers with bounded concurrency.
+
+    `op` is a plain synchronous function taking a connected-on-demand
+    ServerManager; it returns a short message on success, raises SkipServer
+    to skip or raises (FleetError or anything else) to fail.
+    """
+
+    def __init__(self, name, concurrency=FLEET_CONCURRENCY, timeout=FLEET_HOST_TIMEOUT,
+                 checkpoint_path=None, resume=False, progress=None, label=None):
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.checkpoint = Checkpoint(checkpoint_path or Checkpoint.default_path(name), name)
+        self.resume = resume
+        self.progress = progress or (lambda line, status: logger.info(line))
+        self.label = label or (lambda server: server.ip_address)
+
+    def run(self, servers, op):
+        servers = list(servers)
+        if self.resume:
+            self.checkpoint.load()
+        todo = [s for s in servers if not (self.resume and self.checkpoint.succeeded(s.pk))]
+        resumed = len(servers) - len(todo)
+        if resumed:
+            self.progress(f'Resuming: {resumed} server(s) already done in {self.checkpoint.path}', 'info')
+
+        results = []
+        total = len(todo)
+
+        async def call(manager):
+            return await manager.run(op, manager.sync, manager.server)
+
+        def on_done(outcome):
+            server = outcome.server
+            if outcome.ok:
+                result = HostResult(server.pk, server.ip_address, 'ok', str(outcome.result or ''), outcome.duration)
+            elif isinstance(outcome.exception, SkipServer):
+                result = HostResult(server.pk, server.ip_address, 'skipped', outcome.error, outcome.duration)
+            else:
+                result = HostResult(server.pk, server.ip_address, 'failed', outcome.error, outcome.duration)
+            results.append(result)
+            self.checkpoint.record(result)
+            suffix = f' — {result.message}' if result.message else ''
+            self.progress(
+                f'[{len(results)}/{total}] {result.status.upper()} {self.label(server)}'
+                f'{suffix} ({result.duration:.1f}s)',
+                result.status,
+            )
+
+        asyncio.run(for_each_server(
+            todo, call, concurrency=self.concurrency, timeout=self.timeout, on_done=on_done,
+        ))
+        return FleetSummary(self.name, results, resumed=resumed)
+
+
+class FleetCommand(BaseCommand):
+    """Base for management commands that apply one operation across servers."""
+
+    fleet_name = None
+    found_label = 'server(s)'
+    default_concurrency = FLEET_CONCURRENCY
+    default_timeout = FLEET_HOST_TIMEOUT
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server-ip',
+            type=str,
+            help='Target a specific server by IP address',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='List servers that would be affected without making changes',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=self.default_concurrency,
+            help=f'Servers processed in parallel (default {self.default_concurrency})',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=self.default_timeout,
+            help=f'Per-server time limit in seconds (default {self.default_timeout})',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            help='Checkpoint file (default: fleet-<command>.json in the temp dir)',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Skip servers that already succeeded in the checkpoint of a previous run',
+        )
+        parser.add_argument(
+            '--summary',
+            type=str,
+            help='Write a JSON summary of per-server results and durations to this file',
+        )
+        self.add_fleet_arguments(parser)
+
+    def add_fleet_arguments(self, parser):
+        """Hook for command-specific arguments."""
+
+    def get_queryset(self, options):
+        raise NotImplementedError
+
+    def describe(self, server):
+        """One line per server for --dry-run."""
+        profile_info = server.profile.user.email if server.profile else 'pool'
+        return f'{server.ip_address} — {profile_info}'
+
+    def label(self, server):
+        if server.profile:
+            return f'{server.ip_address} ({server.profile.user.email})'
+        return server.ip_address
+
+    def process(self, manager, server, options):
+        """Apply the operation to one server. Return a short message on success."""
+        raise NotImplementedError
+
+    def run_name(self, options):
+        return self.fleet_name or self.__module__.rsplit('.', 1)[-1]
+
+    def handle(self, *args, **options):
+        queryset = self.get_queryset(options)
+        if options['server_ip']:
+            queryset = queryset.filter(ip_address=options['server_ip'])
+        servers = list(queryset.select_related('profile__user'))
+        total = len(servers)
+        self.stdout.write(f'Found {total} {self.found_label}')
+
+        if options['dry_run']:
+            for s in servers:
+                self.stdout.write(f'  {self.describe(s)}')
+            return
+
+        styles = {'ok': self.style.SUCCESS, 'failed': self.style.ERROR, 'skipped': self.style.WARNING}
+        runner = FleetRunner(
+            self.run_name(options),
+            concurrency=options['concurrency'],
+            timeout=options['timeout'],
+            checkpoint_path=options['checkpoint'],
+            resume=options['resume'],
+            progress=lambda line, status: self.stdout.write(styles.get(status, str)(line)),
+            label=self.label,
+        )
+        summary = runner.run(servers, lambda manager, server: self.process(manager, server, options))
+
+        self.write_summary(summary, options)
+
+    def write_summary(self, summary, options):
+        self.stdout.write('')
+        slowest = sorted(summary.results, key=lambda r: r.duration, reverse=True)[:5]
+        if slowest:
+            self.stdout.write('Slowest: ' + ', '.join(f'{r.ip_address} {r.duration:.0f}s' for r in slowest))
+        for r in summary.results:
+            if r.status == 'failed':
+                self.stdout.write(self.style.ERROR(f'  FAILED {r.ip_address}: {r.message}'))
+        if options.get('summary'):
+            with open(options['summary'], 'w') as f:
+                json.dump(summary.as_dict(), f, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Summary written to {options["summary"]}')
+        resumed = f', {summary.resumed} already done' if summary.resumed else ''
+        self.stdout.write(self.style.SUCCESS(
+            f'Done: {summary.count("ok")} succeeded, {summary.count("failed")} failed, '
+            f'{summary.count("skipped")} skipped out of {len(summary.results) + summary.resumed}{resumed}'
+        ))
@@ -0,0 +1,240 @@
+"""Golden image — pool servers from a TimeWeb snapshot of a warmed standby.
+
+A new pool server used to go create_server → wait_for_server_ready →
+setup_standby_server (sleep 90 s, apt-get, get.docker.com, compose) →
+warm_deploy_standby (image, browser, human-browser deps, agents). With
+GOLDEN_IMAGE_ENABLED the first warmed, user-agnostic standby is snapshotted
+into a TimeWeb image (capture). New pool servers are created from that
+image and only run ServerManager.personalize_golden: a fresh gateway token,
+SearXNG secret and control agent key, then start the stack.
+
+An image is tied to fingerprint() — the image tag and the static files a
+warm deploy puts on a server — and to GOLDEN_IMAGE_MAX_AGE, so a changed
+stack leads to a new snapshot (refresh_golden_image task). The tag covers
+the upstream openclaw image too: like a warm deploy, fingerprint() asks
+whether openclaw:latest moved (images.release(refresh=True)), and only a
+standby pinned to that image is a source. Older images are deleted from
+TimeWeb once a new one is ready.
+
+While the snapshot is taken the source's stack is stopped (consistent
+config volume on disk) and the server is out of the pool: pick_source
+claims it ('provisioning') with a conditional update before looking at it,
+so a server assign_server_to_user took in between is never stopped or
+snapshotted. TimeWeb takes many minutes per image; poll_golden_image checks
+it every GOLDEN_IMAGE_POLL seconds instead of a worker sleeping through it.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from . import artifacts, bundles, control_agent, images, timeweb
+from .reconcile import digest
+
+logger = logging.getLogger(__name__)
+
+# Create pool servers from a golden image
+GOLDEN_IMAGE_ENABLED = getattr(settings, 'GOLDEN_IMAGE_ENABLED', False)
+# Re-snapshot after this many days even if nothing changed (OS packages, apt/npm caches)
+GOLDEN_IMAGE_MAX_AGE = getattr(settings, 'GOLDEN_IMAGE_MAX_AGE', 7)
+# Seconds to wait for TimeWeb to finish an image
+GOLDEN_IMAGE_WAIT = getattr(settings, 'GOLDEN_IMAGE_WAIT', 1800)
+# Seconds between checks of an image TimeWeb is still creating
+GOLDEN_IMAGE_POLL = getattr(settings, 'GOLDEN_IMAGE_POLL', 30)
+
+
+def fingerprint():
+    """Digest of what warm_deploy_standby puts on a server, minus per-server values."""
+    from .services import (
+        DOCKER_COMPOSE_TEMPLATE, DOCKERFILE_CONTENT, LIGHTPANDA_CDP_ADAPTER_JS, SEARXNG_ADAPTER_JS,
+        SEARXNG_SETTINGS_YML, ServerManager,
+    )
+    try:
+        with open(bundles.AGENTS_CONFIG_FILE) as f:
+            agents_json = f.read()
+    except FileNotFoundError:
+        agents_json = ''
+    image = images.release(DOCKERFILE_CONTENT, refresh=True)['tag']
+    return digest(
+        image, DOCKER_COMPOSE_TEMPLATE, SEARXNG_SETTINGS_YML, SEARXNG_ADAPTER_JS,
+        LIGHTPANDA_CDP_ADAPTER_JS,
+        bundles.human_browser_bundle().sha256, artifacts.human_browser_key(image),
+        bundles.agents_bundle(ServerManager.AGENT_IDS, ServerManager.AGENT_FILES).sha256, agents_json,
+        sorted(ServerManager.OPENCLAW_ESSENTIAL_SKILLS), sorted(ServerManager.OPENCLAW_REMOVE_SKILLS),
+        ServerManager.SESSION_WATCHDOG_SCRIPT, control_agent.agent_script(), control_agent.AGENT_UNIT_CONTENT,
+    )
+
+
+def current():
+    """The ready GoldenImage for the current stack, or None."""
+    from .models import GoldenImage
+    return GoldenImage.objects.filter(
+        status='ready', fingerprint=fingerprint(),
+        created_at__gte=timezone.now() - timedelta(days=GOLDEN_IMAGE_MAX_AGE),
+    ).first()
+
+
+def capture_in_progress():
+    from .models import GoldenImage
+    return GoldenImage.objects.filter(
+        status='creating', updated_at__gte=timezone.now() - timedelta(seconds=GOLDEN_IMAGE_WAIT + 600),
+    ).exists()
+
+
+def pick_source():
+    """Claim an untouched warm standby to snapshot (status 'provisioning'), or None."""
+    from .models import Server
+    from .services import DOCKERFILE_CONTENT, ServerManager
+
+    # Warmed with the image fingerprint() names, not an older base
+    key = images.release(DOCKERFILE_CONTENT, refresh=True)['key']
+    candidates = Server.objects.filter(
+        status='active', profile__isnull=True, openclaw_running=True,
+    ).exclude(timeweb_server_id='').order_by('-updated_at')
+    for server in candidates[:5]:
+        pin = (server.deploy_state or {}).get('image') or {}
+        if pin.get('key') != key or not claim(server):
+            continue
+        # Checked after the claim: assign_server_to_user can't take it any more
+        manager = ServerManager(server)
+        try:
+            if manager.warm_standby_token():
+                return server
+        except Exception as e:
+            logger.info(f'Golden image source {server.ip_address} unusable: {e}')
+        finally:
+            manager.disconnect()
+        release(server)
+    return None
+
+
+def claim(server):
+    """Take a pool server out of the pool; False if a user got it first."""
+    from .models import Server
+    claimed = Server.objects.filter(pk=server.pk, status='active', profile__isnull=True).update(
+        status='provisioning', updated_at=timezone.now(),
+    )
+    if claimed:
+        server.status = 'provisioning'
+    return bool(claimed)
+
+
+def release(server):
+    """Put a claimed server back into the pool (only if it is still nobody's)."""
+    from .models import Server
+    Server.objects.filter(pk=server.pk, status='provisioning', profile__isnull=True).update(
+        status='active', updated_at=timezone.now(),
+    )
+
+
+def start_capture(server):
+    """Stop the claimed `server`'s stack and start a TimeWeb snapshot of its disk.
+
+    Returns the GoldenImage: 'creating' (poll_capture finishes it) or 'failed'.
+    """
+    from .models import GoldenImage
+    from .services import ServerManager
+
+    fp = fingerprint()
+    golden = GoldenImage.objects.create(fingerprint=fp, source=server, deploy_state=server.deploy_state or {})
+    try:
+        disk_id = timeweb.get_system_disk_id(server.timeweb_server_id)
+        if not disk_id:
+            raise RuntimeError(f'no system disk for TimeWeb server {server.timeweb_server_id}')
+
+        logger.info(f'Capturing golden image {fp[:12]} from {server.ip_address}...')
+        with ServerManager(server) as manager:
+            out, err, code = manager.exec_command(f'cd {server.openclaw_path} && docker compose stop && sync', timeout=120)
+        if code != 0:
+            raise RuntimeError(f'docker compose stop failed: {(err or out)[:300]}')
+        image_id = timeweb.create_image(
+            disk_id, f'openclaw-golden-{fp[:12]}', f'SimpleClaw warm standby from {server.ip_address}',
+        )
+        if not image_id:
+            raise RuntimeError('TimeWeb image create failed')
+        golden.timeweb_image_id = image_id
+        golden.save(update_fields=['timeweb_image_id', 'updated_at'])
+    except Exception as e:
+        finish(golden, error=str(e))
+    return golden
+
+
+def poll_capture(golden_id):
+    """Check a snapshot once. Returns seconds until the next check, or None when it is finished."""
+    from .models import GoldenImage, Server
+
+    golden = GoldenImage.objects.select_related('source').filter(pk=golden_id, status='creating').first()
+    if golden is None:
+        return None
+    status = (timeweb.get_image(golden.timeweb_image_id) or {}).get('status')
+    logger.info(f'Golden image {golden.timeweb_image_id} status: {status}')
+    if status == 'created':
+        finish(golden)
+    elif status in ('failed', 'deleted'):
+        finish(golden, error=f'TimeWeb image {golden.timeweb_image_id} {status}')
+    elif timezone.now() - golden.created_at > timedelta(seconds=GOLDEN_IMAGE_WAIT):
+        finish(golden, error=f'TimeWeb image {golden.timeweb_image_id} not ready after {GOLDEN_IMAGE_WAIT}s')
+    else:
+        # Not a stuck server for cleanup_error_servers
+        Server.objects.filter(pk=golden.source_id, status='provisioning').update(updated_at=timezone.now())
+        return GOLDEN_IMAGE_POLL
+    return None
+
+
+def finish(golden, error=''):
+    """Mark the snapshot ready or failed, restart the source's stack and put it back into the pool."""
+    from .models import GoldenImage
+    from .services import ServerManager
+    from .tasks import notify_admin, notify_error
+
+    # Only one worker finishes a capture (duplicate poll deliveries)
+    if not GoldenImage.objects.filter(pk=golden.pk, status='creating').update(
+        status='failed' if error else 'ready', error=error[:500], updated_at=timezone.now(),
+    ):
+        return
+    golden.refresh_from_db()
+    server = golden.source
+    if server is not None:
+        try:
+            with ServerManager(server) as manager:
+                manager.exec_command(f'cd {server.openclaw_path} && docker compose start', timeout=300)
+        except Exception as e:
+            logger.error(f'Golden image source {server.ip_address}: stack not restarted: {e}')
+        release(server)
+
+    source = server.ip_address if server else '—'
+    if error:
+        logger.error(f'Golden image capture from {source} failed: {error}')
+        if golden.timeweb_image_id:
+            timeweb.delete_image(golden.timeweb_image_id)
+        notify_error.delay('Golden Image Capture Failed', f'Source: {source}\nError: {error}')
+        return
+    logger.info(f'Golden image {golden.timeweb_image_id} ready (from {source})')
+    retire_old(golden)
+    notify_admin.delay(f'📀 Golden image {golden.timeweb_image_id} ready (from {source})')
+
+
+def stale_captures():
+    """Captures nobody polls any more (worker lost): poll_capture finishes them."""
+    from .models import GoldenImage
+    return list(GoldenImage.objects.filter(
+        status='creating', updated_at__lt=timezone.now() - timedelta(seconds=GOLDEN_IMAGE_WAIT + 600),
+    ).values_list('pk', flat=True))
+
+
+def retire_old(keep):
+    """Delete the older ready images from TimeWeb."""
+    from .models import GoldenImage
+    for old in GoldenImage.objects.filter(status='ready').exclude(pk=keep.pk):
+        if old.timeweb_image_id and not timeweb.delete_image(old.timeweb_image_id):
+            logger.warning(f'Golden image {old.timeweb_image_id} not deleted from TimeWeb')
+            continue
+        old.status = 'retired'
+        old.save(update_fields=['status', 'updated_at'])
+
+
+def count_server(golden):
+    from .models import GoldenImage
+    GoldenImage.objects.filter(pk=golden.pk).update(servers_created=F('servers_created') + 1)
@@ -0,0 +1,367 @@
+"""OpenClaw images — build openclaw-chrome once per Dockerfile, ship it to the fleet.
+
+Every pool server used to run `docker compose up -d --build`. Each build
+ran apt-get, installed Google Chrome and ~20 libraries, pip-installed
+python-pptx and sed-patched the dist files, which takes minutes on the
+2-vCPU TimeWeb preset. Now the image is tagged by build_key(): the sha256
+of DOCKERFILE_CONTENT and of the registry digests its FROM images resolved
+to (`openclaw-chrome:<key[:16]>`), and built once per tag with those
+digests pinned. An ImageBuild row records where the build happened, the
+base digests and the resulting image ID. Every other server gets the image
+in one of two ways:
+
+  - registry: if OPENCLAW_IMAGE_REGISTRY is set, the builder pushes the tag
+    there. Servers pull it by the pushed digest (`…@sha256:…`) and tag it
+    locally.
+  - stream: otherwise `docker save | gzip` runs on the server that built
+    the image. The stream is relayed through the backend into
+    `gunzip | docker load` on the target over the two SSH connections, so
+    no registry is needed.
+
+The loaded image ID is checked against the recorded one.
+
+Which image a server runs is a release() — and only warm deploys and the
+golden image fingerprint ask the registries whether upstream moved
+(refresh=True, at most every IMAGE_BASE_CHECK_INTERVAL). User deploys use
+the image the server was warmed with (pin(), kept in Server.deploy_state)
+or the newest ready build, so a new openclaw:latest never makes a paying
+user wait for a build. docker-compose.yml references the pinned image by
+its registry digest where the server has it (by the content-addressed tag
+otherwise — a `docker load`ed image has no digest; the pin's image ID is
+what warm_standby_token checks). The compose file still has `build: .`,
+so a server that could not get the image builds it itself as before.
+
+The backend host does not need docker. The first server that needs a new
+tag builds it while the others wait for it (IMAGE_WAIT_TIMEOUT).
+"""
+import hashlib
+import logging
+import re
+import time
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+IMAGE_REPOSITORY = 'openclaw-chrome'
+
+# host[:port] of a registry reachable from the VPSes; '' = stream `docker save` over SSH
+OPENCLAW_IMAGE_REGISTRY = getattr(settings, 'OPENCLAW_IMAGE_REGISTRY', '')
+# Seconds for `docker build` on the builder
+IMAGE_BUILD_TIMEOUT = getattr(settings, 'IMAGE_BUILD_TIMEOUT', 900)
+# Seconds for one pull or save→load transfer
+IMAGE_TRANSFER_TIMEOUT = getattr(settings, 'IMAGE_TRANSFER_TIMEOUT', 600)
+# Seconds to wait for a build running on another server before building locally
+IMAGE_WAIT_TIMEOUT = getattr(settings, 'IMAGE_WAIT_TIMEOUT', 900)
+IMAGE_WAIT_POLL = 15
+# Seconds between asking the registries what the Dockerfile's FROM tags point to
+IMAGE_BASE_CHECK_INTERVAL = getattr(settings, 'IMAGE_BASE_CHECK_INTERVAL', 3600)
+
+FROM_RE = re.compile(r'^[ \t]*FROM[ \t]+(?:--platform=\S+[ \t]+)?(\S+)(?:[ \t]+AS[ \t]+(\S+))?', re.IGNORECASE | re.MULTILINE)
+MANIFEST_TYPES = ', '.join([
+    'application/vnd.oci.image.index.v1+json',
+    'application/vnd.docker.distribution.manifest.list.v2+json',
+    'application/vnd.docker.distribution.manifest.v2+json',
+    'application/vnd.oci.image.manifest.v1+json',
+])
+
+
+class ImageUnavailable(Exception):
+    """The image could not be fetched from the registry or the builder."""
+
+
+def dockerfile_sha(dockerfile):
+    return hashlib.sha256(dockerfile.encode('utf-8')).hexdigest()
+
+
+def base_images(dockerfile):
+    """Registry references of the FROM lines (not earlier stages or scratch)."""
+    refs, stages = [], set()
+    for ref, stage in FROM_RE.findall(dockerfile):
+        if ref.lower() != 'scratch' and ref not in stages and ref not in refs:
+            refs.append(ref)
+        if stage:
+            stages.add(stage)
+    return refs
+
+
+def _split_ref(ref):
+    """'ghcr.io/a/b:tag' → ('ghcr.io', 'a/b', 'tag'); Docker Hub names get its registry and library/."""
+    name, _, tag = ref.rpartition(':') if ':' in ref.rsplit('/', 1)[-1] else (ref, '', 'latest')
+    host, _, repo = name.partition('/')
+    if not repo or not ('.' in host or ':' in host or host == 'localhost'):
+        host, repo = 'registry-1.docker.io', name if '/' in name else f'library/{name}'
+    return host, repo, tag
+
+
+def resolve_digest(ref):
+    """Digest the registry currently serves for `ref` ('sha256:…'), '' if it can't be asked."""
+    if '@' in ref:
+        return ref.split('@', 1)[1]
+    host, repo, tag = _split_ref(ref)
+    url = f'https://{host}/v2/{repo}/manifests/{tag}'
+    headers = {'Accept': MANIFEST_TYPES}
+    try:
+        resp = requests.head(url, headers=headers, timeout=10)
+        challenge = resp.headers.get('WWW-Authenticate', '')
+        if resp.status_code == 401 and challenge.lower().startswith('bearer '):
+            # Anonymous pull token (ghcr.io, Docker Hub)
+            params = dict(re.findall(r'(\w+)="([^"]*)"', challenge))
+            realm = params.pop('realm', '')
+            params.setdefault('scope', f'repository:{repo}:pull')
+            token = requests.get(realm, params=params, timeout=10).json()
+            headers['Authorization'] = f'Bearer {token.get("token") or token.get("access_token")}'
+            resp = requests.head(url, headers=headers, timeout=10)
+        if resp.status_code != 200:
+            logger.warning(f'Registry digest of {ref}: HTTP {resp.status_code}')
+            return ''
+        return resp.headers.get('Docker-Content-Digest', '')
+    except Exception as e:
+        logger.warning(f'Registry digest of {ref}: {e}')
+        return ''
+
+
+def base_digests(dockerfile):
+    """{FROM ref: digest}, re-resolved every IMAGE_BASE_CHECK_INTERVAL seconds.
+
+    If a registry can't be asked, the last resolved digests are kept (and
+    {} before the first success — the key is then the Dockerfile alone).
+    """
+    sha = dockerfile_sha(dockerfile)
+    digests = cache.get(f'image-base:{sha}')
+    if digests is not None:
+        return digests
+    digests = {ref: resolve_digest(ref) for ref in base_images(dockerfile)}
+    if all(digests.values()):
+        cache.set(f'image-base-last:{sha}', digests, None)
+    else:
+        digests = cache.get(f'image-base-last:{sha}') or {}
+    cache.set(f'image-base:{sha}', digests, IMAGE_BASE_CHECK_INTERVAL)
+    return digests
+
+
+def build_key(dockerfile, bases):
+    """sha256 of the Dockerfile and the digests its base images resolved to."""
+    h = hashlib.sha256(dockerfile.encode('utf-8'))
+    for ref, digest in sorted(bases.items()):
+        h.update(f'\0{ref}@{digest}'.encode('utf-8'))
+    return h.hexdigest()
+
+
+def pinned(dockerfile, bases):
+    """`dockerfile` with its FROM images pinned to the digests in `bases`."""
+    def pin(match):
+        ref = match.group(1)
+        if not bases.get(ref) or '@' in ref:
+            return match.group(0)
+        return match.group(0).replace(ref, f'{ref}@{bases[ref]}', 1)
+    return FROM_RE.sub(pin, dockerfile)
+
+
+def image_tag(key):
+    """Content-addressed tag of the image with build_key `key`."""
+    return f'{IMAGE_REPOSITORY}:{key[:16]}'
+
+
+def release(dockerfile, refresh=False):
+    """The image to deploy for `dockerfile`: {'dockerfile', 'key', 'tag', 'ref', 'bases'}.
+
+    Without `refresh` it is the newest ready build of this Dockerfile and no
+    registry is asked — a deploy never waits for an upstream change to be
+    built. refresh=True (warm deploys, golden.fingerprint) resolves the FROM
+    digests again and may name an image nobody has built yet. Either way
+    the first release of a new Dockerfile is resolved.
+    """
+    from .models import ImageBuild
+
+    sha = dockerfile_sha(dockerfile)
+    build = None if refresh else ImageBuild.objects.filter(dockerfile_sha=sha, status='ready').first()
+    if build:
+        key, bases = build.build_key, build.base_digests
+    else:
+        bases = base_digests(dockerfile)
+        key = build_key(dockerfile, bases)
+    tag = image_tag(key)
+    return {'dockerfile': sha, 'key': key, 'tag': tag, 'ref': tag, 'bases': bases}
+
+
+def pin(manager, release):
+    """`release` as the manager's server has it: plus the image 'id' and the 'ref' compose uses.
+
+    The ref is the registry digest if the server knows the image by it,
+    the tag otherwise.
+    """
+    from .models import ImageBuild
+
+    image_id = _inspect(manager, release['tag'])
+    ref = release['tag']
+    build = ImageBuild.objects.filter(build_key=release['key']).first()
+    if image_id and build and build.registry_ref and _inspect(manager, build.registry_ref) == image_id:
+        ref = build.registry_ref
+    return {**release, 'id': image_id, 'ref': ref}
+
+
+def _inspect(manager, ref, fmt='{{.Id}}'):
+    out, _, code = manager.exec_command(f"docker image inspect -f '{fmt}' {ref} 2>/dev/null")
+    return out.strip() if code == 0 else ''
+
+
+def ensure_image(manager, dockerfile, release):
+    """Make the image of `release` (see release()) present on the manager's server.
+
+    Returns how it got there: 'present', 'pulled', 'loaded' or 'built'.
+    Raises RuntimeError if the local build fails.
+    """
+    from .models import ImageBuild
+
+    key, tag = release['key'], release['tag']
+    server = manager.server
+    record = {'tag': tag, 'dockerfile_sha': release['dockerfile'], 'base_digests': release['bases']}
+
+    image_id = _inspect(manager, tag)
+    if image_id:
+        # A server that already has the image can serve it to the others
+        ImageBuild.objects.get_or_create(build_key=key, defaults={
+            **record, 'status': 'ready', 'source': server, 'image_id': image_id,
+        })
+        return 'present'
+
+    build, created = ImageBuild.objects.get_or_create(build_key=key, defaults={
+        **record, 'status': 'building', 'source': server,
+    })
+    if created or _claim(build, server):
+        return _build(manager, build, dockerfile, release)
+
+    deadline = time.monotonic() + IMAGE_WAIT_TIMEOUT
+    while build.status == 'building' and time.monotonic() < deadline:
+        logger.info(f'Waiting for {tag} to be built on {build.source} for {server.ip_address}')
+        time.sleep(IMAGE_WAIT_POLL)
+        build.refresh_from_db()
+
+    if build.status == 'ready':
+        try:
+            return _fetch(manager, build)
+        except ImageUnavailable as e:
+            logger.warning(f'Image {tag} not fetched to {server.ip_address}: {e}, building locally')
+    else:
+        logger.warning(f'Image {tag} not ready ({build.status}), building locally on {server.ip_address}')
+
+    # Local fallback: doesn't take over the record of the shared build
+    return _build(manager, None, dockerfile, release)
+
+
+def _claim(build, server):
+    """Take over a failed or abandoned build (one server at a time)."""
+    from .models import ImageBuild
+    stale = timezone.now() - timedelta(seconds=IMAGE_BUILD_TIMEOUT)
+    claimed = ImageBuild.objects.filter(
+        Q(status='failed') | Q(status='building', updated_at__lt=stale), pk=build.pk,
+    ).update(
+        status='building', source=server, error='', updated_at=timezone.now(),
+    )
+    if claimed:
+        build.refresh_from_db()
+    return bool(claimed)
+
+
+def _build(manager, build, dockerfile, release):
+    """docker build on the server (Dockerfile on stdin — it has no build context)."""
+    tag = release['tag']
+    server = manager.server
+    logger.info(f'Building {tag} on {server.ip_address}...')
+    started = time.monotonic()
+    # Not -q: the build log is streamed into the deploy progress, only its tail is kept
+    result = manager.exec_stream(
+        f'timeout {IMAGE_BUILD_TIMEOUT} docker build -t {tag} -', stdin=pinned(dockerfile, release['bases']),
+        timeout=IMAGE_BUILD_TIMEOUT + 30, tail_bytes=8192,
+    )
+    out, err, code = result.as_tuple()
+    duration = time.monotonic() - started
+    if code != 0:
+        if build is not None:
+            build.status = 'failed'
+            build.error = (err or out)[-500:]
+            build.save(update_fields=['status', 'error', 'updated_at'])
+        raise RuntimeError(f'docker build {tag} failed: {(err or out)[-300:]}')
+
+    logger.info(f'Built {tag} on {server.ip_address} in {duration:.0f}s')
+    if build is None:
+        return 'built'
+
+    build.image_id = _inspect(manager, tag)
+    size = _inspect(manager, tag, '{{.Size}}')
+    build.size_bytes = int(size) if size.isdigit() else None
+    build.build_duration = duration
+    build.registry_ref = _push(manager, tag) if OPENCLAW_IMAGE_REGISTRY else ''
+    build.source = server
+    build.status = 'ready'
+    build.error = ''
+    build.save()
+    return 'built'
+
+
+def _push(manager, tag):
+    """Push to OPENCLAW_IMAGE_REGISTRY; returns the digest reference or '' (stream fallback)."""
+    remote = f'{OPENCLAW_IMAGE_REGISTRY}/{tag}'
+    out, err, code = manager.exec_command(
+        f'docker tag {tag} {remote} && docker push -q {remote}', timeout=IMAGE_TRANSFER_TIMEOUT,
+    )
+    if code != 0:
+        logger.warning(f'docker push {remote} failed on {manager.server.ip_address}: {(err or out)[:300]}')
+        return ''
+    return _inspect(manager, remote, '{{index .RepoDigests 0}}')
+
+
+def _fetch(manager, build):
+    if build.registry_ref:
+        out, err, code = manager.exec_command(
+            f'docker pull -q {build.registry_ref} && docker tag {build.registry_ref} {build.tag}',
+            timeout=IMAGE_TRANSFER_TIMEOUT,
+        )
+        if code == 0:
+            _verify(manager, build)
+            return 'pulled'
+        logger.warning(f'docker pull {build.registry_ref} failed on {manager.server.ip_address}: {(err or out)[:300]}')
+
+    if build.source is None or build.source_id == manager.server.pk:
+        raise ImageUnavailable('no server to copy the image from')
+    _stream(build.source, manager, build.tag)
+    _verify(manager, build)
+    return 'loaded'
+
+
+def _stream(source_server, manager, tag):
+    """Relay `docker save | gzip` on the source into `docker load` on the target."""
+    from .services import ServerManager
+
+    started = time.monotonic()
+    with ServerManager(source_server) as source:
+        try:
+            _, stdout, stderr = source._open_channel(f'docker save {tag} | gzip -1', IMAGE_TRANSFER_TIMEOUT)
+        except Exception as e:
+            raise ImageUnavailable(f'{source_server.ip_address}: {e}')
+        out, err, code = manager.exec_stdin(
+            'gunzip | docker load -q', stdout, timeout=IMAGE_TRANSFER_TIMEOUT, chunk_size=1 << 20,
+        )
+        source_code = stdout.channel.recv_exit_status()
+    if source_code != 0:
+        raise ImageUnavailable(
+            f'docker save on {source_server.ip_address} failed: {stderr.read().decode(errors="replace")[:300]}'
+        )
+    if code != 0:
+        raise ImageUnavailable(f'docker load failed: {(err or out)[:300]}')
+    logger.info(
+        f'Image {tag} copied {source_server.ip_address} → {manager.server.ip_address} '
+        f'in {time.monotonic() - started:.0f}s'
+    )
+
+
+def _verify(manager, build):
+    image_id = _inspect(manager, build.tag)
+    if build.image_id and image_id != build.image_id:
+        raise ImageUnavailable(f'{build.tag} is {image_id or "missing"}, expected {build.image_id}')
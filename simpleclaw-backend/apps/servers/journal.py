@@ -0,0 +1,445 @@
+"""Deploy journal — per-step timings of deploys in DeployRun/DeployStep.
+
+Server.deployment_stage only holds a coarse label and step timings used to
+exist only in log lines, so "which step of quick_deploy_user is slow on
+which server" had no answer. A deploy method decorated with @journaled opens
+a DeployRun; each step (ServerManager.journal_step / run_step, and every
+Reconciler step) becomes a DeployStep with start/end, the number of remote
+commands, bytes sent and received, the exit status of the last remote
+command and retries. ServerManager feeds the counters from exec_command,
+exec_parallel, exec_stdin, upload_file and RemoteBatch.
+
+Journal writes never fail a deploy: database errors are logged and ignored.
+
+While a long remote command runs (ServerManager.exec_stream), progress()
+publishes the current step and its latest output line in the cache (Redis
+in production) at most every DEPLOY_PROGRESS_INTERVAL seconds;
+deploy_progress() reads it back for the server status view.
+
+step_percentiles() aggregates p50/p95 per step across the fleet for the
+admin and the /api/server/deploy-stats/ view.
+
+Resume: a run is keyed by idempotency_key() (kind, server and the deploy
+arguments), and DeployRun.checkpoint keeps every top-level step that
+finished (with its result, strings trimmed) plus the values the deploy
+generated through remember() (the gateway token). Called with resume=True,
+a @journaled method continues the server's last run if that run failed
+with the same key less than DEPLOY_RESUME_MAX_AGE hours ago and the openclaw
+container is still the one it left behind: finished steps are not run
+again (run_step returns the recorded result), the rest run as usual.
+Otherwise the deploy starts over (the Reconciler still skips unchanged
+steps).
+"""
+import copy
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Minimum seconds between two progress updates of one deploy
+DEPLOY_PROGRESS_INTERVAL = getattr(settings, 'DEPLOY_PROGRESS_INTERVAL', 2)
+DEPLOY_PROGRESS_TTL = 3600
+# Hours during which a failed deploy can be resumed
+DEPLOY_RESUME_MAX_AGE = getattr(settings, 'DEPLOY_RESUME_MAX_AGE', 24)
+# Characters kept of each string in a checkpointed step result
+CHECKPOINT_TEXT = 500
+
+
+def _progress_key(server_id):
+    return f'deploy-progress:{server_id}'
+
+
+def deploy_progress(server):
+    """{'kind', 'step', 'line', 'updated_at'} of the server's running deploy, or None."""
+    try:
+        return cache.get(_progress_key(server.pk))
+    except Exception:
+        return None
+
+
+def _compact(value):
+    """JSON-safe copy of a step result with long strings trimmed; TypeError if it has no JSON form."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value[-CHECKPOINT_TEXT:]
+    if isinstance(value, (list, tuple)):
+        return [_compact(v) for v in value]
+    if isinstance(value, dict):
+        return {str(k): _compact(v) for k, v in value.items()}
+    raise TypeError(f'{type(value).__name__} is not checkpointable')
+
+
+@dataclass
+class StepCounters:
+    name: str = ''
+    commands: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    retries: int = 0
+    exit_code: int | None = None
+    failed: bool = False
+
+
+class DeployJournal:
+    """Records the steps of one DeployRun."""
+
+    def __init__(self, run, resume_from=None):
+        self.run = run
+        self.position = 0
+        self._lock = threading.Lock()
+        self._progress_at = 0.0
+        # Steps of a deploy pipeline run in parallel threads — one current step per thread
+        self._local = threading.local()
+        previous = (resume_from.checkpoint or {}) if resume_from is not None else {}
+        self.resumed_from = resume_from
+        # Steps finished by the resumed run: name → result
+        self.done = dict(previous.get('steps', {}))
+        self.checkpoint = {'steps': {}, 'values': dict(previous.get('values', {}))}
+
+    @property
+    def resuming(self):
+        return bool(self.done)
+
+    @property
+    def current(self):
+        return getattr(self._local, 'current', None)
+
+    @current.setter
+    def current(self, counters):
+        self._local.current = counters
+
+    @classmethod
+    def start(cls, server, kind, key='', resume_from=None):
+        from .models import DeployRun
+        try:
+            run = DeployRun.objects.create(server=server, kind=kind, idempotency_key=key, resumed_from=resume_from)
+        except Exception as e:
+            logger.warning(f'Deploy journal unavailable for {server.ip_address}: {e}')
+            run, resume_from = None, None
+        return cls(run, resume_from)
+
+    def track(self, commands=0, sent=0, received=0, retries=0, exit_code=None):
+        c = self.current
+        if c is None:
+            return
+        c.commands += commands
+        c.bytes_sent += sent
+        c.bytes_received += received
+        c.retries += retries
+        if exit_code is not None:
+            c.exit_code = exit_code
+
+    @contextmanager
+    def step(self, name):
+        """Time a step; yields its StepCounters. Nested steps are folded
+        into the outer one (and yield None)."""
+        if self.current is not None:
+            yield None
+            return
+        self.current = StepCounters(name=name)
+        started_at = timezone.now()
+        started = time.monotonic()
+        status, error = 'ok', ''
+        try:
+            yield self.current
+        except Exception as e:
+            status, error = 'failed', str(e)[:500]
+            raise
+        finally:
+            counters, self.current = self.current, None
+            self._save(name, status, started_at, time.monotonic() - started, counters, error)
+
+    def run_step(self, name, fn, *args, **kwargs):
+        """Run fn inside a step; a False result marks the step failed.
+
+        A step the resumed run finished is not run; its recorded result is returned.
+        """
+        top = self.current is None
+        if top and name in self.done:
+            logger.info(f'Deploy step {name} finished in run {self.resumed_from.pk}, skipping')
+            result = self.done[name]
+            self.skipped(name)
+            self._checkpoint_step(name, result)
+            return result
+        with self.step(name) as counters:
+            result = fn(*args, **kwargs)
+            if result is False and counters is not None:
+                counters.failed = True
+        if top and result is not False:
+            self._checkpoint_step(name, result)
+        return result
+
+    def remember(self, name, make):
+        """A value generated for this deploy (e.g. a token): make() once, the resumed run's value on resume."""
+        with self._lock:
+            values = self.checkpoint['values']
+            if name in values:
+                return values[name]
+            values[name] = make()
+            self._save_checkpoint()
+            return values[name]
+
+    def steps_done(self):
+        """Names of the steps checkpointed so far."""
+        with self._lock:
+            return set(self.checkpoint['steps'])
+
+    def discard_steps(self, keep):
+        """Forget checkpointed steps not in `keep` (an abandoned attempt within the deploy)."""
+        with self._lock:
+            steps = self.checkpoint['steps']
+            if set(steps) - set(keep):
+                self.checkpoint['steps'] = {k: v for k, v in steps.items() if k in keep}
+                self._save_checkpoint()
+
+    def _checkpoint_step(self, name, result):
+        try:
+            result = _compact(result)
+        except TypeError:
+            return  # reruns on resume
+        with self._lock:
+            self.checkpoint['steps'][name] = result
+            self._save_checkpoint()
+
+    def _save_checkpoint(self):
+        # Called with self._lock held
+        if self.run is None:
+            return
+        self.run.checkpoint = copy.deepcopy(self.checkpoint)
+        try:
+            self.run.save(update_fields=['checkpoint'])
+        except Exception as e:
+            logger.warning(f'Deploy checkpoint of run {self.run.pk} not saved: {e}')
+
+    def progress(self, stream, line):
+        """Output line of a streaming command in the current step (throttled)."""
+        if self.run is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if now - self._progress_at < DEPLOY_PROGRESS_INTERVAL:
+                return
+            self._progress_at = now
+        c = self.current
+        try:
+            cache.set(_progress_key(self.run.server_id), {
+                'kind': self.run.kind,
+                'step': c.name if c is not None else '',
+                'line': line[-200:],
+                'updated_at': timezone.now().isoformat(),
+            }, DEPLOY_PROGRESS_TTL)
+        except Exception as e:
+            logger.debug(f'Deploy progress not published: {e}')
+
+    def skipped(self, name):
+        self._save(name, 'skipped', timezone.now(), 0.0, StepCounters(), '')
+
+    def _save(self, name, status, started_at, duration, counters, error):
+        if self.run is None:
+            return
+        from .models import DeployStep
+        if counters.failed:
+            status = 'failed'
+        with self._lock:
+            self.position += 1
+            position = self.position
+        try:
+            DeployStep.objects.create(
+                run=self.run, name=name, position=position, status=status,
+                started_at=started_at, finished_at=started_at + timedelta(seconds=duration),
+                duration=duration, commands=counters.commands, bytes_sent=counters.bytes_sent,
+                bytes_received=counters.bytes_received, exit_code=counters.exit_code,
+                retries=counters.retries, error=error,
+            )
+        except Exception as e:
+            logger.warning(f'Deploy journal step {name} not saved: {e}')
+
+    def set_critical_path(self, path):
+        """[(step, seconds), …] of the pipeline's critical path."""
+        if self.run is None:
+            return
+        self.run.critical_path = [{'step': name, 'duration': duration} for name, duration in path]
+        try:
+            self.run.save(update_fields=['critical_path'])
+        except Exception as e:
+            logger.warning(f'Deploy journal run {self.run.pk} not saved: {e}')
+
+    def finish(self, ok, error='', container=None):
+        """Close the run; `container` (reconcile.container_identity) makes a failed run resumable."""
+        if self.run is None:
+            return
+        run = self.run
+        run.status = 'ok' if ok else 'failed'
+        run.finished_at = timezone.now()
+        run.duration = (run.finished_at - run.started_at).total_seconds()
+        run.error = '' if ok else (error or '')[:500]
+        with self._lock:
+            if container is not None:
+                self.checkpoint['container'] = container
+            run.checkpoint = copy.deepcopy(self.checkpoint)
+        try:
+            run.save(update_fields=['status', 'finished_at', 'duration', 'error', 'checkpoint'])
+        except Exception as e:
+            logger.warning(f'Deploy journal run {run.pk} not saved: {e}')
+        try:
+            cache.delete(_progress_key(run.server_id))
+        except Exception:
+            pass
+
+
+def idempotency_key(kind, server, arguments):
+    """Digest of a deploy's kind, server and arguments {name: value} (secrets are only hashed)."""
+    from .reconcile import digest
+    return digest(kind, server.pk, sorted(arguments.items()))
+
+
+def resumable(server):
+    """The server's last DeployRun if it failed recently with checkpointed steps, else None."""
+    from .models import DeployRun
+    last = DeployRun.objects.filter(server=server).order_by('-started_at').first()
+    if last is None or last.status != 'failed' or not (last.checkpoint or {}).get('steps'):
+        return None
+    if last.started_at < timezone.now() - timedelta(hours=DEPLOY_RESUME_MAX_AGE):
+        return None
+    return last
+
+
+def resume_point(manager, kind, key):
+    """The run a deploy of `kind` with `key` can continue on manager's server, or None."""
+    from .reconcile import container_identity
+
+    run = resumable(manager.server)
+    if run is None or run.kind != kind or run.idempotency_key != key:
+        return None
+    container = run.checkpoint.get('container')
+    if container is None or container != container_identity(manager):
+        # Something touched the container since — its finished steps can't be trusted
+        logger.info(f'Deploy run {run.pk} on {manager.server.ip_address}: container changed, not resuming')
+        return None
+    return run
+
+
+def journaled(kind):
+    """Decorator for ServerManager deploy methods: record the call as a DeployRun.
+
+    The run fails if the method raises or returns False (the deploy methods
+    report errors through Server.last_error). resume=True continues the
+    server's failed run of the same deploy (see resume_point).
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, resume=False, **kwargs):
+            if self.journal is not None:
+                # Deploy called from inside another deploy — one run only
+                return method(self, *args, **kwargs)
+            bound = inspect.signature(method).bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            key = idempotency_key(kind, self.server, dict(list(bound.arguments.items())[1:]))
+            previous = None
+            if resume:
+                try:
+                    previous = resume_point(self, kind, key)
+                except Exception as e:
+                    logger.warning(f'Resume check failed on {self.server.ip_address}: {e}')
+            if previous is not None:
+                logger.info(f'Resuming {kind} deploy run {previous.pk} on {self.server.ip_address}')
+            self.journal = DeployJournal.start(self.server, kind, key=key, resume_from=previous)
+            ok, error = False, ''
+            try:
+                result = method(self, *args, **kwargs)
+                ok = result is not False
+                return result
+            except Exception as e:
+                error = str(e)
+                raise
+            finally:
+                journal, self.journal = self.journal, None
+                container = None
+                if not ok and journal.run is not None:
+                    from .reconcile import container_identity
+                    try:
+                        container = container_identity(self)
+                    except Exception:
+                        pass
+                journal.finish(ok, error or self.server.last_error, container=container)
+        return wrapper
+    return decorator
+
+
+def _percentile(values, q):
+    """Linear-interpolated percentile of sorted `values` (q in 0..100)."""
+    if not values:
+        return None
+    k = (len(values) - 1) * q / 100
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def step_percentiles(kind=None, days=30, server=None):
+    """p50/p95 duration per step name over finished steps of the last `days` days.
+
+    Returns [{'step', 'count', 'p50', 'p95', 'max', 'failed', 'commands_p50', 'bytes_p50'}]
+    sorted by p95 descending, plus a '(total)' row for whole runs.
+    """
+    from .models import DeployRun, DeployStep
+
+    since = timezone.now() - timedelta(days=days)
+    steps = DeployStep.objects.filter(run__started_at__gte=since).exclude(status='skipped')
+    runs = DeployRun.objects.filter(started_at__gte=since, duration__isnull=False)
+    if kind:
+        steps = steps.filter(run__kind=kind)
+        runs = runs.filter(kind=kind)
+    if server is not None:
+        steps = steps.filter(run__server=server)
+        runs = runs.filter(server=server)
+
+    grouped = {}
+    for name, status, duration, commands, sent, received in steps.values_list(
+        'name', 'status', 'duration', 'commands', 'bytes_sent', 'bytes_received',
+    ).iterator():
+        g = grouped.setdefault(name, {'durations': [], 'commands': [], 'bytes': [], 'failed': 0})
+        g['durations'].append(duration)
+        g['commands'].append(commands)
+        g['bytes'].append(sent + received)
+        g['failed'] += status == 'failed'
+
+    rows = []
+    for name, g in grouped.items():
+        durations = sorted(g['durations'])
+        rows.append({
+            'step': name,
+            'count': len(durations),
+            'p50': round(_percentile(durations, 50), 2),
+            'p95': round(_percentile(durations, 95), 2),
+            'max': round(durations[-1], 2),
+            'failed': g['failed'],
+            'commands_p50': _percentile(sorted(g['commands']), 50),
+            'bytes_p50': int(_percentile(sorted(g['bytes']), 50)),
+        })
+    rows.sort(key=lambda r: r['p95'], reverse=True)
+
+    totals = sorted(runs.values_list('duration', flat=True))
+    if totals:
+        rows.append({
+            'step': '(total)',
+            'count': len(totals),
+            'p50': round(_percentile(totals, 50), 2),
+            'p95': round(_percentile(totals, 95), 2),
+            'max': round(totals[-1], 2),
+            'failed': runs.filter(status='failed').count(),
+            'commands_p50': None,
+            'bytes_p50': None,
+        })
+    return rows
@@ -0,0 +1,28 @@
+"""Management command to show Celery queue depths and how long tasks waited for a worker."""
+import logging
+
+from django.core.management.base import BaseCommand
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Show messages waiting per Celery queue and the wait before a worker picked them up'
+
+    def handle(self, *args, **options):
+        from apps.servers import queues
+
+        try:
+            depths = queues.queue_depths()
+        except Exception as e:
+            self.stderr.write(self.style.ERROR(f'Broker unreachable: {e}'))
+            depths = {}
+
+        self.stdout.write(f'{"queue":<14} {"waiting":>8} {"started":>8} {"avg s":>8} {"p50 s":>8} {"p95 s":>8} {"max s":>8}')
+        for queue in queues.QUEUES:
+            depth = depths.get(queue)
+            stats = queues.wait_stats(queue)
+            line = f'{queue:<14} {"?" if depth is None else depth:>8} {stats["count"]:>8}'
+            if stats['count']:
+                line += ''.join(f' {stats[k]:>8.1f}' for k in ('avg', 'p50', 'p95', 'max'))
+            self.stdout.write(line)
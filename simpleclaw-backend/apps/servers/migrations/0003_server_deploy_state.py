@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0002_add_deployment_stage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='server',
+            name='deploy_state',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
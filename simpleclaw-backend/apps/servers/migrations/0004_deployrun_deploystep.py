@@ -0,0 +1,54 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0003_server_deploy_state'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DeployRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('warm', 'Warm standby'), ('quick', 'Quick deploy'), ('full', 'Full deploy')], db_index=True, max_length=10)),
+                ('status', models.CharField(choices=[('running', 'Выполняется'), ('ok', 'Успешно'), ('failed', 'Ошибка')], default='running', max_length=10)),
+                ('started_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('duration', models.FloatField(blank=True, help_text='Seconds', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('server', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deploy_runs', to='servers.server')),
+            ],
+            options={
+                'verbose_name': 'Деплой',
+                'verbose_name_plural': 'Деплои',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DeployStep',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(db_index=True, max_length=64)),
+                ('position', models.PositiveIntegerField(default=0)),
+                ('status', models.CharField(choices=[('ok', 'Успешно'), ('failed', 'Ошибка'), ('skipped', 'Пропущен')], default='ok', max_length=10)),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField()),
+                ('duration', models.FloatField(help_text='Seconds')),
+                ('commands', models.PositiveIntegerField(default=0, help_text='Remote commands run')),
+                ('bytes_sent', models.BigIntegerField(default=0)),
+                ('bytes_received', models.BigIntegerField(default=0)),
+                ('exit_code', models.IntegerField(blank=True, help_text='Exit code of the last remote command', null=True)),
+                ('retries', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='steps', to='servers.deployrun')),
+            ],
+            options={
+                'verbose_name': 'Шаг деплоя',
+                'verbose_name_plural': 'Шаги деплоя',
+                'ordering': ['run', 'position'],
+            },
+        ),
+    ]
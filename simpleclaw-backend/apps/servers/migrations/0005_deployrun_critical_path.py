@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0004_deployrun_deploystep'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployrun',
+            name='critical_path',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
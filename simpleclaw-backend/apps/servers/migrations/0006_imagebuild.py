@@ -0,0 +1,34 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0005_deployrun_critical_path'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageBuild',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dockerfile_sha', models.CharField(max_length=64, unique=True)),
+                ('tag', models.CharField(max_length=100)),
+                ('status', models.CharField(choices=[('building', 'Собирается'), ('ready', 'Готов'), ('failed', 'Ошибка')], default='building', max_length=10)),
+                ('image_id', models.CharField(blank=True, max_length=80)),
+                ('registry_ref', models.CharField(blank=True, help_text='Pushed digest reference', max_length=255)),
+                ('size_bytes', models.BigIntegerField(blank=True, null=True)),
+                ('build_duration', models.FloatField(blank=True, help_text='Seconds', null=True)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='servers.server')),
+            ],
+            options={
+                'verbose_name': 'Образ OpenClaw',
+                'verbose_name_plural': 'Образы OpenClaw',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
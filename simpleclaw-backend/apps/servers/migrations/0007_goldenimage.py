@@ -0,0 +1,37 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0006_imagebuild'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='deployrun',
+            name='kind',
+            field=models.CharField(choices=[('warm', 'Warm standby'), ('quick', 'Quick deploy'), ('full', 'Full deploy'), ('golden', 'Golden image personalization')], db_index=True, max_length=10),
+        ),
+        migrations.CreateModel(
+            name='GoldenImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.CharField(db_index=True, max_length=64)),
+                ('timeweb_image_id', models.CharField(blank=True, max_length=100)),
+                ('status', models.CharField(choices=[('creating', 'Создается'), ('ready', 'Готов'), ('failed', 'Ошибка'), ('retired', 'Выведен')], default='creating', max_length=10)),
+                ('deploy_state', models.JSONField(blank=True, default=dict)),
+                ('servers_created', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('source', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='servers.server')),
+            ],
+            options={
+                'verbose_name': 'Golden image',
+                'verbose_name_plural': 'Golden images',
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
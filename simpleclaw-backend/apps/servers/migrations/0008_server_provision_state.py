@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0007_goldenimage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='server',
+            name='provision_state',
+            field=models.CharField(blank=True, choices=[('', 'Нет'), ('created', 'Создан в TimeWeb'), ('booting', 'Загружается'), ('ssh_ready', 'SSH доступен'), ('docker_ready', 'Docker установлен'), ('warm', 'Готов'), ('failed', 'Ошибка')], db_index=True, default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='provision_state_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='provision_failures',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='server',
+            name='provision_data',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
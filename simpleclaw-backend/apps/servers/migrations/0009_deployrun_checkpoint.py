@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0008_server_provision_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='deployrun',
+            name='idempotency_key',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='deployrun',
+            name='resumed_from',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resumes', to='servers.deployrun'),
+        ),
+        migrations.AddField(
+            model_name='deployrun',
+            name='checkpoint',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
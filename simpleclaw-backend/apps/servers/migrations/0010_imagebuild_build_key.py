@@ -0,0 +1,16 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0009_deployrun_checkpoint'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='imagebuild',
+            old_name='dockerfile_sha',
+            new_name='build_key',
+        ),
+    ]
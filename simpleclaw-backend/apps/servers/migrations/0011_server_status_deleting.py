@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0010_imagebuild_build_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='server',
+            name='status',
+            field=models.CharField(choices=[('creating', 'Создается'), ('provisioning', 'Настраивается'), ('active', 'Активен'), ('error', 'Ошибка'), ('deactivated', 'Деактивирован'), ('deleting', 'Удаляется')], default='creating', max_length=20),
+        ),
+    ]
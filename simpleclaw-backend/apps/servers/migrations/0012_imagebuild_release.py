@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('servers', '0011_server_status_deleting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imagebuild',
+            name='dockerfile_sha',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='imagebuild',
+            name='base_digests',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
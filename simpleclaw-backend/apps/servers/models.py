@@ -11,6 +11,7 @@ class Server(models.Model):
         ('active', 'Активен'),
         ('error', 'Ошибка'),
         ('deactivated', 'Деактивирован'),
+        ('deleting', 'Удаляется'),
     ]
 
     profile = models.OneToOneField(
@@ -54,6 +55,26 @@ class Server(models.Model):
     # Gateway token for HTTP chat endpoint
     gateway_token = models.CharField(max_length=255, blank=True)
 
+    # Digests of applied deploy steps (see reconcile.py)
+    deploy_state = models.JSONField(default=dict, blank=True)
+
+    # Provisioning state machine (see provisioning.py)
+    PROVISION_STATE_CHOICES = [
+        ('', 'Нет'),
+        ('created', 'Создан в TimeWeb'),
+        ('booting', 'Загружается'),
+        ('ssh_ready', 'SSH доступен'),
+        ('docker_ready', 'Docker установлен'),
+        ('warm', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+    provision_state = models.CharField(
+        max_length=20, choices=PROVISION_STATE_CHOICES, default='', blank=True, db_index=True,
+    )
+    provision_state_at = models.DateTimeField(null=True, blank=True)
+    provision_failures = models.PositiveIntegerField(default=0)
+    provision_data = models.JSONField(default=dict, blank=True)
+
     # Logs
     last_error = models.TextField(blank=True)
     last_health_check = models.DateTimeField(null=True, blank=True)
@@ -86,3 +107,142 @@ class OAuthPendingFlow(models.Model):
 
     def __str__(self):
         return f'{self.provider} → {self.skill_key} ({self.server.ip_address})'
+
+
+class DeployRun(models.Model):
+    """One deploy of a server (see journal.py)."""
+
+    KIND_CHOICES = [
+        ('warm', 'Warm standby'),
+        ('quick', 'Quick deploy'),
+        ('full', 'Full deploy'),
+        ('golden', 'Golden image personalization'),
+    ]
+    STATUS_CHOICES = [
+        ('running', 'Выполняется'),
+        ('ok', 'Успешно'),
+        ('failed', 'Ошибка'),
+    ]
+
+    server = models.ForeignKey(Server, on_delete=models.CASCADE, related_name='deploy_runs')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, db_index=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    duration = models.FloatField(null=True, blank=True, help_text='Seconds')
+    error = models.TextField(blank=True)
+    # Steps that determined the total time (see pipeline.py)
+    critical_path = models.JSONField(default=list, blank=True)
+    # Resume (see journal.py): same deploy arguments → same key
+    idempotency_key = models.CharField(max_length=64, blank=True, db_index=True)
+    resumed_from = models.ForeignKey(
+        'self', on_delete=models.SET_NULL, null=True, blank=True, related_name='resumes',
+    )
+    # Finished steps with their results, generated values, container at failure
+    checkpoint = models.JSONField(default=dict, blank=True)
+
+    class Meta:
+        verbose_name = 'Деплой'
+        verbose_name_plural = 'Деплои'
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f'{self.get_kind_display()} {self.server.ip_address} — {self.status}'
+
+
+class DeployStep(models.Model):
+    """Timing and remote I/O of one step of a DeployRun."""
+
+    STATUS_CHOICES = [
+        ('ok', 'Успешно'),
+        ('failed', 'Ошибка'),
+        ('skipped', 'Пропущен'),
+    ]
+
+    run = models.ForeignKey(DeployRun, on_delete=models.CASCADE, related_name='steps')
+    name = models.CharField(max_length=64, db_index=True)
+    position = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='ok')
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField()
+    duration = models.FloatField(help_text='Seconds')
+    commands = models.PositiveIntegerField(default=0, help_text='Remote commands run')
+    bytes_sent = models.BigIntegerField(default=0)
+    bytes_received = models.BigIntegerField(default=0)
+    exit_code = models.IntegerField(null=True, blank=True, help_text='Exit code of the last remote command')
+    retries = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Шаг деплоя'
+        verbose_name_plural = 'Шаги деплоя'
+        ordering = ['run', 'position']
+
+    def __str__(self):
+        return f'{self.name} {self.duration:.1f}s ({self.status})'
+
+
+class ImageBuild(models.Model):
+    """openclaw-chrome image built for one Dockerfile and base image (see images.py)."""
+
+    STATUS_CHOICES = [
+        ('building', 'Собирается'),
+        ('ready', 'Готов'),
+        ('failed', 'Ошибка'),
+    ]
+
+    # images.build_key(): the Dockerfile and the digests of its FROM images
+    build_key = models.CharField(max_length=64, unique=True)
+    tag = models.CharField(max_length=100)
+    dockerfile_sha = models.CharField(max_length=64, blank=True, db_index=True)
+    # {FROM ref: digest} the build pinned
+    base_digests = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='building')
+    # Server that built (or has) the image — the source for `docker save`
+    source = models.ForeignKey(Server, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    image_id = models.CharField(max_length=80, blank=True)
+    registry_ref = models.CharField(max_length=255, blank=True, help_text='Pushed digest reference')
+    size_bytes = models.BigIntegerField(null=True, blank=True)
+    build_duration = models.FloatField(null=True, blank=True, help_text='Seconds')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Образ OpenClaw'
+        verbose_name_plural = 'Образы OpenClaw'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.tag} ({self.status})'
+
+
+class GoldenImage(models.Model):
+    """TimeWeb image of a warmed, user-agnostic pool server (see golden.py)."""
+
+    STATUS_CHOICES = [
+        ('creating', 'Создается'),
+        ('ready', 'Готов'),
+        ('failed', 'Ошибка'),
+        ('retired', 'Выведен'),
+    ]
+
+    # golden.fingerprint() of the stack the image was taken with
+    fingerprint = models.CharField(max_length=64, db_index=True)
+    timeweb_image_id = models.CharField(max_length=100, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='creating')
+    source = models.ForeignKey(Server, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    # Server.deploy_state of the source at snapshot time, adopted by the new servers
+    deploy_state = models.JSONField(default=dict, blank=True)
+    servers_created = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Golden image'
+        verbose_name_plural = 'Golden images'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.timeweb_image_id or "—"} ({self.status})'
@@ -1,4 +1,3 @@
-import json
 import logging
 import uuid
 
@@ -10,6 +9,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .models import OAuthPendingFlow, Server
+from .openclaw_config import ConfigPatch
 from .services import ServerManager
 
 logger = logging.getLogger(__name__)
@@ -233,29 +233,13 @@ def _push_tokens_to_server(server, skill_key, token_data):
     try:
         manager.connect()
 
-        config_path = '/var/lib/docker/volumes/openclaw_config/_data/openclaw.json'
-
-        # Read current config
-        out, err, exit_code = manager.exec_command(f'cat {config_path}')
-        if exit_code != 0:
-            raise RuntimeError(f'Failed to read config: {err}')
-
-        cfg = json.loads(out)
-
         # Write tokens into skills.entries[skillKey].config.oauthTokens
-        skills = cfg.setdefault('skills', {})
-        entries = skills.setdefault('entries', {})
-        entry = entries.setdefault(skill_key, {})
-        config = entry.setdefault('config', {})
-        config['oauthTokens'] = token_data
-
-        # Write back
-        new_config_json = json.dumps(cfg, indent=2)
-        # Use python3 to write atomically (avoid broken json from echo)
-        escaped = new_config_json.replace("'", "'\\''")
-        manager.exec_command(
-            f"python3 -c \"import sys; open('{config_path}','w').write(sys.stdin.read())\" <<'EOFCFG'\n{new_config_json}\nEOFCFG"
-        )
+        # (atomic write; skill keys may contain dots, so no dotted path)
+        def set_tokens(cfg):
+            entry = cfg.setdefault('skills', {}).setdefault('entries', {}).setdefault(skill_key, {})
+            entry.setdefault('config', {})['oauthTokens'] = token_data
+
+        manager.patch_openclaw_config(ConfigPatch().update(set_tokens))
 
         logger.info('OAuth tokens pushed to %s for skill %s', server.ip_address, skill_key)
     finally:
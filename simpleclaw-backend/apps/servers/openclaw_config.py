@@ -0,0 +1,165 @@
+"""OpenClaw config patch engine — edit openclaw.json with one read and one write.
+
+Every `docker exec openclaw node /app/openclaw.mjs config set …` cold-starts a
+Node process in the container (~1s each on the 2-vCPU preset), and a deploy
+issued a dozen of them plus `models fallbacks clear/add`. Instead we read
+openclaw.json once from the Docker volume on the host, apply all desired keys
+in Python and write the file back atomically (temp file + rename in the same
+directory), so the gateway sees a single change and reloads at most once.
+
+Usage:
+    patch = ConfigPatch()
+    patch.set('agents.defaults.maxConcurrent', 2)
+    patch.merge('gateway.http.endpoints', {'chatCompletions': {'enabled': True}})
+    manager.patch_openclaw_config(patch)
+"""
+import copy
+import hashlib
+import json
+
+# openclaw.json on the host side of the openclaw_config volume
+OPENCLAW_CONFIG_PATH = '/var/lib/docker/volumes/openclaw_config/_data/openclaw.json'
+
+# Exit code of the write script when the file changed since it was read
+CONFLICT_EXIT_CODE = 75
+
+
+def config_sha(text):
+    """sha256 of the raw config text as read from the server ('' if missing)."""
+    if not text:
+        return ''
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def _split(path):
+    return [p for p in path.split('.') if p]
+
+
+def get_path(config, path, default=None):
+    """Value at a dotted path, or `default` if any segment is missing."""
+    node = config
+    for key in _split(path):
+        if not isinstance(node, dict) or key not in node:
+            return default
+        node = node[key]
+    return node
+
+
+def set_path(config, path, value):
+    """Set a dotted path, creating intermediate objects.
+
+    Raises TypeError if an intermediate segment exists but is not an object —
+    silently replacing a scalar with a dict would hide a schema mismatch.
+    """
+    keys = _split(path)
+    node = config
+    for key in keys[:-1]:
+        child = node.get(key)
+        if child is None:
+            child = node[key] = {}
+        elif not isinstance(child, dict):
+            raise TypeError(f'{path}: {key!r} is {type(child).__name__}, not an object')
+        node = child
+    node[keys[-1]] = value
+
+
+def delete_path(config, path):
+    """Remove a dotted path if present. Returns True if something was removed."""
+    keys = _split(path)
+    parent = get_path(config, '.'.join(keys[:-1])) if len(keys) > 1 else config
+    if isinstance(parent, dict) and keys[-1] in parent:
+        del parent[keys[-1]]
+        return True
+    return False
+
+
+def deep_merge(base, overlay):
+    """Recursively merge `overlay` into `base` (in place) and return `base`.
+
+    Objects are merged key by key; lists and scalars from `overlay` replace
+    the existing value.
+    """
+    for key, value in overlay.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            deep_merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+class ConfigPatch:
+    """An ordered list of edits to apply to openclaw.json."""
+
+    def __init__(self):
+        self.ops = []
+
+    def __bool__(self):
+        return bool(self.ops)
+
+    def set(self, path, value):
+        """Replace the value at `path` (same as `openclaw.mjs config set`)."""
+        self.ops.append(('set', path, value))
+        return self
+
+    def merge(self, path, value):
+        """Deep-merge an object into the value at `path`, keeping other keys."""
+        if not isinstance(value, dict):
+            raise TypeError(f'merge({path!r}) needs an object, got {type(value).__name__}')
+        self.ops.append(('merge', path, value))
+        return self
+
+    def delete(self, path):
+        self.ops.append(('delete', path, None))
+        return self
+
+    def update(self, fn):
+        """Arbitrary edit: fn(config) mutates the parsed config in place."""
+        self.ops.append(('update', None, fn))
+        return self
+
+    def extend(self, other):
+        self.ops.extend(other.ops)
+        return self
+
+    def apply(self, config):
+        """Apply all edits to `config` in place. Returns True if it changed."""
+        before = json.dumps(config, sort_keys=True)
+        for op, path, value in self.ops:
+            if op == 'set':
+                set_path(config, path, copy.deepcopy(value))
+            elif op == 'merge':
+                current = get_path(config, path)
+                if current is None:
+                    set_path(config, path, copy.deepcopy(value))
+                elif not isinstance(current, dict):
+                    raise TypeError(f'{path}: cannot merge into {type(current).__name__}')
+                else:
+                    deep_merge(current, value)
+            elif op == 'delete':
+                delete_path(config, path)
+            elif op == 'update':
+                value(config)
+        return json.dumps(config, sort_keys=True) != before
+
+
+def write_script(path, expected_sha):
+    """Shell that atomically replaces `path` with stdin.
+
+    The temp file lives next to the target so `mv` is a rename on the same
+    filesystem; owner and mode are copied from the existing file. If the file
+    no longer matches `expected_sha` (someone else wrote it since we read it),
+    nothing is written and the script exits with CONFLICT_EXIT_CODE.
+    """
+    check = ''
+    if expected_sha:
+        check = (
+            f'if [ "$(sha256sum < "$f" | cut -d" " -f1)" != "{expected_sha}" ]; '
+            f'then rm -f "$t"; exit {CONFLICT_EXIT_CODE}; fi; '
+        )
+    return (
+        f'f={path}; t="$f.tmp.$$"; '
+        f'cat > "$t" || {{ rm -f "$t"; exit 1; }}; '
+        f'{check}'
+        f'if [ -e "$f" ]; then chown --reference="$f" "$t"; chmod --reference="$f" "$t"; fi; '
+        f'mv -f "$t" "$f"'
+    )
@@ -0,0 +1,189 @@
+"""Deploy pipeline — run independent deploy steps in parallel.
+
+warm_deploy_standby and quick_deploy_user ran every step in sequence although
+e.g. the human-browser npm/Playwright install, skill pruning, the session
+watchdog and the agent workspaces don't depend on each other. A Pipeline is a
+list of Tasks that declare which resources they read and write; the
+dependency graph is derived from that, in declaration order:
+
+  - a task waits for the last earlier task that writes a resource it reads
+    or writes (read-after-write, write-after-write)
+  - a task that writes a resource waits for the earlier tasks reading it
+    since that write (write-after-read)
+
+so tasks that share nothing run at the same time, and e.g. every openclaw.json
+edit ('config') or container restart ('container') keeps its original order.
+Ready tasks run on up to PIPELINE_CONCURRENCY worker threads, each with its
+own ServerManager.share() view of the server — separate channels (and SFTP
+session) multiplexed over the one pooled SSH transport.
+
+After the run the critical path (the chain of tasks that determined the
+total time) is logged and stored on the DeployRun.
+
+Usage:
+    pipeline = Pipeline(manager)
+    pipeline.add('recreate', lambda m: m.exec_command('docker compose up -d'), writes=['container'])
+    pipeline.add('prune', lambda m: m.prune_builtin_skills(), reads=['container'], writes=['skills'])
+    result = pipeline.run()
+"""
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable
+
+from django.conf import settings
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+# Deploy steps of one server run at once
+PIPELINE_CONCURRENCY = getattr(settings, 'PIPELINE_CONCURRENCY', 4)
+
+
+@dataclass
+class Task:
+    """A deploy step: `fn(manager)` reading and writing named resources."""
+    name: str
+    fn: Callable
+    reads: tuple = ()
+    writes: tuple = ()
+    after: tuple = ()
+    deps: set = field(default_factory=set)
+    started: float | None = None
+    finished: float | None = None
+    result: object = None
+    error: BaseException | None = None
+
+    @property
+    def duration(self):
+        if self.started is None or self.finished is None:
+            return 0.0
+        return self.finished - self.started
+
+
+@dataclass
+class PipelineResult:
+    tasks: list
+    duration: float = 0.0
+    critical_path: list = field(default_factory=list)
+
+    def __getitem__(self, name):
+        for t in self.tasks:
+            if t.name == name:
+                return t
+        raise KeyError(name)
+
+
+class Pipeline:
+    """Dependency graph of deploy tasks for one server."""
+
+    def __init__(self, manager, concurrency=PIPELINE_CONCURRENCY):
+        self.manager = manager
+        self.concurrency = max(1, concurrency)
+        self.tasks = []
+        self._last_writer = {}
+        self._readers = {}
+
+    def add(self, name, fn, reads=(), writes=(), after=()):
+        """Declare a task. Returns self so calls can be chained."""
+        if any(t.name == name for t in self.tasks):
+            raise ValueError(f'duplicate task {name!r}')
+        task = Task(name, fn, tuple(reads), tuple(writes), tuple(after))
+        known = {t.name for t in self.tasks}
+        for dep in task.after:
+            if dep not in known:
+                raise ValueError(f'{name!r} runs after unknown task {dep!r}')
+            task.deps.add(dep)
+        for resource in set(task.reads) | set(task.writes):
+            writer = self._last_writer.get(resource)
+            if writer:
+                task.deps.add(writer)
+        for resource in task.writes:
+            task.deps.update(self._readers.get(resource, ()))
+            self._last_writer[resource] = name
+            self._readers[resource] = set()
+        for resource in task.reads:
+            self._readers.setdefault(resource, set()).add(name)
+        self.tasks.append(task)
+        return self
+
+    def run(self):
+        """Run all tasks. Raises the first task error after running tasks finish;
+        tasks not yet started at that point are not started."""
+        by_name = {t.name: t for t in self.tasks}
+        pending = list(self.tasks)
+        done = set()
+        running = {}
+        failed = None
+        started = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='deploy-step') as pool:
+            while pending or running:
+                if failed is None:
+                    for task in [t for t in pending if t.deps <= done]:
+                        if len(running) >= self.concurrency:
+                            break
+                        pending.remove(task)
+                        task.started = time.monotonic()
+                        running[pool.submit(self._call, task)] = task
+                if not running:
+                    break
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task = running.pop(future)
+                    task.finished = time.monotonic()
+                    try:
+                        task.result = future.result()
+                        done.add(task.name)
+                    except Exception as e:
+                        task.error = e
+                        if failed is None:
+                            failed = task
+                            logger.warning(
+                                f'Deploy step {task.name} failed on {self.manager.server.ip_address}: {e}'
+                            )
+
+        result = PipelineResult(self.tasks, duration=time.monotonic() - started)
+        result.critical_path = self._critical_path(by_name)
+        self._report(result)
+        if failed is not None:
+            raise failed.error
+        return result
+
+    def _call(self, task):
+        manager = self.manager.share()
+        try:
+            return task.fn(manager)
+        finally:
+            manager.disconnect()
+            # Worker threads get their own DB connection — don't leak it
+            close_old_connections()
+
+    @staticmethod
+    def _critical_path(by_name):
+        """Walk back from the last task to finish through the dependency that finished last."""
+        ran = [t for t in by_name.values() if t.finished is not None]
+        if not ran:
+            return []
+        task = max(ran, key=lambda t: t.finished)
+        path = [task]
+        while True:
+            deps = [by_name[d] for d in task.deps if by_name[d].finished is not None]
+            if not deps:
+                break
+            task = max(deps, key=lambda t: t.finished)
+            path.append(task)
+        path.reverse()
+        return [(t.name, round(t.duration, 2)) for t in path]
+
+    def _report(self, result):
+        path = ' → '.join(f'{name} {duration:.1f}s' for name, duration in result.critical_path)
+        serial = sum(t.duration for t in self.tasks)
+        logger.info(
+            f'Deploy pipeline on {self.manager.server.ip_address}: {result.duration:.1f}s '
+            f'(steps sum {serial:.1f}s), critical path: {path}'
+        )
+        journal = self.manager.journal
+        if journal is not None:
+            journal.set_critical_path(result.critical_path)
@@ -0,0 +1,335 @@
+"""Provisioning state machine — bring up new servers without sleeping workers.
+
+create_standby_server_with_retry used to block a worker in
+wait_for_server_ready (up to 300 s of 15 s polls). setup_standby_server then
+started with time.sleep(90) and provision_user_service slept 30 s. With a
+small worker pool, a few pool refills could starve the payment-triggered
+assign_server_to_user.
+
+Now a server's progress is persisted in Server.provision_state:
+
+    created      — TimeWeb server ordered, waiting for it to be 'on' with an IPv4
+    booting      — IP known, waiting for sshd
+    ssh_ready    — SSH works; Docker is installed once apt is free (cloud-init)
+    docker_ready — Docker + stack files in place; warm deploy (pool) or full
+                   deploy (user server)
+    warm         — done, status 'active'
+    failed       — gave up (pool servers are deleted and replaced)
+
+The advance_provisioning task runs one step of the current state and
+reschedules itself with a countdown. A wait ("not booted yet") returns a poll
+interval, so a worker is never held while the server boots. A step that
+fails is retried PROVISION_STEP_RETRIES times, PROVISION_RETRY_DELAY apart.
+Each wait has a deadline measured from provision_state_at.
+
+Servers in 'created' are not polled one by one: sweep() (the
+sweep_provisioning beat task, every PROVISION_POLL seconds) lists all
+TimeWeb servers in one paged call and moves the ones that are up to
+'booting'. A server that came up with IPv6 only gets an IPv4 requested and
+is picked up by a later sweep; the request is repeated every
+PROVISION_IPV4_RETRY seconds. TimeWeb calls scale with sweeps, not with
+servers × polls.
+
+Servers created from a golden image (provision_data['golden_id']) leave the
+machine at ssh_ready for personalize_golden_server.
+"""
+import logging
+import socket
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from . import timeweb
+
+logger = logging.getLogger(__name__)
+
+CREATED = 'created'
+BOOTING = 'booting'
+SSH_READY = 'ssh_ready'
+DOCKER_READY = 'docker_ready'
+WARM = 'warm'
+FAILED = 'failed'
+
+# Seconds between two polls of a waiting state
+PROVISION_POLL = getattr(settings, 'PROVISION_POLL', 15)
+# Deadlines (seconds in the state) of the waiting states
+PROVISION_BOOT_TIMEOUT = getattr(settings, 'PROVISION_BOOT_TIMEOUT', 300)
+PROVISION_SSH_TIMEOUT = getattr(settings, 'PROVISION_SSH_TIMEOUT', 300)
+# apt held by cloud-init / unattended-upgrades: install anyway after this long
+PROVISION_APT_WAIT = getattr(settings, 'PROVISION_APT_WAIT', 300)
+PROVISION_STEP_RETRIES = getattr(settings, 'PROVISION_STEP_RETRIES', 3)
+PROVISION_RETRY_DELAY = getattr(settings, 'PROVISION_RETRY_DELAY', 60)
+# Seconds before asking TimeWeb for an IPv4 again
+PROVISION_IPV4_RETRY = getattr(settings, 'PROVISION_IPV4_RETRY', 120)
+
+# One step of a server at a time (a step runs at most a warm/full deploy)
+STEP_LOCK_TIMEOUT = 30 * 60
+SWEEP_LOCK_TIMEOUT = 5 * 60
+
+DOCKER_INSTALL_COMMANDS = [
+    'apt-get update -y',
+    'apt-get install -y apt-transport-https ca-certificates curl software-properties-common',
+    'curl -fsSL https://get.docker.com -o get-docker.sh && sh get-docker.sh',
+    'systemctl enable docker && systemctl start docker',
+    'curl -L https://github.com/docker/compose/releases/latest/download/docker-compose-Linux-x86_64 -o /usr/local/bin/docker-compose',
+    'chmod +x /usr/local/bin/docker-compose',
+]
+
+APT_BUSY_CMD = (
+    "pgrep -x 'apt|apt-get|dpkg|unattended-upgr' >/dev/null && echo busy; "
+    "command -v cloud-init >/dev/null && cloud-init status 2>/dev/null | grep -q running && echo busy; true"
+)
+
+
+class ProvisioningError(Exception):
+    """A step failed in a way that retrying the step can't fix."""
+
+
+def enter(server, state, **data):
+    """Move `server` to `state` (resets the step's failure count)."""
+    server.provision_state = state
+    server.provision_state_at = timezone.now()
+    server.provision_failures = 0
+    if data:
+        server.provision_data = {**(server.provision_data or {}), **data}
+    server.save(update_fields=['provision_state', 'provision_state_at', 'provision_failures', 'provision_data'])
+    logger.info(f'Server {server.pk} ({server.ip_address or "no IP"}): provisioning → {state}')
+
+
+def _in_state_for(server):
+    return (timezone.now() - (server.provision_state_at or timezone.now())).total_seconds()
+
+
+def advance(server_id):
+    """Run one step. Returns the countdown for the next step, or None when done/failed."""
+    from .models import Server
+
+    lock = f'provision-step:{server_id}'
+    if not cache.add(lock, 1, STEP_LOCK_TIMEOUT):
+        logger.info(f'Server {server_id}: provisioning step already running')
+        return None
+    try:
+        try:
+            server = Server.objects.get(pk=server_id)
+        except Server.DoesNotExist:
+            return None
+        handler = HANDLERS.get(server.provision_state)
+        if handler is None:
+            return None
+        try:
+            return handler(server)
+        except ProvisioningError as e:
+            fail(server, str(e))
+            return None
+        except Exception as e:
+            server.provision_failures += 1
+            server.last_error = str(e)[:500]
+            server.save(update_fields=['provision_failures', 'last_error'])
+            logger.error(
+                f'Server {server.pk} ({server.ip_address}): {server.provision_state} failed '
+                f'({server.provision_failures}/{PROVISION_STEP_RETRIES}): {e}'
+            )
+            if server.provision_failures >= PROVISION_STEP_RETRIES:
+                fail(server, f'{server.provision_state}: {e}')
+                return None
+            return PROVISION_RETRY_DELAY
+    finally:
+        cache.delete(lock)
+
+
+def fail(server, error):
+    """Give up on `server`. Pool servers are deleted and replaced."""
+    from .tasks import create_standby_server_with_retry, notify_error
+
+    logger.error(f'Provisioning of server {server.pk} ({server.ip_address}) failed: {error}')
+    state = server.provision_state
+    server.status = 'error'
+    server.last_error = error[:500]
+    server.save(update_fields=['status', 'last_error'])
+    enter(server, FAILED, failed_in=state)
+
+    if server.profile_id:
+        notify_error.delay(
+            'Server Setup Failed',
+            f'IP: {server.ip_address}\nUser: {server.profile.user.email}\nState: {state}\nError: {error}',
+        )
+        return
+    notify_error.delay(
+        'Server Provisioning Failed - DELETING',
+        f'Server: {server.ip_address or "no IP"}\n'
+        f'TW ID: {server.timeweb_server_id}\n'
+        f'State: {state}\n'
+        f'Error: {error}\n'
+        f'Action: Deleting server and creating a new one.'
+    )
+    if server.timeweb_server_id:
+        try:
+            timeweb.delete_server(server.timeweb_server_id)
+        except Exception:
+            pass
+    server.delete()
+    create_standby_server_with_retry.delay()
+
+
+# ─── states ─────────────────────────────────────────────────────────
+
+def _created(server):
+    """TimeWeb server ordered: normally advanced by sweep(); this checks just this server."""
+    return 0 if _observe_created(server, timeweb.get_server_info(server.timeweb_server_id)) else None
+
+
+def _observe_created(server, info):
+    """Apply TimeWeb's view of a 'created' server. True once it is 'on' with an IPv4 (→ booting)."""
+    if info and info.get('root_pass') and not server.ssh_password:
+        server.ssh_password = info['root_pass']
+        server.save(update_fields=['ssh_password'])
+
+    if info and info.get('status') == 'on':
+        ipv4, ipv6 = timeweb.server_ips(info)
+        requested_at = server.provision_data.get('ipv4_requested_at', 0)
+        if not ipv4 and ipv6 and time.time() - requested_at > PROVISION_IPV4_RETRY:
+            logger.info(f'Server {server.timeweb_server_id} only has IPv6 ({ipv6}), adding IPv4...')
+            ipv4 = timeweb.request_ipv4(server.timeweb_server_id)
+            server.provision_data = {**server.provision_data, 'ipv4_requested_at': time.time()}
+            server.save(update_fields=['provision_data'])
+        if ipv4:
+            server.ip_address = ipv4
+            server.status = 'provisioning'
+            server.save(update_fields=['ip_address', 'status'])
+            enter(server, BOOTING)
+            return True
+
+    if _in_state_for(server) > PROVISION_BOOT_TIMEOUT:
+        raise ProvisioningError(f'Server creation timeout. TW ID: {server.timeweb_server_id}')
+    return False
+
+
+def sweep():
+    """Advance every 'created' server from one TimeWeb server listing. Returns the servers now booting."""
+    from .models import Server
+
+    servers = list(Server.objects.filter(provision_state=CREATED).exclude(timeweb_server_id=''))
+    if not servers or not cache.add('provision-sweep', 1, SWEEP_LOCK_TIMEOUT):
+        return []
+    try:
+        listed = timeweb.list_servers()
+        if listed is None:
+            return []  # API error: the next sweep tries again (deadlines still apply then)
+        by_id = {str(info.get('id')): info for info in listed}
+        booting = []
+        for server in servers:
+            try:
+                if _observe_created(server, by_id.get(str(server.timeweb_server_id))):
+                    booting.append(server)
+            except ProvisioningError as e:
+                fail(server, str(e))
+            except Exception as e:
+                logger.error(f'Provisioning sweep: server {server.pk} (TW {server.timeweb_server_id}): {e}')
+        return booting
+    finally:
+        cache.delete('provision-sweep')
+
+
+def _booting(server):
+    """Wait for sshd, then log in once."""
+    from .services import ServerManager
+
+    try:
+        socket.create_connection((server.ip_address, server.ssh_port), timeout=5).close()
+        with ServerManager(server):
+            pass
+    except Exception as e:
+        if _in_state_for(server) > PROVISION_SSH_TIMEOUT:
+            raise ProvisioningError(f'SSH not reachable after {PROVISION_SSH_TIMEOUT}s: {e}')
+        logger.info(f'Server {server.ip_address}: SSH not up yet ({e})')
+        return PROVISION_POLL
+
+    golden_id = server.provision_data.get('golden_id')
+    enter(server, SSH_READY)
+    if golden_id:
+        from .tasks import personalize_golden_server
+        personalize_golden_server.delay(server.pk, golden_id)
+        return None
+    return 0
+
+
+def _ssh_ready(server):
+    """Install Docker (once apt is free) and upload the stack files."""
+    from .services import DOCKERFILE_CONTENT, ServerManager, docker_compose_content
+
+    with ServerManager(server) as manager:
+        out, _, _ = manager.exec_command(APT_BUSY_CMD)
+        if 'busy' in out and _in_state_for(server) < PROVISION_APT_WAIT:
+            logger.info(f'Server {server.ip_address}: apt busy (cloud-init), waiting')
+            return PROVISION_POLL
+
+        _, _, code = manager.exec_command('docker --version')
+        if code != 0:
+            logger.info(f'Installing Docker on {server.ip_address}...')
+            for cmd in DOCKER_INSTALL_COMMANDS:
+                out, err, code = manager.exec_command(cmd, timeout=300)
+                if code != 0 and 'docker' in cmd.lower():
+                    raise Exception(f'Critical command failed: {cmd}\nError: {err}')
+            _, err, code = manager.exec_command('docker --version')
+            if code != 0:
+                raise Exception(f'Docker not working: {err}')
+
+        manager.exec_command(f'mkdir -p {server.openclaw_path}')
+        manager.upload_many({
+            f'{server.openclaw_path}/Dockerfile': DOCKERFILE_CONTENT,
+            f'{server.openclaw_path}/docker-compose.yml': docker_compose_content(manager.image_release()['ref']),
+        })
+
+    enter(server, DOCKER_READY)
+    return 0
+
+
+def _docker_ready(server):
+    """Warm deploy a pool server, full deploy a user's server; then it is active."""
+    from .services import ServerManager
+    from .tasks import notify_admin
+
+    profile = server.profile
+    manager = ServerManager(server)
+    try:
+        if profile is not None:
+            if profile.telegram_bot_token:
+                telegram_owner_id = None
+                try:
+                    telegram_owner_id = profile.user.telegram_bot_user.telegram_id
+                except Exception:
+                    pass
+                manager.deploy_openclaw(
+                    openrouter_key=profile.openrouter_api_key,
+                    telegram_token=profile.telegram_bot_token,
+                    model_slug=profile.selected_model,
+                    telegram_owner_id=telegram_owner_id,
+                )
+        elif not manager.warm_deploy_standby():
+            # Still usable: assign_server_to_user runs a full deploy on unwarmed servers
+            logger.warning(f'Warm deploy failed on pool server {server.ip_address}, activating unwarmed')
+    finally:
+        manager.disconnect()
+
+    server.refresh_from_db()
+    server.status = 'active'
+    server.last_error = ''
+    server.save(update_fields=['status', 'last_error'])
+    enter(server, WARM)
+
+    if profile is not None:
+        notify_admin.delay(f'✅ Server ready!\nIP: {server.ip_address}\nUser: {profile.user.email}')
+    else:
+        notify_admin.delay(f'✅ Pool server ready: {server.ip_address}')
+    return None
+
+
+HANDLERS = {
+    CREATED: _created,
+    BOOTING: _booting,
+    SSH_READY: _ssh_ready,
+    DOCKER_READY: _docker_ready,
+}
+
@@ -0,0 +1,173 @@
+"""Celery queues — payment-critical work never waits behind background jobs.
+
+Every task used to go to the one default queue, so assign_server_to_user
+after a payment could sit behind cleanup_error_servers, monitor_servers,
+notify_admin and a pool refill. CELERY_TASK_ROUTES (settings) sends each
+task to one of:
+
+    deploy        — user-facing: assign a server after payment, redeploy
+    provisioning  — pool refills, golden images, provisioning steps
+    monitoring    — health checks
+    notifications — admin Telegram messages
+    billing       — renewals, deactivation, OpenRouter key resets
+
+Run one worker per queue; the worker picks up its concurrency and prefetch
+from QUEUE_WORKERS unless given on the command line (configure_worker):
+
+    celery -A config worker -Q deploy -n deploy@%h
+    celery -A config worker -Q provisioning -n provisioning@%h
+    celery -A config worker -Q monitoring,notifications,billing,celery -n background@%h
+
+A plain `celery -A config worker` (no -Q) consumes every queue in
+CELERY_TASK_QUEUES, so a host still running the old single worker keeps
+processing everything. 'celery', the default queue before the split, is in
+that list and in the background worker's, so messages published by older
+code are drained.
+
+Within a queue the Redis transport serves lower priority numbers first
+(priority_steps 0–9). Messages default to PRIORITY_DEFAULT; first-payment
+deploys are sent with PRIORITY_FIRST_PAYMENT and jump the queue.
+
+Every message carries its enqueue time; when a worker starts it, the wait
+goes into per-queue stats (wait_stats). queue_depths() asks the broker how
+many messages are waiting. Both: `manage.py queue_stats`.
+"""
+import logging
+import time
+from datetime import datetime
+
+from celery.signals import before_task_publish, task_prerun
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEPLOY = 'deploy'
+PROVISIONING = 'provisioning'
+MONITORING = 'monitoring'
+NOTIFICATIONS = 'notifications'
+BILLING = 'billing'
+QUEUES = (DEPLOY, PROVISIONING, MONITORING, NOTIFICATIONS, BILLING)
+
+PRIORITY_FIRST_PAYMENT = 0
+PRIORITY_DEFAULT = 5
+
+# Worker settings per queue: long SSH tasks get prefetch 1 so a busy worker
+# doesn't hold messages an idle one could start
+QUEUE_WORKERS = getattr(settings, 'QUEUE_WORKERS', {
+    DEPLOY: {'concurrency': 4, 'prefetch_multiplier': 1},
+    PROVISIONING: {'concurrency': 4, 'prefetch_multiplier': 1},
+    MONITORING: {'concurrency': 2, 'prefetch_multiplier': 1},
+    NOTIFICATIONS: {'concurrency': 2, 'prefetch_multiplier': 8},
+    BILLING: {'concurrency': 1, 'prefetch_multiplier': 1},
+})
+
+# Waits kept per queue for the percentiles
+WAIT_SAMPLES = 200
+WAIT_STATS_TTL = 24 * 60 * 60
+
+
+def server_lane(server):
+    """apply_async options for provisioning `server`: a user's server is a first-payment deploy."""
+    if server.profile_id:
+        return {'queue': DEPLOY, 'priority': PRIORITY_FIRST_PAYMENT}
+    return {}
+
+
+def configure_worker(conf, options):
+    """celeryd_init: apply QUEUE_WORKERS of the worker's queues (-Q) unless set on the command line.
+
+    A worker without -Q consumes all queues: it gets the lowest prefetch,
+    its concurrency stays Celery's default (not the sum of every profile).
+    """
+    queues = options.get('queues') or []
+    if isinstance(queues, str):
+        queues = queues.split(',')
+    every = not queues
+    if every:
+        queues = [q.name for q in conf.task_queues or ()] or list(QUEUES)
+    profiles = [QUEUE_WORKERS[q] for q in queues if q in QUEUE_WORKERS]
+    if not profiles:
+        return
+    if not options.get('concurrency') and not every:
+        conf.worker_concurrency = sum(p['concurrency'] for p in profiles)
+    if not options.get('prefetch_multiplier'):
+        conf.worker_prefetch_multiplier = min(p['prefetch_multiplier'] for p in profiles)
+    logger.info(
+        f'Worker for {",".join(queues)}: concurrency {conf.worker_concurrency}, '
+        f'prefetch {conf.worker_prefetch_multiplier}'
+    )
+
+
+# ─── metrics ────────────────────────────────────────────────────────
+
+@before_task_publish.connect
+def _stamp_enqueued(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault('enqueued_at', time.time())
+
+
+@task_prerun.connect
+def _record_wait(task=None, **kwargs):
+    try:
+        request = task.request
+        enqueued_at = getattr(request, 'enqueued_at', None) or (request.headers or {}).get('enqueued_at')
+        queue = (request.delivery_info or {}).get('routing_key')
+        if not enqueued_at or not queue:
+            return  # eager call or a message from an older publisher
+        ready_at = enqueued_at
+        if request.eta:
+            # Countdown/eta tasks wait on purpose until then
+            eta = request.eta if isinstance(request.eta, datetime) else datetime.fromisoformat(request.eta)
+            ready_at = max(ready_at, eta.timestamp())
+        record_wait(queue, max(time.time() - ready_at, 0.0))
+    except Exception as e:
+        logger.debug(f'Queue wait not recorded: {e}')
+
+
+def record_wait(queue, seconds):
+    key = f'queue-wait:{queue}'
+    stats = cache.get(key) or {'count': 0, 'total': 0.0, 'max': 0.0, 'recent': []}
+    stats['count'] += 1
+    stats['total'] += seconds
+    stats['max'] = max(stats['max'], seconds)
+    stats['recent'] = (stats['recent'] + [round(seconds, 3)])[-WAIT_SAMPLES:]
+    stats['updated_at'] = time.time()
+    cache.set(key, stats, WAIT_STATS_TTL)
+
+
+def wait_stats(queue):
+    """Seconds messages of `queue` waited for a worker: count, avg, max, p50/p95 of the recent ones."""
+    stats = cache.get(f'queue-wait:{queue}')
+    if not stats or not stats['count']:
+        return {'count': 0}
+    recent = sorted(stats['recent'])
+    return {
+        'count': stats['count'],
+        'avg': stats['total'] / stats['count'],
+        'max': stats['max'],
+        'p50': recent[len(recent) // 2],
+        'p95': recent[min(len(recent) - 1, int(len(recent) * 0.95))],
+        'updated_at': stats.get('updated_at'),
+    }
+
+
+def queue_depths(queues=QUEUES):
+    """Messages waiting in each queue (all priorities), None where the broker can't tell."""
+    from config.celery import app
+
+    depths = {}
+    with app.connection_for_read() as conn:
+        channel = conn.default_channel
+        for queue in queues:
+            try:
+                if hasattr(channel, '_size'):
+                    # Virtual transports (Redis): an empty queue has no key, which
+                    # a passive declare reports as missing
+                    depths[queue] = channel._size(queue)
+                else:
+                    depths[queue] = channel.queue_declare(queue, passive=True).message_count
+            except Exception as e:
+                logger.warning(f'Queue depth of {queue}: {e}')
+                depths[queue] = None
+    return depths
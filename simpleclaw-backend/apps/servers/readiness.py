@@ -0,0 +1,129 @@
+"""Readiness probes — wait for a service to be up instead of sleeping.
+
+Deploys used to hard-sleep after `docker compose up` / `restart` (8-12 s) and
+before checking Telegram or SearXNG, whether the service needed that long or
+not. A Probe is a shell command on the VPS host that exits 0 once some part of
+the stack is ready. wait_until() runs all probes of a wait in one RemoteBatch
+per poll and polls with short exponential backoff until every probe passes in
+the same poll or the deadline expires.
+
+Usage:
+    result = manager.wait_ready(readiness.GATEWAY_READY, timeout=60)
+    if not result.ok:
+        logger.warning(f'not ready: {result.pending}')
+"""
+import logging
+import shlex
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Default deadline for a single wait (seconds)
+READINESS_TIMEOUT = getattr(settings, 'READINESS_TIMEOUT', 90)
+# Backoff between polls: first delay, growth factor, cap
+READINESS_INITIAL_DELAY = 0.5
+READINESS_BACKOFF = 1.6
+READINESS_MAX_DELAY = 4
+
+# Per-probe command timeout inside a poll
+PROBE_TIMEOUT = 10
+
+GATEWAY_PORT = 18789
+
+
+@dataclass(frozen=True)
+class Probe:
+    """A readiness check: shell command on the host, ready when it exits 0."""
+    name: str
+    cmd: str
+
+
+def container_running(container='openclaw'):
+    return Probe(
+        f'{container}:running',
+        f'[ "$(docker inspect -f {{{{.State.Running}}}} {container} 2>/dev/null)" = true ]',
+    )
+
+
+def port_open(port, host='127.0.0.1'):
+    """TCP port accepts connections (bash /dev/tcp — no nc/curl needed on the host)."""
+    return Probe(f'port:{port}', f'exec 3<>/dev/tcp/{host}/{port}')
+
+
+def cli_responsive(container='openclaw'):
+    return Probe(
+        f'{container}:cli',
+        f'docker exec {container} node /app/openclaw.mjs --version >/dev/null 2>&1',
+    )
+
+
+def log_line(pattern, container='openclaw'):
+    """`pattern` (grep -E) appeared in logs since the container last started."""
+    return Probe(
+        f'{container}:log:{pattern}',
+        f'docker logs {container} --since "$(docker inspect -f {{{{.State.StartedAt}}}} {container})" 2>&1 '
+        f'| grep -qE {shlex.quote(pattern)}',
+    )
+
+
+def http_ok(url, via='openclaw'):
+    """HTTP 2xx from `url`, requested from inside the `via` container (compose network)."""
+    return Probe(f'http:{url}', f'docker exec {via} curl -sf -o /dev/null --max-time 5 {shlex.quote(url)}')
+
+
+# Container is up and the CLI answers — safe to run `docker exec … openclaw.mjs`
+CONTAINER_READY = (container_running(), cli_responsive())
+# Gateway process is serving on its port
+GATEWAY_READY = (container_running(), port_open(GATEWAY_PORT))
+# Telegram provider started after the last (re)start
+TELEGRAM_READY = (container_running(), log_line(r'\[telegram\].*starting provider'))
+# SearXNG adapter and Lightpanda CDP adapter answer on the compose network
+ADAPTERS_READY = (
+    http_ok('http://searxng-adapter:3000/res/v1/web/search?q=test&count=1'),
+    http_ok('http://lightpanda-adapter:9223/health'),
+)
+
+
+@dataclass
+class ReadinessResult:
+    ok: bool
+    elapsed: float = 0.0
+    polls: int = 0
+    pending: list = field(default_factory=list)
+
+
+def wait_until(manager, probes, timeout=READINESS_TIMEOUT, initial_delay=READINESS_INITIAL_DELAY,
+               max_delay=READINESS_MAX_DELAY):
+    """Poll `probes` until all pass in the same poll or `timeout` expires."""
+    started = time.monotonic()
+    deadline = started + timeout
+    delay = initial_delay
+    polls = 0
+    pending = [p.name for p in probes]
+
+    while True:
+        polls += 1
+        batch = manager.batch()
+        for probe in probes:
+            batch.add(probe.cmd, name=probe.name, timeout=PROBE_TIMEOUT)
+        try:
+            result = batch.run()
+            pending = [s.name for s in result.steps if not s.ok]
+        except Exception as e:
+            if getattr(manager, 'cancelled', False):
+                raise
+            # Transport hiccup while services restart — treat as not ready yet
+            logger.debug(f'Readiness poll failed on {manager.server.ip_address}: {e}')
+        if not pending:
+            return ReadinessResult(ok=True, elapsed=time.monotonic() - started, polls=polls)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return ReadinessResult(
+                ok=False, elapsed=time.monotonic() - started, polls=polls, pending=pending,
+            )
+        time.sleep(min(delay, remaining))
+        delay = min(delay * READINESS_BACKOFF, max_delay)
@@ -0,0 +1,172 @@
+"""Deploy reconciler — skip deploy steps whose inputs haven't changed.
+
+quick_deploy_user and deploy_openclaw used to re-upload the static stack files
+and rerun install_human_browser (npm install + `playwright install`), the
+session watchdog, the control agent and install_agents on every run, even
+when nothing changed since warm_deploy_standby. A Reconciler records a
+sha256 of each step's inputs once the step succeeds, both in
+Server.deploy_state and in a manifest file on the VPS, and skips a step when
+both records match the desired digest.
+
+Requiring both records keeps the check honest: a VPS that was reinstalled
+has no manifest, and a manifest that came along with a disk image of another
+server doesn't match this server's DB record.
+
+Steps are scoped by where their result lives:
+  host   — files on the VPS filesystem (survive container recreates)
+  volume — data in the openclaw_config volume; the volume's creation time is
+           part of the digest, so dropping the volume reruns the step
+  container — changes to the openclaw container's own filesystem (e.g.
+           /app/skills); the container and image IDs are part of the digest,
+           so a recreated container or a new image reruns the step
+
+A step's digest is saved as soon as the step succeeds, so a deploy that
+fails half-way still skips the finished steps when it is retried.
+
+Usage:
+    rec = Reconciler(manager)
+    rec.step('human-browser', (bundle.sha256, DOCKERFILE_CONTENT), manager.install_human_browser)
+"""
+import hashlib
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+from .openclaw_config import write_script
+
+logger = logging.getLogger(__name__)
+
+# False = run every step unconditionally (still records digests)
+DEPLOY_RECONCILE = getattr(settings, 'DEPLOY_RECONCILE', True)
+
+MANIFEST_NAME = '.deploy-manifest.json'
+MANIFEST_VERSION = 1
+
+HOST = 'host'
+VOLUME = 'volume'
+CONTAINER = 'container'
+
+CONFIG_VOLUME = 'openclaw_config'
+CONTAINER_NAME = 'openclaw'
+
+
+def digest(*parts):
+    """sha256 over the step inputs (str, bytes, or JSON-serializable values)."""
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, bytes):
+            data = part
+        elif isinstance(part, str):
+            data = part.encode('utf-8')
+        else:
+            data = json.dumps(part, sort_keys=True, default=str).encode('utf-8')
+        h.update(hashlib.sha256(data).digest())
+    return h.hexdigest()
+
+
+# Server.deploy_state is written from parallel pipeline threads (a step
+# record, ServerManager.ensure_image's image pin) on the same Server object
+_state_lock = threading.Lock()
+
+
+def save_state(server, name, entry):
+    """Set deploy_state[name] of `server` and save it."""
+    with _state_lock:
+        server.deploy_state = {**(server.deploy_state or {}), name: entry}
+        server.save(update_fields=['deploy_state'])
+
+
+def container_identity(manager):
+    """'<container id> <image id>' of the openclaw container, '' if there is none."""
+    out, _, code = manager.exec_command(
+        f"docker inspect -f '{{{{.Id}}}} {{{{.Image}}}}' {CONTAINER_NAME} 2>/dev/null"
+    )
+    return out.strip() if code == 0 else ''
+
+
+class Reconciler:
+    """Run deploy steps against the digests recorded for one server."""
+
+    def __init__(self, manager, force=False):
+        self.manager = manager
+        self.server = manager.server
+        self.force = force or not DEPLOY_RECONCILE
+        self.manifest_path = f'{self.server.openclaw_path}/{MANIFEST_NAME}'
+        self._remote = None
+        # Steps may run in parallel pipeline threads (pipeline.py)
+        self._lock = threading.RLock()
+        self.ran = []
+        self.skipped = []
+
+    def _load_remote(self):
+        with self._lock:
+            if self._remote is None:
+                out, _, code = self.manager.exec_command(f'cat {self.manifest_path} 2>/dev/null')
+                try:
+                    data = json.loads(out) if code == 0 and out.strip() else {}
+                except json.JSONDecodeError:
+                    data = {}
+                if data.get('version') != MANIFEST_VERSION:
+                    data = {}
+                self._remote = data.get('steps', {})
+            return self._remote
+
+    def _scope_identity(self, scope):
+        if scope == VOLUME:
+            out, _, code = self.manager.exec_command(
+                f'docker volume inspect -f {{{{.CreatedAt}}}} {CONFIG_VOLUME} 2>/dev/null'
+            )
+            return out.strip() if code == 0 else ''
+        if scope == CONTAINER:
+            return container_identity(self.manager)
+        return ''
+
+    def recorded(self, name):
+        """Digest this server has for `name` in both the DB and the manifest, or None."""
+        db = (self.server.deploy_state or {}).get(name, {}).get('digest')
+        remote = self._load_remote().get(name, {}).get('digest')
+        return db if db and db == remote else None
+
+    def current(self, name, inputs, scope=HOST):
+        """True if `name` is recorded with these inputs, i.e. step() would skip it."""
+        return not self.force and self.recorded(name) == digest(scope, self._scope_identity(scope), *inputs)
+
+    def step(self, name, inputs, fn, scope=HOST):
+        """Run `fn()` unless `inputs` produced the same digest last time.
+
+        Returns True if the step ran. The digest is recorded only if `fn`
+        neither raises nor returns False, so a failed step runs again.
+        """
+        wanted = digest(scope, self._scope_identity(scope), *inputs)
+        if not self.force and self.recorded(name) == wanted:
+            logger.info(f'Deploy step {name} unchanged on {self.server.ip_address}, skipping')
+            self.skipped.append(name)
+            if self.manager.journal is not None:
+                self.manager.journal.skipped(name)
+            return False
+        if self.manager.run_step(name, fn) is False:
+            logger.info(f'Deploy step {name} failed on {self.server.ip_address}, not recorded')
+            return True
+        self.ran.append(name)
+        self.record(name, wanted)
+        return True
+
+    def record(self, name, wanted):
+        """Store the digest of a finished step in the VPS manifest and Server.deploy_state."""
+        entry = {'digest': wanted, 'applied_at': datetime.now(timezone.utc).isoformat()}
+        with self._lock:
+            steps = {**self._load_remote(), name: entry}
+            manifest = json.dumps({'version': MANIFEST_VERSION, 'steps': steps}, indent=2)
+            out, err, code = self.manager.exec_stdin(
+                f'mkdir -p {self.server.openclaw_path} && {write_script(self.manifest_path, None)}', manifest,
+            )
+            if code != 0:
+                # DB and manifest now disagree, so the step simply runs again next time
+                logger.warning(f'Deploy manifest write failed on {self.server.ip_address}: {(err or out)[:200]}')
+            else:
+                self._remote = steps
+
+            save_state(self.server, name, entry)
@@ -0,0 +1,192 @@
+"""Remote batch — run a sequence of shell commands in one SSH round trip.
+
+Deploy methods used to call ServerManager.exec_command dozens of times in a
+row, paying one channel open + exit-status wait per command. A RemoteBatch
+collects the commands, compiles them into a single bash script that is fed
+to `bash -s` on one channel, and parses per-step results back as each step
+finishes.
+
+Usage:
+    batch = manager.batch()
+    batch.add('docker compose down', name='down')
+    batch.add('docker compose up -d', name='up', on_error='abort', timeout=300)
+    result = batch.run()
+    if not result.ok:
+        logger.warning(result.failures)
+"""
+import base64
+import logging
+import time
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+# Failure policies for a step:
+#   continue — record the failure and run the next step (default)
+#   abort    — record the failure and skip all remaining steps
+#   ignore   — run the next step and don't count the failure in result.ok
+ON_ERROR_POLICIES = ('continue', 'abort', 'ignore')
+
+# Default per-step timeout (seconds), same as ServerManager.exec_command
+DEFAULT_STEP_TIMEOUT = 60
+
+_STEP_MARK = '__RB_STEP__'
+
+_SCRIPT_HEADER = r'''set +e
+__rb_tmp=$(mktemp -d)
+trap 'rm -rf "$__rb_tmp"' EXIT
+__rb_step() {
+  __rb_start=$(date +%s%3N)
+  if [ "$3" -gt 0 ] && command -v timeout >/dev/null 2>&1; then
+    timeout "$3" bash -c "$(printf %s "$4" | base64 -d)" >"$__rb_tmp/o" 2>"$__rb_tmp/e" </dev/null
+  else
+    bash -c "$(printf %s "$4" | base64 -d)" >"$__rb_tmp/o" 2>"$__rb_tmp/e" </dev/null
+  fi
+  __rb_code=$?
+  __rb_end=$(date +%s%3N)
+  printf '__RB_STEP__ %s %s %s %s %s\n' "$1" "$__rb_code" "$((__rb_end - __rb_start))" \
+    "$(base64 -w0 <"$__rb_tmp/o")" "$(base64 -w0 <"$__rb_tmp/e")"
+  if [ "$__rb_code" -ne 0 ] && [ "$2" = abort ]; then
+    exit "$__rb_code"
+  fi
+}
+'''
+
+
+@dataclass
+class StepResult:
+    """Outcome of one batch step."""
+    index: int
+    name: str
+    cmd: str
+    on_error: str = 'continue'
+    timeout: int = DEFAULT_STEP_TIMEOUT
+    exit_code: int | None = None
+    stdout: str = ''
+    stderr: str = ''
+    duration: float = 0.0
+    skipped: bool = False
+
+    @property
+    def ok(self):
+        return self.exit_code == 0
+
+    def as_tuple(self):
+        """(out, err, exit_code) — same shape as ServerManager.exec_command."""
+        return self.stdout, self.stderr, self.exit_code
+
+
+@dataclass
+class BatchResult:
+    """All step results of a batch run, in order."""
+    steps: list = field(default_factory=list)
+    duration: float = 0.0
+
+    @property
+    def ok(self):
+        return all(s.ok or s.on_error == 'ignore' for s in self.steps)
+
+    @property
+    def failures(self):
+        return [
+            f'{s.name}: exit={s.exit_code} {(s.stderr or s.stdout).strip()[:200]}'
+            for s in self.steps
+            if not s.skipped and not s.ok and s.on_error != 'ignore'
+        ]
+
+    def __getitem__(self, name):
+        for s in self.steps:
+            if s.name == name:
+                return s
+        raise KeyError(name)
+
+
+class RemoteBatch:
+    """Collects commands and runs them as one generated script on one channel."""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.steps = []
+
+    def __len__(self):
+        return len(self.steps)
+
+    def add(self, cmd, name=None, on_error='continue', timeout=DEFAULT_STEP_TIMEOUT):
+        """Append a command. Returns self so calls can be chained."""
+        if on_error not in ON_ERROR_POLICIES:
+            raise ValueError(f'on_error must be one of {ON_ERROR_POLICIES}, got {on_error!r}')
+        index = len(self.steps)
+        self.steps.append(StepResult(
+            index=index, name=name or f'step{index}', cmd=cmd, on_error=on_error,
+            timeout=int(timeout or 0),
+        ))
+        return self
+
+    def script(self):
+        """Compile the collected steps into a bash script."""
+        lines = [_SCRIPT_HEADER]
+        for step in self.steps:
+            b64 = base64.b64encode(step.cmd.encode('utf-8')).decode('ascii')
+            lines.append(f'__rb_step {step.index} {step.on_error} {step.timeout} {b64}')
+        return '\n'.join(lines) + '\n'
+
+    def run(self, on_step=None):
+        """Execute all steps in one round trip.
+
+        on_step(StepResult) is called as each step's result arrives, so long
+        batches can report progress before the whole script finishes.
+        """
+        result = BatchResult(steps=self.steps)
+        if not self.steps:
+            return result
+
+        # Channel read timeout must outlast the slowest single step
+        read_timeout = max(s.timeout or DEFAULT_STEP_TIMEOUT for s in self.steps) + 30
+        script = self.script()
+
+        started = time.monotonic()
+        stdin, stdout, stderr = self.manager._open_channel('bash -s', timeout=read_timeout)
+        stdin.write(script)
+        stdin.flush()
+        stdin.channel.shutdown_write()
+
+        seen = set()
+        for raw in stdout:
+            line = raw.rstrip('\n')
+            if not line.startswith(_STEP_MARK + ' '):
+                continue
+            parts = line.split(' ')
+            if len(parts) != 6:
+                logger.warning(f'Malformed batch record on {self.manager.server.ip_address}: {line[:120]}')
+                continue
+            step = self.steps[int(parts[1])]
+            step.exit_code = int(parts[2])
+            step.duration = int(parts[3]) / 1000
+            step.stdout = base64.b64decode(parts[4]).decode('utf-8', errors='replace')
+            step.stderr = base64.b64decode(parts[5]).decode('utf-8', errors='replace')
+            seen.add(step.index)
+            if on_step:
+                on_step(step)
+
+        shell_err = stderr.read().decode('utf-8', errors='replace')
+        stdout.channel.recv_exit_status()
+        result.duration = time.monotonic() - started
+
+        for step in self.steps:
+            if step.index not in seen:
+                step.skipped = True
+            else:
+                self.manager.state.saw_command(step.cmd)
+        self.manager._track(
+            commands=len(seen),
+            sent=len(script),
+            received=sum(len(s.stdout) + len(s.stderr) for s in self.steps),
+            exit_code=next((s.exit_code for s in self.steps if not s.ok and s.on_error != 'ignore'), 0),
+        )
+        if shell_err.strip():
+            logger.warning(f'Batch shell stderr on {self.manager.server.ip_address}: {shell_err[:300]}')
+        logger.info(
+            f'Batch of {len(self.steps)} step(s) on {self.manager.server.ip_address} '
+            f'finished in {result.duration:.1f}s ({len(seen)} ran)'
+        )
+        return result
@@ -0,0 +1,141 @@
+"""Remote state cache — short-lived answers to "what does the server look like".
+
+Deploy, verify and management code asked the same things of a server
+seconds apart: the openclaw container's state, openclaw.json (read, patched,
+read again for the next patch), the list of /app/skills. Each answer cost an
+SSH round trip and, for `docker exec`, a process spawn in the container.
+
+RemoteState (ServerManager.state) keeps each answer for REMOTE_STATE_TTL
+seconds, per server and per process, so every ServerManager of the server
+in this worker (also share() children in pipeline threads) sees the same
+entries:
+
+    manager.state.container_status('openclaw')   # 'running', 'exited', … or ''
+    manager.state.config()                       # (openclaw.json, sha)
+    manager.state.config_get('browser.headless')
+    manager.state.skills()                       # names in /app/skills
+
+Entries are dropped before their TTL whenever this process changes the
+server. ServerManager passes every command it runs to saw_command(), which
+invalidates the entries a command may affect (MUTATIONS), and the methods
+that change state through the control agent invalidate explicitly. The TTL
+bounds staleness from changes made elsewhere (the gateway itself, another
+worker, an agent moving skills around).
+"""
+import copy
+import re
+import threading
+import time
+
+from django.conf import settings
+
+from .openclaw_config import get_path
+
+# Seconds a cached answer stays valid
+REMOTE_STATE_TTL = getattr(settings, 'REMOTE_STATE_TTL', 10)
+
+CONTAINER = 'container'
+CONFIG = 'config'
+SKILLS = 'skills'
+
+# Commands that may change cached state → the entries they invalidate.
+# Container lifecycle changes everything.
+MUTATIONS = (
+    (re.compile(r'docker\s+(compose|restart|stop|start|kill|rm|run|create|volume\s+rm)\b|systemctl\s+restart'),
+     (CONTAINER, CONFIG, SKILLS)),
+    (re.compile(r'openclaw\.json|\.openclaw|openclaw_config|openclaw\.mjs\s+(config|doctor|models|browser)'),
+     (CONFIG,)),
+    (re.compile(r'/app/skills|docker\s+cp\b'), (SKILLS,)),
+)
+
+_states = {}
+_lock = threading.RLock()
+
+
+def _entries(server):
+    with _lock:
+        return _states.setdefault(server.pk, {})
+
+
+def forget(server):
+    """Drop everything cached for `server` (e.g. the VPS was rebuilt)."""
+    with _lock:
+        _states.pop(server.pk, None)
+
+
+class RemoteState:
+    """Cached remote facts of the manager's server."""
+
+    def __init__(self, manager, ttl=None):
+        self.manager = manager
+        self.ttl = REMOTE_STATE_TTL if ttl is None else ttl
+        self._entries = _entries(manager.server)
+        # The fetches' own commands must not invalidate what they fetch
+        self._fetching = threading.local()
+
+    def _get(self, key, fetch):
+        with _lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+        self._fetching.active = True
+        try:
+            value = fetch()
+        finally:
+            self._fetching.active = False
+        self.put(key, value)
+        return value
+
+    def put(self, key, value):
+        """Store an answer learned some other way (e.g. the content just written)."""
+        if self.ttl <= 0:
+            return
+        with _lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, *kinds):
+        """Drop the entries of the given kinds (CONTAINER, CONFIG, SKILLS); all if none given."""
+        with _lock:
+            for key in list(self._entries):
+                kind = key[0] if isinstance(key, tuple) else key
+                if not kinds or kind in kinds:
+                    del self._entries[key]
+
+    def saw_command(self, cmd):
+        """Invalidate what a command run on the server may have changed."""
+        if getattr(self._fetching, 'active', False):
+            return
+        kinds = set()
+        for pattern, affected in MUTATIONS:
+            if pattern.search(cmd):
+                kinds.update(affected)
+        if kinds:
+            self.invalidate(*kinds)
+
+    # ─── cached facts ───────────────────────────────────────────────
+
+    def container_status(self, name='openclaw'):
+        """`docker inspect` State.Status of a container, '' if it doesn't exist."""
+        def fetch():
+            out, _, code = self.manager.exec_command(
+                f"docker inspect -f '{{{{.State.Status}}}}' {name} 2>/dev/null"
+            )
+            return out.strip() if code == 0 else ''
+        return self._get((CONTAINER, name), fetch)
+
+    def config(self):
+        """(openclaw.json, sha) as read_openclaw_config returns it; the dict is a private copy."""
+        config, sha = self._get(CONFIG, self.manager._read_openclaw_config)
+        return copy.deepcopy(config), sha
+
+    def config_get(self, path, default=None):
+        """Value at a dotted path of openclaw.json."""
+        config, _ = self._get(CONFIG, self.manager._read_openclaw_config)
+        return copy.deepcopy(get_path(config, path, default))
+
+    def skills(self):
+        """Skill directories in the container's /app/skills."""
+        def fetch():
+            out, _, code = self.manager.exec_command('docker exec openclaw ls -1 /app/skills 2>/dev/null')
+            return tuple(s.strip() for s in out.splitlines() if s.strip()) if code == 0 else ()
+        return list(self._get(SKILLS, fetch))
@@ -1,10 +1,32 @@
 """ServerManager — управление OpenClaw на серверах через SSH (paramiko)"""
+import copy
+import hashlib
+import hmac
 import json
 import logging
 import paramiko
 import io
+import shlex
+import threading
+import time
+from contextlib import nullcontext
 import requests as http_requests
 from django.conf import settings
+from django.utils import timezone
+
+from . import artifacts, bundles, control_agent, images, readiness, verification
+from . import remote_state
+from .control_agent import ControlAgentClient, ControlAgentError, ControlAgentUnavailable
+from .exec_stream import EXEC_MAX_OUTPUT, EXEC_TAIL_BYTES, pump
+from .journal import journaled
+from .pipeline import Pipeline
+from .reconcile import CONTAINER, VOLUME, Reconciler, save_state
+from .openclaw_config import (
+    CONFLICT_EXIT_CODE, OPENCLAW_CONFIG_PATH, ConfigPatch, config_sha, write_script,
+)
+from .remote_batch import RemoteBatch
+from .remote_state import RemoteState
+from .verification import Check
 
 
 # Dockerfile для сборки образа OpenClaw с Chrome headless
@@ -33,11 +55,14 @@ RUN sed -i 's|https://api.search.brave.com/res/v1/web/search|http://searxng-adap
 USER root
 """
 
+
 # docker-compose: OpenClaw + SearXNG + Lightpanda + Valkey
-DOCKER_COMPOSE_WITH_CHROME = """services:
+# {openclaw_image} is the server's pinned image (ServerManager.image_release());
+# `build: .` is only the fallback for a server that couldn't get it
+DOCKER_COMPOSE_TEMPLATE = """services:
   openclaw:
     build: .
-    image: openclaw-chrome:latest
+    image: {openclaw_image}
     container_name: openclaw
     restart: unless-stopped
     shm_size: 2g
@@ -75,7 +100,7 @@ DOCKER_COMPOSE_WITH_CHROME = """services:
     mem_limit: 512m
 
   searxng-adapter:
-    image: openclaw-chrome:latest
+    image: {openclaw_image}
     container_name: searxng-adapter
     restart: unless-stopped
     user: node
@@ -87,7 +112,7 @@ DOCKER_COMPOSE_WITH_CHROME = """services:
       - openclaw
 
   lightpanda-adapter:
-    image: openclaw-chrome:latest
+    image: {openclaw_image}
     container_name: lightpanda-adapter
     restart: unless-stopped
     user: "0"
@@ -115,6 +140,11 @@ volumes:
     name: openclaw_config
 """
 
+
+def docker_compose_content(image):
+    return DOCKER_COMPOSE_TEMPLATE.format(openclaw_image=image)
+
+
 # SearXNG settings.yml — minimal private instance with JSON API enabled
 SEARXNG_SETTINGS_YML = """\
 use_default_settings: true
@@ -465,83 +495,495 @@ http.createServer(async (req, res) => {
 
 logger = logging.getLogger(__name__)
 
+
+def _as_fileobj(content):
+    """Wrap str/bytes upload content in a binary file object."""
+    if isinstance(content, str):
+        return io.BytesIO(content.encode('utf-8'))
+    if isinstance(content, (bytes, bytearray)):
+        return io.BytesIO(content)
+    return content
+
+
 # How many times to retry applying config if verification fails
 CONFIG_MAX_RETRIES = 5
 # Seconds to wait between retries (increases: 5, 10, 15, 20, 25)
 CONFIG_RETRY_BASE_DELAY = 5
 
+# quick_deploy_user on a warm standby server: stage the user's config into the
+# running stack and restart only openclaw instead of recreating the stack
+QUICK_DEPLOY_HOT_RELOAD = getattr(settings, 'QUICK_DEPLOY_HOT_RELOAD', True)
+
+
+class OperationCancelled(RuntimeError):
+    """ServerManager.cancel() was called: no more remote work on this manager."""
+
 
 class ServerManager:
-    """Подключение к серверу по SSH и управление OpenClaw"""
+    """Подключение к серверу по SSH и управление OpenClaw.
+
+    SSH transports are borrowed from the process-wide pool in ssh_pool.py:
+    connect() takes one, disconnect() hands it back for the next caller.
+
+    During a deploy, `journal` is the DeployJournal of the run (journal.py)
+    and the remote calls below report their command/byte counts to it.
+    """
 
     def __init__(self, server):
         self.server = server
         self.client = None
+        self._conn = None
+        self._agent = None
+        self._state = None
+        self.journal = None
+        # share(): connection owned by another manager, private SFTP session
+        self._shared = False
+        self._sftp = None
+        # cancel(): set from another thread, shared with share() children
+        self._cancelled = threading.Event()
+        # image_release() of this deploy, shared with share() children
+        self._image = {}
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.disconnect()
+
+    def __del__(self):
+        try:
+            self.disconnect()
+        except Exception:
+            pass
 
     def connect(self):
-        """Установить SSH-соединение"""
-        self.client = paramiko.SSHClient()
-        self.client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        self.client.connect(
-            hostname=self.server.ip_address,
-            port=self.server.ssh_port,
-            username=self.server.ssh_user,
-            password=self.server.ssh_password or None,
-            timeout=30,
-        )
-        logger.info(f'SSH подключение к {self.server.ip_address} установлено')
+        """Взять SSH-соединение из пула (или установить новое)"""
+        if self._cancelled.is_set():
+            raise OperationCancelled(f'Remote work on {self.server.ip_address} was cancelled')
+        if self._conn is not None:
+            if self._conn.is_alive():
+                return
+            self.disconnect(discard=True)
+        from .ssh_pool import get_pool
+        self._conn = get_pool().acquire(self.server)
+        self.client = self._conn.client
+
+    def disconnect(self, discard=False):
+        """Вернуть соединение в пул. discard=True закрывает его."""
+        conn, self._conn = self._conn, None
+        self.client = None
+        if self._sftp is not None:
+            try:
+                self._sftp.close()
+            except Exception:
+                pass
+            self._sftp = None
+        if self._shared:
+            # The owner returns the connection; after a reconnect this
+            # manager holds a connection of its own
+            self._shared = False
+            return
+        if conn is not None:
+            from .ssh_pool import get_pool
+            get_pool().release(conn, discard=discard)
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
 
-    def disconnect(self):
-        if self.client:
-            self.client.close()
-            self.client = None
+    def cancel(self):
+        """Abort this manager's remote work from another thread.
+
+        Closes the SSH transport, so a command or upload in progress fails,
+        and makes connect() raise OperationCancelled instead of reconnecting.
+        The thread running the work still owns the connection and gives it
+        back with disconnect(discard=True).
+        """
+        self._cancelled.set()
+        conn = self._conn
+        if conn is not None and conn.transport is not None:
+            conn.transport.close()
+
+    def share(self):
+        """Another manager on the same SSH transport, for steps run in parallel threads.
+
+        Commands open their own channels on the shared transport and file
+        uploads use a private SFTP session. The child's disconnect() leaves
+        the connection to this manager; the deploy journal is shared.
+        """
+        if not self.client:
+            self.connect()
+        other = ServerManager(self.server)
+        other._conn, other.client, other._shared = self._conn, self.client, True
+        other.journal = self.journal
+        other._cancelled = self._cancelled
+        other._image = self._image
+        return other
+
+    def _open_channel(self, cmd, timeout):
+        """Start `cmd` on a new session channel, reconnecting once if the
+        pooled transport turned out to be dead."""
+        if not self.client:
+            self.connect()
+        try:
+            return self.client.exec_command(cmd, timeout=timeout)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            logger.info(f'SSH channel open failed on {self.server.ip_address} ({e}), reconnecting')
+            self._track(retries=1)
+            self.disconnect(discard=True)
+            self.connect()
+            return self.client.exec_command(cmd, timeout=timeout)
+
+    @property
+    def state(self):
+        """Short-TTL cache of container status, openclaw.json and skills (remote_state.py)."""
+        if self._state is None:
+            self._state = RemoteState(self)
+        return self._state
+
+    # ─── deploy journal ─────────────────────────────────────────────
+
+    def _track(self, **counters):
+        """Report remote I/O to the current journal step (no-op outside deploys)."""
+        if self.journal is not None:
+            self.journal.track(**counters)
+
+    def journal_step(self, name):
+        """Context manager timing a deploy step in the journal."""
+        if self.journal is None:
+            return nullcontext()
+        return self.journal.step(name)
+
+    def run_step(self, name, fn, *args, **kwargs):
+        """Call fn as a journaled deploy step; returns its result."""
+        if self.journal is None:
+            return fn(*args, **kwargs)
+        return self.journal.run_step(name, fn, *args, **kwargs)
 
     def exec_command(self, cmd, timeout=60):
-        """Выполнить команду на сервере"""
+        """Выполнить команду на сервере
+
+        stdout and stderr are read together (exec_stream), the full output is
+        returned. Raises TimeoutError if it goes `timeout` seconds without output.
+        """
+        result = self.exec_stream(cmd, timeout=timeout, tail_bytes=None, progress=False)
+        if result.timed_out:
+            raise TimeoutError(f'{cmd[:80]!r} timed out after {timeout}s on {self.server.ip_address}')
+        return result.as_tuple()
+
+    def exec_stream(self, cmd, timeout=60, stdin=None, on_line=None, tail_bytes=EXEC_TAIL_BYTES,
+                    max_output=EXEC_MAX_OUTPUT, chunk_size=32768, progress=True):
+        """Run `cmd` reading stdout/stderr as they arrive (exec_stream.py).
+
+        Keeps the last `tail_bytes` of each stream and cuts the command off
+        after `max_output` bytes. Output lines go to `on_line(stream, line)`
+        and, during a deploy with `progress`, to the journal's progress.
+        Returns a StreamResult; exit_code is None on timeout or cut-off.
+        """
+        callbacks = [on_line] if on_line else []
+        if progress and self.journal is not None:
+            callbacks.append(self.journal.progress)
+
+        def fan_out(stream, line):
+            for callback in callbacks:
+                callback(stream, line)
+
+        # Keep the file objects referenced: closing the stdin file (e.g. on
+        # garbage collection) sends EOF to the command
+        stdin_file, stdout, stderr = self._open_channel(cmd, timeout)
+        result = pump(
+            stdout.channel, timeout, stdin=_as_fileobj(stdin) if stdin is not None else None,
+            on_line=fan_out if callbacks else None, tail_bytes=tail_bytes, max_output=max_output,
+            chunk_size=chunk_size,
+        )
+        self._track(
+            commands=1, sent=len(cmd) + result.bytes_sent, received=result.bytes_out + result.bytes_err,
+            exit_code=result.exit_code,
+        )
+        self.state.saw_command(cmd)
+        if result.capped:
+            logger.warning(
+                f'{cmd[:80]!r} on {self.server.ip_address} cut off after {result.bytes_out + result.bytes_err} '
+                f'bytes of output'
+            )
+        return result
+
+    def exec_parallel(self, cmds, timeout=60):
+        """Run {name: cmd} concurrently, one channel each on the shared transport.
+
+        Returns {name: (out, err, exit_code, duration)}; a command still
+        running at the deadline gets exit_code None.
+        """
         if not self.client:
             self.connect()
-        stdin, stdout, stderr = self.client.exec_command(cmd, timeout=timeout)
-        out = stdout.read().decode('utf-8', errors='replace')
-        err = stderr.read().decode('utf-8', errors='replace')
-        exit_code = stdout.channel.recv_exit_status()
-        return out, err, exit_code
-
-    def upload_file(self, content, remote_path):
-        """Загрузить содержимое как файл на сервер"""
+        started = time.monotonic()
+        pending = {}
+        for name, cmd in cmds.items():
+            try:
+                chan = self.client.get_transport().open_session(timeout=15)
+            except (paramiko.SSHException, EOFError, OSError, AttributeError) as e:
+                if pending:
+                    raise
+                logger.info(f'SSH channel open failed on {self.server.ip_address} ({e}), reconnecting')
+                self._track(retries=1)
+                self.disconnect(discard=True)
+                self.connect()
+                chan = self.client.get_transport().open_session(timeout=15)
+            chan.exec_command(cmd)
+            pending[name] = (chan, [], [])
+
+        results = {}
+        deadline = started + timeout
+        while pending:
+            progressed = False
+            for name in list(pending):
+                chan, out, err = pending[name]
+                # Data precedes exit-status on the wire: check the status
+                # first, then drain, so nothing printed can be missed
+                exited = chan.exit_status_ready()
+                while chan.recv_ready():
+                    out.append(chan.recv(32768))
+                    progressed = True
+                while chan.recv_stderr_ready():
+                    err.append(chan.recv_stderr(32768))
+                    progressed = True
+                if exited:
+                    results[name] = (
+                        b''.join(out).decode('utf-8', errors='replace'),
+                        b''.join(err).decode('utf-8', errors='replace'),
+                        chan.recv_exit_status(),
+                        time.monotonic() - started,
+                    )
+                    chan.close()
+                    del pending[name]
+            if time.monotonic() > deadline:
+                for name, (chan, out, err) in pending.items():
+                    chan.close()
+                    results[name] = (
+                        b''.join(out).decode('utf-8', errors='replace'), 'timeout', None, timeout,
+                    )
+                break
+            if not progressed:
+                time.sleep(0.01)
+        for cmd in cmds.values():
+            self.state.saw_command(cmd)
+        codes = [r[2] for r in results.values()]
+        self._track(
+            commands=len(cmds),
+            sent=sum(len(c) for c in cmds.values()),
+            received=sum(len(r[0]) + len(r[1]) for r in results.values()),
+            exit_code=next((c for c in codes if c), 0),
+        )
+        return results
+
+    def sftp(self):
+        """SFTP session of the current connection (opened lazily, reused)."""
         if not self.client:
             self.connect()
-        sftp = self.client.open_sftp()
-        f = sftp.file(remote_path, 'w')
-        f.write(content)
-        f.close()
-        sftp.close()
+        if self._shared:
+            # SFTPClient isn't safe to use from several threads at once
+            if self._sftp is None:
+                self._sftp = self.client.open_sftp()
+            return self._sftp
+        return self._conn.sftp()
+
+    def upload_file(self, content, remote_path, mode=None):
+        """Загрузить содержимое как файл на сервер.
+
+        `content` may be str, bytes or a binary file-like object; it is
+        streamed with pipelined SFTP writes over the shared session.
+        """
+        fileobj = _as_fileobj(content)
+        try:
+            sftp = self.sftp()
+            sftp.putfo(fileobj, remote_path, confirm=False)
+        except (paramiko.SSHException, EOFError, OSError) as e:
+            if getattr(e, 'errno', None):
+                raise  # remote path error (ENOENT, EACCES), not a dead session
+            # Stale SFTP session on a pooled connection — reopen once
+            logger.info(f'SFTP session lost on {self.server.ip_address} ({e}), reopening')
+            self._track(retries=1)
+            if self._shared:
+                self._sftp = None
+            else:
+                self._conn._sftp = None
+            fileobj.seek(0)
+            sftp = self.sftp()
+            sftp.putfo(fileobj, remote_path, confirm=False)
+        if mode is not None:
+            sftp.chmod(remote_path, mode)
+        self._track(commands=1, sent=fileobj.tell())
+        self.state.saw_command(remote_path)
         logger.info(f'Файл загружен: {remote_path}')
 
+    def upload_many(self, files, mode=0o644):
+        """Upload several files ({remote_path: content}) in one round trip.
+
+        The files are packed into an in-memory tar and extracted on the host
+        by a single `tar -x` over one channel, so the cost no longer grows
+        with the number of files. Parent directories are created as needed.
+        """
+        if not files:
+            return
+        data = bundles.build_tar(
+            {path.lstrip('/'): content for path, content in files.items()}, mode=mode,
+        )
+        out, err, code = self.exec_stdin('tar -xf - -C /', data, timeout=120)
+        self.state.saw_command(' '.join(files))
+        if code != 0:
+            raise RuntimeError(f'upload_many failed on {self.server.ip_address}: {(err or out)[:300]}')
+        logger.info(f'Загружено файлов: {len(files)} ({len(data)} bytes) на {self.server.ip_address}')
+
+    def push_bundle(self, bundle, cmd, timeout=120):
+        """Stream a bundles.Bundle into `cmd` (e.g. `docker cp - openclaw:/`) on one channel.
+
+        Raises RuntimeError if `cmd` fails, like upload_many.
+        """
+        out, err, code = self.exec_stdin(cmd, bundle.data, timeout=timeout)
+        if code != 0:
+            raise RuntimeError(
+                f'Bundle {bundle.name} delivery failed on {self.server.ip_address}: {(err or out)[:300]}'
+            )
+        logger.info(
+            f'Bundle {bundle.name} delivered to {self.server.ip_address}: '
+            f'{len(bundle.files)} files, {len(bundle)} bytes'
+        )
+        return out, err, code
+
+    def exec_stdin(self, cmd, data, timeout=60, chunk_size=32768):
+        """Run `cmd` streaming `data` (bytes or binary file-like) to its stdin."""
+        result = self.exec_stream(
+            cmd, timeout=timeout, stdin=data, tail_bytes=None, chunk_size=chunk_size, progress=False,
+        )
+        if result.timed_out:
+            raise TimeoutError(f'{cmd[:80]!r} timed out after {timeout}s on {self.server.ip_address}')
+        return result.as_tuple()
+
+    def wait_ready(self, probes, timeout=readiness.READINESS_TIMEOUT, what='services'):
+        """Block until readiness probes pass (see readiness.py). Returns ReadinessResult."""
+        result = readiness.wait_until(self, probes, timeout=timeout)
+        if result.ok:
+            logger.info(f'{what} ready on {self.server.ip_address} in {result.elapsed:.1f}s ({result.polls} polls)')
+        else:
+            logger.warning(
+                f'{what} not ready on {self.server.ip_address} after {result.elapsed:.1f}s: {result.pending}'
+            )
+        return result
+
+    def require_ready(self, probes, timeout=readiness.READINESS_TIMEOUT, what='services'):
+        """wait_ready for deploy steps: raises RuntimeError if the probes didn't pass in time."""
+        result = self.wait_ready(probes, timeout=timeout, what=what)
+        if not result.ok:
+            raise RuntimeError(
+                f'{what} not ready on {self.server.ip_address} after {result.elapsed:.0f}s: '
+                f'{", ".join(result.pending)}'
+            )
+        return result
+
+    def batch(self):
+        """Start a RemoteBatch — many commands in one SSH round trip."""
+        return RemoteBatch(self)
+
+    # ─── control agent ──────────────────────────────────────────────
+
+    @property
+    def agent(self):
+        """ControlAgentClient for this server (see control_agent.py)."""
+        if self._agent is None:
+            self._agent = ControlAgentClient(self)
+        return self._agent
+
+    def install_control_agent(self):
+        """Install/upgrade the openclaw-agent systemd unit on the host."""
+        self.upload_many({
+            control_agent.AGENT_SCRIPT_PATH: control_agent.agent_script(),
+            control_agent.AGENT_KEY_PATH: control_agent.agent_key(self.server),
+            control_agent.AGENT_UNIT_PATH: control_agent.AGENT_UNIT_CONTENT,
+        }, mode=0o600)
+        result = (
+            self.batch()
+            .add('systemctl daemon-reload', name='daemon-reload')
+            .add(f'systemctl enable {control_agent.AGENT_UNIT}', name='enable')
+            .add(f'systemctl restart {control_agent.AGENT_UNIT}', name='restart')
+            .run()
+        )
+        if not result.ok:
+            logger.warning(f'Control agent install issues on {self.server.ip_address}: {result.failures}')
+            return False
+        control_agent.forget_unavailable(self.server)
+        self.wait_ready(
+            (readiness.port_open(control_agent.CONTROL_AGENT_PORT),), timeout=15, what='control agent',
+        )
+        logger.info(f'Control agent installed on {self.server.ip_address}')
+        return True
+
+    def agent_health(self):
+        """Container states from the control agent, or None if it isn't available."""
+        try:
+            return self.agent.health()
+        except ControlAgentUnavailable:
+            return None
+
+    def check_health(self):
+        """True if the openclaw container is running (monitor_servers)."""
+        try:
+            healthy = self.state.container_status('openclaw') == 'running'
+        except Exception as e:
+            logger.warning(f'Health check failed on {self.server.ip_address}: {e}')
+            return False
+        finally:
+            self.disconnect()
+        if healthy:
+            self.server.last_health_check = timezone.now()
+            self.server.save(update_fields=['last_health_check'])
+        return healthy
+
+    def tail_logs(self, container='openclaw', tail=200):
+        """Last `tail` lines of a container's logs."""
+        try:
+            return self.agent.logs(container, tail)
+        except ControlAgentUnavailable:
+            out, err, _ = self.exec_command(f'docker logs --tail {int(tail)} {container} 2>&1')
+            return out + err
+
+    def approve_pairing(self, code, channel='telegram'):
+        """`openclaw pairing approve` for an already validated code. Returns (out, err, exit_code)."""
+        try:
+            return self.agent.approve_pairing(code, channel)
+        except ControlAgentUnavailable:
+            return self.exec_command(
+                f'docker exec openclaw node /app/openclaw.mjs pairing approve {channel} {shlex.quote(code)}'
+            )
+
     def install_browser_in_container(self):
         """Настройка Chrome headless внутри контейнера OpenClaw.
         Chrome уже установлен в образе через Dockerfile, здесь только
         очистка stale lock-файлов и настройка профиля."""
         logger.info(f'Configuring Chrome headless on {self.server.ip_address}...')
 
+        batch = self.batch()
+
         # Очистка stale lock-файлов от предыдущих падений Chrome
-        self.exec_command(
+        batch.add(
             'docker exec openclaw rm -f '
             '/root/.openclaw/browser/headless/user-data/SingletonLock '
             '/root/.openclaw/browser/headless/user-data/SingletonSocket '
             '/root/.openclaw/browser/headless/user-data/SingletonCookie '
-            '2>/dev/null || true'
+            '2>/dev/null || true',
+            name='clear-locks',
         )
 
         # Настройка профиля браузера
-        browser_commands = [
-            'docker exec openclaw node /app/openclaw.mjs browser create-profile --name headless --color "#00FF00" --driver openclaw 2>/dev/null || true',
-            'docker exec openclaw node /app/openclaw.mjs config set browser.defaultProfile lightpanda',
-            'docker exec openclaw node /app/openclaw.mjs config set browser.noSandbox true',
-            'docker exec openclaw node /app/openclaw.mjs config set browser.headless true',
-        ]
-
-        for cmd in browser_commands:
-            self.exec_command(cmd)
+        batch.add('docker exec openclaw node /app/openclaw.mjs browser create-profile --name headless --color "#00FF00" --driver openclaw 2>/dev/null || true')
+        batch.run()
+        self.patch_openclaw_config(
+            ConfigPatch().merge('browser', {
+                'defaultProfile': 'lightpanda',
+                'noSandbox': True,
+                'headless': True,
+            })
+        )
 
         logger.info(f'Chrome headless configured on {self.server.ip_address}')
         # NOTE: Lightpanda browser profile is configured by configure_searxng_provider().
@@ -551,67 +993,275 @@ class ServerManager:
         """Install human-browser skill (Playwright stealth browser with residential proxy).
 
         Uploads SKILL.md, browser-human.js, and package.json to the host skill directory
-        (volume-mounted into the container). Installs npm deps and Playwright chromium
-        using an ephemeral container so binaries end up on the host.
+        (volume-mounted into the container). npm deps and Playwright chromium come
+        from the backend's artifact cache (artifacts.py); only without a cached
+        tarball they are installed in an ephemeral container so binaries end up
+        on the host, and a pool server then builds the tarball for the next servers.
         """
-        import os
         path = self.server.openclaw_path
         skill_dir = f'{path}/skills/human-browser'
         logger.info(f'Installing human-browser skill on {self.server.ip_address}...')
 
-        # Local skill files in the backend repo
-        local_skills_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'skills', 'human-browser',
+        self._upload_human_browser_files(path)
+
+        release = self.image_release()
+        image = release['ref']
+        deps = artifacts.HumanBrowserDeps(self, release['tag'])
+        if deps.installed() or deps.deliver():
+            logger.info(f'human-browser skill installed on {self.server.ip_address} (cached deps)')
+            return True
+
+        # Install npm deps via ephemeral container (host has no node), then
+        # Playwright chromium to the persistent host cache — streamed, so the
+        # deploy progress shows what npm/playwright are doing
+        installs = {
+            'npm-install': (
+                f'docker run --rm -u 0 '
+                f'-v {skill_dir}:/skill -w /skill '
+                f'{image} '
+                f'sh -c "npm install --no-fund --no-audit 2>&1"',
+                120,
+            ),
+            'playwright-install': (
+                f'docker run --rm -u 0 '
+                f'-v {skill_dir}:/skill '
+                f'-v /root/playwright-cache:/root/.cache/ms-playwright '
+                f'-w /skill '
+                f'{image} '
+                f'sh -c "npx playwright install chromium 2>&1"',
+                300,
+            ),
+        }
+        for name, (cmd, timeout) in installs.items():
+            result = self.exec_stream(f'timeout {timeout} {cmd}', timeout=timeout + 30, tail_bytes=4096)
+            if not result.ok:
+                logger.warning(
+                    f'human-browser {name} failed on {self.server.ip_address} '
+                    f'(exit {result.exit_code}): {result.out[-500:]}'
+                )
+                return False
+
+        # Fix ownership for node user (uid 1000)
+        self.exec_command(f'chown -R 1000:1000 {skill_dir} /root/playwright-cache')
+
+        deps.mark_installed()
+        # The fleet's tarball: built in a clean container, never on a user's host (artifacts.py)
+        if self.server.profile_id is None:
+            deps.capture()
+        logger.info(f'human-browser skill installed on {self.server.ip_address}')
+        return True
+
+    def _upload_human_browser_files(self, path):
+        """Stream the human-browser skill bundle into {path}/skills/human-browser on the host."""
+        self.push_bundle(bundles.human_browser_bundle(), f'tar -xf - -C {path}')
+
+    def _recreate_stack(self, path):
+        """Stop the stack, drop the config volume and start it again in one round trip.
+
+        Returns (out, err, exit_code) of `docker compose up`.
+        """
+        result = (
+            self.batch()
+            .add(f'cd {path} && docker compose down 2>/dev/null || true', name='down')
+            .add('docker volume rm openclaw_config 2>/dev/null || true', name='volume-rm')
+            .add(f'cd {path} && docker compose up -d', name='up', timeout=300)
+            .run()
+        )
+        return result['up'].as_tuple()
+
+    def image_release(self, refresh=False):
+        """The openclaw image of this deploy (images.release()), resolved once per deploy.
+
+        The image the server is pinned to (deploy_state, see ensure_image) as
+        long as the Dockerfile is the same, else the newest ready build. Only
+        warm deploys pass refresh=True and pick up a new upstream base.
+        """
+        if refresh or 'release' not in self._image:
+            pin = (self.server.deploy_state or {}).get('image') or {}
+            release = None
+            if refresh or pin.get('dockerfile') != images.dockerfile_sha(DOCKERFILE_CONTENT):
+                release = images.release(DOCKERFILE_CONTENT, refresh=refresh)
+            self._image['release'] = pin if release is None or pin.get('key') == release['key'] else release
+        return self._image['release']
+
+    def ensure_image(self):
+        """Get the image_release() onto the server instead of building it here (images.py)
+        and pin the server to it — the stack files reference the pin."""
+        release = self.image_release()
+        how = images.ensure_image(self, DOCKERFILE_CONTENT, release)
+        pin = images.pin(self, release)
+        self._image['release'] = pin
+        save_state(self.server, 'image', pin)
+        logger.info(f'{pin["ref"]} on {self.server.ip_address}: {how}')
+        return how
+
+    def _init_gateway_config(self):
+        """Run doctor and pin gateway mode/bind (LAN bind for mobile access)."""
+        self.exec_command('docker exec openclaw node /app/openclaw.mjs doctor --fix')
+        self.patch_openclaw_config(ConfigPatch().merge('gateway', {'mode': 'local', 'bind': 'lan'}))
+
+    def _upload_docker_files(self, path, extra=None):
+        """Upload Dockerfile, docker-compose, SearXNG settings, and adapters to server.
+
+        `extra` ({remote_path: content}) is sent in the same round trip —
+        used for the per-deploy .env and openclaw-config.yaml.
+        """
+        files = self._docker_files(path)
+        files.update(extra or {})
+        self.upload_many(files)
+
+    def _docker_files(self, path):
+        """Static stack files: {remote_path: content}."""
+        return {
+            f'{path}/Dockerfile': DOCKERFILE_CONTENT,
+            f'{path}/docker-compose.yml': docker_compose_content(self.image_release()['ref']),
+            f'{path}/searxng/settings.yml': self._searxng_settings_content(),
+            f'{path}/searxng-adapter.js': SEARXNG_ADAPTER_JS,
+            f'{path}/lightpanda-cdp-adapter.js': LIGHTPANDA_CDP_ADAPTER_JS,
+        }
+
+    # ─── reconciled deploy steps (see reconcile.py) ─────────────────
+
+    def _sync_docker_files(self, rec, path, extra):
+        """Upload the static stack files if they changed; `extra` is always sent."""
+        files = self._docker_files(path)
+        if not rec.step('docker-files', (files,), lambda: self.upload_many({**files, **extra})):
+            self.run_step('user-files', self.upload_many, extra)
+
+    def _sync_human_browser_files(self, rec, path):
+        """human-browser skill files on the host (mounted into the container)."""
+        rec.step(
+            'human-browser-files', (path, bundles.human_browser_bundle().sha256),
+            lambda: self._upload_human_browser_files(path),
         )
 
-        # Create directories on server host
-        self.exec_command(f'mkdir -p {skill_dir}/scripts')
+    def _sync_human_browser(self, rec, path):
+        """npm + Playwright deps of human-browser, only when the bundle or the image changed."""
+        return rec.step(
+            'human-browser',
+            (path, bundles.human_browser_bundle().sha256, artifacts.human_browser_key(self.image_release()['tag'])),
+            self.install_human_browser,
+        )
 
-        # Upload skill files
-        for rel_path in ['SKILL.md', 'package.json', 'scripts/browser-human.js']:
-            local_path = os.path.join(local_skills_dir, rel_path)
-            try:
-                with open(local_path, 'r') as f:
-                    content = f.read()
-            except FileNotFoundError:
-                logger.warning(f'human-browser file not found: {local_path}')
-                continue
-            self.upload_file(content, f'{skill_dir}/{rel_path}')
-
-        # Install npm deps via ephemeral container (host has no node)
-        self.exec_command(
-            f'docker run --rm -u 0 '
-            f'-v {skill_dir}:/skill -w /skill '
-            f'openclaw-chrome:latest '
-            f'sh -c "npm install --no-fund --no-audit 2>&1"',
-            timeout=120,
+    def _sync_host_services(self, rec):
+        """Session watchdog cron and the control agent unit."""
+        rec.step('session-watchdog', (self.SESSION_WATCHDOG_SCRIPT,), self.install_session_watchdog)
+        rec.step(
+            'control-agent',
+            (control_agent.agent_script(), control_agent.agent_key(self.server), control_agent.AGENT_UNIT_CONTENT),
+            self.install_control_agent,
         )
 
-        # Install Playwright chromium to persistent host cache
-        self.exec_command(
-            f'docker run --rm -u 0 '
-            f'-v {skill_dir}:/skill '
-            f'-v /root/playwright-cache:/root/.cache/ms-playwright '
-            f'-w /skill '
-            f'openclaw-chrome:latest '
-            f'sh -c "npx playwright install chromium 2>&1"',
-            timeout=300,
+    def _sync_agents(self, rec, openrouter_key=None):
+        """Agent workspaces + agents config; lives in the config volume."""
+        try:
+            with open(bundles.AGENTS_CONFIG_FILE) as f:
+                agents_json = f.read()
+        except FileNotFoundError:
+            agents_json = ''
+        bundle = bundles.agents_bundle(self.AGENT_IDS, self.AGENT_FILES)
+        rec.step(
+            'agents', (bundle.sha256, agents_json, openrouter_key or ''),
+            lambda: self.install_agents(openrouter_key=openrouter_key), scope=VOLUME,
         )
 
-        # Fix ownership for node user (uid 1000)
-        self.exec_command(f'chown -R 1000:1000 {skill_dir}')
-        self.exec_command('chown -R 1000:1000 /root/playwright-cache')
+    def _sync_prune_skills(self, rec):
+        """Skill pruning changes the container's own filesystem — redo it for a new container or image."""
+        rec.step(
+            'prune-skills', (sorted(self.OPENCLAW_ESSENTIAL_SKILLS), sorted(self.OPENCLAW_REMOVE_SKILLS)),
+            self.prune_builtin_skills, scope=CONTAINER,
+        )
 
-        logger.info(f'human-browser skill installed on {self.server.ip_address}')
+    # ─── openclaw.json patching ─────────────────────────────────────
+
+    def read_openclaw_config(self):
+        """Read openclaw.json from the Docker volume.
 
-    def _upload_docker_files(self, path):
-        """Upload Dockerfile, docker-compose, SearXNG settings, and adapters to server"""
-        self.upload_file(DOCKERFILE_CONTENT, f'{path}/Dockerfile')
-        self.upload_file(DOCKER_COMPOSE_WITH_CHROME, f'{path}/docker-compose.yml')
-        self._upload_searxng_settings()
-        self.upload_file(SEARXNG_ADAPTER_JS, f'{path}/searxng-adapter.js')
-        self.upload_file(LIGHTPANDA_CDP_ADAPTER_JS, f'{path}/lightpanda-cdp-adapter.js')
+        Returns (config, sha) — ({}, '') if the file is missing, (None, sha)
+        if it is not valid JSON. `sha` is passed back to write_openclaw_config
+        to detect concurrent writers. Served from self.state for REMOTE_STATE_TTL
+        seconds; a stale answer only costs a retry of the conditional write.
+        """
+        return self.state.config()
+
+    def _read_openclaw_config(self):
+        """Uncached read; goes through the control agent when available."""
+        try:
+            return self.agent.read_config()
+        except ControlAgentUnavailable:
+            pass
+        out, _, code = self.exec_command(f'cat {OPENCLAW_CONFIG_PATH} 2>/dev/null')
+        if code != 0 or not out.strip():
+            return {}, ''
+        try:
+            config = json.loads(out)
+        except json.JSONDecodeError:
+            logger.warning(f'openclaw.json on {self.server.ip_address} is not valid JSON')
+            return None, config_sha(out)
+        return config, config_sha(out)
+
+    def write_openclaw_config(self, config, expected_sha=None):
+        """Atomically replace openclaw.json. Returns False on a write conflict."""
+        data = json.dumps(config, indent=2, ensure_ascii=False)
+        try:
+            written = self.agent.write_config(config, expected_sha=expected_sha)
+        except ControlAgentUnavailable:
+            out, err, code = self.exec_stdin(write_script(OPENCLAW_CONFIG_PATH, expected_sha), data)
+            if code != 0 and code != CONFLICT_EXIT_CODE:
+                self.state.invalidate(remote_state.CONFIG)
+                raise RuntimeError(
+                    f'openclaw.json write failed on {self.server.ip_address}: {(err or out)[:200]}'
+                )
+            written = code == 0
+        if written:
+            # The next read_openclaw_config of a patch sequence needs no round trip
+            self.state.put(remote_state.CONFIG, (copy.deepcopy(config), config_sha(data)))
+        else:
+            self.state.invalidate(remote_state.CONFIG)
+        return written
+
+    def patch_openclaw_config(self, patch, retries=3):
+        """Apply a ConfigPatch with one read and one atomic write.
+
+        Nothing is written (and the gateway doesn't reload) if the patch
+        leaves the config unchanged. If another writer touched the file in
+        between, the read-apply-write cycle is retried. An openclaw.json that
+        isn't valid JSON is left alone (RuntimeError): writing only the
+        patched keys would throw away the rest of it.
+        Returns True if the file was changed.
+        """
+        for attempt in range(retries):
+            config, sha = self.read_openclaw_config()
+            if config is None:
+                raise RuntimeError(f'openclaw.json on {self.server.ip_address} is not valid JSON, not patching')
+            if not patch.apply(config):
+                return False
+            if self.write_openclaw_config(config, expected_sha=sha):
+                logger.info(f'openclaw.json patched on {self.server.ip_address} ({len(patch.ops)} ops)')
+                return True
+            logger.info(f'openclaw.json changed concurrently on {self.server.ip_address}, retrying')
+            self._track(retries=1)
+        raise RuntimeError(f'openclaw.json patch conflict on {self.server.ip_address} after {retries} attempts')
+
+    def _model_patch(self, openrouter_model, patch=None):
+        """Patch that sets the primary model and the /model aliases.
+
+        Equivalent of `models set` + re-applying MODEL_ALIASES, which
+        `models set` used to overwrite with only the primary model.
+        """
+        if patch is None:
+            patch = ConfigPatch()
+        patch.update(self._normalize_default_model)
+        patch.set('agents.defaults.model.primary', openrouter_model)
+        patch.update(self._set_model_aliases)
+        return patch
+
+    @staticmethod
+    def _normalize_default_model(config):
+        """agents.defaults.model may be a bare string — turn it into {primary: ...}."""
+        defaults = config.setdefault('agents', {}).setdefault('defaults', {})
+        if isinstance(defaults.get('model'), str):
+            defaults['model'] = {'primary': defaults['model']}
 
     def set_model(self, model_slug: str) -> tuple[bool, str]:
         """Change the active model on a running OpenClaw container.
@@ -629,54 +1279,26 @@ class ServerManager:
         base_model = model_mapping.get(model_slug, model_slug)
         openrouter_model = self._ensure_openrouter_prefix(base_model)
 
-        cli = 'docker exec openclaw node /app/openclaw.mjs'
-
-        # 1. Set global default model
-        out, err, exit_code = self.exec_command(
-            f'{cli} models set {openrouter_model}',
-            timeout=30,
-        )
-
-        if exit_code != 0:
-            logger.warning('set_model failed for %s: %s', openrouter_model, err or out)
-            return False, (err or out).strip()
-
-        # 2. Update per-agent model overrides so all agents use the new model
-        self._update_agent_models(openrouter_model)
-
-        # Re-apply aliases so /model command still works after models set
-        self._apply_model_aliases()
+        # Global default + aliases (so /model still works) + per-agent
+        # overrides, all in one write
+        patch = self._model_patch(openrouter_model)
+        patch.update(lambda config: self._update_agent_models(config, openrouter_model))
+        try:
+            self.patch_openclaw_config(patch)
+        except Exception as e:
+            logger.warning('set_model failed for %s: %s', openrouter_model, e)
+            return False, str(e)
 
         logger.info('Model changed to %s on %s', openrouter_model, self.server.ip_address)
         return True, openrouter_model
 
-    def _update_agent_models(self, openrouter_model: str):
+    @staticmethod
+    def _update_agent_models(config, openrouter_model: str):
         """Update the model field on all agents in the config."""
-        cli = 'docker exec openclaw node /app/openclaw.mjs'
-        # Read current config to get agent list
-        out, err, code = self.exec_command(f'{cli} config get agents.list', timeout=15)
-        if code != 0:
-            logger.warning('Failed to read agents list: %s', err or out)
-            return
-
-        try:
-            agents = json.loads(out.strip())
-        except (json.JSONDecodeError, ValueError):
-            logger.warning('Failed to parse agents list: %s', out[:200])
-            return
-
-        for i, agent in enumerate(agents):
+        for agent in config.get('agents', {}).get('list', []):
             if agent.get('model'):
                 agent['model'] = openrouter_model
 
-        agents_json = json.dumps(agents)
-        out, err, code = self.exec_command(
-            f"{cli} config set agents.list '{agents_json}'",
-            timeout=15,
-        )
-        if code != 0:
-            logger.warning('Failed to update agent models: %s', (err or out)[:200])
-
     @staticmethod
     def _ensure_openrouter_prefix(model: str) -> str:
         """Ensure model string has openrouter/ prefix for routing through OpenRouter."""
@@ -684,48 +1306,38 @@ class ServerManager:
             return f'openrouter/{model}'
         return model
 
-    def _apply_model_aliases(self):
-        """Set model aliases so user can switch models via /model command.
-
-        Must be called AFTER `models set` because that command overwrites
-        agents.defaults.models with only the primary model.
-        """
-        cli = 'docker exec openclaw node /app/openclaw.mjs'
-        aliases = {
-            "openrouter/anthropic/claude-opus-4.5": {"alias": "opus"},
-            "openrouter/anthropic/claude-sonnet-4": {"alias": "sonnet"},
-            "openrouter/anthropic/claude-sonnet-4-5-20250929": {"alias": "sonnet45"},
-            "openrouter/anthropic/claude-haiku-4.5": {"alias": "haiku"},
-            "openrouter/openai/gpt-4o": {"alias": "gpt4o"},
-            "openrouter/google/gemini-2.5-flash": {"alias": "flash"},
-            "openrouter/google/gemini-3-flash-preview": {"alias": "gemini3"},
-            "openrouter/deepseek/deepseek-reasoner": {"alias": "deepseek"},
-            "openrouter/minimax/minimax-m2.5": {"alias": "minimax"},
-        }
-        aliases_json = json.dumps(aliases)
-        out, err, code = self.exec_command(
-            f"{cli} config set agents.defaults.models '{aliases_json}'"
-        )
-        if code != 0:
-            logger.warning(f'Model aliases failed: {err[:200]}')
+    # Aliases for the /model command (agents.defaults.models)
+    MODEL_ALIASES = {
+        "openrouter/anthropic/claude-opus-4.5": {"alias": "opus"},
+        "openrouter/anthropic/claude-sonnet-4": {"alias": "sonnet"},
+        "openrouter/anthropic/claude-sonnet-4-5-20250929": {"alias": "sonnet45"},
+        "openrouter/anthropic/claude-haiku-4.5": {"alias": "haiku"},
+        "openrouter/openai/gpt-4o": {"alias": "gpt4o"},
+        "openrouter/google/gemini-2.5-flash": {"alias": "flash"},
+        "openrouter/google/gemini-3-flash-preview": {"alias": "gemini3"},
+        "openrouter/deepseek/deepseek-reasoner": {"alias": "deepseek"},
+        "openrouter/minimax/minimax-m2.5": {"alias": "minimax"},
+    }
 
-    def configure_token_optimization(self, model_slug='claude-sonnet-4'):
-        """Configure OpenClaw for optimal token usage to reduce costs.
+    def _set_model_aliases(self, config):
+        """Replace agents.defaults.models with MODEL_ALIASES, keeping the primary model listed."""
+        self._normalize_default_model(config)
+        defaults = config['agents']['defaults']
+        models = dict(self.MODEL_ALIASES)
+        primary = (defaults.get('model') or {}).get('primary')
+        if primary:
+            models.setdefault(primary, {})
+        defaults['models'] = models
 
-        Optimizations applied:
-        - contextTokens: 100K (triggers compaction earlier than default 200K)
-        - bootstrapMaxChars: 20K (limits system prompt bloat from AGENTS.md etc.)
-        - Heartbeat disabled (biggest silent cost driver)
-        - Sub-agent routing to gemini-3-flash-preview (cheap + fast)
-        - Image model routing to gemini-2.5-flash
-        - Compaction with memoryFlush (saves context before compaction)
-        - Context pruning with cache-ttl 1h
-        - Concurrency limits
-        - Cheap fallback models (gemini-2.5-flash → haiku)
-        - Local RAG memory search (semantic memory across sessions)
-        """
-        logger.info(f'Configuring token optimization on {self.server.ip_address}...')
+    def _apply_model_aliases(self):
+        """Set model aliases so user can switch models via /model command."""
+        try:
+            self.patch_openclaw_config(ConfigPatch().update(self._set_model_aliases))
+        except Exception as e:
+            logger.warning(f'Model aliases failed: {str(e)[:200]}')
 
+    def _token_optimization_patch(self, model_slug='claude-sonnet-4'):
+        """ConfigPatch with the token optimization settings (see configure_token_optimization)."""
         if 'claude' in model_slug.lower():
             fallback_models = [
                 'openrouter/google/gemini-2.5-flash',
@@ -747,71 +1359,83 @@ class ServerManager:
                 'openrouter/anthropic/claude-haiku-4.5',
             ]
 
-        cli = 'docker exec openclaw node /app/openclaw.mjs'
-
-        optimization_commands = [
-            # --- Heartbeat: disable entirely (up to 30%+ savings) ---
-            f"""{cli} config set agents.defaults.heartbeat '{{"every": "0m"}}'""",
-
-            # --- Sub-agent model: gpt-5-nano (cheapest + fast) ---
-            f"""{cli} config set agents.defaults.subagents '{{"model": "openrouter/openai/gpt-5-nano", "maxConcurrent": 2, "archiveAfterMinutes": 60}}'""",
-
-            # --- Image model: cheap model ---
-            f"""{cli} config set agents.defaults.imageModel '{{"primary": "openrouter/google/gemini-2.5-flash", "fallbacks": ["openrouter/openai/gpt-4o-mini"]}}'""",
-
-            # --- Compaction with memoryFlush (saves context before compaction) ---
-            f"""{cli} config set agents.defaults.compaction '{{"mode": "default", "memoryFlush": {{"enabled": true, "softThresholdTokens": 30000}}}}'""",
-
-            # --- Context pruning with keepLastAssistants ---
-            f"""{cli} config set agents.defaults.contextPruning '{{"mode": "cache-ttl", "ttl": "1h", "keepLastAssistants": 3}}'""",
-
-            # --- Concurrency limit ---
-            f'{cli} config set agents.defaults.maxConcurrent 2',
-
-            # --- Enable web search ---
-            f'{cli} config set web.enabled true',
-            # NOTE: SearXNG provider is configured via configure_searxng_provider()
-            # which sets provider=brave (adapter translates to SearXNG)
-
-            # --- Bootstrap file size limit (reduces system prompt bloat) ---
-            f'{cli} config set agents.defaults.bootstrapMaxChars 20000',
-
-            # --- Context token limit (100K — triggers compaction earlier) ---
-            f'{cli} config set agents.defaults.contextTokens 100000',
-
-            # --- Local RAG — semantic memory search across sessions ---
-            f"""{cli} config set agents.defaults.memorySearch '{{"enabled": true, "provider": "local", "store": {{"path": "/root/.openclaw/memory.db"}}}}'""",
-
-            # --- Enable HTTP chat completions endpoint (for mobile app) ---
-            f"""{cli} config set gateway.http.endpoints.chatCompletions '{{"enabled": true}}'""",
-        ]
+        patch = ConfigPatch().update(self._normalize_default_model)
+        # --- Heartbeat: disable entirely (up to 30%+ savings) ---
+        patch.set('agents.defaults.heartbeat', {'every': '0m'})
+        # --- Sub-agent model: gpt-5-nano (cheapest + fast) ---
+        patch.set('agents.defaults.subagents', {
+            'model': 'openrouter/openai/gpt-5-nano', 'maxConcurrent': 2, 'archiveAfterMinutes': 60,
+        })
+        # --- Image model: cheap model ---
+        patch.set('agents.defaults.imageModel', {
+            'primary': 'openrouter/google/gemini-2.5-flash',
+            'fallbacks': ['openrouter/openai/gpt-4o-mini'],
+        })
+        # --- Compaction with memoryFlush (saves context before compaction) ---
+        patch.set('agents.defaults.compaction', {
+            'mode': 'default', 'memoryFlush': {'enabled': True, 'softThresholdTokens': 30000},
+        })
+        # --- Context pruning with keepLastAssistants ---
+        patch.set('agents.defaults.contextPruning', {
+            'mode': 'cache-ttl', 'ttl': '1h', 'keepLastAssistants': 3,
+        })
+        # --- Concurrency limit ---
+        patch.set('agents.defaults.maxConcurrent', 2)
+        # --- Enable web search ---
+        # NOTE: SearXNG provider is configured via configure_searxng_provider()
+        # which sets provider=brave (adapter translates to SearXNG)
+        patch.set('web.enabled', True)
+        # --- Bootstrap file size limit (reduces system prompt bloat) ---
+        patch.set('agents.defaults.bootstrapMaxChars', 20000)
+        # --- Context token limit (100K — triggers compaction earlier) ---
+        patch.set('agents.defaults.contextTokens', 100000)
+        # --- Local RAG — semantic memory search across sessions ---
+        patch.set('agents.defaults.memorySearch', {
+            'enabled': True, 'provider': 'local', 'store': {'path': '/root/.openclaw/memory.db'},
+        })
+        # --- Enable HTTP chat completions endpoint (for mobile app) ---
+        patch.set('gateway.http.endpoints.chatCompletions', {'enabled': True})
+        # --- Fallback models (was `models fallbacks clear/add`) ---
+        patch.set('agents.defaults.model.fallbacks', fallback_models)
+        # --- Aliases for easy /model switching ---
+        patch.update(self._set_model_aliases)
+        return patch
+
+    def configure_token_optimization(self, model_slug='claude-sonnet-4', openrouter_model=None):
+        """Configure OpenClaw for optimal token usage to reduce costs.
 
-        for cmd in optimization_commands:
-            out, err, code = self.exec_command(cmd)
-            if code != 0:
-                logger.warning(f'Token opt command failed (code {code}): {cmd[:80]}... err={err[:200]}')
+        Optimizations applied:
+        - contextTokens: 100K (triggers compaction earlier than default 200K)
+        - bootstrapMaxChars: 20K (limits system prompt bloat from AGENTS.md etc.)
+        - Heartbeat disabled (biggest silent cost driver)
+        - Sub-agent routing to gemini-3-flash-preview (cheap + fast)
+        - Image model routing to gemini-2.5-flash
+        - Compaction with memoryFlush (saves context before compaction)
+        - Context pruning with cache-ttl 1h
+        - Concurrency limits
+        - Cheap fallback models (gemini-2.5-flash → haiku)
+        - Local RAG memory search (semantic memory across sessions)
 
-        # Set fallback models
-        self.exec_command(f'{cli} models fallbacks clear 2>/dev/null || true')
-        for fallback in fallback_models:
-            self.exec_command(f'{cli} models fallbacks add {fallback}')
+        Everything, including the /model aliases, goes into openclaw.json in
+        a single patch instead of one `config set` (Node cold start) per key.
+        If openrouter_model is given, the primary model is set in the same write.
+        """
+        logger.info(f'Configuring token optimization on {self.server.ip_address}...')
 
-        # Set model aliases for easy /model switching
-        self._apply_model_aliases()
+        patch = ConfigPatch()
+        if openrouter_model:
+            self._model_patch(self._ensure_openrouter_prefix(openrouter_model), patch)
+        patch.extend(self._token_optimization_patch(model_slug))
+        try:
+            self.patch_openclaw_config(patch)
+        except Exception as e:
+            logger.warning(f'Token optimization patch failed on {self.server.ip_address}: {e}')
+            return
 
         logger.info(f'Token optimization configured on {self.server.ip_address}')
 
-    def install_session_watchdog(self):
-        """Install a cron-based watchdog that auto-compacts OpenClaw sessions
-        when Gemini's 'Thought signature is not valid' error is detected.
-
-        The script runs every 2 minutes, checks recent docker logs for the error,
-        and if found — triggers /compact via the agent CLI to flush corrupted
-        thought tokens while preserving conversation memory.
-        """
-        logger.info(f'Installing session watchdog on {self.server.ip_address}...')
-
-        script = r'''#!/bin/bash
+    # Cron script installed by install_session_watchdog()
+    SESSION_WATCHDOG_SCRIPT = r'''#!/bin/bash
 # OpenClaw session watchdog — auto-compact on Gemini "Thought signature" errors
 LOGFILE="/var/log/openclaw-watchdog.log"
 CONTAINER="openclaw"
@@ -833,17 +1457,32 @@ else
 fi
 '''
 
-        self.upload_file(script, '/usr/local/bin/openclaw-watchdog.sh')
-        self.exec_command('chmod +x /usr/local/bin/openclaw-watchdog.sh')
+    def install_session_watchdog(self):
+        """Install a cron-based watchdog that auto-compacts OpenClaw sessions
+        when Gemini's 'Thought signature is not valid' error is detected.
+
+        The script runs every 2 minutes, checks recent docker logs for the error,
+        and if found — triggers /compact via the agent CLI to flush corrupted
+        thought tokens while preserving conversation memory.
+        """
+        logger.info(f'Installing session watchdog on {self.server.ip_address}...')
+
+        self.upload_file(self.SESSION_WATCHDOG_SCRIPT, '/usr/local/bin/openclaw-watchdog.sh')
 
         # Install cron job (every 2 min), idempotent — remove old entry first
-        self.exec_command(
+        out, err, code = self.exec_command(
+            'chmod +x /usr/local/bin/openclaw-watchdog.sh && '
             '(crontab -l 2>/dev/null | grep -v openclaw-watchdog; '
             'echo "*/2 * * * * /usr/local/bin/openclaw-watchdog.sh") | crontab -'
         )
+        if code != 0:
+            logger.warning(f'Session watchdog install failed on {self.server.ip_address}: {(err or out)[:200]}')
+            return False
 
         logger.info(f'Session watchdog installed on {self.server.ip_address}')
+        return True
 
+    @journaled('warm')
     def warm_deploy_standby(self):
         """Pre-deploy OpenClaw on a pool server without user-specific config.
 
@@ -853,136 +1492,329 @@ fi
         quick_deploy_user() — cutting deployment from ~5-10min to ~30-60s.
         """
         import secrets
-        import time
         path = self.server.openclaw_path
 
-        gateway_token = secrets.token_urlsafe(32)
+        # Same token when a failed run is resumed (journal.py)
+        gateway_token = self.journal.remember('gateway-token', lambda: secrets.token_urlsafe(32))
+        env_content = self._standby_env_content(gateway_token)
+        config_content = self._standby_config_content(gateway_token)
 
-        # Generic .env — no user keys, just enough to start the container
-        env_content = f"""OPENROUTER_API_KEY=placeholder
-TELEGRAM_BOT_TOKEN=placeholder
-OPENCLAW_GATEWAY_TOKEN={gateway_token}
-BRAVE_API_KEY=local-searxng
-LOG_LEVEL=info
-"""
+        try:
+            self.connect()
+            rec = Reconciler(self)
+            # The only deploy that picks up a new upstream base image; a
+            # resumed run keeps the image its finished 'image' step pinned
+            self.image_release(refresh='image' not in self.journal.done)
+
+            def recreate(m):
+                # Stop existing container, clear stale config and rebuild
+                out, err, code = m.run_step('recreate-stack', m._recreate_stack, path)
+                if code != 0:
+                    raise RuntimeError(f'docker compose up failed: {(err or out)[:300]}')
+
+            def container_ready(m):
+                m.run_step('container-ready', m.require_ready, readiness.CONTAINER_READY, what='openclaw container')
+                m._fix_permissions()
+
+            def clear_config(m):
+                # Clear stale internal config (a step of its own: not repeated on resume)
+                m.run_step(
+                    'clear-config', m.exec_command,
+                    "docker exec openclaw rm -rf /root/.openclaw/openclaw.json 2>/dev/null || true",
+                )
 
-        # Generic config — no telegram channel, default model
-        config_content = f"""provider: openrouter
-model: openrouter/anthropic/claude-sonnet-4
+            def start_browser(m):
+                with m.journal_step('browser-start'):
+                    m.exec_command('docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless')
+
+            # Steps declare the resources they read/write; independent ones
+            # (human-browser deps, host services, skill pruning) run in parallel
+            # with the openclaw.json chain. See pipeline.py.
+            (
+                Pipeline(self)
+                # Prebuilt openclaw-chrome instead of `docker compose up --build`
+                .add('image', lambda m: m.run_step('image', m.ensure_image), writes=['image'])
+                # docker-compose.yml references the pinned image
+                .add('docker-files', lambda m: m._sync_docker_files(rec, path, extra={
+                    f'{path}/.env': env_content,
+                    f'{path}/openclaw-config.yaml': config_content,
+                }), reads=['image'], writes=['stack-files'])
+                # human-browser skill files on the host (mounted into container)
+                .add('human-browser-files', lambda m: m._sync_human_browser_files(rec, path),
+                     writes=['human-browser-files'])
+                .add('recreate-stack', recreate,
+                     reads=['stack-files', 'human-browser-files', 'image'], writes=['container', 'config'])
+                .add('container-ready', container_ready, writes=['container'])
+                .add('clear-config', clear_config, reads=['container'], writes=['config'])
+                # Chrome profile (lock cleanup + browser profile in config)
+                .add('browser-profile', lambda m: m.run_step('browser-profile', m.install_browser_in_container),
+                     reads=['container'], writes=['config'])
+                # human-browser npm + Playwright deps (ephemeral container from the image)
+                .add('human-browser', lambda m: m._sync_human_browser(rec, path),
+                     reads=['image', 'human-browser-files'], writes=['human-browser-deps'])
+                # Run doctor + set gateway mode + bind to LAN for mobile access
+                .add('gateway-config', lambda m: m.run_step('gateway-config', m._init_gateway_config),
+                     reads=['container'], writes=['config'])
+                .add('token-optimization',
+                     lambda m: m.run_step('token-optimization', m.configure_token_optimization),
+                     writes=['config'])
+                # Session watchdog (auto-recovers from Gemini thought signature errors)
+                # and the resident control agent for pairing/model/skill operations
+                .add('host-services', lambda m: m._sync_host_services(rec), writes=['host-services'])
+                .add('prune-skills', lambda m: m._sync_prune_skills(rec), reads=['container'], writes=['skills'])
+                # Multi-agent workspace files and config
+                .add('agents', lambda m: m._sync_agents(rec), reads=['container'], writes=['config', 'agent-files'])
+                # Start browser with headless profile (CLI still works at this point)
+                .add('browser-start', start_browser, reads=['container', 'config'])
+                # SearXNG (via Brave adapter) + Lightpanda browser; may restart the container
+                .add('searxng', lambda m: m.run_step('searxng', m.configure_searxng_provider),
+                     writes=['config', 'container'])
+                .run()
+            )
 
-gateway:
-  mode: local
-  bind: lan
-  controlUi:
-    dangerouslyDisableDeviceAuth: true
-  auth:
-    type: token
-    token: {gateway_token}
+            self.server.openclaw_running = True
+            self.server.gateway_token = gateway_token
+            self.server.last_error = ''
+            self.server.save()
+            logger.info(f'Warm deploy complete on {self.server.ip_address}')
+            return True
 
-limits:
-  max_tokens_per_message: 4096
-  max_context_messages: 30
-"""
+        except Exception as e:
+            logger.error(f'warm_deploy_standby failed on {self.server.ip_address}: {e}')
+            self.server.last_error = str(e)[:500]
+            self.server.save()
+            return False
+
+    @journaled('golden')
+    def personalize_golden(self, deploy_state):
+        """Make a pool server created from a golden image (golden.py) its own.
+
+        The disk already holds what warm_deploy_standby produced on the
+        snapshot's source: the image, human-browser deps, host services and
+        the warmed config volume, with the stack stopped. Only what was
+        per-server on the source is replaced: a fresh gateway token (.env,
+        openclaw-config.yaml), the SearXNG secret and the control agent key
+        (both derived from the server id). The source's deploy state is
+        adopted along with its manifest on the disk, so later deploys skip
+        the steps that are still current.
+        """
+        import secrets
+        path = self.server.openclaw_path
+        gateway_token = self.journal.remember('gateway-token', lambda: secrets.token_urlsafe(32))
 
         try:
             self.connect()
+            self.server.deploy_state = dict(deploy_state or {})
+            self.server.save(update_fields=['deploy_state'])
+            rec = Reconciler(self)
 
-            self.upload_file(env_content, f'{path}/.env')
-            self.upload_file(config_content, f'{path}/openclaw-config.yaml')
-            self._upload_docker_files(path)
-
-            # Upload human-browser skill files to host (mounted into container)
-            self._upload_human_browser_files(path)
-
-            # Stop existing container and clear stale config
-            self.exec_command(f'cd {path} && docker compose down 2>/dev/null || true')
-            self.exec_command('docker volume rm openclaw_config 2>/dev/null || true')
+            self._sync_docker_files(rec, path, extra={
+                f'{path}/.env': self._standby_env_content(gateway_token),
+                f'{path}/openclaw-config.yaml': self._standby_config_content(gateway_token),
+            })
+            self._sync_host_services(rec)
 
-            out, err, code = self.exec_command(f'cd {path} && docker compose up -d --build', timeout=300)
+            # openclaw is recreated (its .env changed), the rest just starts
+            out, err, code = self.run_step(
+                'start-stack', self.exec_command, f'cd {path} && docker compose up -d', timeout=300,
+            )
             if code != 0:
-                logger.error(f'warm_deploy_standby: docker compose up failed on {self.server.ip_address}: {err}')
-                return False
-
-            time.sleep(8)
-            self._fix_permissions()
+                raise RuntimeError(f'docker compose up failed: {(err or out)[:300]}')
+            self.run_step('container-ready', self.require_ready, readiness.CONTAINER_READY, what='openclaw container')
 
-            # Clear stale internal config
-            self.exec_command(
-                "docker exec openclaw rm -rf /root/.openclaw/openclaw.json 2>/dev/null || true"
-            )
+            # Chrome profile locks of the source + headless browser in the new container
+            self.run_step('browser-profile', self.install_browser_in_container)
+            with self.journal_step('browser-start'):
+                self.exec_command('docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless')
 
-            # Install browser (the slow part — ~3-5 min)
-            self.install_browser_in_container()
+            self.server.openclaw_running = True
+            self.server.gateway_token = gateway_token
+            self.server.last_error = ''
+            self.server.save()
+            logger.info(f'Golden image personalization complete on {self.server.ip_address}')
+            return True
 
-            # Install human-browser Playwright deps (needs running container image)
-            self.install_human_browser()
+        except Exception as e:
+            logger.error(f'personalize_golden failed on {self.server.ip_address}: {e}')
+            self.server.last_error = str(e)[:500]
+            self.server.save()
+            return False
 
-            # Run doctor + set gateway mode + bind to LAN for mobile access
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs doctor --fix')
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs config set gateway.mode local')
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs config set gateway.bind lan')
+    @journaled('quick')
+    def quick_deploy_user(self, openrouter_key, telegram_token, model_slug, telegram_owner_id=None):
+        """Fast user deployment on an already-warmed server (~30-60s).
 
-            # Apply token optimization
-            self.configure_token_optimization()
+        Skips Chromium install, doctor, token optimization (already done by
+        warm_deploy_standby). Only injects user-specific config and restarts.
+        On an untouched warm standby the config is staged into the running
+        stack instead (_hot_deploy_user, seconds); the recreate below is the
+        fallback.
+        """
+        import secrets
+        path = self.server.openclaw_path
 
-            # Install session watchdog (auto-recovers from Gemini thought signature errors)
-            self.install_session_watchdog()
+        model_mapping = getattr(settings, 'MODEL_MAPPING', {})
+        base_model = model_mapping.get(model_slug, 'anthropic/claude-sonnet-4')
+        openrouter_model = f'openrouter/{base_model}'
 
-            # Prune unused built-in skills
-            self.prune_builtin_skills()
+        if QUICK_DEPLOY_HOT_RELOAD and not self.journal.resuming:
+            before = self.journal.steps_done()
+            try:
+                if self._hot_deploy_user(openrouter_key, telegram_token, model_slug, telegram_owner_id):
+                    return True
+            except Exception as e:
+                logger.warning(f'Hot user injection failed on {self.server.ip_address}: {e}, recreating')
+            # Steps of the abandoned hot path must not count as done on resume
+            self.journal.discard_steps(keep=before)
+
+        gateway_token = self.journal.remember('gateway-token', lambda: secrets.token_urlsafe(32))
+        env_content = self._user_env_content(openrouter_key, telegram_token, gateway_token)
+        config_content = self._user_config_content(
+            openrouter_key, openrouter_model, telegram_token, gateway_token, telegram_owner_id,
+        )
 
-            # Install multi-agent workspace files and config
-            self.install_agents()
+        try:
+            self.connect()
+            rec = Reconciler(self)
 
-            # Start browser with headless profile (CLI still works at this point)
-            self.exec_command(
-                'docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless'
+            def recreate(m):
+                # Recreate to pick up new .env (restart doesn't reload env vars)
+                out, err, code = m.run_step(
+                    'recreate-container', m.exec_command, f'cd {path} && docker compose up -d --force-recreate',
+                )
+                if code != 0:
+                    raise RuntimeError(f'docker compose up failed: {(err or out)[:300]}')
+
+            def container_ready(m):
+                m.run_step('container-ready', m.require_ready, readiness.CONTAINER_READY, what='openclaw container')
+                m._fix_permissions()
+
+            def apply_config(m):
+                # User-specific config (auth-profiles, telegram) with retry.
+                # Runs AFTER install_agents so it has the final say on auth/model
+                config_ok = m.run_step(
+                    'apply-config', m._apply_config_with_retry, openrouter_key, openrouter_model, telegram_owner_id,
+                )
+                if not config_ok:
+                    from .tasks import send_telegram_message, ADMIN_TELEGRAM_ID
+                    send_telegram_message(
+                        ADMIN_TELEGRAM_ID,
+                        f'🚨 quick_deploy_user config verification FAILED\n'
+                        f'Server: {self.server.ip_address}\n'
+                        f'Manual intervention may be needed.'
+                    )
+                    raise RuntimeError('Quick deploy config verification failed')
+
+            def start_browser(m):
+                with m.journal_step('browser-start'):
+                    m.exec_command('docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless')
+
+            # See warm_deploy_standby / pipeline.py: steps run in parallel
+            # unless they share a resource
+            (
+                Pipeline(self)
+                # The image the server was warmed with — normally already there
+                .add('image', lambda m: m.run_step('image', m.ensure_image), writes=['image'])
+                # User-specific config files; the static stack files only
+                # if they changed since warm_deploy_standby
+                .add('docker-files', lambda m: m._sync_docker_files(rec, path, extra={
+                    f'{path}/.env': env_content,
+                    f'{path}/openclaw-config.yaml': config_content,
+                }), reads=['image'], writes=['stack-files'])
+                # human-browser skill files on the host (mounted into container)
+                .add('human-browser-files', lambda m: m._sync_human_browser_files(rec, path),
+                     writes=['human-browser-files'])
+                .add('recreate-container', recreate,
+                     reads=['stack-files', 'human-browser-files', 'image'], writes=['container'])
+                .add('container-ready', container_ready, writes=['container'])
+                # Reinstall Chromium profile (lost when container is recreated from image)
+                .add('browser-profile', lambda m: m.run_step('browser-profile', m.install_browser_in_container),
+                     reads=['container'], writes=['config'])
+                # human-browser Playwright deps live on the host (survive recreate),
+                # built from the existing image — no need to wait for the container
+                .add('human-browser', lambda m: m._sync_human_browser(rec, path),
+                     reads=['image', 'human-browser-files'], writes=['human-browser-deps'])
+                # Set model + fallbacks (one openclaw.json write)
+                .add('token-optimization', lambda m: m.run_step(
+                    'token-optimization', m.configure_token_optimization, model_slug,
+                    openrouter_model=openrouter_model,
+                ), writes=['config'])
+                .add('host-services', lambda m: m._sync_host_services(rec), writes=['host-services'])
+                .add('prune-skills', lambda m: m._sync_prune_skills(rec), reads=['container'], writes=['skills'])
+                # Multi-agent workspace files and config (with OpenRouter auth)
+                .add('agents', lambda m: m._sync_agents(rec, openrouter_key=openrouter_key),
+                     reads=['container'], writes=['config', 'agent-files'])
+                # Restarts the container when the config changed
+                .add('apply-config', apply_config, writes=['config', 'container'])
+                .add('browser-start', start_browser, reads=['container', 'config'])
+                # SearXNG (via Brave adapter) + Lightpanda browser
+                .add('searxng', lambda m: m.run_step('searxng', m.configure_searxng_provider),
+                     writes=['config', 'container'])
+                .run()
             )
 
-            # Configure SearXNG (via Brave adapter) + Lightpanda browser
-            self.configure_searxng_provider()
-
             self.server.openclaw_running = True
+            self.server.status = 'active'
             self.server.gateway_token = gateway_token
             self.server.last_error = ''
             self.server.save()
-            logger.info(f'Warm deploy complete on {self.server.ip_address}')
+            logger.info(f'Quick deploy complete on {self.server.ip_address}')
             return True
 
         except Exception as e:
-            logger.error(f'warm_deploy_standby failed on {self.server.ip_address}: {e}')
+            self.server.status = 'error'
             self.server.last_error = str(e)[:500]
             self.server.save()
+            logger.error(f'quick_deploy_user failed on {self.server.ip_address}: {e}')
             return False
 
-    def quick_deploy_user(self, openrouter_key, telegram_token, model_slug, telegram_owner_id=None):
-        """Fast user deployment on an already-warmed server (~30-60s).
+    @staticmethod
+    def _standby_env_content(gateway_token):
+        """Generic .env — no user keys, just enough to start the container"""
+        return f"""OPENROUTER_API_KEY=placeholder
+TELEGRAM_BOT_TOKEN=placeholder
+OPENCLAW_GATEWAY_TOKEN={gateway_token}
+BRAVE_API_KEY=local-searxng
+LOG_LEVEL=info
+"""
+
+    @staticmethod
+    def _standby_config_content(gateway_token):
+        """Generic config — no telegram channel, default model"""
+        return f"""provider: openrouter
+model: openrouter/anthropic/claude-sonnet-4
 
-        Skips Chromium install, doctor, token optimization (already done by
-        warm_deploy_standby). Only injects user-specific config and restarts.
-        """
-        import secrets
-        import time
-        path = self.server.openclaw_path
+gateway:
+  mode: local
+  bind: lan
+  controlUi:
+    dangerouslyDisableDeviceAuth: true
+  auth:
+    type: token
+    token: {gateway_token}
 
-        model_mapping = getattr(settings, 'MODEL_MAPPING', {})
-        base_model = model_mapping.get(model_slug, 'anthropic/claude-sonnet-4')
-        openrouter_model = f'openrouter/{base_model}'
-        gateway_token = secrets.token_urlsafe(32)
+limits:
+  max_tokens_per_message: 4096
+  max_context_messages: 30
+"""
 
-        # User-specific .env
-        env_content = f"""OPENROUTER_API_KEY={openrouter_key}
+    @staticmethod
+    def _user_env_content(openrouter_key, telegram_token, gateway_token):
+        """User-specific .env"""
+        return f"""OPENROUTER_API_KEY={openrouter_key}
 TELEGRAM_BOT_TOKEN={telegram_token}
 OPENCLAW_GATEWAY_TOKEN={gateway_token}
 BRAVE_API_KEY=local-searxng
 LOG_LEVEL=info
 """
 
+    @staticmethod
+    def _user_config_content(openrouter_key, openrouter_model, telegram_token, gateway_token,
+                             telegram_owner_id=None):
+        """User-specific openclaw-config.yaml with the telegram channel"""
         # Build allowFrom — restrict to owner's Telegram ID if known
         allow_from = f'["{telegram_owner_id}"]' if telegram_owner_id else '["*"]'
-
-        # User-specific config with telegram channel
-        config_content = f"""provider: openrouter
+        return f"""provider: openrouter
 model: {openrouter_model}
 api_key: {openrouter_key}
 
@@ -1009,84 +1841,92 @@ limits:
   max_context_messages: 30
 """
 
-        try:
-            self.connect()
-
-            # Upload user-specific config files
-            self.upload_file(env_content, f'{path}/.env')
-            self.upload_file(config_content, f'{path}/openclaw-config.yaml')
-
-            # Ensure latest docker-compose with SearXNG + Lightpanda
-            self._upload_docker_files(path)
-
-            # Upload human-browser skill files to host (mounted into container)
-            self._upload_human_browser_files(path)
-
-            # Recreate to pick up new .env (restart doesn't reload env vars)
-            self.exec_command(f'cd {path} && docker compose up -d --force-recreate')
-            time.sleep(8)
-
-            # Reinstall Chromium (lost when container is recreated from image)
-            self.install_browser_in_container()
-
-            # Install human-browser Playwright deps
-            self.install_human_browser()
-
-            self._fix_permissions()
-
-            # Set model + fallbacks
-            self.exec_command(
-                f'docker exec openclaw node /app/openclaw.mjs models set {openrouter_model}'
-            )
-            self.configure_token_optimization(model_slug)
-            self.install_session_watchdog()
-
-            # Prune unused built-in skills
-            self.prune_builtin_skills()
-
-            # Install multi-agent workspace files and config (with OpenRouter auth)
-            self.install_agents(openrouter_key=openrouter_key)
-
-            # Apply user-specific config (auth-profiles, telegram) with retry
-            # This runs AFTER install_agents so it has the final say on auth/model
-            config_ok = self._apply_config_with_retry(openrouter_key, openrouter_model, telegram_owner_id)
-
-            if not config_ok:
-                from .tasks import send_telegram_message, ADMIN_TELEGRAM_ID
-                send_telegram_message(
-                    ADMIN_TELEGRAM_ID,
-                    f'🚨 quick_deploy_user config verification FAILED\n'
-                    f'Server: {self.server.ip_address}\n'
-                    f'Manual intervention may be needed.'
-                )
-                self.server.status = 'error'
-                self.server.last_error = 'Quick deploy config verification failed'
-                self.server.save()
-                return False
-
-            # Start browser with headless profile (CLI still works at this point)
-            self.exec_command(
-                'docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless'
-            )
+    def warm_standby_token(self):
+        """Gateway token of an untouched warm standby, '' otherwise.
 
-            # Configure SearXNG (via Brave adapter) + Lightpanda browser
-            self.configure_searxng_provider()
+        Untouched: the openclaw container runs the image the server is pinned
+        to (image_release()) and .env still has the placeholder Telegram token
+        (no user was ever deployed).
+        """
+        path = self.server.openclaw_path
+        image_id = self.image_release().get('id')
+        self.connect()
+        out, _, code = self.exec_command(
+            f"docker inspect -f '{{{{.State.Running}}}} {{{{.Image}}}}' openclaw 2>/dev/null; "
+            f"grep -qx 'TELEGRAM_BOT_TOKEN=placeholder' {path}/.env && "
+            f"sed -n 's/^OPENCLAW_GATEWAY_TOKEN=//p' {path}/.env"
+        )
+        lines = out.split()
+        if code != 0 or len(lines) != 3 or not image_id or lines[:2] != ['true', image_id]:
+            return ''
+        return lines[2]
+
+    def _hot_deploy_user(self, openrouter_key, telegram_token, model_slug, telegram_owner_id=None):
+        """Inject a user into a running warm standby without recreating the stack.
+
+        `docker compose up --force-recreate` lost the container's Chromium
+        state, so quick_deploy_user had to reinstall the browser profile and
+        then restart again in _apply_config_with_retry. Here the user's
+        values go where the running stack reads them:
+          - openclaw.json in the config volume: telegram channel (botToken
+            in the config wins over the placeholder TELEGRAM_BOT_TOKEN env),
+            model, token optimization; auth-profiles.json for every agent
+          - .env / openclaw-config.yaml on the host — the env overlay that
+            a later recreate starts from
+        and only the openclaw service is restarted; searxng, lightpanda,
+        valkey and the adapters stay up. The gateway token of the warm
+        .env is kept, so the container env still matches.
+
+        Returns False when the server isn't an untouched warm standby on the
+        current image and stack files (nothing is changed then), or when the
+        config doesn't verify — either way the caller recreates the stack.
+        """
+        path = self.server.openclaw_path
+        openrouter_model = self._ensure_openrouter_prefix(
+            getattr(settings, 'MODEL_MAPPING', {}).get(model_slug, 'anthropic/claude-sonnet-4')
+        )
 
-            self.server.openclaw_running = True
-            self.server.status = 'active'
-            self.server.gateway_token = gateway_token
-            self.server.last_error = ''
-            self.server.save()
-            logger.info(f'Quick deploy complete on {self.server.ip_address}')
-            return True
+        with self.journal_step('hot-precheck'):
+            gateway_token = self.warm_standby_token()
+            stack_current = gateway_token and Reconciler(self).current('docker-files', (self._docker_files(path),))
+        if not stack_current:
+            logger.info(f'{self.server.ip_address} is not a warm standby on the current stack, recreating')
+            return False
 
-        except Exception as e:
-            self.server.status = 'error'
-            self.server.last_error = str(e)[:500]
-            self.server.save()
-            logger.error(f'quick_deploy_user failed on {self.server.ip_address}: {e}')
+        logger.info(f'Hot user injection on {self.server.ip_address}...')
+        self.run_step('user-files', self.upload_many, {
+            f'{path}/.env': self._user_env_content(openrouter_key, telegram_token, gateway_token),
+            f'{path}/openclaw-config.yaml': self._user_config_content(
+                openrouter_key, openrouter_model, telegram_token, gateway_token, telegram_owner_id,
+            ),
+        })
+        self.run_step('telegram-config', self.patch_openclaw_config, ConfigPatch().merge('channels.telegram', {
+            'enabled': True,
+            'botToken': telegram_token,
+            'dmPolicy': 'pairing',
+            'allowFrom': [str(telegram_owner_id) if telegram_owner_id else '*'],
+            'groupPolicy': 'allowlist',
+            'streamMode': 'partial',
+        }))
+        self.run_step(
+            'token-optimization', self.configure_token_optimization, model_slug, openrouter_model=openrouter_model,
+        )
+        # Writes auth-profiles + model, restarts openclaw only and verifies;
+        # one attempt — the recreate path has its own retries
+        if not self.run_step(
+            'apply-config', self._apply_config_with_retry, openrouter_key, openrouter_model, telegram_owner_id,
+            attempts=1,
+        ):
             return False
 
+        self.server.openclaw_running = True
+        self.server.status = 'active'
+        self.server.gateway_token = gateway_token
+        self.server.last_error = ''
+        self.server.save()
+        logger.info(f'Hot user injection complete on {self.server.ip_address}')
+        return True
+
     def _fix_permissions(self):
         """No-op: OpenClaw now runs as root inside the container."""
         pass
@@ -1107,111 +1947,123 @@ limits:
         }
         auth_json = json.dumps(auth_profiles)
 
+        self._fix_permissions()
+
         # Write auth-profiles.json to ALL agent directories (main + sub-agents)
         self.upload_file(auth_json, '/tmp/_openclaw_auth.json')
+        batch = self.batch()
         agent_dirs = ['main'] + self.AGENT_IDS
         for agent_id in agent_dirs:
             agent_path = f'/root/.openclaw/agents/{agent_id}/agent'
-            self.exec_command(f'docker exec openclaw mkdir -p {agent_path}')
-            self.exec_command(
-                f'docker cp /tmp/_openclaw_auth.json openclaw:{agent_path}/auth-profiles.json'
+            batch.add(
+                f'docker exec openclaw mkdir -p {agent_path} && '
+                f'docker cp /tmp/_openclaw_auth.json openclaw:{agent_path}/auth-profiles.json',
+                name=f'auth:{agent_id}',
             )
-        self.exec_command('rm -f /tmp/_openclaw_auth.json')
+        batch.add('rm -f /tmp/_openclaw_auth.json')
 
-        self._fix_permissions()
+        result = batch.run()
+        if not result.ok:
+            logger.warning(f'Config apply issues on {self.server.ip_address}: {result.failures}')
 
-        # Ensure model has openrouter/ prefix (provider is inferred from model prefix)
+        # Ensure model has openrouter/ prefix (provider is inferred from model prefix),
+        # keep the /model aliases and set dmPolicy to pairing — users must
+        # approve via pairing code. One write to openclaw.json.
         openrouter_model = self._ensure_openrouter_prefix(openrouter_model)
-        self.exec_command(
-            f'docker exec openclaw node /app/openclaw.mjs models set {openrouter_model}'
-        )
-
-        # Re-apply model aliases (models set overwrites agents.defaults.models)
-        self._apply_model_aliases()
-
-        # Set dmPolicy to pairing — users must approve via pairing code
-        self.exec_command(
-            'docker exec openclaw node /app/openclaw.mjs config set channels.telegram.dmPolicy pairing'
-        )
+        patch = self._model_patch(openrouter_model)
+        patch.set('channels.telegram.dmPolicy', 'pairing')
+        try:
+            self.patch_openclaw_config(patch)
+        except Exception as e:
+            logger.warning(f'Config patch failed on {self.server.ip_address}: {e}')
 
     def _verify_config(self, openrouter_key, openrouter_model, telegram_owner_id=None):
         """
         Verify that all critical OpenClaw settings are correctly applied.
         Returns (ok: bool, failures: list[str]).
+
+        The checks are independent and run concurrently (see verification.py).
         """
-        failures = []
+        expected_id = f'"{telegram_owner_id}"' if telegram_owner_id else '"*"'
 
-        # 1. dmPolicy must be "pairing"
-        out, _, _ = self.exec_command(
-            'docker exec openclaw node /app/openclaw.mjs config get channels.telegram.dmPolicy'
-        )
-        if 'pairing' not in out.strip():
-            failures.append(f'dmPolicy={out.strip()!r} (expected "pairing")')
+        def eacces(out, err, code):
+            count = int(out.strip()) if out.strip().isdigit() else 0
+            return count == 0, f'{count} EACCES permission errors in logs'
+
+        checks = [
+            # 1. dmPolicy must be "pairing"
+            verification.config_value(
+                'dm-policy', 'channels.telegram.dmPolicy',
+                lambda value: value == 'pairing',
+                lambda value: f'dmPolicy={value!r} (expected "pairing")',
+            ),
+            # 2. Model must contain openrouter/ — check logs; force-fixed below if wrong
+            Check(
+                'model',
+                'docker logs openclaw --tail 30 2>&1 | grep "agent model:" | tail -1',
+                lambda out, err, code: (
+                    'openrouter/' in out,
+                    f'model not set to openrouter (logs={out.strip()!r}), re-applied',
+                ),
+            ),
+            # 3. Auth profiles file must exist and contain the key
+            Check(
+                'auth-profiles',
+                'docker exec openclaw cat /root/.openclaw/agents/main/agent/auth-profiles.json 2>/dev/null',
+                lambda out, err, code: (
+                    code == 0 and openrouter_key in out, 'auth-profiles.json missing or wrong key',
+                ),
+            ),
+            # 4. Container must be running (not restarting)
+            verification.container_status('openclaw'),
+            # 5. No permission errors in recent logs
+            Check('eacces', 'docker logs openclaw --tail 20 2>&1 | grep -c "EACCES"', eacces),
+            # 6. Telegram provider must be started
+            Check(
+                'telegram',
+                'docker logs openclaw --tail 50 2>&1 | grep "\\[telegram\\]" | tail -1',
+                lambda out, err, code: (
+                    'starting provider' in out,
+                    f'telegram provider not started (last telegram log: {out.strip()!r})',
+                ),
+            ),
+            # 7. telegram-allowFrom.json must have correct allowFrom
+            Check(
+                'allow-from',
+                'docker exec openclaw cat /root/.openclaw/credentials/telegram-allowFrom.json 2>/dev/null',
+                lambda out, err, code: (
+                    code == 0 and expected_id in out,
+                    f'telegram-allowFrom.json missing {expected_id} (content={out.strip()!r})',
+                ),
+            ),
+        ]
+        results = verification.run_checks(self, checks)
 
-        # 2. Model must contain openrouter/ — check logs; force-fix if wrong
-        out, _, _ = self.exec_command(
-            'docker logs openclaw --tail 30 2>&1 | grep "agent model:" | tail -1'
-        )
-        if 'openrouter/' not in out:
-            # Force re-set the model with openrouter/ prefix
+        # Force re-set the model with openrouter/ prefix
+        if not next(r for r in results if r.name == 'model').ok:
             openrouter_model = self._ensure_openrouter_prefix(openrouter_model)
-            self.exec_command(
-                f'docker exec openclaw node /app/openclaw.mjs models set {openrouter_model}'
-            )
-            failures.append(f'model not set to openrouter (logs={out.strip()!r}), re-applied')
-
-        # 3. Auth profiles file must exist and contain the key
-        out, _, code = self.exec_command(
-            'docker exec openclaw cat /root/.openclaw/agents/main/agent/auth-profiles.json 2>/dev/null'
-        )
-        if code != 0 or openrouter_key not in out:
-            failures.append('auth-profiles.json missing or wrong key')
-
-        # 4. Container must be running (not restarting)
-        out, _, _ = self.exec_command('docker inspect openclaw --format={{.State.Status}} 2>/dev/null')
-        if 'running' not in out.strip():
-            failures.append(f'container status={out.strip()!r} (expected "running")')
-
-        # 5. No permission errors in recent logs
-        out, _, _ = self.exec_command(
-            'docker logs openclaw --tail 20 2>&1 | grep -c "EACCES"'
-        )
-        eacces_count = int(out.strip()) if out.strip().isdigit() else 0
-        if eacces_count > 0:
-            failures.append(f'{eacces_count} EACCES permission errors in logs')
-
-        # 6. Telegram provider must be started
-        out, _, _ = self.exec_command(
-            'docker logs openclaw --tail 50 2>&1 | grep "\\[telegram\\]" | tail -1'
-        )
-        if 'starting provider' not in out:
-            failures.append(f'telegram provider not started (last telegram log: {out.strip()!r})')
-
-        # 7. telegram-allowFrom.json must have correct allowFrom
-        out, _, code = self.exec_command(
-            'docker exec openclaw cat /root/.openclaw/credentials/telegram-allowFrom.json 2>/dev/null'
-        )
-        expected_id = f'"{telegram_owner_id}"' if telegram_owner_id else '"*"'
-        if code != 0 or expected_id not in out:
-            failures.append(f'telegram-allowFrom.json missing {expected_id} (content={out.strip()!r})')
+            self.patch_openclaw_config(self._model_patch(openrouter_model))
 
+        failures = verification.failures_of(results)
         return (len(failures) == 0, failures)
 
-    def _apply_config_with_retry(self, openrouter_key, openrouter_model, telegram_owner_id=None):
+    def _apply_config_with_retry(self, openrouter_key, openrouter_model, telegram_owner_id=None,
+                                 attempts=CONFIG_MAX_RETRIES):
         """
         Apply config, restart container so running process loads it,
         then verify. Retry on failure.
         Returns True if config is verified correct, False if all retries exhausted.
         """
-        import time
         path = self.server.openclaw_path
         failures = []
 
-        for attempt in range(1, CONFIG_MAX_RETRIES + 1):
+        for attempt in range(1, attempts + 1):
             logger.info(
-                f'Config apply attempt {attempt}/{CONFIG_MAX_RETRIES} '
+                f'Config apply attempt {attempt}/{attempts} '
                 f'on {self.server.ip_address}'
             )
+            if attempt > 1:
+                self._track(retries=1)
 
             # Fix permissions before every attempt
             self._fix_permissions()
@@ -1219,10 +2071,11 @@ limits:
             # Apply all settings (writes JSON files + CLI config set)
             self._apply_config(openrouter_key, openrouter_model, telegram_owner_id)
 
-            # Restart container so the running process picks up new config
-            logger.info(f'Restarting container to apply config...')
-            self.exec_command(f'cd {path} && docker compose restart')
-            time.sleep(12)
+            # Restart openclaw so the running process picks up new config
+            # (searxng, lightpanda, valkey and the adapters don't read it)
+            logger.info(f'Restarting openclaw to apply config...')
+            self.exec_command(f'cd {path} && docker compose restart openclaw')
+            self.wait_ready(readiness.GATEWAY_READY, what='gateway')
 
             # Fix permissions again after restart
             self._fix_permissions()
@@ -1231,7 +2084,7 @@ limits:
             self._apply_config(openrouter_key, openrouter_model, telegram_owner_id)
 
             # Wait for Telegram provider to start
-            time.sleep(8)
+            self.wait_ready(readiness.TELEGRAM_READY, timeout=45, what='telegram provider')
 
             # Verify
             ok, failures = self._verify_config(openrouter_key, openrouter_model, telegram_owner_id)
@@ -1247,28 +2100,29 @@ limits:
                 f'for {self.server.ip_address}: {failures}'
             )
 
-            if attempt < CONFIG_MAX_RETRIES:
+            if attempt < attempts:
+                # Growing back-off, but cut short as soon as the gateway is up
                 delay = CONFIG_RETRY_BASE_DELAY * attempt
-                logger.info(f'Waiting {delay}s before retry...')
-                time.sleep(delay)
+                logger.info(f'Waiting up to {delay}s for gateway before retry...')
+                self.wait_ready(readiness.GATEWAY_READY, timeout=delay, what='gateway')
 
         # All retries exhausted
         logger.error(
-            f'Config verification FAILED after {CONFIG_MAX_RETRIES} attempts '
+            f'Config verification FAILED after {attempts} attempts '
             f'on {self.server.ip_address}. Last failures: {failures}'
         )
         return False
 
+    @journaled('full')
     def deploy_openclaw(self, openrouter_key, telegram_token, model_slug, telegram_owner_id=None):
         """Настроить и запустить OpenClaw на сервере"""
         import secrets
-        import time
         path = self.server.openclaw_path
 
         model_mapping = getattr(settings, 'MODEL_MAPPING', {})
         base_model = model_mapping.get(model_slug, 'anthropic/claude-sonnet-4')
         openrouter_model = f'openrouter/{base_model}'
-        gateway_token = secrets.token_urlsafe(32)
+        gateway_token = self.journal.remember('gateway-token', lambda: secrets.token_urlsafe(32))
 
         env_content = f"""OPENROUTER_API_KEY={openrouter_key}
 TELEGRAM_BOT_TOKEN={telegram_token}
@@ -1309,21 +2163,22 @@ limits:
 
         try:
             self.connect()
+            rec = Reconciler(self)
+
+            # Image first: docker-compose.yml references the pinned image
+            self.run_step('image', self.ensure_image)
 
             # Upload all config files
-            self.upload_file(env_content, f'{path}/.env')
-            self.upload_file(config_content, f'{path}/openclaw-config.yaml')
-            self._upload_docker_files(path)
+            self._sync_docker_files(rec, path, extra={
+                f'{path}/.env': env_content,
+                f'{path}/openclaw-config.yaml': config_content,
+            })
 
             # Upload human-browser skill files to host (mounted into container)
-            self._upload_human_browser_files(path)
-
-            # Stop existing container and clear stale config
-            self.exec_command(f'cd {path} && docker compose down 2>/dev/null || true')
-            self.exec_command('docker volume rm openclaw_config 2>/dev/null || true')
+            self._sync_human_browser_files(rec, path)
 
-            # Start container
-            out, err, code = self.exec_command(f'cd {path} && docker compose up -d --build', timeout=300)
+            # Stop existing container, clear stale config and start container
+            out, err, code = self.run_step('recreate-stack', self._recreate_stack, path)
 
             if code != 0:
                 self.server.openclaw_running = False
@@ -1333,45 +2188,43 @@ limits:
                 logger.error(f'Ошибка запуска OpenClaw на {self.server.ip_address}: {err}')
                 return False
 
-            time.sleep(8)
+            self.run_step('container-ready', self.require_ready, readiness.CONTAINER_READY, what='openclaw container')
 
             # Fix volume permissions
             self._fix_permissions()
 
-            # Clear any stale internal config
-            self.exec_command(
-                "docker exec openclaw rm -rf /root/.openclaw/openclaw.json 2>/dev/null || true"
+            # Clear any stale internal config (a step of its own: not repeated on resume)
+            self.run_step(
+                'clear-config', self.exec_command,
+                "docker exec openclaw rm -rf /root/.openclaw/openclaw.json 2>/dev/null || true",
             )
 
             # Install browser in container
-            self.install_browser_in_container()
+            self.run_step('browser-profile', self.install_browser_in_container)
 
             # Install human-browser Playwright deps
-            self.install_human_browser()
+            self._sync_human_browser(rec, path)
 
             # Run doctor to fix initial setup issues
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs doctor --fix')
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs config set gateway.mode local')
-            self.exec_command('docker exec openclaw node /app/openclaw.mjs config set gateway.bind lan')
+            self.run_step('gateway-config', self._init_gateway_config)
 
-            # Set model
-            self.exec_command(
-                f'docker exec openclaw node /app/openclaw.mjs models set {openrouter_model}'
+            # Set model and configure token optimization (one openclaw.json write)
+            self.run_step(
+                'token-optimization', self.configure_token_optimization, model_slug, openrouter_model=openrouter_model,
             )
-
-            # Configure token optimization
-            self.configure_token_optimization(model_slug)
-            self.install_session_watchdog()
+            self._sync_host_services(rec)
 
             # Prune unused built-in skills
-            self.prune_builtin_skills()
+            self._sync_prune_skills(rec)
 
             # Install multi-agent workspace files and config (with OpenRouter auth)
-            self.install_agents(openrouter_key=openrouter_key)
+            self._sync_agents(rec, openrouter_key=openrouter_key)
 
             # Apply config with restart + verify (includes restart cycle)
             # Runs AFTER install_agents so it has the final say on auth/model
-            config_ok = self._apply_config_with_retry(openrouter_key, openrouter_model, telegram_owner_id)
+            config_ok = self.run_step(
+                'apply-config', self._apply_config_with_retry, openrouter_key, openrouter_model, telegram_owner_id,
+            )
 
             if not config_ok:
                 from .tasks import send_telegram_message, ADMIN_TELEGRAM_ID
@@ -1388,12 +2241,13 @@ limits:
                 return False
 
             # Start the browser with headless profile (CLI still works at this point)
-            self.exec_command(
-                'docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless'
-            )
+            with self.journal_step('browser-start'):
+                self.exec_command(
+                    'docker exec openclaw node /app/openclaw.mjs browser start --browser-profile headless'
+                )
 
             # Configure SearXNG (via Brave adapter) + Lightpanda browser
-            self.configure_searxng_provider()
+            self.run_step('searxng', self.configure_searxng_provider)
 
             self.server.openclaw_running = True
             self.server.status = 'active'
@@ -1413,17 +2267,22 @@ limits:
 
     # ─── SearXNG + Lightpanda ────────────────────────────────────────
 
+    def _searxng_settings_content(self):
+        """Render SearXNG settings.yml with this server's secret key.
+
+        The key is derived from SECRET_KEY and the server id: unique per
+        server, yet stable across deploys so the 'docker-files' digest
+        (reconcile.py) doesn't change on every run.
+        """
+        secret = hmac.new(
+            settings.SECRET_KEY.encode('utf-8'), f'searxng:{self.server.pk}'.encode('utf-8'), hashlib.sha256,
+        ).hexdigest()
+        return SEARXNG_SETTINGS_YML.format(secret_key=secret)
+
     def _upload_searxng_settings(self):
         """Upload SearXNG settings.yml to the server."""
-        import secrets as secrets_mod
         path = self.server.openclaw_path
-
-        self.exec_command(f'mkdir -p {path}/searxng')
-
-        secret_key = secrets_mod.token_hex(32)
-        settings_content = SEARXNG_SETTINGS_YML.format(secret_key=secret_key)
-
-        self.upload_file(settings_content, f'{path}/searxng/settings.yml')
+        self.upload_many({f'{path}/searxng/settings.yml': self._searxng_settings_content()})
         logger.info(f'SearXNG settings uploaded to {self.server.ip_address}')
 
     def configure_searxng_provider(self):
@@ -1437,25 +2296,25 @@ limits:
         to SearXNG). BRAVE_API_KEY env var satisfies the API key check.
         """
         cli = 'docker exec openclaw node /app/openclaw.mjs'
-        commands = [
-            f'{cli} config set tools.web.search.provider brave',
-            f'{cli} config set tools.web.search.enabled true',
-            f'{cli} browser create-profile --name lightpanda --driver cdp --color "#0066CC" 2>/dev/null || true',
-            f'{cli} config set browser.profiles.lightpanda.cdpUrl http://lightpanda-adapter:9223',
-            f'{cli} config set browser.defaultProfile lightpanda',
-        ]
-        for cmd in commands:
-            out, err, code = self.exec_command(cmd)
-            if code != 0:
-                logger.warning(f'SearXNG/Lightpanda config failed: {cmd[-60:]} err={err[:200]}')
-
-        # Health check: verify SearXNG adapter responds
-        import time
-        time.sleep(3)
-        out, _, code = self.exec_command(
-            'docker exec openclaw curl -sf http://searxng-adapter:3000/res/v1/web/search?q=test\\&count=1 2>/dev/null'
+        out, err, code = self.exec_command(
+            f'{cli} browser create-profile --name lightpanda --driver cdp --color "#0066CC" 2>/dev/null || true'
         )
         if code != 0:
+            logger.warning(f'Lightpanda profile create failed: err={err[:200]}')
+
+        patch = (
+            ConfigPatch()
+            .merge('tools.web.search', {'provider': 'brave', 'enabled': True})
+            .merge('browser.profiles.lightpanda', {'cdpUrl': 'http://lightpanda-adapter:9223'})
+            .set('browser.defaultProfile', 'lightpanda')
+        )
+        try:
+            self.patch_openclaw_config(patch)
+        except Exception as e:
+            logger.warning(f'SearXNG/Lightpanda config failed on {self.server.ip_address}: {e}')
+
+        # Health check: wait for the SearXNG and Lightpanda adapters to respond
+        if not self.wait_ready(readiness.ADAPTERS_READY, timeout=30, what='SearXNG/Lightpanda adapters').ok:
             logger.warning(f'SearXNG health check failed on {self.server.ip_address}')
         else:
             logger.info(f'SearXNG + browser configured on {self.server.ip_address}')
@@ -1470,40 +2329,22 @@ limits:
         Reads/writes directly from the Docker volume on the host filesystem,
         so this works even when the openclaw container is crash-looping.
         """
-        vol_path = '/var/lib/docker/volumes/openclaw_config/_data/openclaw.json'
-        out, _, code = self.exec_command(f'cat {vol_path} 2>/dev/null')
-        if code != 0 or not out.strip():
-            return
-        try:
-            config = json.loads(out)
-        except json.JSONDecodeError:
-            return
-        changed = False
-
-        # Fix tools.web.search: remove invalid searxng provider/key
-        search = config.get('tools', {}).get('web', {}).get('search', {})
-        if 'searxng' in search:
-            del search['searxng']
-            changed = True
-        if search.get('provider') == 'searxng':
-            search['provider'] = 'brave'
-            changed = True
-
-        # Fix browser profiles: remove incomplete lightpanda profile (missing color)
-        profiles = config.get('browser', {}).get('profiles', {})
-        if 'lightpanda' in profiles and 'color' not in profiles['lightpanda']:
-            del profiles['lightpanda']
-            changed = True
-        # Reset default profile to headless if it was lightpanda (and profile was removed)
-        if config.get('browser', {}).get('defaultProfile') == 'lightpanda' and 'lightpanda' not in profiles:
-            config['browser']['defaultProfile'] = 'headless'
-            changed = True
-
-        if changed:
-            new_json = json.dumps(config, indent=2)
-            self.upload_file(new_json, '/tmp/_oc_fix.json')
-            self.exec_command(f'cp /tmp/_oc_fix.json {vol_path}')
-            self.exec_command('rm -f /tmp/_oc_fix.json')
+        def clean(config):
+            # Fix tools.web.search: remove invalid searxng provider/key
+            search = config.get('tools', {}).get('web', {}).get('search', {})
+            search.pop('searxng', None)
+            if search.get('provider') == 'searxng':
+                search['provider'] = 'brave'
+
+            # Fix browser profiles: remove incomplete lightpanda profile (missing color)
+            profiles = config.get('browser', {}).get('profiles', {})
+            if 'lightpanda' in profiles and 'color' not in profiles['lightpanda']:
+                del profiles['lightpanda']
+            # Reset default profile to headless if it was lightpanda (and profile was removed)
+            if config.get('browser', {}).get('defaultProfile') == 'lightpanda' and 'lightpanda' not in profiles:
+                config['browser']['defaultProfile'] = 'headless'
+
+        if self.patch_openclaw_config(ConfigPatch().update(clean)):
             # Restart container so it picks up the fixed config
             self.exec_command('docker restart openclaw 2>/dev/null')
             logger.info(f'Cleaned invalid config on {self.server.ip_address}')
@@ -1512,64 +2353,48 @@ limits:
         """Verify SearXNG + Lightpanda are running and accessible.
         Returns (ok: bool, failures: list[str]).
         """
-        failures = []
-
-        # 1. SearXNG container running
-        out, _, code = self.exec_command(
-            'docker inspect searxng --format={{.State.Status}} 2>/dev/null'
-        )
-        if 'running' not in out.strip():
-            failures.append(f'searxng container status={out.strip()!r}')
-
-        # 2. Valkey (Redis) container running
-        out, _, code = self.exec_command(
-            'docker inspect searxng-redis --format={{.State.Status}} 2>/dev/null'
-        )
-        if 'running' not in out.strip():
-            failures.append(f'valkey container status={out.strip()!r}')
-
-        # 3. Lightpanda container running
-        out, _, code = self.exec_command(
-            'docker inspect lightpanda --format={{.State.Status}} 2>/dev/null'
-        )
-        if 'running' not in out.strip():
-            failures.append(f'lightpanda container status={out.strip()!r}')
-
-        # 4. SearXNG adapter container running
-        out, _, code = self.exec_command(
-            'docker inspect searxng-adapter --format={{.State.Status}} 2>/dev/null'
-        )
-        if 'running' not in out.strip():
-            failures.append(f'searxng-adapter container status={out.strip()!r}')
-
-        # 5. Adapter responds with Brave-format JSON
-        out, _, code = self.exec_command(
-            'docker exec openclaw wget -qO- "http://searxng-adapter:3000/res/v1/web/search?q=test&count=3" 2>/dev/null | head -c 300',
-            timeout=15,
-        )
-        if code != 0 or '"web"' not in out:
-            failures.append(f'SearXNG adapter not responding (code={code})')
-
-        # 6. OpenClaw config has brave provider (adapter translates to SearXNG)
-        out, _, _ = self.exec_command(
-            'docker exec openclaw node /app/openclaw.mjs config get tools.web.search.provider 2>/dev/null'
-        )
-        if 'brave' not in out.strip().lower():
-            failures.append(f'search provider not set to brave')
-
+        checks = [
+            # 1-4. SearXNG, Valkey (Redis), Lightpanda and adapter containers running
+            verification.container_status('searxng'),
+            verification.container_status('searxng-redis', label='valkey'),
+            verification.container_status('lightpanda'),
+            verification.container_status('searxng-adapter'),
+            # 5. Adapter responds with Brave-format JSON
+            Check(
+                'adapter',
+                'docker exec openclaw wget -qO- "http://searxng-adapter:3000/res/v1/web/search?q=test&count=3" 2>/dev/null | head -c 300',
+                lambda out, err, code: (
+                    code == 0 and '"web"' in out, f'SearXNG adapter not responding (code={code})',
+                ),
+                timeout=15,
+            ),
+            # 6. OpenClaw config has brave provider (adapter translates to SearXNG)
+            verification.config_value(
+                'search-provider', 'tools.web.search.provider',
+                lambda value: 'brave' in str(value or '').lower(),
+                lambda value: 'search provider not set to brave',
+            ),
+        ]
+        failures = verification.failures_of(verification.run_checks(self, checks))
         return (not failures, failures)
 
     def install_searxng(self):
         """Install SearXNG + Lightpanda on an existing server (retrofit).
 
-        Rebuilds the Docker image (sed-patches Brave URL to local adapter),
+        Fetches the Docker image (sed-patches Brave URL to local adapter),
         starts all containers including the adapter, and configures OpenClaw.
         """
-        import time
         path = self.server.openclaw_path
 
         logger.info(f'Installing SearXNG + Lightpanda on {self.server.ip_address}...')
 
+        # Image with the sed patch (prebuilt, see images.py)
+        try:
+            self.ensure_image()
+        except RuntimeError as e:
+            logger.error(f'SearXNG install failed on {self.server.ip_address}: {e}')
+            return False
+
         # Upload Dockerfile (with sed patch), docker-compose, SearXNG settings, adapter
         self._upload_docker_files(path)
 
@@ -1578,9 +2403,9 @@ limits:
             f'grep -q BRAVE_API_KEY {path}/.env || echo "BRAVE_API_KEY=local-searxng" >> {path}/.env'
         )
 
-        # Rebuild image (applies sed patch) + start all containers
+        # Start all containers
         out, err, code = self.exec_command(
-            f'cd {path} && docker compose up -d --build',
+            f'cd {path} && docker compose up -d',
             timeout=300,
         )
         if code != 0:
@@ -1591,20 +2416,8 @@ limits:
         self._clean_invalid_searxng_config()
 
         # Wait for openclaw container to be running and ready
-        for _ in range(12):
-            time.sleep(10)
-            out, _, _ = self.exec_command(
-                'docker inspect openclaw --format={{.State.Status}} 2>/dev/null'
-            )
-            if out.strip() == 'running':
-                # Verify CLI works
-                _, _, code = self.exec_command(
-                    'docker exec openclaw node /app/openclaw.mjs config get browser.headless 2>/dev/null'
-                )
-                if code == 0:
-                    break
-        else:
-            logger.warning(f'openclaw container not ready after 120s on {self.server.ip_address}')
+        if not self.wait_ready(readiness.CONTAINER_READY, timeout=120, what='openclaw container').ok:
+            return False
 
         # Configure OpenClaw: provider=brave (adapter translates to SearXNG)
         self.configure_searxng_provider()
@@ -1630,42 +2443,18 @@ limits:
 
         If openrouter_key is provided, writes auth-profiles with
         default=openrouter to main + all sub-agents, ensuring no drift.
-        """
-        import os
 
+        Returns False if the config couldn't be applied or an agent is
+        missing afterwards (the 'agents' deploy step then runs again).
+        """
         logger.info(f'Installing agents on {self.server.ip_address}...')
 
-        agents_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'openclaw-config', 'agents',
-        )
-        agents_config_path = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'openclaw-config', 'openclaw-agents.json',
-        )
-
-        # Create agent workspace directories and upload files
-        for agent_id in self.AGENT_IDS:
-            container_dir = f'/root/.openclaw/agents/{agent_id}'
-            self.exec_command(
-                f'docker exec openclaw mkdir -p {container_dir}'
-            )
+        agents_config_path = bundles.AGENTS_CONFIG_FILE
 
-            for filename in self.AGENT_FILES:
-                local_path = os.path.join(agents_dir, agent_id, filename)
-                try:
-                    with open(local_path, 'r') as f:
-                        content = f.read()
-                except FileNotFoundError:
-                    logger.warning(f'Agent file not found: {local_path}')
-                    continue
-
-                tmp_path = f'/tmp/_agent_{agent_id}_{filename}'
-                self.upload_file(content, tmp_path)
-                self.exec_command(
-                    f'docker cp {tmp_path} openclaw:{container_dir}/{filename}'
-                )
-                self.exec_command(f'rm -f {tmp_path}')
+        # Stream all agent workspace files into the container as one tar
+        self.push_bundle(
+            bundles.agents_bundle(self.AGENT_IDS, self.AGENT_FILES), 'docker cp - openclaw:/',
+        )
 
         # Apply agents config via openclaw.json merge
         try:
@@ -1673,20 +2462,9 @@ limits:
                 agents_json = f.read()
         except FileNotFoundError:
             logger.error(f'openclaw-agents.json not found at {agents_config_path}')
-            return
-
-        # Read current openclaw.json from the Docker volume
-        vol_path = '/var/lib/docker/volumes/openclaw_config/_data/openclaw.json'
-        out, _, code = self.exec_command(f'cat {vol_path} 2>/dev/null')
+            return False
 
         import json as json_mod
-        if code == 0 and out.strip():
-            try:
-                config = json_mod.loads(out)
-            except json_mod.JSONDecodeError:
-                config = {}
-        else:
-            config = {}
 
         # Merge agents config (deep-merge to preserve agents.defaults.models)
         agents_config = json_mod.loads(agents_json)
@@ -1698,25 +2476,22 @@ limits:
             if model and not model.startswith('openrouter/'):
                 agent['model'] = f'openrouter/{model}'
 
-        if 'agents' not in config:
-            config['agents'] = {}
-        existing_defaults = config.get('agents', {}).get('defaults', {})
-        config['agents']['list'] = agents_config['agents']['list']
-        # Merge defaults: keep existing (e.g. models from `models set`) + add new
-        config['agents']['defaults'] = {
-            **existing_defaults,
-            **agents_config['agents'].get('defaults', {}),
-        }
-
-        # Write merged config back
-        merged_json = json_mod.dumps(config, indent=2, ensure_ascii=False)
-        self.upload_file(merged_json, '/tmp/_oc_agents.json')
-        self.exec_command(f'cp /tmp/_oc_agents.json {vol_path}')
-        self.exec_command('rm -f /tmp/_oc_agents.json')
+        # Replace the agents list; merge defaults: keep existing (e.g. models
+        # from `models set`) + add new. One atomic write to openclaw.json.
+        patch = ConfigPatch().set('agents.list', agents_config['agents']['list'])
+        for key, value in agents_config['agents'].get('defaults', {}).items():
+            patch.set(f'agents.defaults.{key}', value)
+        config_ok = True
+        try:
+            self.patch_openclaw_config(patch)
+        except Exception as e:
+            logger.warning(f'Agents config merge failed on {self.server.ip_address}: {e}')
+            config_ok = False
+        batch = self.batch()
 
         # Ensure main agent dir exists (warm_deploy_standby doesn't create it)
         main_agent_dir = '/root/.openclaw/agents/main/agent'
-        self.exec_command(f'docker exec openclaw mkdir -p {main_agent_dir}')
+        batch.add(f'docker exec openclaw mkdir -p {main_agent_dir}')
 
         # Write auth-profiles with default=openrouter to ALL agents
         if openrouter_key:
@@ -1732,38 +2507,45 @@ limits:
             self.upload_file(auth_profiles, '/tmp/_openclaw_auth.json')
             for agent_id in ['main'] + self.AGENT_IDS:
                 agent_auth_dir = f'/root/.openclaw/agents/{agent_id}/agent'
-                self.exec_command(f'docker exec openclaw mkdir -p {agent_auth_dir}')
-                self.exec_command(
-                    f'docker cp /tmp/_openclaw_auth.json openclaw:{agent_auth_dir}/auth-profiles.json'
+                batch.add(
+                    f'docker exec openclaw mkdir -p {agent_auth_dir} && '
+                    f'docker cp /tmp/_openclaw_auth.json openclaw:{agent_auth_dir}/auth-profiles.json',
+                    name=f'auth:{agent_id}',
                 )
-            self.exec_command('rm -f /tmp/_openclaw_auth.json')
-            logger.info(f'Auth-profiles (default=openrouter) written to all agents on {self.server.ip_address}')
+            batch.add('rm -f /tmp/_openclaw_auth.json')
         else:
             # No key provided — copy from main agent to sub-agents if main exists
             for agent_id in self.AGENT_IDS:
                 agent_auth_dir = f'/root/.openclaw/agents/{agent_id}/agent'
-                self.exec_command(f'docker exec openclaw mkdir -p {agent_auth_dir}')
+                batch.add(f'docker exec openclaw mkdir -p {agent_auth_dir}')
                 for fname in ['auth-profiles.json', 'models.json']:
-                    self.exec_command(
+                    batch.add(
                         f'docker exec openclaw sh -c '
                         f'"[ -f {main_agent_dir}/{fname} ] && '
                         f'cp {main_agent_dir}/{fname} {agent_auth_dir}/{fname} || true"'
                     )
 
         # Verify agent directories exist
-        missing_agents = []
         for agent_id in self.AGENT_IDS:
-            out, _, code = self.exec_command(
-                f'docker exec openclaw ls /root/.openclaw/agents/{agent_id}/SOUL.md 2>/dev/null'
+            batch.add(
+                f'docker exec openclaw ls /root/.openclaw/agents/{agent_id}/SOUL.md 2>/dev/null',
+                name=f'verify:{agent_id}',
             )
-            if code != 0:
-                missing_agents.append(agent_id)
+        result = batch.run()
+        if openrouter_key:
+            logger.info(f'Auth-profiles (default=openrouter) written to all agents on {self.server.ip_address}')
+
+        missing_agents = [
+            agent_id for agent_id in self.AGENT_IDS
+            if not result[f'verify:{agent_id}'].ok
+        ]
         if missing_agents:
             logger.warning(f'Agent verification failed on {self.server.ip_address}: missing {missing_agents}')
-        else:
-            logger.info(f'All {len(self.AGENT_IDS)} agents verified on {self.server.ip_address}')
+            return False
+        logger.info(f'All {len(self.AGENT_IDS)} agents verified on {self.server.ip_address}')
 
         logger.info(f'Agents installed on {self.server.ip_address}')
+        return config_ok
 
     # ─── ClawdMatrix Engine (On-Demand Skills) ─────────────────────────
     #
@@ -1864,39 +2646,16 @@ message(action="send", to="<chat_id>", content="Описание", mediaUrl="/ab
         Deploys SKILL.md files to /app/skills/ as regular OpenClaw skills.
         Also cleans up old /app/clawdmatrix/ bundle and private directory.
         """
-        import os
-
         logger.info(f'Installing ClawdMatrix skills on {self.server.ip_address}...')
 
-        skills_dir = os.path.join(
-            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-            'clawdmatrix', 'skills',
+        # Clean up old locations, then stream skill files to /app/skills/
+        # (standard OpenClaw location) — one round trip for the whole set
+        self.push_bundle(
+            bundles.clawdmatrix_bundle(self.CLAWDMATRIX_SKILLS),
+            'docker exec openclaw rm -rf /app/clawdmatrix /root/.openclaw/clawdmatrix; '
+            'docker cp - openclaw:/',
         )
 
-        # Clean up old locations
-        self.exec_command('docker exec openclaw rm -rf /app/clawdmatrix')
-        self.exec_command('docker exec openclaw rm -rf /root/.openclaw/clawdmatrix')
-
-        # Deploy skill files to /app/skills/ (standard OpenClaw location)
-        for skill_name in self.CLAWDMATRIX_SKILLS:
-            local_path = os.path.join(skills_dir, skill_name, 'SKILL.md')
-            try:
-                with open(local_path, 'r') as f:
-                    content = f.read()
-            except FileNotFoundError:
-                logger.warning(f'ClawdMatrix SKILL.md not found: {local_path}')
-                continue
-
-            self.exec_command(
-                f'docker exec openclaw mkdir -p /app/skills/{skill_name}'
-            )
-            tmp_path = f'/tmp/_clawdmatrix_{skill_name}.md'
-            self.upload_file(content, tmp_path)
-            self.exec_command(
-                f'docker cp {tmp_path} openclaw:/app/skills/{skill_name}/SKILL.md'
-            )
-            self.exec_command(f'rm -f {tmp_path}')
-
         # Prune unused built-in skills to save tokens
         self.prune_builtin_skills()
 
@@ -1922,6 +2681,17 @@ message(action="send", to="<chat_id>", content="Описание", mediaUrl="/ab
 
         skill_md_content = resp.text
 
+        try:
+            self.agent.install_skill(skill_name, {'SKILL.md': skill_md_content})
+            self.state.invalidate(remote_state.SKILLS)
+            logger.info(f'Marketplace skill "{skill_name}" installed on {self.server.ip_address}')
+            return
+        except ControlAgentUnavailable:
+            pass
+        except ControlAgentError as e:
+            # The agent is only a faster transport: the SSH path may still succeed
+            logger.warning(f'Control agent skill install failed on {self.server.ip_address}, using SSH: {e}')
+
         # Create skill directory inside the container
         self.exec_command(f'docker exec openclaw mkdir -p /app/skills/{skill_name}')
 
@@ -1950,49 +2720,83 @@ message(action="send", to="<chat_id>", content="Описание", mediaUrl="/ab
 
     def uninstall_marketplace_skill(self, skill_name: str):
         """Remove a marketplace skill from the OpenClaw container."""
-        self.exec_command(f'docker exec openclaw rm -rf /app/skills/{skill_name}')
+        try:
+            self.agent.uninstall_skill(skill_name)
+            self.state.invalidate(remote_state.SKILLS)
+        except (ControlAgentUnavailable, ControlAgentError) as e:
+            if isinstance(e, ControlAgentError):
+                logger.warning(f'Control agent skill uninstall failed on {self.server.ip_address}, using SSH: {e}')
+            self.exec_command(f'docker exec openclaw rm -rf /app/skills/{skill_name}')
         logger.info(f'Marketplace skill "{skill_name}" uninstalled from {self.server.ip_address}')
 
+    @staticmethod
+    def skill_prune_plan(enabled, disabled, essential, remove):
+        """Split the listings of /app/skills and /app/skills-disabled into (disable, delete).
+
+        disable — non-essential skills to move out of /app/skills
+        delete  — VPS-useless skills, wherever they are
+        """
+        disable = sorted(s for s in enabled if s not in essential and s not in remove)
+        delete = sorted(
+            [f'/app/skills/{s}' for s in enabled if s not in essential and s in remove]
+            + [f'/app/skills-disabled/{s}' for s in disabled if s in remove]
+        )
+        return disable, delete
+
+    @staticmethod
+    def skill_prune_script(disable, delete):
+        """sh script applying a skill_prune_plan(); '' if there is nothing to do.
+
+        Stops at the first failed move, so its exit code reports it.
+        """
+        script = []
+        if delete:
+            script.append('rm -rf ' + ' '.join(shlex.quote(p) for p in delete))
+        if disable:
+            # -f: an older copy in skills-disabled is replaced by the image's version
+            script.append(
+                'for s in ' + ' '.join(shlex.quote(s) for s in disable) + '; do '
+                '{ rm -rf "/app/skills-disabled/$s" && mv "/app/skills/$s" /app/skills-disabled/; } || exit 1; done'
+            )
+        return ' && '.join(script)
+
     def prune_builtin_skills(self):
         """Move non-essential built-in skills to /app/skills-disabled/.
 
         Keeps only OPENCLAW_ESSENTIAL_SKILLS in /app/skills/ to reduce
         token overhead. VPS-useless skills are permanently deleted.
+        The plan is computed here from one listing and applied by a single
+        `docker exec` (see skill_prune_plan, skill_prune_script). Returns False
+        if that failed.
         """
         logger.info(f'Pruning built-in skills on {self.server.ip_address}...')
-        self.exec_command('docker exec openclaw mkdir -p /app/skills-disabled')
-
-        result = self.exec_command('docker exec openclaw ls /app/skills/')
-        if isinstance(result, tuple):
-            all_skills = [s.strip() for s in result[0].strip().split('\n') if s.strip()]
-        else:
-            all_skills = [s.strip() for s in result.strip().split('\n') if s.strip()]
-
-        removed = 0
-        for skill in all_skills:
-            if skill not in self.OPENCLAW_ESSENTIAL_SKILLS:
-                if skill in self.OPENCLAW_REMOVE_SKILLS:
-                    # Permanently delete VPS-useless skills
-                    self.exec_command(
-                        f'docker exec openclaw rm -rf /app/skills/{skill}'
-                    )
-                else:
-                    # Move potentially useful skills to disabled
-                    self.exec_command(
-                        f'docker exec openclaw mv /app/skills/{skill} /app/skills-disabled/{skill}'
-                    )
-                removed += 1
+        out, err, code = self.exec_command(
+            "docker exec openclaw sh -c 'mkdir -p /app/skills-disabled && ls -1 /app/skills "
+            "&& echo --- && ls -1 /app/skills-disabled'"
+        )
+        if code != 0 or '---' not in out:
+            logger.warning(f'Skill listing failed on {self.server.ip_address}: {(err or out)[:200]}')
+            return False
+        enabled, _, disabled = out.partition('---')
+        enabled = [s.strip() for s in enabled.split('\n') if s.strip()]
+        disabled = [s.strip() for s in disabled.split('\n') if s.strip()]
 
-        # Also clean VPS-useless from skills-disabled if present
-        for skill in self.OPENCLAW_REMOVE_SKILLS:
-            self.exec_command(
-                f'docker exec openclaw rm -rf /app/skills-disabled/{skill}'
-            )
+        disable, delete = self.skill_prune_plan(
+            enabled, disabled, self.OPENCLAW_ESSENTIAL_SKILLS, self.OPENCLAW_REMOVE_SKILLS,
+        )
+        script = self.skill_prune_script(disable, delete)
+        if script:
+            out, err, code = self.exec_command(f'docker exec openclaw sh -c {shlex.quote(script)}', timeout=120)
+            if code != 0:
+                logger.warning(f'Skill pruning failed on {self.server.ip_address}: {(err or out)[:200]}')
+                return False
 
+        removed = len(disable) + sum(1 for p in delete if p.startswith('/app/skills/'))
         logger.info(
             f'Pruned {removed} skills on {self.server.ip_address}, '
-            f'{len(all_skills) - removed} remaining'
+            f'{len(enabled) - removed} remaining'
         )
+        return True
 
     def enable_clawdmatrix(self, custom_domain_map=None, custom_skills=None):
         """Enable ClawdMatrix Engine with on-demand skill loading.
@@ -2045,13 +2849,11 @@ message(action="send", to="<chat_id>", content="Описание", mediaUrl="/ab
         """
         failures = []
 
-        # Check each SKILL.md exists in private directory
+        # Check each skill is installed in /app/skills (one cached listing)
+        installed = self.state.skills()
         for skill_name in self.CLAWDMATRIX_SKILLS:
-            out, _, code = self.exec_command(
-                f'docker exec openclaw ls {self.CLAWDMATRIX_SKILLS_PATH}/{skill_name}/SKILL.md 2>/dev/null'
-            )
-            if code != 0:
-                failures.append(f'{skill_name}/SKILL.md not found')
+            if skill_name not in installed:
+                failures.append(f'{skill_name} not found in /app/skills/')
 
         # Check CLAUDE.md exists with domain routing
         out, _, code = self.exec_command(
@@ -2063,11 +2865,9 @@ message(action="send", to="<chat_id>", content="Описание", mediaUrl="/ab
             failures.append('CLAUDE.md missing link verification rule')
 
         # Verify old /app/skills/clawdmatrix-* are gone (shouldn't be in available_skills)
-        out, _, code = self.exec_command(
-            'docker exec openclaw ls /app/skills/ 2>/dev/null | grep clawdmatrix'
-        )
-        if out.strip():
-            failures.append(f'Old clawdmatrix entries still in /app/skills/: {out.strip()}')
+        old = [s for s in self.state.skills() if 'clawdmatrix' in s and s not in self.CLAWDMATRIX_SKILLS]
+        if old:
+            failures.append(f'Old clawdmatrix entries still in /app/skills/: {" ".join(old)}')
 
         return (not failures, failures)
 
@@ -89,9 +89,11 @@ def install_openclaw_async(server_id):
         manager.exec_command(f'mkdir -p {server.openclaw_path}')
 
         # Upload Dockerfile, docker-compose (with SearXNG + Lightpanda), and SearXNG settings
-        from .services import DOCKERFILE_CONTENT, DOCKER_COMPOSE_WITH_CHROME
+        from .services import DOCKERFILE_CONTENT, docker_compose_content
         manager.upload_file(DOCKERFILE_CONTENT, f'{server.openclaw_path}/Dockerfile')
-        manager.upload_file(DOCKER_COMPOSE_WITH_CHROME, f'{server.openclaw_path}/docker-compose.yml')
+        manager.upload_file(
+            docker_compose_content(manager.image_release()['ref']), f'{server.openclaw_path}/docker-compose.yml',
+        )
         manager.exec_command(f'mkdir -p {server.openclaw_path}/searxng')
         import secrets as secrets_mod
         from .services import SEARXNG_SETTINGS_YML
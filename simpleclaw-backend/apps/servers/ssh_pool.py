@@ -0,0 +1,233 @@
+"""Process-wide pool of authenticated SSH transports, keyed by server id.
+
+Interactive endpoints (set-model, pairing approve, skill install) used to pay a
+full TCP + SSH handshake + password auth on every click. ServerManager now
+borrows a live transport from this pool in connect() and hands it back in
+disconnect(), so only the first request to a server pays the setup cost.
+"""
+import logging
+import os
+import threading
+import time
+
+import paramiko
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Seconds between SSH keepalive packets on pooled transports
+SSH_POOL_KEEPALIVE = getattr(settings, 'SSH_POOL_KEEPALIVE', 30)
+# Idle transports older than this are closed by the reaper
+SSH_POOL_IDLE_TIMEOUT = getattr(settings, 'SSH_POOL_IDLE_TIMEOUT', 300)
+# Max simultaneous transports (idle + borrowed) per server
+SSH_POOL_MAX_PER_HOST = getattr(settings, 'SSH_POOL_MAX_PER_HOST', 4)
+# How long acquire() waits for a free slot before giving up
+SSH_POOL_ACQUIRE_TIMEOUT = getattr(settings, 'SSH_POOL_ACQUIRE_TIMEOUT', 60)
+# Idle transports older than this get a round-trip probe before reuse
+SSH_POOL_PROBE_AFTER = getattr(settings, 'SSH_POOL_PROBE_AFTER', 60)
+
+
+class PooledConnection:
+    """An authenticated SSH connection owned by the pool."""
+
+    def __init__(self, key, client):
+        self.key = key
+        self.client = client
+        self.transport = client.get_transport()
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self._sftp = None
+
+    def is_alive(self):
+        t = self.transport
+        return t is not None and t.is_active() and t.is_authenticated()
+
+    def probe(self):
+        """Round-trip health check: open and close a session channel."""
+        try:
+            chan = self.transport.open_session(timeout=5)
+            chan.close()
+            return True
+        except Exception:
+            return False
+
+    def sftp(self):
+        """SFTP session bound to this connection, opened on first use and
+        reused by every later upload until the connection is closed."""
+        if self._sftp is None or self._sftp.sock.closed:
+            self._sftp = self.client.open_sftp()
+        return self._sftp
+
+    def close(self):
+        try:
+            if self._sftp is not None:
+                self._sftp.close()
+            self.client.close()
+        except Exception:
+            pass
+
+
+class SSHConnectionPool:
+    """Thread-safe pool of SSH connections with keepalive and idle eviction."""
+
+    def __init__(self, max_per_host=SSH_POOL_MAX_PER_HOST, idle_timeout=SSH_POOL_IDLE_TIMEOUT,
+                 keepalive=SSH_POOL_KEEPALIVE):
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._lock = threading.Condition()
+        self._idle = {}      # key -> [PooledConnection]
+        self._in_use = {}    # key -> count of borrowed connections
+        self._reaper = None
+
+    @staticmethod
+    def key_for(server):
+        """Pool key: server id plus credentials, so a password change recycles transports."""
+        return (
+            server.pk, server.ip_address, int(server.ssh_port or 22),
+            server.ssh_user, server.ssh_password or '',
+        )
+
+    def acquire(self, server, timeout=SSH_POOL_ACQUIRE_TIMEOUT):
+        """Borrow a healthy connection for `server`, opening a new one if needed."""
+        key = self.key_for(server)
+        deadline = time.monotonic() + timeout
+        self._ensure_reaper()
+
+        with self._lock:
+            while True:
+                conn = self._pop_idle(key)
+                if conn is not None:
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    break
+                if self._count(key) < self.max_per_host:
+                    # Reserve the slot, then connect outside the lock
+                    self._in_use[key] = self._in_use.get(key, 0) + 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(
+                        f'SSH pool exhausted for {server.ip_address} '
+                        f'({self.max_per_host} connections in use)'
+                    )
+                self._lock.wait(remaining)
+
+        if conn is not None:
+            if time.monotonic() - conn.last_used < SSH_POOL_PROBE_AFTER or conn.probe():
+                return conn
+            logger.info(f'Pooled SSH transport to {server.ip_address} failed probe, reconnecting')
+            conn.close()
+
+        try:
+            return self._open(key, server)
+        except Exception:
+            with self._lock:
+                self._in_use[key] -= 1
+                self._lock.notify_all()
+            raise
+
+    def release(self, conn, discard=False):
+        """Return a borrowed connection. Broken or discarded ones are closed."""
+        with self._lock:
+            self._in_use[conn.key] = max(self._in_use.get(conn.key, 1) - 1, 0)
+            if discard or not conn.is_alive():
+                conn.close()
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.setdefault(conn.key, []).append(conn)
+            self._lock.notify_all()
+
+    def evict(self, server):
+        """Close all idle connections to a server (e.g. after it is deleted)."""
+        prefix = server.pk
+        with self._lock:
+            for key in [k for k in self._idle if k[0] == prefix]:
+                for conn in self._idle.pop(key):
+                    conn.close()
+
+    def close_all(self):
+        with self._lock:
+            for conns in self._idle.values():
+                for conn in conns:
+                    conn.close()
+            self._idle.clear()
+
+    def reap_idle(self):
+        """Close idle connections that exceeded the idle timeout or died."""
+        now = time.monotonic()
+        with self._lock:
+            for key in list(self._idle):
+                keep = []
+                for conn in self._idle[key]:
+                    if now - conn.last_used > self.idle_timeout or not conn.is_alive():
+                        conn.close()
+                    else:
+                        keep.append(conn)
+                if keep:
+                    self._idle[key] = keep
+                else:
+                    del self._idle[key]
+            self._lock.notify_all()
+
+    # ─── internals ───────────────────────────────────────────────
+
+    def _count(self, key):
+        return self._in_use.get(key, 0) + len(self._idle.get(key, []))
+
+    def _pop_idle(self, key):
+        conns = self._idle.get(key)
+        while conns:
+            conn = conns.pop()
+            if conn.is_alive():
+                return conn
+            conn.close()
+        return None
+
+    def _open(self, key, server):
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        client.connect(
+            hostname=server.ip_address,
+            port=server.ssh_port,
+            username=server.ssh_user,
+            password=server.ssh_password or None,
+            timeout=30,
+        )
+        client.get_transport().set_keepalive(self.keepalive)
+        logger.info(f'SSH подключение к {server.ip_address} установлено (pool)')
+        return PooledConnection(key, client)
+
+    def _ensure_reaper(self):
+        if self._reaper is not None and self._reaper.is_alive():
+            return
+        self._reaper = threading.Thread(target=self._reap_loop, name='ssh-pool-reaper', daemon=True)
+        self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 5))
+            try:
+                self.reap_idle()
+            except Exception as e:
+                logger.warning(f'SSH pool reaper error: {e}')
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the process-wide pool, recreating it after fork.
+
+    Celery prefork and gunicorn workers fork after import; transports inherited
+    from the parent share sockets with it and must never be reused.
+    """
+    global _pool, _pool_pid
+    pid = os.getpid()
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = SSHConnectionPool()
+            _pool_pid = pid
+        return _pool
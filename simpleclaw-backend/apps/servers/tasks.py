@@ -60,7 +60,8 @@ def notify_error(error_type, details):
 def cleanup_error_servers():
     """Delete error servers from TimeWeb and database.
     Run every 10 minutes via celery beat.
-    Also cleans up stuck 'provisioning' servers older than 30 minutes.
+    Also cleans up stuck 'provisioning' servers older than 30 minutes
+    (and 'deleting' ones the autoscaler didn't finish).
     """
     from .models import Server
     from .timeweb import delete_server
@@ -70,12 +71,12 @@ def cleanup_error_servers():
 
     stuck_threshold = timezone.now() - timedelta(minutes=30)
 
-    # Pool servers that are in error OR stuck in provisioning/creating for 30+ min
+    # Pool servers that are in error OR stuck in provisioning/creating/deleting for 30+ min
     servers_to_clean = list(Server.objects.filter(
         profile__isnull=True,
     ).filter(
         Q(status='error') |
-        Q(status__in=['provisioning', 'creating'], updated_at__lt=stuck_threshold)
+        Q(status__in=['provisioning', 'creating', 'deleting'], updated_at__lt=stuck_threshold)
     ))
     
     if not servers_to_clean:
@@ -139,9 +140,11 @@ MAX_RETRY_ATTEMPTS = 3
 
 @shared_task
 def ensure_server_pool():
-    """Ensure there are always MIN_AVAILABLE_SERVERS unassigned ready servers.
+    """Keep the pool of unassigned ready servers at the autoscaler's target
+    (autoscaler.py; MIN_AVAILABLE_SERVERS when AUTOSCALE_ENABLED is off).
     Run this every 5 minutes via celery beat.
     """
+    from . import autoscaler
     from .models import Server
 
     # First cleanup any error servers
@@ -167,8 +170,23 @@ def ensure_server_pool():
         logger.warning(f'Total servers ({total_servers}) >= MAX ({MAX_TOTAL_SERVERS})')
         return
 
-    if total_pool < MIN_AVAILABLE_SERVERS:
-        needed = MIN_AVAILABLE_SERVERS - total_pool
+    # Golden image for the current stack (see golden.py)
+    from . import golden
+    if golden.GOLDEN_IMAGE_ENABLED and not golden.current() and not golden.capture_in_progress():
+        refresh_golden_image.delay()
+
+    if autoscaler.AUTOSCALE_ENABLED:
+        plan = autoscaler.plan(available, in_progress, headroom=MAX_TOTAL_SERVERS - total_servers)
+        logger.info(f'Autoscaler: {plan.summary()}')
+        needed = plan.create
+        if plan.delete:
+            deleted = autoscaler.scale_down(plan.delete)
+            if deleted:
+                notify_admin.delay(f'📉 Pool: {available} available, target {plan.keep}. Deleted idle: {", ".join(deleted)}')
+    else:
+        needed = max(0, MIN_AVAILABLE_SERVERS - total_pool)
+
+    if needed:
         logger.info(f'Creating {needed} new standby server(s)...')
         notify_admin.delay(f'📦 Pool: {available} available. Creating {needed} new server(s).')
         
@@ -177,10 +195,17 @@ def ensure_server_pool():
 
 
 @shared_task(bind=True, max_retries=MAX_RETRY_ATTEMPTS)
-def create_standby_server_with_retry(self):
-    """Create a server for the pool with automatic retry on failure."""
+def create_standby_server_with_retry(self, use_golden=True):
+    """Order a server for the pool with automatic retry on failure.
+
+    Only the TimeWeb call happens here; booting, Docker and the warm deploy
+    are steps of the provisioning state machine (advance_provisioning).
+    From the golden image if there is one for the current stack — the server
+    then only needs personalize_golden_server instead of setup + warm deploy.
+    """
+    from . import golden, provisioning
     from .models import Server
-    from .timeweb import create_server, wait_for_server_ready, delete_server
+    from .timeweb import create_server, delete_server
     
     # Hard limit check
     total = Server.objects.exclude(status='error').count()
@@ -198,8 +223,12 @@ def create_standby_server_with_retry(self):
 
     logger.info(f'Creating standby server: {server_name} (attempt {attempt}/{MAX_RETRY_ATTEMPTS})')
 
+    image = golden.current() if use_golden and golden.GOLDEN_IMAGE_ENABLED else None
+
     try:
-        tw_result = create_server(server_name, 'pool@simpleclaw.com')
+        tw_result = create_server(
+            server_name, 'pool@simpleclaw.com', image_id=image.timeweb_image_id if image else None,
+        )
         
         if not tw_result:
             raise Exception('TimeWeb API returned empty result')
@@ -208,27 +237,6 @@ def create_standby_server_with_retry(self):
         server_record.ssh_password = tw_result.get('root_pass', '')
         server_record.save()
 
-        # Wait for server to be ready
-        logger.info(f'Waiting for server {tw_result['id']}...')
-        ready_info = wait_for_server_ready(tw_result['id'], max_wait=300)
-        
-        if not ready_info:
-            raise Exception(f'Server creation timeout. TW ID: {tw_result.get('id')}')
-
-        # Check for valid IPv4
-        ip = ready_info.get('ip', '')
-        if not ip or ':' in ip:  # IPv6 only
-            raise Exception(f'No valid IPv4 address. Got: {ip}')
-
-        server_record.ip_address = ip
-        if ready_info.get('root_pass'):
-            server_record.ssh_password = ready_info['root_pass']
-        server_record.status = 'provisioning'
-        server_record.save()
-
-        logger.info(f'Server ready: {ip}, installing Docker...')
-        setup_standby_server.delay(server_record.id)
-
     except Exception as e:
         error_msg = str(e)
         logger.error(f'Server creation failed (attempt {attempt}): {error_msg}')
@@ -262,112 +270,151 @@ def create_standby_server_with_retry(self):
                 f'Error: {error_msg}\n'
                 f'Action: Manual intervention required!'
             )
+        return
 
+    if image:
+        logger.info(f'Server {server_record.timeweb_server_id} ordered from golden image {image.timeweb_image_id}')
+        golden.count_server(image)
+        provisioning.enter(server_record, provisioning.CREATED, golden_id=image.id)
+    else:
+        provisioning.enter(server_record, provisioning.CREATED)
+    # sweep_provisioning takes it from here once TimeWeb reports it running
+
+
+@shared_task(bind=True)
+def advance_provisioning(self, server_id):
+    """Run one step of a server's provisioning and schedule the next one (see provisioning.py)."""
+    from . import provisioning
+
+    countdown = provisioning.advance(server_id)
+    if countdown is not None:
+        # Next step in the same queue and priority (a user's server stays in 'deploy')
+        delivery = self.request.delivery_info or {}
+        lane = {'queue': delivery.get('routing_key'), 'priority': delivery.get('priority')}
+        advance_provisioning.apply_async(
+            (server_id,), countdown=countdown, **{k: v for k, v in lane.items() if v is not None},
+        )
 
-@shared_task(bind=True, max_retries=MAX_RETRY_ATTEMPTS)
-def setup_standby_server(self, server_id):
-    """Install Docker and prepare server for OpenClaw deployment."""
+
+@shared_task
+def sweep_provisioning():
+    """One TimeWeb listing for all servers still being created; start the booting ones."""
+    from . import provisioning, queues
+
+    for server in provisioning.sweep():
+        advance_provisioning.apply_async((server.pk,), **queues.server_lane(server))
+
+
+@shared_task
+def setup_standby_server(server_id):
+    """Install Docker and prepare server for OpenClaw deployment.
+
+    Kept for already queued calls: continues in the provisioning state machine.
+    """
+    from . import provisioning
     from .models import Server
-    from .services import ServerManager
-    from .timeweb import delete_server
 
     try:
         server = Server.objects.get(id=server_id)
     except Server.DoesNotExist:
         logger.error(f'Server {server_id} not found')
         return
+    if not server.provision_state:
+        provisioning.enter(server, provisioning.BOOTING)
+    advance_provisioning.delay(server_id)
+
+
+@shared_task(bind=True, max_retries=MAX_RETRY_ATTEMPTS)
+def personalize_golden_server(self, server_id, golden_id):
+    """Make a pool server created from a golden image its own (fresh secrets, start the stack)."""
+    from . import provisioning
+    from .models import GoldenImage, Server
+    from .services import ServerManager
+    from .timeweb import delete_server
+
+    try:
+        server = Server.objects.get(id=server_id)
+        image = GoldenImage.objects.get(id=golden_id)
+    except (Server.DoesNotExist, GoldenImage.DoesNotExist):
+        logger.error(f'Server {server_id} or golden image {golden_id} not found')
+        return
 
     attempt = self.request.retries + 1
     manager = ServerManager(server)
 
     try:
-        # Wait for SSH (90s to ensure server is ready)
-        time.sleep(90)
+        # SSH is up: the provisioning 'booting' step waited for it
         manager.connect()
+        if not manager.personalize_golden(image.deploy_state):
+            raise Exception(server.last_error or 'personalize_golden failed')
 
-        # Install Docker
-        logger.info(f'Installing Docker on {server.ip_address} (attempt {attempt})...')
-        commands = [
-            'apt-get update -y',
-            'apt-get install -y apt-transport-https ca-certificates curl software-properties-common',
-            'curl -fsSL https://get.docker.com -o get-docker.sh && sh get-docker.sh',
-            'systemctl enable docker && systemctl start docker',
-            'curl -L https://github.com/docker/compose/releases/latest/download/docker-compose-Linux-x86_64 -o /usr/local/bin/docker-compose',
-            'chmod +x /usr/local/bin/docker-compose',
-        ]
-        
-        for cmd in commands:
-            out, err, code = manager.exec_command(cmd)
-            if code != 0 and 'docker' in cmd.lower():
-                raise Exception(f'Critical command failed: {cmd}\nError: {err}')
-
-        # Verify Docker works
-        out, err, code = manager.exec_command('docker --version')
-        if code != 0:
-            raise Exception(f'Docker not working: {err}')
-
-        # Create OpenClaw directory
-        manager.exec_command(f'mkdir -p {server.openclaw_path}')
-
-        # Загрузка Dockerfile и docker-compose с Chrome headless
-        from .services import DOCKERFILE_CONTENT, DOCKER_COMPOSE_WITH_CHROME
-        manager.upload_file(DOCKERFILE_CONTENT, f'{server.openclaw_path}/Dockerfile')
-        manager.upload_file(DOCKER_COMPOSE_WITH_CHROME, f'{server.openclaw_path}/docker-compose.yml')
-
-        # Mark as active — warm deploy will be triggered by signal handler
         server.status = 'active'
         server.last_error = ''
         server.save()
-
-        logger.info(f'Standby server {server.ip_address} is ready!')
-        notify_admin.delay(f'✅ Pool server ready: {server.ip_address}')
+        provisioning.enter(server, provisioning.WARM)
+        logger.info(f'Golden pool server {server.ip_address} is ready!')
+        notify_admin.delay(f'✅ Pool server ready (golden image): {server.ip_address}')
 
     except Exception as e:
         error_msg = str(e)
-        logger.error(f'Setup failed for {server.ip_address} (attempt {attempt}): {error_msg}')
-        
-        # Always save error status so cleanup_error_servers can handle it
+        logger.error(f'Golden personalization failed for {server.ip_address} (attempt {attempt}): {error_msg}')
         server.status = 'error'
         server.last_error = error_msg[:500]
         server.save()
-        
+
         if attempt < MAX_RETRY_ATTEMPTS:
-            notify_error.delay(
-                'Server Setup Failed - Retrying',
-                f'Attempt: {attempt}/{MAX_RETRY_ATTEMPTS}\n'
-                f'Server: {server.ip_address}\n'
-                f'Error: {error_msg}\n'
-                f'Action: Retrying in 60 seconds...'
-            )
             manager.disconnect()
             raise self.retry(exc=e, countdown=60)
-        else:
-            # Max retries - cleanup
-            notify_error.delay(
-                'Server Setup Failed - DELETING',
-                f'Attempts: {MAX_RETRY_ATTEMPTS}/{MAX_RETRY_ATTEMPTS}\n'
-                f'Server: {server.ip_address}\n'
-                f'TW ID: {server.timeweb_server_id}\n'
-                f'Error: {error_msg}\n'
-                f'Action: Deleting server and will retry pool creation.'
-            )
-            
-            # Delete from TimeWeb
-            if server.timeweb_server_id:
-                try:
-                    delete_server(server.timeweb_server_id)
-                except:
-                    pass
-            
-            # Delete record
-            server.delete()
-            
-            # Trigger new server creation
-            create_standby_server_with_retry.delay()
+
+        notify_error.delay(
+            'Golden Image Server Failed - DELETING',
+            f'Server: {server.ip_address}\n'
+            f'Image: {image.timeweb_image_id}\n'
+            f'Error: {error_msg}\n'
+            f'Action: Deleting server, next one is installed from scratch.'
+        )
+        if server.timeweb_server_id:
+            try:
+                delete_server(server.timeweb_server_id)
+            except Exception:
+                pass
+        server.delete()
+        create_standby_server_with_retry.delay(use_golden=False)
     finally:
         manager.disconnect()
 
 
+@shared_task
+def refresh_golden_image():
+    """Snapshot a warm standby if there is no golden image for the current stack."""
+    from . import golden
+
+    if not golden.GOLDEN_IMAGE_ENABLED:
+        return
+    # Captures whose poll chain was lost (worker restart): finish them
+    for golden_id in golden.stale_captures():
+        poll_golden_image.delay(golden_id)
+    if golden.current() or golden.capture_in_progress():
+        return
+    source = golden.pick_source()
+    if source is None:
+        logger.info('Golden image: no untouched warm standby to snapshot yet')
+        return
+    image = golden.start_capture(source)
+    if image.status == 'creating':
+        poll_golden_image.apply_async((image.pk,), countdown=golden.GOLDEN_IMAGE_POLL)
+
+
+@shared_task
+def poll_golden_image(golden_id):
+    """Check a golden image TimeWeb is creating; check again later until it is finished (see golden.py)."""
+    from . import golden
+
+    countdown = golden.poll_capture(golden_id)
+    if countdown is not None:
+        poll_golden_image.apply_async((golden_id,), countdown=countdown)
+
+
 # Legacy function - redirect to new one
 @shared_task
 def create_standby_server():
@@ -378,10 +425,10 @@ def create_standby_server():
 def provision_user_service(user_id):
     """Create server via TimeWeb and deploy OpenClaw"""
     from django.contrib.auth.models import User
+    from . import provisioning
     from .models import Server
-    from .services import ServerManager
     from .openrouter import create_openrouter_key
-    from .timeweb import create_server, wait_for_server_ready
+    from .timeweb import create_server
 
     try:
         user = User.objects.get(id=user_id)
@@ -413,20 +460,7 @@ def provision_user_service(user_id):
         return
 
     server_record.timeweb_server_id = tw_result.get('id', '')
-    server_record.save()
-
-    ready_info = wait_for_server_ready(tw_result['id'], max_wait=300)
-    
-    if not ready_info:
-        server_record.status = 'error'
-        server_record.last_error = 'Server creation timeout'
-        server_record.save()
-        notify_error.delay('User Server Creation Timeout', f'User: {user.email}\nTW ID: {tw_result.get('id')}')
-        return
-
-    server_record.ip_address = ready_info['ip']
-    server_record.ssh_password = ready_info.get('root_pass', '')
-    server_record.status = 'provisioning'
+    server_record.ssh_password = tw_result.get('root_pass', '')
     server_record.save()
 
     or_key, or_key_id = create_openrouter_key(
@@ -440,86 +474,38 @@ def provision_user_service(user_id):
         profile.tokens_used_usd = 0
         profile.save()
 
-    time.sleep(30)
-    setup_openclaw_server.delay(server_record.id)
+    # Boot, Docker and the deploy: sweep_provisioning → advance_provisioning (the server has a profile → full deploy)
+    provisioning.enter(server_record, provisioning.CREATED)
 
 
 @shared_task
 def setup_openclaw_server(server_id):
-    """Install OpenClaw on a newly created server"""
+    """Install OpenClaw on a newly created server
+
+    Kept for already queued calls: continues in the provisioning state machine.
+    """
+    from . import provisioning
     from .models import Server
-    from .services import ServerManager
 
     try:
         server = Server.objects.get(id=server_id)
     except Server.DoesNotExist:
         return
 
-    profile = server.profile
-    if not profile:
+    if not server.profile:
         return
 
-    manager = ServerManager(server)
-
-    try:
-        manager.connect()
-
-        commands = [
-            'apt-get update -y',
-            'apt-get install -y apt-transport-https ca-certificates curl software-properties-common',
-            'curl -fsSL https://get.docker.com -o get-docker.sh && sh get-docker.sh',
-            'systemctl enable docker && systemctl start docker',
-            'curl -L https://github.com/docker/compose/releases/latest/download/docker-compose-Linux-x86_64 -o /usr/local/bin/docker-compose',
-            'chmod +x /usr/local/bin/docker-compose',
-        ]
-        
-        for cmd in commands:
-            out, err, code = manager.exec_command(cmd)
-            if code != 0:
-                logger.warning(f'Command failed: {cmd}, error: {err}')
-
-        manager.exec_command(f'mkdir -p {server.openclaw_path}')
-
-        # Загрузка Dockerfile и docker-compose с Chrome headless
-        from .services import DOCKERFILE_CONTENT, DOCKER_COMPOSE_WITH_CHROME
-        manager.upload_file(DOCKERFILE_CONTENT, f'{server.openclaw_path}/Dockerfile')
-        manager.upload_file(DOCKER_COMPOSE_WITH_CHROME, f'{server.openclaw_path}/docker-compose.yml')
-
-        server.status = 'active'
-        server.last_error = ''
-        server.save()
-
-        if profile.telegram_bot_token:
-            telegram_owner_id = None
-            try:
-                telegram_owner_id = profile.user.telegram_bot_user.telegram_id
-            except Exception:
-                pass
-            manager.deploy_openclaw(
-                openrouter_key=profile.openrouter_api_key,
-                telegram_token=profile.telegram_bot_token,
-                model_slug=profile.selected_model,
-                telegram_owner_id=telegram_owner_id,
-            )
-
-        notify_admin.delay(
-            f'✅ Server ready!\n'
-            f'IP: {server.ip_address}\n'
-            f'User: {profile.user.email}'
-        )
-
-    except Exception as e:
-        server.status = 'error'
-        server.last_error = str(e)[:500]
-        server.save()
-        notify_error.delay('Server Setup Failed', f'IP: {server.ip_address}\nUser: {profile.user.email}\nError: {e}')
-    finally:
-        manager.disconnect()
+    if not server.provision_state:
+        provisioning.enter(server, provisioning.BOOTING)
+    advance_provisioning.delay(server_id)
 
 
 @shared_task
-def redeploy_openclaw(user_id):
-    """Redeploy OpenClaw after model/token change"""
+def redeploy_openclaw(user_id, resume=False):
+    """Redeploy OpenClaw after model/token change
+
+    resume=True continues the server's failed deploy from its first unfinished step (journal.py).
+    """
     from django.contrib.auth.models import User
     from .services import ServerManager
 
@@ -541,11 +527,19 @@ def redeploy_openclaw(user_id):
         pass
 
     manager = ServerManager(server)
-    manager.deploy_openclaw(
+    deploy = manager.deploy_openclaw
+    if resume:
+        from .journal import resumable
+        failed = resumable(server)
+        if failed is not None and failed.kind == 'quick':
+            # Continue the quick deploy of assign_server_to_user, not a full one
+            deploy = manager.quick_deploy_user
+    deploy(
         openrouter_key=profile.openrouter_api_key,
         telegram_token=profile.telegram_bot_token,
         model_slug=profile.selected_model,
         telegram_owner_id=telegram_owner_id,
+        resume=resume,
     )
 
 
@@ -606,6 +600,7 @@ def monitor_servers():
 def assign_server_to_user(user_id):
     """Assign an available server from pool to user after payment."""
     from django.contrib.auth.models import User
+    from . import queues
     from .models import Server
     from .services import ServerManager
     from .openrouter import create_openrouter_key
@@ -633,7 +628,7 @@ def assign_server_to_user(user_id):
         if not available_server:
             logger.warning(f'No servers in pool for {user.email}')
             notify_admin.delay(f'⚠️ No pool servers for {user.email}! Creating new...')
-            provision_user_service.delay(user_id)
+            provision_user_service.apply_async((user_id,), priority=queues.PRIORITY_FIRST_PAYMENT)
             return
 
         available_server.profile = profile
@@ -1,12 +1,12 @@
 """TimeWeb Cloud API integration for server provisioning"""
 import logging
-import time
 import requests
 from django.conf import settings
 
 logger = logging.getLogger(__name__)
 
-TIMEWEB_API_BASE = 'https://api.timeweb.cloud/api/v1'
+# Overridable for a local stand-in of the API (tests)
+TIMEWEB_API_BASE = getattr(settings, 'TIMEWEB_API_BASE', 'https://api.timeweb.cloud/api/v1')
 # Preset: 2 CPU 3.3GHz, 4GB RAM, 50GB NVMe, Moscow, 1000 RUB/month
 PRESET_ID = 4801
 
@@ -43,27 +43,29 @@ def get_ubuntu_os_id():
         return None
 
 
-def create_server(name, user_email):
-    """Create a new server via TimeWeb API"""
+def create_server(name, user_email, image_id=None):
+    """Create a new server via TimeWeb API (from a golden image if `image_id` is given)"""
     token = getattr(settings, 'TIMEWEB_API_TOKEN', '')
     if not token:
         logger.error('TIMEWEB_API_TOKEN not configured')
         return None
 
-    os_id = get_ubuntu_os_id()
-    if not os_id:
-        logger.error('Could not find Ubuntu OS image')
-        return None
-
     server_data = {
         'name': name,
         'comment': 'SimpleClaw pool server',
         'preset_id': PRESET_ID,
-        'os_id': os_id,
         'bandwidth': 1000,
         'is_ddos_guard': False,
         'is_local_network': False,
     }
+    if image_id:
+        server_data['image_id'] = image_id
+    else:
+        os_id = get_ubuntu_os_id()
+        if not os_id:
+            logger.error('Could not find Ubuntu OS image')
+            return None
+        server_data['os_id'] = os_id
 
     try:
         logger.info(f'Creating TimeWeb server: {server_data}')
@@ -107,100 +109,59 @@ def get_server_info(server_id):
         return None
 
 
-def add_ipv4_to_server(server_id, max_retries=5):
-    """Add IPv4 address to a server that only has IPv6, with retry and wait"""
-    for attempt in range(max_retries):
-        try:
-            logger.info(f'Adding IPv4 to server {server_id} (attempt {attempt + 1}/{max_retries})')
-            resp = requests.post(
-                f'{TIMEWEB_API_BASE}/servers/{server_id}/ips',
+def list_servers(page_size=100):
+    """All servers of the account (GET /servers, paged). None on an API error."""
+    servers = []
+    try:
+        while True:
+            resp = requests.get(
+                f'{TIMEWEB_API_BASE}/servers',
                 headers=get_headers(),
-                json={'type': 'ipv4'},
+                params={'limit': page_size, 'offset': len(servers)},
                 timeout=30,
             )
+            if resp.status_code != 200:
+                logger.error(f'TimeWeb list servers error: {resp.status_code} {resp.text}')
+                return None
+            data = resp.json()
+            page = data.get('servers', [])
+            servers.extend(page)
+            total = data.get('meta', {}).get('total', 0)
+            if len(page) < page_size or len(servers) >= total:
+                return servers
+    except Exception as e:
+        logger.error(f'TimeWeb list servers exception: {e}')
+        return None
+
 
-            if resp.status_code in (200, 201):
-                data = resp.json()
-                ip_info = data.get('server_ip', {})
-                ip = ip_info.get('ip')
-                if ip:
-                    logger.info(f'Added IPv4 {ip} to server {server_id}')
-                    return ip
-
-            # Wait and check server info for IPv4
-            logger.info(f'IPv4 not ready yet, waiting 20s...')
-            time.sleep(20)
-
-            # Check if IPv4 appeared in server info
-            info = get_server_info(server_id)
-            if info:
-                networks = info.get('networks', [])
-                for net in networks:
-                    for ip_data in net.get('ips', []):
-                        if ip_data.get('type') == 'ipv4':
-                            ip = ip_data.get('ip')
-                            logger.info(f'Found IPv4 {ip} in server info')
-                            return ip
-
-        except Exception as e:
-            logger.error(f'Exception adding IPv4 (attempt {attempt + 1}): {e}')
-            time.sleep(10)
-
-    logger.error(f'Failed to add IPv4 to server {server_id} after {max_retries} attempts')
-    return None
-
-
-def wait_for_server_ready(server_id, max_wait=300):
-    """Wait for server to be ready and return IPv4 (adds IPv4 if only IPv6)"""
-    start = time.time()
-    root_pass = None
-
-    while time.time() - start < max_wait:
-        info = get_server_info(server_id)
-        if info:
-            status = info.get('status')
-            if not root_pass:
-                root_pass = info.get('root_pass', '')
-
-            logger.info(f'Server {server_id} status: {status}')
-
-            if status == 'on':
-                networks = info.get('networks', [])
-                ipv4 = None
-                ipv6 = None
-                for net in networks:
-                    ips = net.get('ips', [])
-                    for ip_info in ips:
-                        ip = ip_info.get('ip')
-                        ip_type = ip_info.get('type')
-                        if ip_type == 'ipv4':
-                            ipv4 = ip
-                        elif ip_type == 'ipv6':
-                            ipv6 = ip
-
-                # If only IPv6, try to add IPv4 with retries
-                if not ipv4 and ipv6:
-                    logger.info(f'Server {server_id} only has IPv6 ({ipv6}), adding IPv4...')
-                    ipv4 = add_ipv4_to_server(server_id, max_retries=5)
-                    if ipv4:
-                        logger.info(f'Successfully added IPv4 {ipv4} to server {server_id}')
-
-                if ipv4:
-                    logger.info(f'Server ready: IP={ipv4}')
-                    return {
-                        'ip': ipv4,
-                        'root_pass': root_pass,
-                        'status': 'ready',
-                    }
-                else:
-                    # NO IPv4 - return None to trigger retry
-                    logger.error(f'Server {server_id} has no IPv4, returning None to retry')
-                    return None
-
-        time.sleep(15)
-
-    logger.error(f'Server {server_id} timeout after {max_wait}s')
-    return None
+def server_ips(info):
+    """(ipv4, ipv6) from a server of get_server_info()/list_servers(); None for a missing one."""
+    ipv4 = ipv6 = None
+    for net in (info or {}).get('networks', []):
+        for ip_info in net.get('ips', []):
+            if ip_info.get('type') == 'ipv4':
+                ipv4 = ip_info.get('ip')
+            elif ip_info.get('type') == 'ipv6':
+                ipv6 = ip_info.get('ip')
+    return ipv4, ipv6
+
+
+def request_ipv4(server_id):
+    """Ask TimeWeb for an IPv4 address (one call, no waiting). Returns the IP if assigned at once."""
+    try:
+        resp = requests.post(
+            f'{TIMEWEB_API_BASE}/servers/{server_id}/ips',
+            headers=get_headers(),
+            json={'type': 'ipv4'},
+            timeout=30,
+        )
+        if resp.status_code in (200, 201):
+            return resp.json().get('server_ip', {}).get('ip')
+        logger.error(f'TimeWeb add IPv4 error: {resp.status_code} {resp.text}')
+        return None
+    except Exception as e:
+        logger.error(f'TimeWeb add IPv4 exception: {e}')
+        return None
 
 
 def delete_server(server_id):
@@ -217,3 +178,77 @@ def delete_server(server_id):
     except Exception as e:
         logger.error(f'TimeWeb delete error: {e}')
         return False
+
+
+# ─── Images (golden image snapshots, see golden.py) ──────────────────
+
+def get_system_disk_id(server_id):
+    """ID of the server's system disk"""
+    try:
+        resp = requests.get(
+            f'{TIMEWEB_API_BASE}/servers/{server_id}/disks',
+            headers=get_headers(),
+            timeout=30,
+        )
+        if resp.status_code == 200:
+            disks = resp.json().get('server_disks', [])
+            for disk in disks:
+                if disk.get('is_system'):
+                    return disk.get('id')
+            return disks[0].get('id') if disks else None
+        logger.error(f'TimeWeb disks error: {resp.status_code} {resp.text}')
+        return None
+    except Exception as e:
+        logger.error(f'TimeWeb disks exception: {e}')
+        return None
+
+
+def create_image(disk_id, name, description=''):
+    """Snapshot a disk into an image. Returns the image ID"""
+    try:
+        resp = requests.post(
+            f'{TIMEWEB_API_BASE}/images',
+            headers=get_headers(),
+            json={'disk_id': disk_id, 'name': name, 'description': description},
+            timeout=60,
+        )
+        if resp.status_code in (200, 201):
+            image = resp.json().get('image', {})
+            logger.info(f'TimeWeb image created: ID={image.get("id")}, status={image.get("status")}')
+            return image.get('id')
+        logger.error(f'TimeWeb image create error: {resp.status_code} {resp.text}')
+        return None
+    except Exception as e:
+        logger.error(f'TimeWeb image create exception: {e}')
+        return None
+
+
+def get_image(image_id):
+    """Get image details"""
+    try:
+        resp = requests.get(
+            f'{TIMEWEB_API_BASE}/images/{image_id}',
+            headers=get_headers(),
+            timeout=30,
+        )
+        if resp.status_code == 200:
+            return resp.json().get('image', {})
+        return None
+    except Exception as e:
+        logger.error(f'TimeWeb get image error: {e}')
+        return None
+
+
+def delete_image(image_id):
+    """Delete an image"""
+    try:
+        resp = requests.delete(
+            f'{TIMEWEB_API_BASE}/images/{image_id}',
+            headers=get_headers(),
+            timeout=30,
+        )
+        logger.info(f'Delete image {image_id}: {resp.status_code}')
+        return resp.status_code in (200, 204)
+    except Exception as e:
+        logger.error(f'TimeWeb delete image error: {e}')
+        return False
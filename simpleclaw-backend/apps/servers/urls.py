@@ -2,7 +2,7 @@ from django.urls import path
 from .views import (
     ServerStatusView, RedeployView, ServerPoolStatusView, ApprovePairingView,
     SetModelView, SkillsSearchView, SkillDetailView, SkillInstallView,
-    SkillUninstallView, InternalWsAuthView,
+    SkillUninstallView, InternalWsAuthView, DeployStatsView,
 )
 
 # api/
@@ -10,6 +10,7 @@ urlpatterns = [
     path('server/status/', ServerStatusView.as_view(), name='server-status'),
     path('server/redeploy/', RedeployView.as_view(), name='server-redeploy'),
     path('server/pool/', ServerPoolStatusView.as_view(), name='server-pool'),
+    path('server/deploy-stats/', DeployStatsView.as_view(), name='server-deploy-stats'),
     path('server/pairing/approve/', ApprovePairingView.as_view(), name='server-pairing-approve'),
     path('server/set-model/', SetModelView.as_view(), name='server-set-model'),
     path('server/skills/install/', SkillInstallView.as_view(), name='skill-install'),
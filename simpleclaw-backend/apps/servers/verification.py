@@ -0,0 +1,96 @@
+"""Verification checks — run independent remote checks concurrently.
+
+_verify_config and verify_searxng used to run their checks one after another,
+one exec_command each, although none depends on another. A Check pairs a
+shell command with a function that judges its output; run_checks() starts
+every check on its own channel of the same SSH transport (see
+ServerManager.exec_parallel), so total latency is that of the slowest check,
+and returns a structured CheckResult per check with its own timing.
+
+Usage:
+    results = run_checks(manager, [
+        Check('container', 'docker inspect openclaw --format={{.State.Status}}',
+              lambda out, err, code: ('running' in out, f'status={out.strip()!r}')),
+    ])
+    failures = [r.detail for r in results if not r.ok]
+"""
+import json
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+from .openclaw_config import OPENCLAW_CONFIG_PATH, get_path
+
+logger = logging.getLogger(__name__)
+
+# Default per-check timeout (seconds)
+CHECK_TIMEOUT = 30
+
+
+@dataclass
+class Check:
+    """A remote check: `evaluate(out, err, exit_code)` returns (ok, detail)."""
+    name: str
+    cmd: str
+    evaluate: Callable
+    timeout: int = CHECK_TIMEOUT
+
+
+@dataclass
+class CheckResult:
+    name: str
+    ok: bool
+    detail: str = ''
+    duration: float = 0.0
+    exit_code: int | None = None
+    out: str = ''
+
+
+def run_checks(manager, checks):
+    """Run all checks concurrently on one transport. Results keep the input order."""
+    timeout = max((c.timeout for c in checks), default=CHECK_TIMEOUT)
+    raw = manager.exec_parallel({c.name: c.cmd for c in checks}, timeout=timeout)
+    results = []
+    for check in checks:
+        out, err, code, duration = raw[check.name]
+        try:
+            ok, detail = check.evaluate(out, err, code)
+        except Exception as e:
+            ok, detail = False, f'{check.name}: check raised {e!r}'
+        results.append(CheckResult(
+            name=check.name, ok=bool(ok), detail=detail, duration=duration, exit_code=code, out=out,
+        ))
+    slowest = max(results, key=lambda r: r.duration, default=None)
+    if slowest:
+        logger.info(
+            f'{len(results)} checks on {manager.server.ip_address}: '
+            f'{sum(r.ok for r in results)} passed, slowest {slowest.name} {slowest.duration:.1f}s'
+        )
+    return results
+
+
+def failures_of(results):
+    return [r.detail for r in results if not r.ok]
+
+
+# ─── reusable checks ─────────────────────────────────────────────────
+
+def container_status(container, label=None):
+    """Container must be running (not restarting/exited)."""
+    label = label or container
+    return Check(
+        f'{container}:status',
+        f'docker inspect {container} --format={{{{.State.Status}}}} 2>/dev/null',
+        lambda out, err, code: ('running' in out.strip(), f'{label} container status={out.strip()!r}'),
+    )
+
+
+def config_value(name, path, predicate, describe):
+    """Judge a value from openclaw.json (read from the volume, no Node cold start)."""
+    def evaluate(out, err, code):
+        try:
+            value = get_path(json.loads(out), path) if code == 0 and out.strip() else None
+        except json.JSONDecodeError:
+            value = None
+        return predicate(value), describe(value)
+    return Check(name, f'cat {OPENCLAW_CONFIG_PATH} 2>/dev/null', evaluate)
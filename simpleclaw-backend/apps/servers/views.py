@@ -1,13 +1,12 @@
 import hashlib
 import json
 import re
-import shlex
 import logging
 import requests as http_requests
 from django.conf import settings
 from django.core.cache import cache
 from django.http import HttpResponse
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.throttling import UserRateThrottle
@@ -271,6 +270,8 @@ class InternalWsAuthView(APIView):
 class ServerStatusView(APIView):
     def get(self, request):
         """Статус сервера пользователя"""
+        from .journal import deploy_progress, resumable
+
         profile = request.user.profile
         server = getattr(profile, 'server', None)
 
@@ -288,6 +289,9 @@ class ServerStatusView(APIView):
             'openclaw_running': server.openclaw_running,
             'gateway_token': server.gateway_token,
             'deployment_stage': server.deployment_stage,
+            'deploy_progress': deploy_progress(server),
+            # POST /api/server/redeploy/ {"resume": true} continues the failed deploy
+            'deploy_resumable': server.status == 'error' and resumable(server) is not None,
             'last_health_check': server.last_health_check,
             'ws_url': ws_url,
         })
@@ -305,13 +309,19 @@ class RedeployView(APIView):
         if not profile.telegram_bot_token:
             return Response({'error': 'Telegram-токен не установлен'}, status=400)
 
-        if not server.openclaw_running:
+        # resume: continue a failed deploy from the step where it stopped
+        resume = str(request.data.get('resume', '')).lower() in ('1', 'true', 'yes')
+        if resume:
+            from .journal import resumable
+            if server.status != 'error' or resumable(server) is None:
+                return Response({'error': 'Нет прерванного деплоя'}, status=409)
+        elif not server.openclaw_running:
             return Response({'error': 'Деплой в процессе, подождите'}, status=409)
 
         from .tasks import redeploy_openclaw
-        redeploy_openclaw.delay(request.user.id)
+        redeploy_openclaw.delay(request.user.id, resume=resume)
 
-        return Response({'status': 'redeploying'})
+        return Response({'status': 'resuming' if resume else 'redeploying'})
 
 
 class ServerPoolStatusView(APIView):
@@ -336,6 +346,36 @@ class ServerPoolStatusView(APIView):
         })
 
 
+class DeployStatsView(APIView):
+    """GET /api/server/deploy-stats/ — p50/p95 per deploy step across the fleet (staff only)
+
+    Query: kind=warm|quick|full, days (default 30), server_ip.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        from .journal import step_percentiles
+        from .models import Server
+
+        kind = request.query_params.get('kind') or None
+        try:
+            days = max(1, min(int(request.query_params.get('days', 30)), 365))
+        except ValueError:
+            return Response({'error': 'Invalid days'}, status=400)
+        server = None
+        server_ip = request.query_params.get('server_ip')
+        if server_ip:
+            server = Server.objects.filter(ip_address=server_ip).first()
+            if server is None:
+                return Response({'error': 'Server not found'}, status=404)
+
+        return Response({
+            'kind': kind,
+            'days': days,
+            'steps': step_percentiles(kind=kind, days=days, server=server),
+        })
+
+
 class PairingThrottle(UserRateThrottle):
     rate = '10/min'
 
@@ -394,15 +434,11 @@ class ApprovePairingView(APIView):
         if not server or not server.openclaw_running:
             return Response({'error': 'Сервер не готов'}, status=404)
 
-        # SSH на сервер пользователя и запуск pairing approve
+        # pairing approve на сервере пользователя (control agent или SSH)
         from .services import ServerManager
         manager = ServerManager(server)
         try:
-            manager.connect()
-            safe_code = shlex.quote(code)
-            out, err, exit_code = manager.exec_command(
-                f'docker exec openclaw node /app/openclaw.mjs pairing approve telegram {safe_code}'
-            )
+            out, err, exit_code = manager.approve_pairing(code)
 
             if exit_code != 0:
                 logger.warning('Pairing approve failed for user %s: %s', request.user.id, err or out)
@@ -76,10 +76,7 @@ class ApprovePairingView(APIView):
         from apps.servers.services import ServerManager
         manager = ServerManager(server)
         try:
-            manager.connect()
-            out, err, exit_code = manager.exec_command(
-                f'docker exec openclaw node /app/openclaw.mjs pairing approve telegram {code}'
-            )
+            out, err, exit_code = manager.approve_pairing(code)
             manager.disconnect()
 
             if exit_code != 0:
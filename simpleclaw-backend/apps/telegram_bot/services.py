@@ -239,9 +239,8 @@ def notify_user(chat_id, text):
 
 
 def approve_pairing_code(user, code):
-    """Подтвердить код сопряжения OpenClaw на сервере пользователя через SSH."""
+    """Подтвердить код сопряжения OpenClaw на сервере пользователя (control agent или SSH)."""
     import re
-    import shlex
     from apps.servers.services import ServerManager
 
     # Валидация кода — только буквы, цифры, дефис, подчёркивание; макс 64 символа
@@ -256,11 +255,7 @@ def approve_pairing_code(user, code):
 
     manager = ServerManager(server)
     try:
-        manager.connect()
-        safe_code = shlex.quote(code)
-        out, err, exit_code = manager.exec_command(
-            f'docker exec openclaw node /app/openclaw.mjs pairing approve telegram {safe_code}'
-        )
+        out, err, exit_code = manager.approve_pairing(code)
         if exit_code != 0:
             logger.warning('Pairing approve failed: %s', err or out)
             return False, 'Код не принят. Проверьте код и попробуйте снова.'
@@ -1,7 +1,15 @@
 import os
 from celery import Celery
+from celery.signals import celeryd_init
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings.production')
 app = Celery('simpleclaw')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
+
+
+@celeryd_init.connect
+def configure_worker(sender=None, conf=None, options=None, **kwargs):
+    # Concurrency and prefetch of the worker's queues (before Django is set up)
+    from apps.servers.queues import configure_worker
+    configure_worker(conf, options or {})
@@ -129,6 +129,44 @@ CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'Europe/Moscow'
 CELERY_BEAT_SCHEDULER = 'django_celery_beat.schedulers:DatabaseScheduler'
 
+# Queues (see apps/servers/queues.py): one worker per queue, payment-critical first
+from kombu import Queue
+
+CELERY_TASK_DEFAULT_QUEUE = 'provisioning'
+# What a worker started without -Q consumes: all of them. 'celery' is the
+# default queue of publishers from before the split, drained until it is empty
+CELERY_TASK_QUEUES = [
+    Queue(name, routing_key=name)
+    for name in ('deploy', 'provisioning', 'monitoring', 'notifications', 'billing', 'celery')
+]
+CELERY_TASK_ROUTES = {
+    'apps.servers.tasks.assign_server_to_user': {'queue': 'deploy'},
+    'apps.servers.tasks.provision_user_service': {'queue': 'deploy'},
+    'apps.servers.tasks.setup_openclaw_server': {'queue': 'deploy'},
+    'apps.servers.tasks.redeploy_openclaw': {'queue': 'deploy'},
+    'apps.servers.tasks.ensure_server_pool': {'queue': 'provisioning'},
+    'apps.servers.tasks.create_standby_server*': {'queue': 'provisioning'},
+    'apps.servers.tasks.setup_standby_server': {'queue': 'provisioning'},
+    'apps.servers.tasks.advance_provisioning': {'queue': 'provisioning'},
+    'apps.servers.tasks.sweep_provisioning': {'queue': 'provisioning'},
+    'apps.servers.tasks.personalize_golden_server': {'queue': 'provisioning'},
+    'apps.servers.tasks.refresh_golden_image': {'queue': 'provisioning'},
+    'apps.servers.tasks.poll_golden_image': {'queue': 'provisioning'},
+    'apps.servers.tasks.cleanup_error_servers': {'queue': 'provisioning'},
+    'apps.servers.tasks.monitor_servers': {'queue': 'monitoring'},
+    'apps.servers.tasks.notify_*': {'queue': 'notifications'},
+    'apps.servers.tasks.deactivate_subscription': {'queue': 'billing'},
+    'apps.servers.tasks.reset_openrouter_keys_monthly': {'queue': 'billing'},
+    'apps.payments.tasks.*': {'queue': 'billing'},
+}
+# Redis serves priority 0 first; first-payment deploys are sent with 0 (queues.PRIORITY_FIRST_PAYMENT)
+CELERY_TASK_DEFAULT_PRIORITY = 5
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'queue_order_strategy': 'priority',
+    'priority_steps': list(range(10)),
+    'sep': ':',
+}
+
 from celery.schedules import crontab
 
 CELERY_BEAT_SCHEDULE = {
@@ -140,6 +178,10 @@ CELERY_BEAT_SCHEDULE = {
         'task': 'apps.servers.tasks.cleanup_error_servers',
         'schedule': crontab(minute='*/10'),  # Every 10 minutes
     },
+    'sweep-provisioning': {
+        'task': 'apps.servers.tasks.sweep_provisioning',
+        'schedule': 15.0,  # Every 15 seconds (PROVISION_POLL)
+    },
     'ensure-server-pool': {
         'task': 'apps.servers.tasks.ensure_server_pool',
         'schedule': crontab(minute='*/5'),  # Every 5 minutes
@@ -199,3 +241,8 @@ YOOKASSA_TEST_SECRET_KEY = env('YOOKASSA_TEST_SECRET_KEY', default='')
 
 # TimeWeb Cloud
 TIMEWEB_API_TOKEN = env('TIMEWEB_API_TOKEN', default='')
+
+# SSH connection pool for ServerManager (apps/servers/ssh_pool.py)
+SSH_POOL_MAX_PER_HOST = env.int('SSH_POOL_MAX_PER_HOST', default=4)
+SSH_POOL_IDLE_TIMEOUT = env.int('SSH_POOL_IDLE_TIMEOUT', default=300)
+SSH_POOL_KEEPALIVE = env.int('SSH_POOL_KEEPALIVE', default=30)
@@ -2,6 +2,10 @@
 
 Run with:
     cd simpleclaw-backend && TEST_AUTH_TOKEN=<token> pytest tests/ -v
+
+Unit tests (no live server) run against Django settings configured here:
+an in-memory SQLite database with the tables built from the models, and a
+local cache. A test that needs the database takes the `db` fixture.
 """
 
 import os
@@ -9,9 +13,54 @@ import json
 import asyncio
 from urllib.parse import urlparse, parse_qs
 
+import django
 import pytest
 import requests
 import websockets
+from django.conf import settings
+
+
+class _NoMigrations(dict):
+    """MIGRATION_MODULES for tests: tables from the models (apps.payments has no migrations)."""
+
+    def __contains__(self, app_label):
+        return True
+
+    def __getitem__(self, app_label):
+        return None
+
+
+if not settings.configured:
+    settings.configure(
+        SECRET_KEY="test",
+        TIMEWEB_API_TOKEN="test-token",
+        USE_TZ=True,
+        TIME_ZONE="Europe/Moscow",
+        DEFAULT_AUTO_FIELD="django.db.models.BigAutoField",
+        INSTALLED_APPS=[
+            "django.contrib.admin",
+            "django.contrib.auth",
+            "django.contrib.contenttypes",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+            "rest_framework",
+            "rest_framework.authtoken",
+            "corsheaders",
+            "django_celery_beat",
+            "apps.accounts",
+            "apps.payments",
+            "apps.servers",
+            "apps.telegram_app",
+            "apps.telegram_bot",
+            "apps.seo",
+            "apps.support",
+        ],
+        DATABASES={"default": {"ENGINE": "django.db.backends.sqlite3", "NAME": ":memory:"}},
+        CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+        MIGRATION_MODULES=_NoMigrations(),
+    )
+    django.setup()
 
 API_BASE = "https://claw-paw.com/api"
 
@@ -181,3 +230,27 @@ async def ws_client(wss_url, gateway_token):
         pytest.skip(f"OpenClaw WS not reachable (server may be down): {e}")
     yield client
     await client.close()
+
+
+# ─── Unit tests ─────────────────────────────────────────────────────────────
+
+
+@pytest.fixture(scope="session")
+def django_db_setup():
+    """Create the tables once per test run."""
+    from django.core.management import call_command
+
+    call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+@pytest.fixture
+def db(django_db_setup):
+    """Run the test in a transaction that is rolled back afterwards; clear the cache."""
+    from django.core.cache import cache
+    from django.db import transaction
+
+    cache.clear()
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+    cache.clear()
@@ -0,0 +1,117 @@
+"""human-browser deps tarballs of apps.servers.artifacts: delivery and capture.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_artifacts.py -v
+"""
+
+import io
+import shutil
+import subprocess
+from unittest import mock
+
+import pytest
+
+from apps.servers import artifacts
+
+IMAGE = "openclaw-chrome:0123456789abcdef"
+
+
+@pytest.fixture(autouse=True)
+def artifacts_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifacts, "DEPLOY_ARTIFACTS_DIR", str(tmp_path))
+    return tmp_path
+
+
+def manager(profile_id=None):
+    m = mock.Mock()
+    m.server.ip_address = "10.0.0.1"
+    m.server.openclaw_path = "/root/openclaw"
+    m.server.profile_id = profile_id
+    return m
+
+
+def channel(data, code=0):
+    stdin = mock.Mock()
+    stdout = mock.Mock(read=io.BytesIO(data).read)
+    stdout.channel.recv_exit_status.return_value = code
+    return stdin, stdout, io.BytesIO(b"npm ERR! network")
+
+
+def test_key_follows_the_image():
+    assert artifacts.human_browser_key(IMAGE) == artifacts.human_browser_key(IMAGE)
+    assert artifacts.human_browser_key(IMAGE) != artifacts.human_browser_key("openclaw-chrome:fedcba9876543210")
+
+
+def test_installed_checks_the_marker():
+    m = manager()
+    deps = artifacts.HumanBrowserDeps(m, IMAGE)
+    m.exec_command.return_value = (f"{deps.key}\n", "", 0)
+    assert deps.installed()
+    m.exec_command.return_value = ("old-key\n", "", 0)
+    assert not deps.installed()
+
+
+def test_deliver_without_tarball():
+    m = manager()
+    assert not artifacts.HumanBrowserDeps(m, IMAGE).deliver()
+    m.exec_stdin.assert_not_called()
+
+
+def test_deliver_streams_the_tarball():
+    m = manager()
+    deps = artifacts.HumanBrowserDeps(m, IMAGE)
+    with open(deps.path, "wb") as f:
+        f.write(b"tarball")
+    m.exec_stdin.return_value = ("", "", 0)
+    assert deps.deliver()
+    cmd = m.exec_stdin.call_args.args[0]
+    assert cmd.endswith(f"echo {deps.key} > {deps.marker}")
+
+
+def test_capture_stores_the_tarball(artifacts_dir):
+    m = manager()
+    stdin, stdout, stderr = channel(b"x" * (3 << 20))
+    m._open_channel.return_value = stdin, stdout, stderr
+    deps = artifacts.HumanBrowserDeps(m, IMAGE)
+    assert deps.capture()
+
+    with open(deps.path, "rb") as f:
+        assert f.read() == b"x" * (3 << 20)
+    assert [p.name for p in artifacts_dir.iterdir()] == [f"{artifacts.HUMAN_BROWSER_DEPS}-{deps.key}.tar.gz"]
+    # package.json goes in on stdin; the container has no host mounts
+    assert b'"playwright' in stdin.write.call_args.args[0]
+    stdin.channel.shutdown_write.assert_called_once_with()
+    cmd = m._open_channel.call_args.args[0]
+    assert " -v " not in cmd and f"--entrypoint sh {IMAGE} " in cmd
+
+
+def test_failed_capture_leaves_nothing(artifacts_dir):
+    m = manager()
+    m._open_channel.return_value = channel(b"partial", code=1)
+    assert not artifacts.HumanBrowserDeps(m, IMAGE).capture()
+    assert list(artifacts_dir.iterdir()) == []
+
+
+def test_no_capture_from_a_user_server(artifacts_dir):
+    m = manager(profile_id=7)
+    assert not artifacts.HumanBrowserDeps(m, IMAGE).capture()
+    m._open_channel.assert_not_called()
+    assert list(artifacts_dir.iterdir()) == []
+
+
+@pytest.mark.skipif(not shutil.which("sh"), reason="needs sh")
+def test_capture_script_reports_the_install_log(tmp_path):
+    """The script inside the container, with npm failing: its log tail on stderr, no tarball."""
+    script = artifacts.HumanBrowserDeps(manager(), IMAGE).capture_command().split(" -c ", 1)[1]
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    (bin_dir / "npm").write_text("#!/bin/sh\necho 'npm ERR! 404 playwright'\nexit 1\n")
+    (bin_dir / "npm").chmod(0o755)
+    script = script.replace("/out", str(tmp_path / "out"))
+    result = subprocess.run(
+        f"sh -c {script}", shell=True, input=b"{}", capture_output=True,
+        env={"PATH": f"{bin_dir}:/usr/bin:/bin"},
+    )
+    assert result.returncode == 1
+    assert b"npm ERR! 404" in result.stderr and result.stdout == b""
@@ -0,0 +1,75 @@
+"""Demand forecast of apps.servers.autoscaler (no database).
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_autoscaler.py -v
+"""
+
+from datetime import datetime, timedelta
+
+from django.utils import timezone
+
+from apps.servers import autoscaler
+
+
+def local(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+# Monday 2026-10-12, 00:00 local time
+MONDAY = local(2026, 10, 12)
+
+
+def test_hour_of_week():
+    assert autoscaler.hour_of_week(MONDAY) == 0
+    assert autoscaler.hour_of_week(local(2026, 10, 14, 20, 30)) == 2 * 24 + 20
+    assert autoscaler.hour_of_week(local(2026, 10, 18, 23, 59)) == 167
+
+
+def test_hourly_rates_follow_the_weekly_peak():
+    now = MONDAY + timedelta(weeks=4)
+    # Every week: 3 payments on Wednesday 20:xx, one on Monday 09:xx
+    times = []
+    for week in range(4):
+        start = MONDAY + timedelta(weeks=week)
+        times += [start + timedelta(days=2, hours=20, minutes=m) for m in (5, 20, 40)]
+        times.append(start + timedelta(hours=9, minutes=15))
+
+    rates = autoscaler.hourly_rates(times, now, weeks=8, decay=1.0, shrink=1.0)
+    assert rates[2 * 24 + 20] == 3.0
+    assert rates[9] == 1.0
+    assert sum(rates) == 4.0
+
+    # Shrinking spreads a little of the weekly total over the quiet hours
+    shrunk = autoscaler.hourly_rates(times, now, weeks=8, decay=1.0, shrink=0.5)
+    assert 0 < shrunk[3] < shrunk[9] < shrunk[2 * 24 + 20] < 3.0
+    assert abs(sum(shrunk) - 4.0) < 1e-9
+
+
+def test_hourly_rates_weigh_recent_weeks_more():
+    now = MONDAY + timedelta(weeks=2)
+    old = [MONDAY + timedelta(hours=10)] * 4
+    recent = [MONDAY + timedelta(weeks=1, hours=10)]
+    rates = autoscaler.hourly_rates(old + recent, now, weeks=8, decay=0.5, shrink=1.0)
+    # (1 * 1 + 0.5 * 4) / 1.5
+    assert abs(rates[10] - 2.0) < 1e-9
+    assert autoscaler.hourly_rates([], now) == [0.0] * autoscaler.HOURS_PER_WEEK
+
+
+def test_expected_arrivals_prorates_hour_buckets():
+    rates = [0.0] * autoscaler.HOURS_PER_WEEK
+    rates[20] = 6.0
+    rates[21] = 12.0
+    # 20:30 → 21:15: half of hour 20, a quarter of hour 21
+    assert abs(autoscaler.expected_arrivals(rates, MONDAY + timedelta(hours=20, minutes=30), 45 * 60) - 6.0) < 1e-9
+    # Sunday 23:30 wraps to Monday 00:00
+    rates[0] = 2.0
+    assert abs(autoscaler.expected_arrivals(rates, MONDAY - timedelta(minutes=30), 3600) - 1.0) < 1e-9
+
+
+def test_poisson_quantile():
+    assert autoscaler.poisson_quantile(0, 0.95) == 0
+    # P(N ≤ 2) ≈ 0.920, P(N ≤ 3) ≈ 0.981 for mean 1
+    assert autoscaler.poisson_quantile(1.0, 0.95) == 3
+    assert autoscaler.poisson_quantile(1.0, 0.9) == 2
+    assert autoscaler.poisson_quantile(10.0, 0.95) == 15
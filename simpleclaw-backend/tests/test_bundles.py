@@ -0,0 +1,74 @@
+"""Tar bundles of apps.servers.bundles: archive layout and content-keyed caching.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_bundles.py -v
+"""
+
+import io
+import tarfile
+
+import pytest
+
+from apps.servers import bundles
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(bundles, "_cache", {})
+
+
+def members(data):
+    with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+        return {t.name: (t, tar.extractfile(t).read() if t.isfile() else None) for t in tar.getmembers()}
+
+
+def test_build_tar():
+    data = bundles.build_tar({"a/b.txt": "ünïcode", "c.bin": b"\x00\x01"}, mode=0o600, uid=1000, gid=1000,
+                             dirs=["a"])
+    tar = members(data)
+    assert list(tar) == ["a", "a/b.txt", "c.bin"]
+    assert tar["a"][0].isdir() and tar["a"][0].mode == 0o755
+    assert tar["a/b.txt"][1] == "ünïcode".encode()
+    assert tar["c.bin"][0].mode == 0o600
+    assert {(t.uid, t.gid) for t, _ in tar.values()} == {(1000, 1000)}
+
+
+def tree(tmp_path, **files):
+    for name, content in files.items():
+        (tmp_path / name).write_text(content)
+    return [(str(tmp_path / name), f"skill/{name}") for name in files]
+
+
+def test_bundle_is_cached_by_content(tmp_path):
+    sources = tree(tmp_path, a="1", b="2")
+    first = bundles._bundle("test", sources)
+    assert bundles._bundle("test", sources) is first
+    assert first.files == ("skill/a", "skill/b")
+    assert len(first) == len(first.data)
+
+    (tmp_path / "b").write_text("changed")
+    second = bundles._bundle("test", sources)
+    assert second is not first and second.sha256 != first.sha256
+    assert members(second.data)["skill/b"][1] == b"changed"
+
+
+def test_owner_and_dirs_are_part_of_the_key(tmp_path):
+    sources = tree(tmp_path, a="1")
+    plain = bundles._bundle("test", sources)
+    assert bundles._bundle("test", sources, uid=1000, gid=1000).sha256 != plain.sha256
+    assert bundles._bundle("test", sources, dirs=["skill"]).sha256 != plain.sha256
+
+
+def test_missing_files_are_skipped(tmp_path):
+    sources = tree(tmp_path, a="1") + [(str(tmp_path / "gone"), "skill/gone")]
+    assert bundles._bundle("test", sources).files == ("skill/a",)
+
+
+def test_human_browser_bundle():
+    bundle = bundles.human_browser_bundle()
+    tar = members(bundle.data)
+    assert set(bundle.files) == {f"skills/human-browser/{f}" for f in bundles.HUMAN_BROWSER_FILES}
+    assert tar["skills/human-browser"][0].isdir()
+    assert {t.uid for t, _ in tar.values()} == {bundles.NODE_UID}
+    assert bundles.human_browser_bundle() is bundle
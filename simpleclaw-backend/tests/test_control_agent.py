@@ -0,0 +1,153 @@
+"""ControlAgentClient of apps.servers.control_agent and the SSH fallbacks of ServerManager.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_control_agent.py -v
+"""
+
+import io
+import json
+import time
+from unittest import mock
+
+import paramiko
+import pytest
+
+from apps.servers import control_agent
+from apps.servers.control_agent import ControlAgentClient, ControlAgentError, ControlAgentUnavailable
+from apps.servers.services import ServerManager
+
+
+class FakeChannel:
+    """Paramiko channel holding a canned HTTP response; keeps what the client sent."""
+
+    def __init__(self, status=200, body=b"{}"):
+        reason = {200: "OK", 401: "Unauthorized", 404: "Not Found", 409: "Conflict", 500: "Error"}[status]
+        self.response = (
+            f"HTTP/1.1 {status} {reason}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body
+        )
+        self.sent = b""
+
+    def settimeout(self, timeout):
+        pass
+
+    def sendall(self, data):
+        self.sent += data
+
+    def makefile(self, mode):
+        return io.BytesIO(self.response)
+
+    def close(self):
+        pass
+
+
+def manager(*channels, pk=1):
+    m = mock.Mock()
+    m.server.pk = pk
+    m.server.ip_address = "10.0.0.1"
+    m.client.get_transport.return_value.open_channel.side_effect = list(channels)
+    return m
+
+
+@pytest.fixture(autouse=True)
+def forget():
+    control_agent._unavailable.clear()
+    yield
+    control_agent._unavailable.clear()
+
+
+def test_request_sends_the_key_and_parses_json():
+    channel = FakeChannel(body=json.dumps({"logs": "line"}).encode())
+    client = ControlAgentClient(manager(channel))
+    assert client.logs("searxng", 50) == "line"
+    head = channel.sent.split(b"\r\n\r\n")[0].decode()
+    assert head.startswith("GET /logs?container=searxng&tail=50 HTTP/1.1")
+    assert f"X-Agent-Key: {control_agent.agent_key(client.server)}" in head
+
+
+def test_agent_key_is_per_server():
+    assert control_agent.agent_key(mock.Mock(pk=1)) != control_agent.agent_key(mock.Mock(pk=2))
+
+
+def test_refused_channel_backs_off():
+    m = manager(paramiko.ChannelException(2, "Connect failed"), FakeChannel())
+    client = ControlAgentClient(m)
+    with pytest.raises(ControlAgentUnavailable):
+        client.health()
+    # Later calls go straight to SSH without opening a channel
+    assert not client.enabled
+    with pytest.raises(ControlAgentUnavailable):
+        client.health()
+    assert m.client.get_transport.return_value.open_channel.call_count == 1
+    # Other servers are not affected
+    assert ControlAgentClient(manager(pk=2)).enabled
+
+
+def test_backoff_expires():
+    client = ControlAgentClient(manager(FakeChannel(status=404), FakeChannel(body=b'{"ok": true}')))
+    with pytest.raises(ControlAgentUnavailable):
+        client.health()
+    control_agent._unavailable[client.server.pk] = time.monotonic() - 1
+    assert client.enabled
+    assert client.health() == {"ok": True}
+
+
+def test_forget_unavailable():
+    client = ControlAgentClient(manager(FakeChannel(status=401)))
+    with pytest.raises(ControlAgentUnavailable):
+        client.health()
+    control_agent.forget_unavailable(client.server)
+    assert client.enabled
+
+
+def test_error_status_raises_control_agent_error():
+    client = ControlAgentClient(manager(FakeChannel(status=500, body=b'{"error": "exec failed"}')))
+    with pytest.raises(ControlAgentError, match="exec failed") as e:
+        client.install_skill("weather", {"SKILL.md": "x"})
+    assert e.value.status == 500
+    # The agent answered, so it is still used
+    assert client.enabled
+
+
+def test_write_config_conflict():
+    client = ControlAgentClient(manager(FakeChannel(status=409, body=b'{"error": "changed"}')))
+    assert client.write_config({"a": 1}, expected_sha="sha1") is False
+
+
+def test_read_config():
+    client = ControlAgentClient(manager(FakeChannel(body=json.dumps({"text": '{"a": 1}'}).encode())))
+    config, sha = client.read_config()
+    assert config == {"a": 1}
+    assert sha == control_agent.config_sha('{"a": 1}')
+
+
+class TestFallbacks:
+    """ServerManager methods go over SSH when the agent can't do the job."""
+
+    def manager(self, **agent):
+        m = mock.Mock()
+        m.server.ip_address = "10.0.0.1"
+        for name, effect in agent.items():
+            getattr(m.agent, name).side_effect = effect
+        return m
+
+    def test_tail_logs(self):
+        m = self.manager(logs=ControlAgentUnavailable("refused"))
+        m.exec_command.return_value = ("out\n", "err\n", 0)
+        assert ServerManager.tail_logs(m, "openclaw", 20) == "out\nerr\n"
+        assert m.exec_command.call_args.args[0] == "docker logs --tail 20 openclaw 2>&1"
+
+    def test_uninstall_skill_after_agent_error(self):
+        m = self.manager(uninstall_skill=ControlAgentError("boom", status=500))
+        ServerManager.uninstall_marketplace_skill(m, "weather")
+        m.exec_command.assert_called_once_with("docker exec openclaw rm -rf /app/skills/weather")
+
+    def test_install_skill_after_agent_error(self):
+        m = self.manager(install_skill=ControlAgentError("boom", status=500))
+        m.exec_command.return_value = ("OK\n", "", 0)
+        response = mock.Mock(status_code=200, text="# Weather")
+        with mock.patch("apps.servers.services.http_requests.get", return_value=response):
+            ServerManager.install_marketplace_skill(m, "weather", "https://github.com/a/b/tree/main/weather")
+        commands = [c.args[0] for c in m.exec_command.call_args_list]
+        assert commands[0] == "docker exec openclaw mkdir -p /app/skills/weather"
+        assert "# Weather" in commands[1]
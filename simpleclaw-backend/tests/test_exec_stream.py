@@ -0,0 +1,194 @@
+"""Streaming exec (apps.servers.exec_stream): pump() driving a local bash through a paramiko-shaped channel.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_exec_stream.py -v
+"""
+
+import io
+import os
+import select
+import shutil
+import subprocess
+from unittest import mock
+
+import pytest
+
+from apps.servers.exec_stream import MAX_LINE, OutputTail, StreamResult, pump
+from apps.servers.services import ServerManager
+
+
+class LocalChannel:
+    """`bash -c cmd` on this machine behind the channel methods pump() uses."""
+
+    def __init__(self, cmd):
+        self.proc = subprocess.Popen(
+            ["bash", "-c", cmd], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        os.set_blocking(self.proc.stdin.fileno(), False)
+        self.pipes = {"out": self.proc.stdout.fileno(), "err": self.proc.stderr.fileno()}
+        self.buffered = {"out": b"", "err": b""}
+        self.eof = set()
+
+    def _ready(self, name):
+        if not self.buffered[name] and name not in self.eof:
+            fd = self.pipes[name]
+            if select.select([fd], [], [], 0)[0]:
+                data = os.read(fd, 65536)
+                if data:
+                    self.buffered[name] = data
+                else:
+                    self.eof.add(name)
+        return bool(self.buffered[name])
+
+    def _recv(self, name, size):
+        data, self.buffered[name] = self.buffered[name][:size], self.buffered[name][size:]
+        return data
+
+    def recv_ready(self):
+        return self._ready("out")
+
+    def recv_stderr_ready(self):
+        return self._ready("err")
+
+    def recv(self, size):
+        return self._recv("out", size)
+
+    def recv_stderr(self, size):
+        return self._recv("err", size)
+
+    def exit_status_ready(self):
+        return self.proc.poll() is not None
+
+    def recv_exit_status(self):
+        return self.proc.wait()
+
+    def send_ready(self):
+        return not self.proc.stdin.closed
+
+    def send(self, data):
+        try:
+            return os.write(self.proc.stdin.fileno(), data)
+        except (BlockingIOError, BrokenPipeError):
+            return 0
+
+    def shutdown_write(self):
+        self.proc.stdin.close()
+
+    def fileno(self):
+        return self.pipes["out"]
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.kill()
+        self.proc.wait()
+        if not self.proc.stdin.closed:
+            self.proc.stdin.close()
+        self.proc.stdout.close()
+        self.proc.stderr.close()
+
+
+def run(cmd, timeout=10, **kwargs):
+    return pump(LocalChannel(cmd), timeout, **kwargs)
+
+
+needs_bash = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("bash", "head", "tr", "wc")), reason="needs bash and coreutils",
+)
+
+
+class TestOutputTail:
+    def test_keeps_the_last_bytes(self):
+        tail = OutputTail(4)
+        tail.write(b"abc")
+        tail.write(b"defg")
+        assert (tail.text(), tail.total, tail.truncated) == ("defg", 7, True)
+
+    def test_unlimited(self):
+        tail = OutputTail()
+        tail.write(b"x" * 100_000)
+        assert tail.total == 100_000 and not tail.truncated
+
+    def test_invalid_utf8_is_replaced(self):
+        tail = OutputTail(2)
+        tail.write("ü".encode() * 2)
+        tail.write(b"!")
+        assert tail.text() == "�!"
+
+
+@needs_bash
+class TestPump:
+    def test_both_streams_larger_than_a_pipe(self):
+        result = run(
+            "for i in 1 2 3 4; do head -c 100000 /dev/zero | tr '\\0' o; head -c 100000 /dev/zero | tr '\\0' e >&2; done; "
+            "exit 3",
+            tail_bytes=None,
+        )
+        assert result.exit_code == 3 and not result.ok
+        assert (result.bytes_out, result.bytes_err) == (400_000, 400_000)
+        assert set(result.out) == {"o"} and set(result.err) == {"e"}
+        assert not (result.truncated or result.capped or result.timed_out)
+
+    def test_tail_bytes(self):
+        result = run("head -c 100000 /dev/zero | tr '\\0' a; echo -n end", tail_bytes=10)
+        assert result.out == "aaaaaaaend"
+        assert result.bytes_out == 100_003 and result.truncated
+
+    def test_max_output_cuts_the_command_off(self):
+        result = run("yes", max_output=200_000, tail_bytes=100)
+        assert result.capped and result.exit_code is None
+        assert result.bytes_out > 200_000
+        assert result.as_tuple() == (result.out, "", None)
+
+    def test_idle_timeout(self):
+        result = run("echo started; sleep 5", timeout=0.5)
+        assert result.timed_out and result.exit_code is None
+        assert result.out == "started\n"
+        assert result.duration < 3
+
+    def test_output_keeps_a_slow_command_alive(self):
+        result = run("for i in 1 2 3 4; do echo $i; sleep 0.3; done", timeout=0.6)
+        assert result.ok and result.out == "1\n2\n3\n4\n"
+
+    def test_stdin_is_streamed(self):
+        data = os.urandom(1_000_000)
+        result = run("wc -c", stdin=io.BytesIO(data))
+        assert result.ok and result.out.strip() == "1000000"
+        assert result.bytes_sent == len(data)
+
+    def test_command_exiting_before_reading_stdin(self):
+        result = run("echo done", stdin=io.BytesIO(b"x" * 1_000_000))
+        assert result.ok and result.out == "done\n"
+
+    def test_lines(self):
+        seen = []
+        result = run(
+            "printf 'one\\ntw'; sleep 0.1; printf 'o\\n'; printf '10%%\\r55%%\\r100%%\\n' >&2; "
+            f"head -c {MAX_LINE + 500} /dev/zero | tr '\\0' x; printf '\\n\\n  \\nlast'",
+            on_line=lambda stream, line: seen.append((stream, line)),
+        )
+        assert result.ok
+        assert ("stdout", "one") in seen and ("stdout", "two") in seen
+        assert ("stderr", "100%") in seen
+        assert ("stdout", "x" * MAX_LINE) in seen
+        assert seen[-1] == ("stdout", "last")
+        assert all(line.strip() for _, line in seen)
+
+
+class TestExecCommand:
+    def result(self, **kwargs):
+        return StreamResult(out="o", err="e", exit_code=0, bytes_out=1, bytes_err=1, bytes_sent=0, duration=0.1,
+                            **kwargs)
+
+    def test_returns_the_full_output(self):
+        m = mock.Mock()
+        m.exec_stream.return_value = self.result()
+        assert ServerManager.exec_command(m, "true", timeout=5) == ("o", "e", 0)
+        assert m.exec_stream.call_args.kwargs == {"timeout": 5, "tail_bytes": None, "progress": False}
+
+    def test_idle_timeout_raises(self):
+        m = mock.Mock()
+        m.server.ip_address = "10.0.0.1"
+        m.exec_stream.return_value = self.result(timed_out=True)
+        with pytest.raises(TimeoutError):
+            ServerManager.exec_command(m, "sleep 100", timeout=5)
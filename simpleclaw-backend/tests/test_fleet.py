@@ -0,0 +1,109 @@
+"""FleetRunner of apps.servers.fleet: per-server results, checkpoint and --resume.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_fleet.py -v
+"""
+
+import json
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from apps.servers.fleet import Checkpoint, FleetError, FleetRunner, HostResult, SkipServer
+
+SERVERS = [SimpleNamespace(pk=i, ip_address=f"10.0.0.{i}") for i in range(1, 5)]
+
+
+def op(calls, fail=(), skip=()):
+    lock = threading.Lock()
+
+    def run(manager, server):
+        with lock:
+            calls.append(server.pk)
+        if server.pk in fail:
+            raise FleetError("docker restart failed")
+        if server.pk in skip:
+            raise SkipServer("no openclaw")
+        return f"done {server.pk}"
+    return run
+
+
+@pytest.fixture
+def checkpoint(tmp_path):
+    return str(tmp_path / "fleet-test.json")
+
+
+def runner(checkpoint, **kwargs):
+    lines = []
+    r = FleetRunner("test", checkpoint_path=checkpoint, progress=lambda line, status: lines.append(status), **kwargs)
+    return r, lines
+
+
+def test_results_and_progress(checkpoint):
+    calls = []
+    r, lines = runner(checkpoint, concurrency=2)
+    summary = r.run(SERVERS, op(calls, fail={2}, skip={3}))
+
+    assert sorted(calls) == [1, 2, 3, 4]
+    by_id = {res.server_id: res for res in summary.results}
+    assert (by_id[1].status, by_id[1].message) == ("ok", "done 1")
+    assert (by_id[2].status, by_id[2].message) == ("failed", "docker restart failed")
+    assert by_id[3].status == "skipped"
+    assert (summary.count("ok"), summary.count("failed"), summary.count("skipped")) == (2, 1, 1)
+    assert sorted(lines) == ["failed", "ok", "ok", "skipped"]
+    assert summary.as_dict()["failed"] == 1
+
+
+def test_checkpoint_after_every_host(checkpoint):
+    r, _ = runner(checkpoint)
+    r.run(SERVERS, op([], fail={2}))
+    with open(checkpoint) as f:
+        data = json.load(f)
+    assert data["name"] == "test"
+    assert {k: v["status"] for k, v in data["done"].items()} == {"1": "ok", "2": "failed", "3": "ok", "4": "ok"}
+
+
+def test_resume_skips_servers_that_succeeded(checkpoint):
+    runner(checkpoint)[0].run(SERVERS, op([], fail={2}, skip={3}))
+
+    calls = []
+    r, _ = runner(checkpoint, resume=True)
+    summary = r.run(SERVERS, op(calls))
+    # Failed and skipped servers are retried
+    assert sorted(calls) == [2, 3]
+    assert summary.resumed == 2
+    assert summary.count("ok") == 2
+
+
+def test_without_resume_everything_runs(checkpoint):
+    runner(checkpoint)[0].run(SERVERS, op([]))
+    calls = []
+    runner(checkpoint)[0].run(SERVERS, op(calls))
+    assert sorted(calls) == [1, 2, 3, 4]
+
+
+def test_checkpoint_of_another_command_is_ignored(checkpoint):
+    Checkpoint(checkpoint, "other").record(HostResult(1, "10.0.0.1", "ok"))
+    cp = Checkpoint(checkpoint, "test")
+    cp.load()
+    assert cp.done == {}
+    with open(checkpoint, "w") as f:
+        f.write("{broken")
+    cp.load()
+    assert cp.done == {}
+
+
+def test_host_timeout(checkpoint):
+    def slow(manager, server):
+        if server.pk == 1:
+            time.sleep(0.5)
+        return "fast"
+
+    r, _ = runner(checkpoint, timeout=0.1)
+    summary = r.run(SERVERS[:2], slow)
+    by_id = {res.server_id: res for res in summary.results}
+    assert by_id[1].status == "failed" and "timed out" in by_id[1].message
+    assert by_id[2].status == "ok"
@@ -0,0 +1,75 @@
+"""Hot user injection into a warm standby (ServerManager._hot_deploy_user).
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_hot_deploy.py -v
+"""
+
+from unittest import mock
+
+import pytest
+
+from apps.servers.services import ServerManager
+
+
+def manager(token="warm-token", stack_current=True, verified=True):
+    m = mock.MagicMock()
+    m.server.ip_address = "10.0.0.1"
+    m.server.openclaw_path = "/root/openclaw"
+    m.server.status = "ready"
+    for name in ("_ensure_openrouter_prefix", "_user_env_content", "_user_config_content"):
+        setattr(m, name, getattr(ServerManager, name))
+    m.warm_standby_token.return_value = token
+    m.run_step.side_effect = lambda name, fn, *args, **kwargs: fn(*args, **kwargs)
+    m._apply_config_with_retry.return_value = verified
+    m.stack_current = stack_current
+    return m
+
+
+def hot_deploy(m):
+    with mock.patch("apps.servers.services.Reconciler") as reconciler:
+        reconciler.return_value.current.return_value = m.stack_current
+        return ServerManager._hot_deploy_user(m, "sk-or-key", "123:abc", "claude-sonnet-4", 42)
+
+
+def steps(m):
+    return [c.args[0] for c in m.run_step.call_args_list]
+
+
+@pytest.mark.parametrize("kwargs", [{"token": ""}, {"stack_current": False}])
+def test_not_a_warm_standby(kwargs):
+    m = manager(**kwargs)
+    assert hot_deploy(m) is False
+    assert steps(m) == []
+    m.upload_many.assert_not_called()
+    m.server.save.assert_not_called()
+
+
+def test_injects_the_user_into_the_running_stack():
+    m = manager()
+    assert hot_deploy(m) is True
+    assert steps(m) == ["user-files", "telegram-config", "token-optimization", "apply-config"]
+
+    files, = m.upload_many.call_args.args
+    # The gateway token of the warm .env is kept
+    assert "OPENCLAW_GATEWAY_TOKEN=warm-token" in files["/root/openclaw/.env"]
+    assert "TELEGRAM_BOT_TOKEN=123:abc" in files["/root/openclaw/.env"]
+    assert '["42"]' in files["/root/openclaw/openclaw-config.yaml"]
+
+    cfg = {}
+    m.patch_openclaw_config.call_args.args[0].apply(cfg)
+    telegram = cfg["channels"]["telegram"]
+    assert (telegram["botToken"], telegram["allowFrom"], telegram["dmPolicy"]) == ("123:abc", ["42"], "pairing")
+
+    assert m._apply_config_with_retry.call_args.kwargs == {"attempts": 1}
+    assert m._apply_config_with_retry.call_args.args[1].startswith("openrouter/")
+    assert not any("compose" in c.args[0] for c in m.exec_command.call_args_list)
+    assert (m.server.status, m.server.gateway_token, m.server.openclaw_running) == ("active", "warm-token", True)
+    m.server.save.assert_called_once_with()
+
+
+def test_unverified_config_falls_back():
+    m = manager(verified=False)
+    assert hot_deploy(m) is False
+    assert m.server.status == "ready"
+    m.server.save.assert_not_called()
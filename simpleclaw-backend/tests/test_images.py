@@ -0,0 +1,157 @@
+"""Releases of apps.servers.images: the build key (Dockerfile plus base image digests) and pins.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_images.py -v
+"""
+
+from unittest import mock
+
+import pytest
+from django.core.cache import cache
+
+from apps.servers import images
+
+DOCKERFILE = """FROM ghcr.io/openclaw/openclaw:latest
+USER root
+RUN apt-get update
+"""
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def registry(digests):
+    """resolve_digest stand-in serving `digests` ({ref: digest}); a missing ref is unreachable."""
+    return mock.patch.object(images, "resolve_digest", side_effect=lambda ref: digests.get(ref, ""))
+
+
+def test_base_images_skips_stages_and_scratch():
+    dockerfile = (
+        "FROM --platform=linux/amd64 node:22 AS deps\n"
+        "FROM deps\n"
+        "FROM scratch\n"
+        "from ghcr.io/openclaw/openclaw:latest as final\n"
+    )
+    assert images.base_images(dockerfile) == ["node:22", "ghcr.io/openclaw/openclaw:latest"]
+
+
+def test_split_ref():
+    assert images._split_ref("ghcr.io/openclaw/openclaw:latest") == ("ghcr.io", "openclaw/openclaw", "latest")
+    assert images._split_ref("node:22") == ("registry-1.docker.io", "library/node", "22")
+    assert images._split_ref("lightpanda/browser") == ("registry-1.docker.io", "lightpanda/browser", "latest")
+    assert images._split_ref("localhost:5000/openclaw-chrome") == ("localhost:5000", "openclaw-chrome", "latest")
+
+
+def refreshed_tag():
+    return images.release(DOCKERFILE, refresh=True)["tag"]
+
+
+def test_new_upstream_digest_is_a_new_tag():
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:aaa"}):
+        first = refreshed_tag()
+    cache.delete(f"image-base:{images.dockerfile_sha(DOCKERFILE)}")  # check interval passed
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:bbb"}):
+        second = refreshed_tag()
+    assert first != second
+    assert second.startswith(f"{images.IMAGE_REPOSITORY}:")
+
+
+def test_digest_is_cached_between_checks():
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:aaa"}) as resolve:
+        assert refreshed_tag() == refreshed_tag()
+    assert resolve.call_count == 1
+
+
+def test_unreachable_registry_keeps_last_digest():
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:aaa"}):
+        tag = refreshed_tag()
+    cache.delete(f"image-base:{images.dockerfile_sha(DOCKERFILE)}")
+    with registry({}):
+        assert refreshed_tag() == tag
+
+
+def test_build_pins_the_resolved_digest():
+    bases = {"ghcr.io/openclaw/openclaw:latest": "sha256:aaa"}
+    assert images.pinned(DOCKERFILE, bases).splitlines()[0] == "FROM ghcr.io/openclaw/openclaw:latest@sha256:aaa"
+
+
+@pytest.mark.usefixtures("db")
+def test_deploys_stay_on_the_last_ready_build():
+    from apps.servers.models import ImageBuild
+
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:aaa"}):
+        built = images.release(DOCKERFILE, refresh=True)
+    ImageBuild.objects.create(
+        build_key=built["key"], tag=built["tag"], status="ready",
+        dockerfile_sha=built["dockerfile"], base_digests=built["bases"],
+    )
+    cache.clear()
+    with registry({"ghcr.io/openclaw/openclaw:latest": "sha256:bbb"}) as resolve:
+        assert images.release(DOCKERFILE) == built
+        resolve.assert_not_called()
+        assert images.release(DOCKERFILE, refresh=True)["key"] != built["key"]
+
+
+@pytest.mark.usefixtures("db")
+def test_pin_prefers_the_registry_digest():
+    from apps.servers.models import ImageBuild
+
+    release = images.release(DOCKERFILE, refresh=True)
+    build = ImageBuild.objects.create(build_key=release["key"], tag=release["tag"], status="ready")
+    manager = mock.Mock()
+    local = {release["tag"]: "sha256:111", "registry.local/openclaw-chrome@sha256:222": "sha256:111"}
+    manager.exec_command.side_effect = lambda cmd: (
+        (local[cmd.split()[-2]] + "\n", "", 0) if cmd.split()[-2] in local else ("", "", 1)
+    )
+
+    assert images.pin(manager, release) == {**release, "id": "sha256:111", "ref": release["tag"]}
+    build.registry_ref = "registry.local/openclaw-chrome@sha256:222"
+    build.save()
+    assert images.pin(manager, release)["ref"] == build.registry_ref
+    # Loaded from a stream: the server doesn't know the digest
+    del local[build.registry_ref]
+    assert images.pin(manager, release)["ref"] == release["tag"]
+
+
+def test_resolve_digest_with_anonymous_token():
+    challenge = mock.Mock(status_code=401, headers={
+        "WWW-Authenticate": 'Bearer realm="https://ghcr.io/token",service="ghcr.io",scope="repository:openclaw/openclaw:pull"',
+    })
+    ok = mock.Mock(status_code=200, headers={"Docker-Content-Digest": "sha256:ccc"})
+    with mock.patch.object(images.requests, "head", side_effect=[challenge, ok]) as head, \
+            mock.patch.object(images.requests, "get") as get:
+        get.return_value.json.return_value = {"token": "anon"}
+        assert images.resolve_digest("ghcr.io/openclaw/openclaw:latest") == "sha256:ccc"
+    assert head.call_args_list[0].args[0] == "https://ghcr.io/v2/openclaw/openclaw/manifests/latest"
+    assert get.call_args.kwargs["params"] == {"service": "ghcr.io", "scope": "repository:openclaw/openclaw:pull"}
+    assert head.call_args.kwargs["headers"]["Authorization"] == "Bearer anon"
+
+    with mock.patch.object(images.requests, "head", side_effect=OSError("no route")):
+        assert images.resolve_digest("ghcr.io/openclaw/openclaw:latest") == ""
+    assert images.resolve_digest("node@sha256:ddd") == "sha256:ddd"
+
+
+@pytest.mark.usefixtures("db")
+def test_server_stays_on_its_pin():
+    from apps.servers.models import Server
+    from apps.servers.services import DOCKERFILE_CONTENT, ServerManager
+
+    base = images.base_images(DOCKERFILE_CONTENT)[0]
+    with registry({base: "sha256:aaa"}):
+        pin = {**images.release(DOCKERFILE_CONTENT, refresh=True), "id": "sha256:111"}
+    server = Server.objects.create(status="active", deploy_state={"image": pin})
+    cache.clear()
+
+    with registry({base: "sha256:bbb"}) as resolve:
+        assert ServerManager(server).image_release() == pin
+        resolve.assert_not_called()
+        # Only a warm deploy moves to the new base
+        assert ServerManager(server).image_release(refresh=True)["key"] != pin["key"]
+    cache.clear()
+    with registry({base: "sha256:aaa"}):
+        assert ServerManager(server).image_release(refresh=True) == pin
@@ -0,0 +1,125 @@
+"""Resuming failed deploys (apps.servers.journal): the idempotency key and checkpointed steps.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_journal.py -v
+"""
+
+import itertools
+from datetime import timedelta
+
+import pytest
+
+from apps.servers import journal
+from apps.servers.journal import journaled
+from apps.servers.models import DeployRun, Server
+
+pytestmark = pytest.mark.usefixtures("db")
+
+tokens = itertools.count()
+
+
+class FakeManager:
+    """The parts of ServerManager a @journaled deploy uses; `container` is what docker inspect shows."""
+
+    def __init__(self, server):
+        self.server = server
+        self.journal = None
+        self.container = "c1 i1"
+        self.calls = []
+        self.fail_at = None
+
+    def exec_command(self, cmd, timeout=60):
+        return f"{self.container}\n", "", 0
+
+    def run_step(self, name, fn, *args, **kwargs):
+        return self.journal.run_step(name, fn, *args, **kwargs)
+
+    def _step(self, name, result):
+        self.calls.append(name)
+        if name == self.fail_at:
+            raise RuntimeError(f"{name} failed")
+        return result
+
+    @journaled("full")
+    def deploy(self, telegram_token, model="claude-sonnet-4"):
+        token = self.journal.remember("gateway-token", lambda: f"token-{next(tokens)}")
+        out, _, code = self.run_step("recreate", self._step, "recreate", ("o" * 2000, "", 0))
+        assert code == 0
+        self.run_step("config", self._step, "config", True)
+        self.run_step("agents", self._step, "agents", None)
+        return token
+
+    def failed_deploy(self, *args, **kwargs):
+        self.fail_at = "agents"
+        with pytest.raises(RuntimeError):
+            self.deploy(*args, **kwargs)
+        self.fail_at, self.calls = None, []
+        return DeployRun.objects.filter(server=self.server).latest("started_at")
+
+
+@pytest.fixture
+def manager():
+    return FakeManager(Server.objects.create(status="error"))
+
+
+def test_idempotency_key():
+    server = Server(pk=1)
+    key = journal.idempotency_key("full", server, {"model": "a", "token": "t"})
+    assert key == journal.idempotency_key("full", server, {"token": "t", "model": "a"})
+    assert key != journal.idempotency_key("full", server, {"model": "b", "token": "t"})
+    assert key != journal.idempotency_key("quick", server, {"model": "a", "token": "t"})
+    assert key != journal.idempotency_key("full", Server(pk=2), {"model": "a", "token": "t"})
+
+
+def test_failed_run_is_checkpointed(manager):
+    run = manager.failed_deploy("123:abc")
+    assert run.status == "failed"
+    assert sorted(run.checkpoint["steps"]) == ["config", "recreate"]
+    assert run.checkpoint["container"] == "c1 i1"
+    # Step output is trimmed to what a resume needs
+    assert len(run.checkpoint["steps"]["recreate"][0]) == journal.CHECKPOINT_TEXT
+    assert journal.resumable(manager.server) == run
+
+
+def test_resume_skips_finished_steps(manager):
+    first = manager.failed_deploy("123:abc")
+    token = manager.deploy("123:abc", resume=True)
+
+    assert manager.calls == ["agents"]
+    assert token == first.checkpoint["values"]["gateway-token"]
+    run = DeployRun.objects.filter(server=manager.server).latest("started_at")
+    assert (run.status, run.resumed_from_id) == ("ok", first.pk)
+    assert [(s.name, s.status) for s in run.steps.order_by("position")] == [
+        ("recreate", "skipped"), ("config", "skipped"), ("agents", "ok"),
+    ]
+
+
+def test_no_resume_with_other_arguments(manager):
+    manager.failed_deploy("123:abc", model="claude-opus-4.5")
+    manager.deploy("123:abc", resume=True)
+    assert manager.calls == ["recreate", "config", "agents"]
+
+
+def test_no_resume_when_the_container_changed(manager):
+    manager.failed_deploy("123:abc")
+    manager.container = "c2 i1"
+    manager.deploy("123:abc", resume=True)
+    assert manager.calls == ["recreate", "config", "agents"]
+
+
+def test_no_resume_of_an_old_run(manager):
+    run = manager.failed_deploy("123:abc")
+    DeployRun.objects.filter(pk=run.pk).update(
+        started_at=run.started_at - timedelta(hours=journal.DEPLOY_RESUME_MAX_AGE + 1),
+    )
+    assert journal.resumable(manager.server) is None
+    manager.deploy("123:abc", resume=True)
+    assert manager.calls == ["recreate", "config", "agents"]
+
+
+def test_without_resume_flag_starts_over(manager):
+    first = manager.failed_deploy("123:abc")
+    token = manager.deploy("123:abc")
+    assert manager.calls == ["recreate", "config", "agents"]
+    assert token != first.checkpoint["values"]["gateway-token"]
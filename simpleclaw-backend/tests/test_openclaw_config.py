@@ -0,0 +1,154 @@
+"""openclaw.json patching of apps.servers.openclaw_config.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_openclaw_config.py -v
+"""
+
+import hashlib
+import shutil
+import subprocess
+from unittest import mock
+
+import pytest
+
+from apps.servers import openclaw_config
+from apps.servers.openclaw_config import ConfigPatch
+from apps.servers.services import ServerManager
+
+
+def config():
+    return {
+        "agents": {"defaults": {"maxConcurrent": 4, "model": {"primary": "openrouter/a", "fallbacks": ["b"]}}},
+        "gateway": {"mode": "local", "http": {"endpoints": {"responses": {"enabled": True}}}},
+    }
+
+
+class TestApply:
+    def test_set_creates_intermediate_objects(self):
+        cfg = config()
+        assert ConfigPatch().set("agents.defaults.maxConcurrent", 2).set("tools.web.search.enabled", True).apply(cfg)
+        assert cfg["agents"]["defaults"]["maxConcurrent"] == 2
+        assert cfg["tools"] == {"web": {"search": {"enabled": True}}}
+
+    def test_merge_keeps_other_keys(self):
+        cfg = config()
+        ConfigPatch().merge("gateway.http.endpoints", {"chatCompletions": {"enabled": True}}).apply(cfg)
+        assert cfg["gateway"]["http"]["endpoints"] == {
+            "responses": {"enabled": True}, "chatCompletions": {"enabled": True},
+        }
+
+    def test_merge_replaces_lists(self):
+        cfg = config()
+        ConfigPatch().merge("agents.defaults.model", {"fallbacks": ["c", "d"]}).apply(cfg)
+        assert cfg["agents"]["defaults"]["model"] == {"primary": "openrouter/a", "fallbacks": ["c", "d"]}
+
+    def test_merge_into_missing_path(self):
+        cfg = config()
+        ConfigPatch().merge("browser.profiles", {"lightpanda": {"cdpUrl": "ws://x"}}).apply(cfg)
+        assert cfg["browser"] == {"profiles": {"lightpanda": {"cdpUrl": "ws://x"}}}
+
+    def test_delete_and_update(self):
+        cfg = config()
+        patch = ConfigPatch().delete("gateway.mode").delete("no.such.key")
+        patch.update(lambda c: c["agents"]["defaults"]["model"]["fallbacks"].append("e"))
+        assert patch.apply(cfg)
+        assert "mode" not in cfg["gateway"]
+        assert cfg["agents"]["defaults"]["model"]["fallbacks"] == ["b", "e"]
+
+    def test_ops_apply_in_order(self):
+        cfg = config()
+        ConfigPatch().set("a.b", 1).delete("a.b").set("a.c", 2).apply(cfg)
+        assert cfg["a"] == {"c": 2}
+
+    def test_unchanged_config(self):
+        cfg = config()
+        assert not ConfigPatch().set("gateway.mode", "local").delete("missing").apply(cfg)
+        assert cfg == config()
+
+    def test_values_are_copied(self):
+        value = {"enabled": True}
+        cfg = config()
+        ConfigPatch().set("x", value).merge("y", value).apply(cfg)
+        value["enabled"] = False
+        assert cfg["x"] == cfg["y"] == {"enabled": True}
+
+    def test_schema_mismatch_raises(self):
+        with pytest.raises(TypeError):
+            ConfigPatch().set("gateway.mode.port", 1).apply(config())
+        with pytest.raises(TypeError):
+            ConfigPatch().merge("gateway.mode", {"a": 1}).apply(config())
+        with pytest.raises(TypeError):
+            ConfigPatch().merge("gateway", "remote")
+
+    def test_extend_and_bool(self):
+        assert not ConfigPatch()
+        patch = ConfigPatch().set("a", 1).extend(ConfigPatch().set("b", 2))
+        assert patch and [op[1] for op in patch.ops] == ["a", "b"]
+
+
+class TestPatchOpenclawConfig:
+    """ServerManager.patch_openclaw_config: read, apply, conditional write."""
+
+    def manager(self, *reads, written=(True,)):
+        m = mock.Mock()
+        m.server.ip_address = "10.0.0.1"
+        m.read_openclaw_config.side_effect = list(reads)
+        m.write_openclaw_config.side_effect = list(written)
+        return m
+
+    def test_writes_once_with_the_read_sha(self):
+        m = self.manager((config(), "sha1"))
+        assert ServerManager.patch_openclaw_config(m, ConfigPatch().set("gateway.mode", "remote"))
+        written, = m.write_openclaw_config.call_args.args
+        assert written["gateway"]["mode"] == "remote"
+        assert m.write_openclaw_config.call_args.kwargs == {"expected_sha": "sha1"}
+
+    def test_unchanged_config_is_not_written(self):
+        m = self.manager((config(), "sha1"))
+        assert not ServerManager.patch_openclaw_config(m, ConfigPatch().set("gateway.mode", "local"))
+        m.write_openclaw_config.assert_not_called()
+
+    def test_conflict_rereads(self):
+        m = self.manager((config(), "sha1"), (config(), "sha2"), written=(False, True))
+        assert ServerManager.patch_openclaw_config(m, ConfigPatch().set("a", 1))
+        assert m.write_openclaw_config.call_args.kwargs == {"expected_sha": "sha2"}
+        with pytest.raises(RuntimeError):
+            ServerManager.patch_openclaw_config(
+                self.manager(*[(config(), "sha") for _ in range(3)], written=(False,) * 3), ConfigPatch().set("a", 1),
+            )
+
+    def test_invalid_json_is_not_overwritten(self):
+        m = self.manager((None, "sha1"))
+        with pytest.raises(RuntimeError):
+            ServerManager.patch_openclaw_config(m, ConfigPatch().set("a", 1))
+        m.write_openclaw_config.assert_not_called()
+
+
+@pytest.mark.skipif(not shutil.which("sha256sum"), reason="needs coreutils")
+class TestWriteScript:
+    def write(self, path, text, expected_sha):
+        script = openclaw_config.write_script(str(path), expected_sha)
+        return subprocess.run(["sh", "-c", script], input=text.encode(), check=False).returncode
+
+    def test_replaces_the_file_when_unchanged(self, tmp_path):
+        path = tmp_path / "openclaw.json"
+        path.write_text("{}")
+        path.chmod(0o600)
+        assert self.write(path, '{"a": 1}', openclaw_config.config_sha("{}")) == 0
+        assert path.read_text() == '{"a": 1}'
+        assert path.stat().st_mode & 0o777 == 0o600
+        assert [p.name for p in tmp_path.iterdir()] == ["openclaw.json"]
+
+    def test_conflict_leaves_the_file(self, tmp_path):
+        path = tmp_path / "openclaw.json"
+        path.write_text('{"changed": true}')
+        code = self.write(path, '{"a": 1}', hashlib.sha256(b"{}").hexdigest())
+        assert code == openclaw_config.CONFLICT_EXIT_CODE
+        assert path.read_text() == '{"changed": true}'
+        assert [p.name for p in tmp_path.iterdir()] == ["openclaw.json"]
+
+    def test_creates_a_missing_file(self, tmp_path):
+        path = tmp_path / "openclaw.json"
+        assert self.write(path, "{}", openclaw_config.config_sha("")) == 0
+        assert path.read_text() == "{}"
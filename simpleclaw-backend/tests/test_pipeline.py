@@ -0,0 +1,152 @@
+"""Dependency graph and scheduling of apps.servers.pipeline.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_pipeline.py -v
+"""
+
+import threading
+import time
+from unittest import mock
+
+import pytest
+
+from apps.servers.pipeline import Pipeline
+
+
+def manager():
+    m = mock.Mock()
+    m.server.ip_address = "10.0.0.1"
+    return m
+
+
+def noop(m):
+    return None
+
+
+def deps(pipeline):
+    return {t.name: t.deps for t in pipeline.tasks}
+
+
+class TestGraph:
+    def test_read_after_write(self):
+        p = Pipeline(manager())
+        p.add("up", noop, writes=["container"])
+        p.add("prune", noop, reads=["container"], writes=["skills"])
+        p.add("agents", noop, reads=["container"], writes=["workspaces"])
+        assert deps(p) == {"up": set(), "prune": {"up"}, "agents": {"up"}}
+
+    def test_write_after_write_keeps_order(self):
+        p = Pipeline(manager())
+        p.add("model", noop, writes=["config"])
+        p.add("search", noop, writes=["config"])
+        p.add("browser", noop, writes=["config"])
+        assert deps(p) == {"model": set(), "search": {"model"}, "browser": {"search"}}
+
+    def test_write_after_read(self):
+        p = Pipeline(manager())
+        p.add("up", noop, writes=["container"])
+        p.add("prune", noop, reads=["container"])
+        p.add("agents", noop, reads=["container"])
+        p.add("restart", noop, writes=["container"])
+        p.add("check", noop, reads=["container"])
+        assert deps(p)["restart"] == {"up", "prune", "agents"}
+        # Readers before the restart don't hold up readers after it
+        assert deps(p)["check"] == {"restart"}
+
+    def test_independent_tasks_share_nothing(self):
+        p = Pipeline(manager())
+        p.add("browser", noop, writes=["human-browser"])
+        p.add("watchdog", noop, writes=["cron"])
+        assert deps(p) == {"browser": set(), "watchdog": set()}
+
+    def test_explicit_after(self):
+        p = Pipeline(manager())
+        p.add("a", noop)
+        p.add("b", noop, after=["a"])
+        assert deps(p)["b"] == {"a"}
+        with pytest.raises(ValueError):
+            p.add("c", noop, after=["later"])
+        with pytest.raises(ValueError):
+            p.add("a", noop)
+
+
+class TestRun:
+    def test_dependencies_finish_first(self):
+        log = []
+        lock = threading.Lock()
+
+        def step(name, delay=0.0):
+            def fn(m):
+                with lock:
+                    log.append(("start", name))
+                time.sleep(delay)
+                with lock:
+                    log.append(("end", name))
+                return name
+            return fn
+
+        p = Pipeline(manager(), concurrency=4)
+        p.add("up", step("up", 0.02), writes=["container"])
+        p.add("slow", step("slow", 0.05), reads=["container"], writes=["skills"])
+        p.add("fast", step("fast"), reads=["container"], writes=["workspaces"])
+        p.add("restart", step("restart"), writes=["container"])
+        result = p.run()
+
+        assert log.index(("end", "up")) < log.index(("start", "slow"))
+        assert log.index(("end", "up")) < log.index(("start", "fast"))
+        assert log.index(("end", "slow")) < log.index(("start", "restart"))
+        assert log.index(("end", "fast")) < log.index(("start", "restart"))
+        assert result["fast"].result == "fast"
+        assert [name for name, _ in result.critical_path] == ["up", "slow", "restart"]
+        p.manager.journal.set_critical_path.assert_called_once_with(result.critical_path)
+
+    def test_independent_tasks_overlap(self):
+        both = threading.Barrier(2, timeout=2)
+        p = Pipeline(manager(), concurrency=2)
+        p.add("a", lambda m: both.wait(), writes=["x"])
+        p.add("b", lambda m: both.wait(), writes=["y"])
+        p.run()  # BrokenBarrierError if they ran one after the other
+
+    def test_concurrency_limit(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def fn(m):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.02)
+            with lock:
+                running.pop()
+
+        p = Pipeline(manager(), concurrency=2)
+        for i in range(5):
+            p.add(f"t{i}", fn)
+        p.run()
+        assert max(peak) == 2
+
+    def test_failure_stops_later_tasks(self):
+        p = Pipeline(manager(), concurrency=1)
+        p.add("ok", noop, writes=["a"])
+        p.add("boom", mock.Mock(side_effect=RuntimeError("apt locked")), writes=["b"])
+        never = mock.Mock()
+        p.add("later", never, reads=["a", "b"])
+        with pytest.raises(RuntimeError, match="apt locked"):
+            p.run()
+        never.assert_not_called()
+        assert p.tasks[2].started is None
+
+    def test_each_task_gets_its_own_view(self):
+        m = manager()
+        views = [mock.Mock(name=f"view{i}") for i in range(2)]
+        m.share.side_effect = views
+        seen = []
+        p = Pipeline(m, concurrency=1)
+        p.add("a", seen.append)
+        p.add("b", seen.append)
+        p.run()
+        assert seen == views
+        for view in views:
+            view.disconnect.assert_called_once_with()
@@ -0,0 +1,277 @@
+"""Provisioning state machine of apps.servers.provisioning (TimeWeb and SSH stubbed).
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_provisioning.py -v
+"""
+
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.servers import provisioning, services, tasks, timeweb
+from apps.servers.models import Server
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+def tw_info(status="on", ipv4=None, ipv6=None, root_pass="pw", server_id=77):
+    """A server as get_server_info()/list_servers() return it."""
+    ips = [{"type": t, "ip": ip} for t, ip in (("ipv4", ipv4), ("ipv6", ipv6)) if ip]
+    return {"id": server_id, "status": status, "root_pass": root_pass,
+            "networks": [{"type": "public", "ips": ips}]}
+
+
+def make_server(state, ago=0, profile=None, ip="10.0.0.1", timeweb_id="77", **data):
+    """A server in `state` since `ago` seconds (IP set after creation: no install signal)."""
+    server = Server.objects.create(status="creating", timeweb_server_id=timeweb_id, profile=profile)
+    if state != provisioning.CREATED:
+        server.ip_address = ip
+        server.status = "provisioning"
+        server.save(update_fields=["ip_address", "status"])
+    provisioning.enter(server, state, **data)
+    if ago:
+        Server.objects.filter(pk=server.pk).update(provision_state_at=timezone.now() - timedelta(seconds=ago))
+        server.refresh_from_db()
+    return server
+
+
+@pytest.fixture(autouse=True)
+def celery():
+    """The tasks provisioning queues, as mocks (no broker)."""
+    with mock.patch.object(tasks, "notify_admin") as notify_admin, \
+            mock.patch.object(tasks, "notify_error") as notify_error, \
+            mock.patch.object(tasks, "create_standby_server_with_retry") as replace, \
+            mock.patch.object(tasks, "personalize_golden_server") as personalize, \
+            mock.patch.object(tasks, "advance_provisioning") as advance:
+        yield mock.Mock(notify_admin=notify_admin, notify_error=notify_error, replace=replace,
+                        personalize=personalize, advance=advance)
+
+
+@pytest.fixture
+def manager():
+    """ServerManager stand-in; `manager.commands` maps a command prefix to (out, err, code)."""
+    instance = mock.MagicMock()
+    instance.__enter__.return_value = instance
+    instance.commands = {}
+
+    def exec_command(cmd, timeout=None):
+        for prefix, result in instance.commands.items():
+            if cmd.startswith(prefix):
+                return result
+        return "", "", 0
+
+    instance.exec_command.side_effect = exec_command
+    with mock.patch.object(services, "ServerManager", return_value=instance):
+        yield instance
+
+
+@pytest.fixture
+def delete_server():
+    with mock.patch.object(timeweb, "delete_server", return_value=True) as delete:
+        yield delete
+
+
+def state_of(server):
+    server.refresh_from_db()
+    return server.provision_state
+
+
+class TestCreated:
+    def test_waits_for_timeweb(self):
+        server = make_server(provisioning.CREATED)
+        with mock.patch.object(timeweb, "get_server_info", return_value=tw_info(status="starting")):
+            assert provisioning.advance(server.pk) is None
+        assert state_of(server) == provisioning.CREATED
+        assert server.ssh_password == "pw"
+
+    def test_on_with_ipv4_is_booting(self):
+        server = make_server(provisioning.CREATED)
+        with mock.patch.object(timeweb, "get_server_info", return_value=tw_info(ipv4="10.0.0.9")):
+            assert provisioning.advance(server.pk) == 0
+        assert state_of(server) == provisioning.BOOTING
+        assert (server.ip_address, server.status) == ("10.0.0.9", "provisioning")
+
+    def test_ipv6_only_requests_ipv4_once(self):
+        server = make_server(provisioning.CREATED)
+        with mock.patch.object(timeweb, "get_server_info", return_value=tw_info(ipv6="::1")), \
+                mock.patch.object(timeweb, "request_ipv4", return_value=None) as request_ipv4:
+            assert provisioning.advance(server.pk) is None
+            assert provisioning.advance(server.pk) is None
+        assert request_ipv4.call_count == 1
+        assert state_of(server) == provisioning.CREATED
+
+    def test_boot_deadline_replaces_pool_server(self, celery, delete_server):
+        server = make_server(provisioning.CREATED, ago=provisioning.PROVISION_BOOT_TIMEOUT + 1)
+        with mock.patch.object(timeweb, "get_server_info", return_value=tw_info(status="starting")):
+            assert provisioning.advance(server.pk) is None
+        assert not Server.objects.filter(pk=server.pk).exists()
+        delete_server.assert_called_once_with("77")
+        celery.replace.delay.assert_called_once_with()
+        assert "DELETING" in celery.notify_error.delay.call_args.args[0]
+
+
+class TestSweep:
+    def test_one_listing_for_all_created_servers(self):
+        up = make_server(provisioning.CREATED, timeweb_id="1")
+        down = make_server(provisioning.CREATED, timeweb_id="2")
+        listing = [tw_info(ipv4="10.0.0.5", server_id=1), tw_info(status="starting", server_id=2)]
+        with mock.patch.object(timeweb, "list_servers", return_value=listing) as list_servers:
+            assert provisioning.sweep() == [up]
+        assert list_servers.call_count == 1
+        assert state_of(up) == provisioning.BOOTING
+        assert state_of(down) == provisioning.CREATED
+
+    def test_api_error_keeps_servers(self):
+        server = make_server(provisioning.CREATED)
+        with mock.patch.object(timeweb, "list_servers", return_value=None):
+            assert provisioning.sweep() == []
+        assert state_of(server) == provisioning.CREATED
+
+    def test_overdue_server_fails(self, delete_server):
+        server = make_server(provisioning.CREATED, ago=provisioning.PROVISION_BOOT_TIMEOUT + 1)
+        with mock.patch.object(timeweb, "list_servers", return_value=[]):
+            assert provisioning.sweep() == []
+        assert not Server.objects.filter(pk=server.pk).exists()
+
+
+class TestBooting:
+    def test_waits_for_sshd(self):
+        server = make_server(provisioning.BOOTING)
+        with mock.patch.object(provisioning.socket, "create_connection", side_effect=OSError("refused")):
+            assert provisioning.advance(server.pk) == provisioning.PROVISION_POLL
+        assert state_of(server) == provisioning.BOOTING
+
+    def test_ssh_deadline(self, delete_server):
+        server = make_server(provisioning.BOOTING, ago=provisioning.PROVISION_SSH_TIMEOUT + 1)
+        with mock.patch.object(provisioning.socket, "create_connection", side_effect=OSError("refused")):
+            assert provisioning.advance(server.pk) is None
+        assert not Server.objects.filter(pk=server.pk).exists()
+
+    def test_ssh_up(self, manager):
+        server = make_server(provisioning.BOOTING)
+        with mock.patch.object(provisioning.socket, "create_connection"):
+            assert provisioning.advance(server.pk) == 0
+        assert state_of(server) == provisioning.SSH_READY
+
+    def test_golden_server_goes_to_personalize(self, manager, celery):
+        server = make_server(provisioning.BOOTING, golden_id=5)
+        with mock.patch.object(provisioning.socket, "create_connection"):
+            assert provisioning.advance(server.pk) is None
+        assert state_of(server) == provisioning.SSH_READY
+        celery.personalize.delay.assert_called_once_with(server.pk, 5)
+
+
+class TestSshReady:
+    def test_waits_while_apt_is_busy(self, manager):
+        server = make_server(provisioning.SSH_READY)
+        manager.commands["pgrep"] = ("busy\n", "", 0)
+        assert provisioning.advance(server.pk) == provisioning.PROVISION_POLL
+        assert state_of(server) == provisioning.SSH_READY
+
+    def test_installs_anyway_after_apt_wait(self, manager):
+        server = make_server(provisioning.SSH_READY, ago=provisioning.PROVISION_APT_WAIT + 1)
+        manager.commands["pgrep"] = ("busy\n", "", 0)
+        assert provisioning.advance(server.pk) == 0
+        assert state_of(server) == provisioning.DOCKER_READY
+
+    def test_uploads_stack_files(self, manager):
+        server = make_server(provisioning.SSH_READY)
+        assert provisioning.advance(server.pk) == 0
+        assert state_of(server) == provisioning.DOCKER_READY
+        files = manager.upload_many.call_args.args[0]
+        assert set(files) == {"/root/openclaw/Dockerfile", "/root/openclaw/docker-compose.yml"}
+
+    def test_retries_then_replaces_pool_server(self, manager, celery, delete_server):
+        server = make_server(provisioning.SSH_READY)
+        manager.commands["docker --version"] = ("", "not found", 127)
+        manager.commands["curl -fsSL https://get.docker.com"] = ("", "no network", 1)
+        for failures in range(1, provisioning.PROVISION_STEP_RETRIES):
+            assert provisioning.advance(server.pk) == provisioning.PROVISION_RETRY_DELAY
+            server.refresh_from_db()
+            assert (server.provision_state, server.provision_failures) == (provisioning.SSH_READY, failures)
+            assert "get.docker.com" in server.last_error
+        assert provisioning.advance(server.pk) is None
+        assert not Server.objects.filter(pk=server.pk).exists()
+        celery.replace.delay.assert_called_once_with()
+
+    def test_step_already_running(self, manager):
+        server = make_server(provisioning.SSH_READY)
+        cache.add(f"provision-step:{server.pk}", 1)
+        assert provisioning.advance(server.pk) is None
+        manager.exec_command.assert_not_called()
+
+
+class TestDockerReady:
+    def test_pool_server_warm_deploy(self, manager, celery):
+        server = make_server(provisioning.DOCKER_READY)
+        manager.warm_deploy_standby.return_value = True
+        assert provisioning.advance(server.pk) is None
+        assert state_of(server) == provisioning.WARM
+        assert server.status == "active"
+        manager.warm_deploy_standby.assert_called_once_with()
+        assert "Pool server ready" in celery.notify_admin.delay.call_args.args[0]
+
+    def test_failed_warm_deploy_still_activates(self, manager):
+        server = make_server(provisioning.DOCKER_READY)
+        manager.warm_deploy_standby.return_value = False
+        provisioning.advance(server.pk)
+        assert state_of(server) == provisioning.WARM
+        assert server.status == "active"
+
+    def test_user_server_full_deploy(self, manager):
+        profile = User.objects.create(username="u", email="u@example.com").profile
+        profile.telegram_bot_token = "123:abc"
+        profile.openrouter_api_key = "sk-or"
+        profile.save()
+        server = make_server(provisioning.DOCKER_READY, profile=profile)
+        assert provisioning.advance(server.pk) is None
+        assert state_of(server) == provisioning.WARM
+        kwargs = manager.deploy_openclaw.call_args.kwargs
+        assert (kwargs["telegram_token"], kwargs["openrouter_key"]) == ("123:abc", "sk-or")
+        manager.warm_deploy_standby.assert_not_called()
+
+    def test_user_server_is_kept_on_failure(self, manager, celery, delete_server):
+        profile = User.objects.create(username="u", email="u@example.com").profile
+        profile.telegram_bot_token = "123:abc"
+        profile.save()
+        server = make_server(provisioning.DOCKER_READY, profile=profile)
+        manager.deploy_openclaw.side_effect = provisioning.ProvisioningError("no disk space")
+        assert provisioning.advance(server.pk) is None
+        server.refresh_from_db()
+        assert (server.provision_state, server.status) == (provisioning.FAILED, "error")
+        assert server.provision_data["failed_in"] == provisioning.DOCKER_READY
+        delete_server.assert_not_called()
+        celery.replace.delay.assert_not_called()
+        assert celery.notify_error.delay.call_args.args[0] == "Server Setup Failed"
+
+
+class TestLegacyShims:
+    def test_setup_standby_server(self, celery):
+        server = Server.objects.create(status="creating", timeweb_server_id="77")
+        tasks.setup_standby_server(server.pk)
+        assert state_of(server) == provisioning.BOOTING
+        celery.advance.delay.assert_called_once_with(server.pk)
+
+    def test_setup_standby_server_keeps_state(self, celery):
+        server = make_server(provisioning.SSH_READY)
+        tasks.setup_standby_server(server.pk)
+        assert state_of(server) == provisioning.SSH_READY
+        celery.advance.delay.assert_called_once_with(server.pk)
+
+    def test_setup_openclaw_server_needs_a_user(self, celery):
+        server = Server.objects.create(status="creating", timeweb_server_id="77")
+        tasks.setup_openclaw_server(server.pk)
+        assert state_of(server) == ""
+        celery.advance.delay.assert_not_called()
+
+        profile = User.objects.create(username="u", email="u@example.com").profile
+        server.profile = profile
+        server.save(update_fields=["profile"])
+        tasks.setup_openclaw_server(server.pk)
+        assert state_of(server) == provisioning.BOOTING
+        celery.advance.delay.assert_called_once_with(server.pk)
@@ -0,0 +1,112 @@
+"""Celery queue setup of apps.servers.queues: worker profiles and wait stats.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_queues.py -v
+"""
+
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+from django.core.cache import cache
+from kombu import Queue
+
+from apps.servers import queues
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def conf(task_queues=None):
+    return SimpleNamespace(worker_concurrency=None, worker_prefetch_multiplier=4, task_queues=task_queues)
+
+
+class TestConfigureWorker:
+    def test_one_queue(self):
+        c = conf()
+        queues.configure_worker(c, {"queues": ["deploy"]})
+        assert (c.worker_concurrency, c.worker_prefetch_multiplier) == (4, 1)
+
+    def test_several_queues(self):
+        c = conf()
+        queues.configure_worker(c, {"queues": "monitoring,notifications,celery"})
+        assert c.worker_concurrency == 4
+        assert c.worker_prefetch_multiplier == 1
+
+    def test_command_line_wins(self):
+        c = conf()
+        c.worker_concurrency = 16
+        queues.configure_worker(c, {"queues": ["notifications"], "concurrency": 16, "prefetch_multiplier": 4})
+        assert (c.worker_concurrency, c.worker_prefetch_multiplier) == (16, 4)
+
+    def test_unknown_queue_is_left_alone(self):
+        c = conf()
+        queues.configure_worker(c, {"queues": ["celery"]})
+        assert (c.worker_concurrency, c.worker_prefetch_multiplier) == (None, 4)
+
+    def test_plain_worker_consumes_everything(self):
+        c = conf([Queue(name) for name in (*queues.QUEUES, "celery")])
+        queues.configure_worker(c, {"queues": None})
+        # Only the safe prefetch: concurrency stays Celery's default
+        assert (c.worker_concurrency, c.worker_prefetch_multiplier) == (None, 1)
+
+
+def test_server_lane():
+    assert queues.server_lane(SimpleNamespace(profile_id=None)) == {}
+    assert queues.server_lane(SimpleNamespace(profile_id=3)) == {
+        "queue": queues.DEPLOY, "priority": queues.PRIORITY_FIRST_PAYMENT,
+    }
+
+
+def test_wait_stats():
+    assert queues.wait_stats(queues.DEPLOY) == {"count": 0}
+    for seconds in range(1, 101):
+        queues.record_wait(queues.DEPLOY, float(seconds))
+    stats = queues.wait_stats(queues.DEPLOY)
+    assert (stats["count"], stats["avg"], stats["max"]) == (100, 50.5, 100.0)
+    assert (stats["p50"], stats["p95"]) == (51.0, 96.0)
+    assert queues.wait_stats(queues.BILLING) == {"count": 0}
+
+
+def test_recent_waits_are_capped():
+    for _ in range(queues.WAIT_SAMPLES + 50):
+        queues.record_wait(queues.DEPLOY, 1.0)
+    assert len(cache.get(f"queue-wait:{queues.DEPLOY}")["recent"]) == queues.WAIT_SAMPLES
+    assert queues.wait_stats(queues.DEPLOY)["count"] == queues.WAIT_SAMPLES + 50
+
+
+class TestRecordWait:
+    def task(self, enqueued_at, eta=None, queue=queues.DEPLOY):
+        request = SimpleNamespace(
+            enqueued_at=enqueued_at, headers={}, delivery_info={"routing_key": queue}, eta=eta,
+        )
+        return SimpleNamespace(request=request)
+
+    def test_wait_since_enqueue(self):
+        queues._record_wait(task=self.task(time.time() - 10))
+        assert 10 <= queues.wait_stats(queues.DEPLOY)["max"] < 11
+
+    def test_countdown_is_not_a_wait(self):
+        # Sent 100 s ago with a countdown that ran out 5 s ago, or runs out later
+        eta = datetime.fromtimestamp(time.time() - 5)
+        queues._record_wait(task=self.task(time.time() - 100, eta=eta.isoformat()))
+        queues._record_wait(task=self.task(time.time() - 100, eta=eta + timedelta(seconds=60)))
+        stats = queues.wait_stats(queues.DEPLOY)
+        assert stats["count"] == 2
+        assert 5 <= stats["max"] < 6
+
+    def test_eager_call_is_skipped(self):
+        queues._record_wait(task=self.task(None))
+        queues._record_wait(task=SimpleNamespace(request=None))
+        assert queues.wait_stats(queues.DEPLOY) == {"count": 0}
+
+    def test_enqueue_time_is_stamped(self):
+        headers = {}
+        queues._stamp_enqueued(headers=headers)
+        assert isinstance(headers["enqueued_at"], float)
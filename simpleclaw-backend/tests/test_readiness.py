@@ -0,0 +1,123 @@
+"""Readiness polling of apps.servers.readiness.wait_until (scripted polls, no sleeping).
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_readiness.py -v
+"""
+
+import shutil
+import socket
+import subprocess
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from apps.servers import readiness
+from apps.servers.readiness import Probe
+
+PROBES = (Probe("a", "check a"), Probe("b", "check b"))
+
+
+class Batch:
+    def __init__(self, manager):
+        self.manager = manager
+        self.added = []
+
+    def add(self, cmd, name, timeout):
+        self.added.append((name, cmd, timeout))
+        return self
+
+    def run(self):
+        outcome = self.manager.polls.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return SimpleNamespace(steps=[
+            SimpleNamespace(name=name, ok=name not in outcome) for name, _, _ in self.added
+        ])
+
+
+class Manager:
+    """`polls`: per poll the probe names still failing, or an exception."""
+
+    def __init__(self, *polls):
+        self.polls = list(polls)
+        self.batches = []
+        self.server = SimpleNamespace(ip_address="10.0.0.1")
+        self.cancelled = False
+
+    def batch(self):
+        self.batches.append(Batch(self))
+        return self.batches[-1]
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """time.monotonic that only sleep() advances."""
+    now = [0.0]
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        now[0] += seconds
+
+    monkeypatch.setattr(readiness.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(readiness.time, "sleep", sleep)
+    return sleeps
+
+
+def test_ready_on_first_poll(clock):
+    m = Manager(set())
+    result = readiness.wait_until(m, PROBES)
+    assert (result.ok, result.polls, result.pending) == (True, 1, [])
+    assert clock == []
+    assert m.batches[0].added == [("a", "check a", readiness.PROBE_TIMEOUT), ("b", "check b", readiness.PROBE_TIMEOUT)]
+
+
+def test_backoff_until_all_pass_in_one_poll(clock):
+    m = Manager({"a", "b"}, {"b"}, {"a"}, set())
+    result = readiness.wait_until(m, PROBES, initial_delay=0.5, max_delay=1.0)
+    assert (result.ok, result.polls) == (True, 4)
+    assert clock == [0.5, 0.8, 1.0]
+    assert result.elapsed == pytest.approx(2.3)
+
+
+def test_timeout_reports_pending(clock):
+    m = Manager(*[{"b"}] * 20)
+    result = readiness.wait_until(m, PROBES, timeout=3, initial_delay=1, max_delay=1)
+    assert not result.ok
+    assert result.pending == ["b"]
+    assert result.polls == 4
+    assert sum(clock) == 3
+
+
+def test_transport_error_is_not_ready(clock):
+    m = Manager(EOFError("connection reset"), set())
+    assert readiness.wait_until(m, PROBES).ok
+    assert len(m.batches) == 2
+
+
+def test_cancelled_deploy_stops_waiting(clock):
+    m = Manager(RuntimeError("cancelled"))
+    m.cancelled = True
+    with pytest.raises(RuntimeError):
+        readiness.wait_until(m, PROBES)
+
+
+def test_require_ready_raises():
+    from apps.servers.services import ServerManager
+
+    m = mock.Mock()
+    m.wait_ready.return_value = readiness.ReadinessResult(ok=False, elapsed=90, polls=20, pending=["openclaw:cli"])
+    with pytest.raises(RuntimeError, match="openclaw:cli"):
+        ServerManager.require_ready(m, readiness.CONTAINER_READY)
+
+
+@pytest.mark.skipif(not shutil.which("bash"), reason="needs bash")
+def test_port_probe():
+    with socket.socket() as listener:
+        listener.bind(("127.0.0.1", 0))
+        listener.listen()
+        port = listener.getsockname()[1]
+        assert subprocess.run(["bash", "-c", readiness.port_open(port).cmd]).returncode == 0
+    assert subprocess.run(["bash", "-c", readiness.port_open(port).cmd], stderr=subprocess.DEVNULL).returncode != 0
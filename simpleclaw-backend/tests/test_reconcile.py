@@ -0,0 +1,163 @@
+"""Deploy reconciler (apps.servers.reconcile): which steps are skipped and what gets recorded.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_reconcile.py -v
+"""
+
+import json
+from unittest import mock
+
+import pytest
+
+from apps.servers import reconcile
+from apps.servers.models import Server
+from apps.servers.reconcile import CONTAINER, VOLUME, Reconciler
+
+pytestmark = pytest.mark.usefixtures("db")
+
+
+class FakeManager:
+    """A VPS with a manifest file, a config volume and an openclaw container."""
+
+    def __init__(self, server):
+        self.server = server
+        self.journal = None
+        self.manifest = None
+        self.manifest_writable = True
+        self.volume = "2026-01-01T00:00:00Z"
+        self.container = "c1 i1"
+
+    def exec_command(self, cmd, timeout=60):
+        if cmd.startswith("cat "):
+            return (self.manifest, "", 0) if self.manifest is not None else ("", "", 1)
+        if cmd.startswith("docker volume inspect"):
+            return f"{self.volume}\n", "", 0
+        if cmd.startswith("docker inspect"):
+            return f"{self.container}\n", "", 0
+        raise AssertionError(cmd)
+
+    def exec_stdin(self, cmd, data, timeout=60):
+        if not self.manifest_writable:
+            return "", "read-only file system", 1
+        self.manifest = data
+        return "", "", 0
+
+    def run_step(self, name, fn):
+        return fn()
+
+
+@pytest.fixture
+def manager():
+    return FakeManager(Server.objects.create(status="error"))
+
+
+def fresh(m):
+    """A new deploy of the same server: the DB record reloaded, the manifest still on the VPS."""
+    m.server.refresh_from_db()
+    return Reconciler(m)
+
+
+def test_second_run_skips(manager):
+    step = mock.Mock()
+    assert Reconciler(manager).step("watchdog", ("script v1",), step)
+    rec = fresh(manager)
+    assert not rec.step("watchdog", ("script v1",), step)
+    assert step.call_count == 1
+    assert rec.skipped == ["watchdog"] and rec.ran == []
+    assert rec.current("watchdog", ("script v1",))
+
+
+def test_changed_inputs_rerun(manager):
+    step = mock.Mock()
+    Reconciler(manager).step("watchdog", ("script v1",), step)
+    rec = fresh(manager)
+    assert not rec.current("watchdog", ("script v2",))
+    assert rec.step("watchdog", ("script v2",), step)
+    assert step.call_count == 2
+
+
+def test_both_records_are_required(manager):
+    step = mock.Mock()
+    Reconciler(manager).step("watchdog", ("v1",), step)
+    # Reinstalled VPS: the DB still has the digest, the manifest is gone
+    manager.manifest = None
+    assert fresh(manager).step("watchdog", ("v1",), step)
+    # Disk image of another server: the manifest matches, the DB doesn't
+    Server.objects.filter(pk=manager.server.pk).update(deploy_state={})
+    assert fresh(manager).step("watchdog", ("v1",), step)
+    assert step.call_count == 3
+
+
+def test_failed_step_is_not_recorded(manager):
+    assert Reconciler(manager).step("agents", ("v1",), lambda: False)
+    assert "agents" not in fresh(manager).server.deploy_state
+    with pytest.raises(RuntimeError):
+        Reconciler(manager).step("agents", ("v1",), mock.Mock(side_effect=RuntimeError("apt locked")))
+    assert fresh(manager).recorded("agents") is None
+
+
+def test_record_writes_both_places(manager):
+    Reconciler(manager).step("docker-files", ("compose",), mock.Mock())
+    manifest = json.loads(manager.manifest)
+    assert manifest["version"] == reconcile.MANIFEST_VERSION
+    digest = manifest["steps"]["docker-files"]["digest"]
+    assert fresh(manager).server.deploy_state["docker-files"]["digest"] == digest
+    # Earlier records of the server are kept
+    Server.objects.filter(pk=manager.server.pk).update(
+        deploy_state={**manager.server.deploy_state, "image": {"key": "k"}},
+    )
+    fresh(manager).step("watchdog", ("v1",), mock.Mock())
+    assert set(fresh(manager).server.deploy_state) == {"docker-files", "image", "watchdog"}
+    assert set(json.loads(manager.manifest)["steps"]) == {"docker-files", "watchdog"}
+
+
+def test_manifest_write_failure_reruns(manager):
+    manager.manifest_writable = False
+    step = mock.Mock()
+    Reconciler(manager).step("watchdog", ("v1",), step)
+    assert fresh(manager).step("watchdog", ("v1",), step)
+    assert step.call_count == 2
+
+
+def test_invalid_or_old_manifest_is_ignored(manager):
+    step = mock.Mock()
+    Reconciler(manager).step("watchdog", ("v1",), step)
+    manager.manifest = "not json"
+    assert fresh(manager).step("watchdog", ("v1",), step)
+    manager.manifest = manager.manifest.replace(
+        f'"version": {reconcile.MANIFEST_VERSION}', '"version": 0',
+    )
+    assert fresh(manager).step("watchdog", ("v1",), step)
+    assert step.call_count == 3
+
+
+@pytest.mark.parametrize("scope, change", [
+    (VOLUME, lambda m: setattr(m, "volume", "2026-02-01T00:00:00Z")),
+    (CONTAINER, lambda m: setattr(m, "container", "c2 i1")),
+    (CONTAINER, lambda m: setattr(m, "container", "c1 i2")),
+])
+def test_scope_identity(manager, scope, change):
+    step = mock.Mock()
+    Reconciler(manager).step("agents", ("v1",), step, scope=scope)
+    assert not fresh(manager).step("agents", ("v1",), step, scope=scope)
+    change(manager)
+    assert fresh(manager).step("agents", ("v1",), step, scope=scope)
+    assert step.call_count == 2
+
+
+def test_force(manager):
+    step = mock.Mock()
+    Reconciler(manager).step("watchdog", ("v1",), step)
+    manager.server.refresh_from_db()
+    rec = Reconciler(manager, force=True)
+    assert not rec.current("watchdog", ("v1",))
+    assert rec.step("watchdog", ("v1",), step)
+    assert step.call_count == 2
+
+
+def test_skip_is_journaled(manager):
+    Reconciler(manager).step("watchdog", ("v1",), mock.Mock())
+    manager.journal = mock.Mock()
+    fresh(manager).step("watchdog", ("v1",), mock.Mock())
+    manager.journal.skipped.assert_called_once_with("watchdog")
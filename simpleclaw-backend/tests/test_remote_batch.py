@@ -0,0 +1,136 @@
+"""RemoteBatch of apps.servers.remote_batch: the generated script (run by a local bash) and its step records.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_remote_batch.py -v
+"""
+
+import base64
+import io
+import shutil
+import subprocess
+from unittest import mock
+
+import pytest
+
+from apps.servers.remote_batch import RemoteBatch
+
+
+class LocalChannel:
+    """(stdin, stdout, stderr) of `bash -s` on this machine, shaped like paramiko's."""
+
+    def __init__(self):
+        self.proc = subprocess.Popen(
+            ["bash", "-s"], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        self.stdin = mock.Mock(write=lambda s: self.proc.stdin.write(s.encode()), flush=self.proc.stdin.flush)
+        self.stdin.channel.shutdown_write = self.proc.stdin.close
+        self.stdout = mock.MagicMock()
+        self.stdout.__iter__.side_effect = lambda: (line.decode() for line in self.proc.stdout)
+        self.stdout.channel.recv_exit_status = self.proc.wait
+        self.stderr = self.proc.stderr
+
+    def streams(self):
+        return self.stdin, self.stdout, self.stderr
+
+
+class ScriptedChannel:
+    """Channel whose stdout is a fixed list of lines (records made up by the test)."""
+
+    def __init__(self, lines, stderr=b""):
+        self.stdin = mock.Mock()
+        self.stdout = mock.MagicMock()
+        self.stdout.__iter__.side_effect = lambda: iter(lines)
+        self.stdout.channel.recv_exit_status.return_value = 0
+        self.stderr = io.BytesIO(stderr)
+
+    def streams(self):
+        return self.stdin, self.stdout, self.stderr
+
+
+def manager(channel):
+    m = mock.Mock()
+    m.server.ip_address = "10.0.0.1"
+    m._open_channel.side_effect = lambda cmd, timeout: channel.streams()
+    return m
+
+
+def record(index, code, out="", err="", ms=5):
+    out, err = (base64.b64encode(s.encode()).decode() for s in (out, err))
+    return f"__RB_STEP__ {index} {code} {ms} {out} {err}\n"
+
+
+needs_bash = pytest.mark.skipif(
+    not all(shutil.which(tool) for tool in ("bash", "base64", "timeout")), reason="needs bash, base64, timeout",
+)
+
+
+@needs_bash
+class TestScript:
+    def test_steps_run_in_order(self):
+        batch = RemoteBatch(manager(LocalChannel()))
+        batch.add("echo one", name="first")
+        batch.add("echo 'quo\"tes' $((1 + 1)) >&2; exit 3", name="second")
+        batch.add("printf 'ünïcode\\nline 2'", name="third")
+        seen = []
+        result = batch.run(on_step=lambda s: seen.append(s.name))
+
+        assert seen == ["first", "second", "third"]
+        assert result["first"].as_tuple() == ("one\n", "", 0)
+        assert result["second"].as_tuple() == ("", 'quo"tes 2\n', 3)
+        assert result["third"].stdout == "ünïcode\nline 2"
+        assert not result.ok
+        assert result.failures == ['second: exit=3 quo"tes 2']
+        batch.manager.state.saw_command.assert_any_call("echo one")
+
+    def test_abort_skips_the_rest(self):
+        batch = RemoteBatch(manager(LocalChannel()))
+        batch.add("true", name="ok")
+        batch.add("false", name="fails", on_error="abort")
+        batch.add("echo never", name="after")
+        result = batch.run()
+
+        assert result["fails"].exit_code == 1
+        assert result["after"].skipped and result["after"].exit_code is None
+        assert result.failures == ["fails: exit=1 "]
+
+    def test_ignored_failure_keeps_ok(self):
+        batch = RemoteBatch(manager(LocalChannel()))
+        batch.add("exit 7", name="optional", on_error="ignore")
+        batch.add("echo done", name="next")
+        result = batch.run()
+        assert result.ok and result.failures == []
+        assert result["optional"].exit_code == 7
+        assert result["next"].stdout == "done\n"
+
+    def test_step_timeout(self):
+        batch = RemoteBatch(manager(LocalChannel()))
+        batch.add("sleep 5", name="slow", timeout=1)
+        result = batch.run()
+        assert result["slow"].exit_code == 124
+        assert result["slow"].duration < 4
+
+
+class TestRecords:
+    def test_parses_records_between_noise(self):
+        lines = ["motd noise\n", record(1, 0, out="b"), "__RB_STEP__ broken\n", record(0, 2, err="a", ms=1500)]
+        batch = RemoteBatch(manager(ScriptedChannel(lines)))
+        batch.add("cmd a", name="a").add("cmd b", name="b").add("cmd c", name="c")
+        result = batch.run()
+
+        assert result["a"].as_tuple() == ("", "a", 2)
+        assert result["a"].duration == 1.5
+        assert result["b"].as_tuple() == ("b", "", 0)
+        assert result["c"].skipped
+        assert [c.args[0] for c in batch.manager.state.saw_command.call_args_list] == ["cmd a", "cmd b"]
+        assert batch.manager._track.call_args.kwargs["commands"] == 2
+        assert batch.manager._track.call_args.kwargs["exit_code"] == 2
+
+    def test_empty_batch_opens_no_channel(self):
+        batch = RemoteBatch(manager(ScriptedChannel([])))
+        assert batch.run().ok
+        batch.manager._open_channel.assert_not_called()
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            RemoteBatch(mock.Mock()).add("true", on_error="retry")
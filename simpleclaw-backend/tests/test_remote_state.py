@@ -0,0 +1,146 @@
+"""Remote state cache (apps.servers.remote_state): TTL, sharing and invalidation by MUTATIONS.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_remote_state.py -v
+"""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from apps.servers import remote_state
+from apps.servers.remote_state import CONFIG, CONTAINER, SKILLS, RemoteState
+
+
+class FakeManager:
+    """Runs nothing; answers the cached queries and reports commands like ServerManager.exec_command."""
+
+    def __init__(self, server, ttl=None):
+        self.server = server
+        self.commands = []
+        self.reads = 0
+        self.state = RemoteState(self, ttl=ttl)
+
+    def exec_command(self, cmd, timeout=60):
+        self.commands.append(cmd)
+        self.state.saw_command(cmd)
+        if cmd.startswith("docker inspect"):
+            return "running\n", "", 0
+        if "ls -1 /app/skills" in cmd:
+            return "weather\ngithub\n", "", 0
+        return "", "", 0
+
+    def _read_openclaw_config(self):
+        self.reads += 1
+        return {"browser": {"headless": True}}, f"sha{self.reads}"
+
+
+@pytest.fixture
+def server():
+    server = SimpleNamespace(pk=1, ip_address="10.0.0.1")
+    yield server
+    remote_state.forget(server)
+
+
+def fill(m):
+    m.state.container_status("openclaw")
+    m.state.config()
+    m.state.skills()
+
+
+def test_answers_are_cached(server):
+    m = FakeManager(server)
+    assert m.state.container_status("openclaw") == "running"
+    assert m.state.container_status("openclaw") == "running"
+    assert m.state.skills() == ["weather", "github"] == m.state.skills()
+    assert m.state.config() == ({"browser": {"headless": True}}, "sha1")
+    assert m.state.config_get("browser.headless") is True
+    assert len(m.commands) == 2 and m.reads == 1
+
+
+def test_config_copies_are_private(server):
+    m = FakeManager(server)
+    config, _ = m.state.config()
+    config["browser"]["headless"] = False
+    assert m.state.config_get("browser.headless") is True
+
+
+def test_entries_expire(server):
+    m = FakeManager(server, ttl=0.05)
+    m.state.config()
+    time.sleep(0.1)
+    assert m.state.config()[1] == "sha2"
+
+
+def test_zero_ttl_caches_nothing(server):
+    m = FakeManager(server, ttl=0)
+    m.state.skills()
+    m.state.skills()
+    assert len(m.commands) == 2
+
+
+def test_shared_by_managers_of_a_server(server):
+    first, second = FakeManager(server), FakeManager(server)
+    first.state.skills()
+    second.state.skills()
+    assert len(first.commands) == 1 and second.commands == []
+    # A command on one manager invalidates for the other
+    second.exec_command("docker exec openclaw rm -rf /app/skills/weather")
+    first.state.skills()
+    assert len(first.commands) == 2
+    # Other servers have their own entries
+    other = FakeManager(SimpleNamespace(pk=2))
+    try:
+        other.state.skills()
+        assert len(other.commands) == 1
+    finally:
+        remote_state.forget(other.server)
+
+
+@pytest.mark.parametrize("cmd, dropped", [
+    ("cd /root/openclaw && docker compose up -d --force-recreate", {CONTAINER, CONFIG, SKILLS}),
+    ("docker restart openclaw", {CONTAINER, CONFIG, SKILLS}),
+    ("systemctl restart docker", {CONTAINER, CONFIG, SKILLS}),
+    ("docker exec openclaw node /app/openclaw.mjs config set browser.headless false", {CONFIG}),
+    ("docker exec openclaw cat /root/.openclaw/openclaw.json", {CONFIG}),
+    ("docker cp /tmp/x openclaw:/app/skills/x", {SKILLS}),
+    ("mv /app/skills/weather /app/skills-disabled/", {SKILLS}),
+    ("docker logs --tail 50 openclaw", set()),
+    ("docker ps", set()),
+])
+def test_mutations(server, cmd, dropped):
+    m = FakeManager(server)
+    fill(m)
+    m.commands.clear()
+    m.exec_command(cmd)
+    fill(m)
+    refetched = {CONTAINER} if any(c.startswith("docker inspect") for c in m.commands[1:]) else set()
+    if any("ls -1 /app/skills" in c for c in m.commands[1:]):
+        refetched.add(SKILLS)
+    if m.reads > 1:
+        refetched.add(CONFIG)
+    assert refetched == dropped
+
+
+def test_put_and_invalidate(server):
+    m = FakeManager(server)
+    m.state.put(CONFIG, ({"a": 1}, "written"))
+    assert m.state.config() == ({"a": 1}, "written") and m.reads == 0
+    m.state.skills()
+    m.state.invalidate(CONFIG)
+    assert m.state.config()[1] == "sha1"
+    assert len(m.commands) == 1
+    m.state.invalidate()
+    m.state.skills()
+    assert len(m.commands) == 2
+
+
+def test_forget(server):
+    m = FakeManager(server)
+    m.state.skills()
+    remote_state.forget(server)
+    rebuilt = FakeManager(server)
+    rebuilt.state.skills()
+    assert len(rebuilt.commands) == 1
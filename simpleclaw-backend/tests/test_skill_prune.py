@@ -0,0 +1,61 @@
+"""Built-in skill pruning of ServerManager: the plan and the script applying it.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_skill_prune.py -v
+"""
+
+import shutil
+import subprocess
+
+import pytest
+
+from apps.servers.services import ServerManager
+
+ESSENTIAL = {"weather", "summarize"}
+REMOVE = {"apple-notes", "imsg"}
+
+
+def test_plan():
+    disable, delete = ServerManager.skill_prune_plan(
+        enabled=["weather", "github", "apple-notes", "summarize", "canvas"],
+        disabled=["imsg", "notion"],
+        essential=ESSENTIAL, remove=REMOVE,
+    )
+    assert disable == ["canvas", "github"]
+    assert delete == ["/app/skills-disabled/imsg", "/app/skills/apple-notes"]
+
+
+def test_essential_skills_are_never_touched():
+    disable, delete = ServerManager.skill_prune_plan(["weather"], ["summarize"], ESSENTIAL, REMOVE | {"weather"})
+    assert (disable, delete) == ([], [])
+    assert ServerManager.skill_prune_script(disable, delete) == ""
+
+
+@pytest.mark.skipif(not shutil.which("sh"), reason="needs sh")
+class TestScript:
+    def run(self, root, disable, delete):
+        script = ServerManager.skill_prune_script(disable, delete).replace("/app/", f"{root}/")
+        return subprocess.run(["sh", "-c", script], capture_output=True).returncode
+
+    def tree(self, root, enabled, disabled=()):
+        for name in enabled:
+            (root / "skills" / name).mkdir(parents=True)
+        (root / "skills-disabled").mkdir()
+        for name in disabled:
+            (root / "skills-disabled" / name).mkdir()
+            (root / "skills-disabled" / name / "old").touch()
+
+    def test_moves_and_deletes(self, tmp_path):
+        self.tree(tmp_path, ["weather", "github", "apple-notes"], disabled=["github", "imsg"])
+        assert self.run(tmp_path, ["github"], ["/app/skills/apple-notes", "/app/skills-disabled/imsg"]) == 0
+        assert sorted(p.name for p in (tmp_path / "skills").iterdir()) == ["weather"]
+        assert sorted(p.name for p in (tmp_path / "skills-disabled").iterdir()) == ["github"]
+        # The image's version replaced the older copy
+        assert not (tmp_path / "skills-disabled" / "github" / "old").exists()
+
+    def test_failed_move_fails_the_script(self, tmp_path):
+        self.tree(tmp_path, ["canvas", "github"])
+        assert self.run(tmp_path, ["canvas", "missing", "github"], []) != 0
+        assert (tmp_path / "skills-disabled" / "canvas").exists()
+        assert (tmp_path / "skills" / "github").exists()
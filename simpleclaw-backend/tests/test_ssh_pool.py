@@ -0,0 +1,139 @@
+"""Checkout, reuse and eviction of apps.servers.ssh_pool.SSHConnectionPool (no real SSH).
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_ssh_pool.py -v
+"""
+
+import threading
+import time
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+
+from apps.servers import ssh_pool
+from apps.servers.ssh_pool import PooledConnection, SSHConnectionPool
+
+
+def server(pk=1, password="secret"):
+    return SimpleNamespace(pk=pk, ip_address=f"10.0.0.{pk}", ssh_port=22, ssh_user="root", ssh_password=password)
+
+
+def client(alive=True):
+    c = mock.Mock()
+    c.get_transport.return_value.is_active.return_value = alive
+    c.get_transport.return_value.is_authenticated.return_value = alive
+    return c
+
+
+class FakePool(SSHConnectionPool):
+    """Opens mock connections instead of dialing the server."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.opened = []
+
+    def _open(self, key, server):
+        conn = PooledConnection(key, client())
+        self.opened.append(conn)
+        return conn
+
+    def _ensure_reaper(self):
+        pass
+
+
+def test_released_connection_is_reused():
+    pool = FakePool()
+    first = pool.acquire(server())
+    pool.release(first)
+    assert pool.acquire(server()) is first
+    assert len(pool.opened) == 1
+
+
+def test_servers_and_credentials_get_their_own_connections():
+    pool = FakePool()
+    pool.release(pool.acquire(server()))
+    assert pool.acquire(server(pk=2)) is not pool.opened[0]
+    # A changed password is a new key: the old transport isn't handed out
+    assert pool.acquire(server(password="new")) is not pool.opened[0]
+    assert len(pool.opened) == 3
+
+
+def test_dead_or_discarded_connections_are_closed():
+    pool = FakePool()
+    conn = pool.acquire(server())
+    pool.release(conn, discard=True)
+    conn.client.close.assert_called_once_with()
+
+    conn = pool.acquire(server())
+    pool.release(conn)
+    conn.transport.is_active.return_value = False
+    assert pool.acquire(server()) is not conn
+    conn.client.close.assert_called_once_with()
+
+
+def test_stale_connection_is_probed(monkeypatch):
+    monkeypatch.setattr(ssh_pool, "SSH_POOL_PROBE_AFTER", 0)
+    pool = FakePool()
+    conn = pool.acquire(server())
+    pool.release(conn)
+    conn.transport.open_session.side_effect = EOFError
+    assert pool.acquire(server()) is not conn
+    conn.client.close.assert_called_once_with()
+
+
+def test_slots_per_host():
+    pool = FakePool(max_per_host=2)
+    a, b = pool.acquire(server()), pool.acquire(server())
+    with pytest.raises(TimeoutError):
+        pool.acquire(server(), timeout=0.05)
+    # Another server has its own slots
+    pool.acquire(server(pk=2), timeout=0.05)
+
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire(server(), timeout=2)))
+    waiter.start()
+    time.sleep(0.05)
+    pool.release(a)
+    waiter.join()
+    assert got == [a]
+    assert b is not a
+
+
+def test_failed_open_frees_the_slot():
+    pool = FakePool(max_per_host=1)
+    with mock.patch.object(pool, "_open", side_effect=OSError("refused")):
+        with pytest.raises(OSError):
+            pool.acquire(server())
+    pool.acquire(server(), timeout=0.05)
+
+
+def test_reap_idle():
+    pool = FakePool(idle_timeout=60)
+    old, fresh = pool.acquire(server()), pool.acquire(server())
+    pool.release(old)
+    pool.release(fresh)
+    old.last_used -= 120
+    pool.reap_idle()
+    old.client.close.assert_called_once_with()
+    fresh.client.close.assert_not_called()
+    assert pool.acquire(server()) is fresh
+
+
+def test_evict_closes_idle_connections_of_one_server():
+    pool = FakePool()
+    one, two = pool.acquire(server()), pool.acquire(server(pk=2))
+    pool.release(one)
+    pool.release(two)
+    pool.evict(server())
+    one.client.close.assert_called_once_with()
+    two.client.close.assert_not_called()
+    assert pool.acquire(server()) is not one
+
+
+def test_pool_is_recreated_after_fork(monkeypatch):
+    pool = ssh_pool.get_pool()
+    assert ssh_pool.get_pool() is pool
+    monkeypatch.setattr(ssh_pool.os, "getpid", lambda: -1)
+    assert ssh_pool.get_pool() is not pool
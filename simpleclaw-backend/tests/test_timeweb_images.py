@@ -0,0 +1,153 @@
+"""Golden-image and server-list calls of apps.servers.timeweb against a local stand-in for the TimeWeb API.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_timeweb_images.py -v
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from apps.servers import timeweb
+
+
+class FakeTimeWeb:
+    """In-memory servers, disks and images; images are 'created' after `image_polls` GETs."""
+
+    def __init__(self, image_polls=2):
+        self.image_polls = image_polls
+        self.images = {}
+        self.created_servers = []
+        self.listed_servers = []
+        self.requests = []
+
+
+def _handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, code, body=None):
+            data = json.dumps(body or {}).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def do_GET(self):
+            state.requests.append(("GET", self.path, self.headers.get("Authorization")))
+            path, _, query = self.path.partition("?")
+            parts = path.strip("/").split("/")
+            if parts == ["servers"]:
+                params = dict(p.split("=") for p in query.split("&") if p)
+                offset, limit = int(params.get("offset", 0)), int(params.get("limit", 100))
+                return self._send(200, {"servers": state.listed_servers[offset:offset + limit],
+                                        "meta": {"total": len(state.listed_servers)}})
+            if parts[:1] == ["servers"] and parts[2:] == ["disks"]:
+                return self._send(200, {"server_disks": [
+                    {"id": 11, "is_system": False},
+                    {"id": 10, "is_system": True},
+                ]})
+            if parts[:1] == ["images"] and len(parts) == 2:
+                image = state.images.get(parts[1])
+                if image is None:
+                    return self._send(404)
+                image["polls"] += 1
+                if image["polls"] >= state.image_polls:
+                    image["status"] = "created"
+                return self._send(200, {"image": {"id": parts[1], "status": image["status"]}})
+            return self._send(404)
+
+        def do_POST(self):
+            body = self._body()
+            state.requests.append(("POST", self.path, body))
+            if self.path == "/images":
+                image_id = f"img-{len(state.images) + 1}"
+                state.images[image_id] = {"disk_id": body["disk_id"], "status": "new", "polls": 0}
+                return self._send(201, {"image": {"id": image_id, "status": "new"}})
+            if self.path == "/servers":
+                state.created_servers.append(body)
+                return self._send(201, {"server": {"id": 500 + len(state.created_servers), "status": "installing",
+                                                   "root_pass": "pw"}})
+            return self._send(404)
+
+        def do_DELETE(self):
+            state.requests.append(("DELETE", self.path, None))
+            parts = self.path.strip("/").split("/")
+            if parts[:1] == ["images"] and state.images.pop(parts[1], None) is not None:
+                return self._send(204)
+            return self._send(404)
+
+    return Handler
+
+
+@pytest.fixture
+def fake_timeweb(monkeypatch):
+    state = FakeTimeWeb()
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler(state))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(timeweb, "TIMEWEB_API_BASE", f"http://127.0.0.1:{httpd.server_address[1]}")
+    yield state
+    httpd.shutdown()
+    httpd.server_close()
+
+
+class TestGoldenImageApi:
+    """Snapshot a server disk, poll the image, create a server from it."""
+
+    def test_system_disk(self, fake_timeweb):
+        assert timeweb.get_system_disk_id(42) == 10
+
+    def test_snapshot_and_poll(self, fake_timeweb):
+        image_id = timeweb.create_image(10, "openclaw-golden-test")
+        assert image_id == "img-1"
+        assert fake_timeweb.images[image_id]["disk_id"] == 10
+        assert timeweb.get_image(image_id)["status"] == "new"
+        assert timeweb.get_image(image_id)["status"] == "created"
+
+    def test_unknown_image(self, fake_timeweb):
+        assert timeweb.get_image("img-404") is None
+
+    def test_create_server_from_image(self, fake_timeweb):
+        result = timeweb.create_server("openclaw-pool-test", "pool@simpleclaw.com", image_id="img-1")
+        assert result["id"] == 501
+        body = fake_timeweb.created_servers[0]
+        assert body["image_id"] == "img-1"
+        assert "os_id" not in body
+
+    def test_delete_image(self, fake_timeweb):
+        image_id = timeweb.create_image(10, "openclaw-golden-test")
+        assert timeweb.delete_image(image_id)
+        assert not timeweb.delete_image(image_id)
+
+    def test_auth_header(self, fake_timeweb):
+        timeweb.get_image("img-missing")
+        method, path, auth = fake_timeweb.requests[-1]
+        assert (method, path, auth) == ("GET", "/images/img-missing", "Bearer test-token")
+
+
+class TestServerList:
+    """All account servers in a few paged calls (the provisioning sweep)."""
+
+    def test_paged(self, fake_timeweb):
+        fake_timeweb.listed_servers = [
+            {"id": i, "status": "on", "networks": [{"ips": [{"type": "ipv4", "ip": f"10.0.0.{i}"}]}]}
+            for i in range(5)
+        ]
+        servers = timeweb.list_servers(page_size=2)
+        assert [s["id"] for s in servers] == [0, 1, 2, 3, 4]
+        assert len([r for r in fake_timeweb.requests if r[1].startswith("/servers?")]) == 3
+        assert timeweb.server_ips(servers[3]) == ("10.0.0.3", None)
+
+    def test_api_error(self, fake_timeweb, monkeypatch):
+        monkeypatch.setattr(timeweb, "TIMEWEB_API_BASE", timeweb.TIMEWEB_API_BASE + "/missing")
+        assert timeweb.list_servers() is None
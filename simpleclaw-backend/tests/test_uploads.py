@@ -0,0 +1,90 @@
+"""File uploads of ServerManager: SFTP upload_file and the one-channel upload_many.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_uploads.py -v
+"""
+
+import io
+import tarfile
+from unittest import mock
+
+import paramiko
+import pytest
+
+from apps.servers.services import ServerManager
+
+
+def manager():
+    m = mock.Mock()
+    m.server.ip_address = "10.0.0.1"
+    m._shared = False
+    return m
+
+
+class FakeSFTP:
+    def __init__(self, fail=None):
+        self.files = {}
+        self.fail = fail
+        self.modes = {}
+
+    def putfo(self, fileobj, path, confirm=True):
+        if self.fail:
+            error, self.fail = self.fail, None
+            raise error
+        self.files[path] = fileobj.read()
+
+    def chmod(self, path, mode):
+        self.modes[path] = mode
+
+
+class TestUploadFile:
+    @pytest.mark.parametrize("content", ["ünïcode", "ünïcode".encode(), io.BytesIO("ünïcode".encode())])
+    def test_content_types(self, content):
+        m, sftp = manager(), FakeSFTP()
+        m.sftp.return_value = sftp
+        ServerManager.upload_file(m, content, "/root/openclaw/.env", mode=0o600)
+        assert sftp.files == {"/root/openclaw/.env": "ünïcode".encode()}
+        assert sftp.modes == {"/root/openclaw/.env": 0o600}
+        m._track.assert_called_once_with(commands=1, sent=len("ünïcode".encode()))
+
+    def test_stale_session_is_reopened_once(self):
+        m = manager()
+        stale, fresh = FakeSFTP(fail=paramiko.SSHException("channel closed")), FakeSFTP()
+        m.sftp.side_effect = [stale, fresh]
+        ServerManager.upload_file(m, "data", "/tmp/a")
+        assert fresh.files == {"/tmp/a": b"data"}
+        assert m._conn._sftp is None
+
+    def test_remote_path_error_is_raised(self):
+        m = manager()
+        m.sftp.return_value = FakeSFTP(fail=FileNotFoundError(2, "No such file"))
+        with pytest.raises(FileNotFoundError):
+            ServerManager.upload_file(m, "data", "/missing/a")
+        assert m.sftp.call_count == 1
+
+
+class TestUploadMany:
+    def test_one_tar_over_one_channel(self):
+        m = manager()
+        m.exec_stdin.return_value = ("", "", 0)
+        ServerManager.upload_many(m, {"/root/openclaw/.env": "A=1\n", "/root/openclaw/searxng/settings.yml": b"x"})
+
+        cmd, data = m.exec_stdin.call_args.args
+        assert cmd == "tar -xf - -C /"
+        with tarfile.open(fileobj=io.BytesIO(data)) as tar:
+            members = {t.name: t for t in tar.getmembers()}
+            assert sorted(members) == ["root/openclaw/.env", "root/openclaw/searxng/settings.yml"]
+            assert tar.extractfile("root/openclaw/.env").read() == b"A=1\n"
+            assert members["root/openclaw/.env"].mode == 0o644
+
+    def test_nothing_to_upload(self):
+        m = manager()
+        ServerManager.upload_many(m, {})
+        m.exec_stdin.assert_not_called()
+
+    def test_failed_extract_raises(self):
+        m = manager()
+        m.exec_stdin.return_value = ("", "tar: Cannot open: Read-only file system", 2)
+        with pytest.raises(RuntimeError, match="Read-only"):
+            ServerManager.upload_many(m, {"/a": "x"})
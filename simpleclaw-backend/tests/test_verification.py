@@ -0,0 +1,70 @@
+"""Concurrent remote checks of apps.servers.verification.
+
+Usage:
+    cd simpleclaw-backend
+    pytest tests/test_verification.py -v
+"""
+
+import json
+from unittest import mock
+
+from apps.servers import verification
+from apps.servers.verification import Check
+
+
+def manager(raw):
+    """exec_parallel stand-in: {name: (out, err, exit_code, duration)}."""
+    m = mock.Mock()
+    m.server.ip_address = "10.0.0.1"
+    m.exec_parallel.return_value = raw
+    return m
+
+
+def judge(out, err, code):
+    return code == 0 and "ok" in out, f"out={out.strip()!r}"
+
+
+def test_results_keep_input_order():
+    checks = [Check("b", "cmd b", judge, timeout=5), Check("a", "cmd a", judge, timeout=15)]
+    m = manager({"a": ("ok\n", "", 0, 2.0), "b": ("bad\n", "", 0, 0.5)})
+    results = verification.run_checks(m, checks)
+
+    m.exec_parallel.assert_called_once_with({"b": "cmd b", "a": "cmd a"}, timeout=15)
+    assert [(r.name, r.ok, r.duration) for r in results] == [("b", False, 0.5), ("a", True, 2.0)]
+    assert results[1].out == "ok\n" and results[1].exit_code == 0
+    assert verification.failures_of(results) == ["out='bad'"]
+
+
+def test_raising_evaluate_is_a_failure():
+    checks = [Check("broken", "cmd", lambda out, err, code: 1 / 0)]
+    result, = verification.run_checks(manager({"broken": ("", "", 0, 0.1)}), checks)
+    assert not result.ok
+    assert "ZeroDivisionError" in result.detail
+
+
+def test_timed_out_check():
+    result, = verification.run_checks(manager({"slow": ("", "", None, 30.0)}), [Check("slow", "sleep 60", judge)])
+    assert not result.ok and result.exit_code is None
+
+
+def test_no_checks():
+    m = manager({})
+    assert verification.run_checks(m, []) == []
+    m.exec_parallel.assert_called_once_with({}, timeout=verification.CHECK_TIMEOUT)
+
+
+def test_container_status():
+    check = verification.container_status("searxng", label="SearXNG")
+    assert check.evaluate("running\n", "", 0) == (True, "SearXNG container status='running'")
+    assert check.evaluate("restarting\n", "", 0)[0] is False
+
+
+def test_config_value():
+    check = verification.config_value(
+        "search-provider", "tools.web.search.provider", lambda v: v == "brave", lambda v: f"provider={v}",
+    )
+    config = json.dumps({"tools": {"web": {"search": {"provider": "brave"}}}})
+    assert check.evaluate(config, "", 0) == (True, "provider=brave")
+    assert check.evaluate("{", "", 0) == (False, "provider=None")
+    assert check.evaluate(config, "", 1) == (False, "provider=None")
+    assert check.evaluate("{}", "", 0) == (False, "provider=None")